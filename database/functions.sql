@@ -8,6 +8,8 @@
 -- ==============================================
 
 -- Add Delivery Function
+-- Prices every product from effective_prices (the shop's custom rate or the
+-- milk type's price) in one join.
 CREATE OR REPLACE FUNCTION add_delivery(
   p_shop_id UUID,
   p_delivery_boy_id UUID,
@@ -20,13 +22,10 @@ SET search_path = 'public'
 AS $$
 DECLARE
   v_delivery_id UUID;
-  v_total_amount NUMERIC := 0;
-  v_product JSONB;
-  v_price NUMERIC;
-  v_quantity INTEGER;
-  v_subtotal NUMERIC;
-  v_products_with_prices JSONB := '[]'::JSONB;
-  v_shop_name TEXT;
+  v_total_amount NUMERIC;
+  v_products_with_prices JSONB;
+  v_priced INTEGER;
+  v_bad_quantity BOOLEAN;
 BEGIN
   -- Validate inputs
   IF p_products IS NULL OR jsonb_array_length(p_products) = 0 THEN
@@ -36,46 +35,50 @@ BEGIN
     );
   END IF;
 
-  -- Get shop name for activity log
-  SELECT name INTO v_shop_name FROM shops WHERE id = p_shop_id;
-  
-  -- Process each product and calculate total
-  FOR v_product IN SELECT * FROM jsonb_array_elements(p_products)
-  LOOP
-    -- Get price from milk_types table
-    SELECT price_per_packet INTO v_price
-    FROM milk_types
-    WHERE id = (v_product->>'milk_type_id')::UUID
-    AND is_active = true;
-    
-    IF v_price IS NULL THEN
-      RETURN jsonb_build_object(
-        'success', false,
-        'error', 'Invalid or inactive milk type'
-      );
-    END IF;
-    
-    v_quantity := (v_product->>'quantity')::INTEGER;
-    
-    IF v_quantity <= 0 THEN
-      RETURN jsonb_build_object(
-        'success', false,
-        'error', 'Quantity must be greater than 0'
-      );
-    END IF;
-    
-    v_subtotal := v_price * v_quantity;
-    v_total_amount := v_total_amount + v_subtotal;
-    
-    -- Build product array with prices
-    v_products_with_prices := v_products_with_prices || 
+  IF NOT EXISTS (SELECT 1 FROM shops WHERE id = p_shop_id) THEN
+    RETURN jsonb_build_object(
+      'success', false,
+      'error', 'Shop not found'
+    );
+  END IF;
+
+  -- Price all products at once; effective_prices only has active milk types
+  SELECT
+    COUNT(ep.price_per_packet),
+    bool_or(COALESCE(p.quantity, 0) <= 0),
+    SUM(ep.price_per_packet * p.quantity),
+    jsonb_agg(
       jsonb_build_object(
-        'milk_type_id', v_product->>'milk_type_id',
-        'quantity', v_quantity,
-        'price_per_packet', v_price,
-        'subtotal', v_subtotal
-      );
-  END LOOP;
+        'milk_type_id', p.milk_type_id,
+        'name', mt.name,
+        'quantity', p.quantity,
+        'price_per_packet', ep.price_per_packet,
+        'subtotal', ep.price_per_packet * p.quantity
+      ) ORDER BY p.ord
+    )
+  INTO v_priced, v_bad_quantity, v_total_amount, v_products_with_prices
+  FROM (
+    SELECT (e.item->>'milk_type_id')::UUID AS milk_type_id,
+           (e.item->>'quantity')::INTEGER AS quantity,
+           e.ord
+    FROM jsonb_array_elements(p_products) WITH ORDINALITY AS e(item, ord)
+  ) p
+  LEFT JOIN effective_prices ep ON ep.shop_id = p_shop_id AND ep.milk_type_id = p.milk_type_id
+  LEFT JOIN milk_types mt ON mt.id = ep.milk_type_id;
+
+  IF v_priced < jsonb_array_length(p_products) THEN
+    RETURN jsonb_build_object(
+      'success', false,
+      'error', 'Invalid or inactive milk type'
+    );
+  END IF;
+
+  IF v_bad_quantity THEN
+    RETURN jsonb_build_object(
+      'success', false,
+      'error', 'Quantity must be greater than 0'
+    );
+  END IF;
 
   -- Insert delivery
   INSERT INTO deliveries (
@@ -86,8 +89,10 @@ BEGIN
     total_amount,
     payment_amount,
     payment_status,
+    delivery_status,
     is_archived,
-    notes
+    notes,
+    delivered_at
   ) VALUES (
     p_shop_id,
     p_delivery_boy_id,
@@ -96,17 +101,18 @@ BEGIN
     v_total_amount,
     0,
     'pending',
+    'delivered',
     false,
-    p_notes
+    p_notes,
+    NOW()
   )
   RETURNING id INTO v_delivery_id;
 
-  -- Log activity
+  -- Log activity (message text is derived at read time by activity_message)
   INSERT INTO activity_log (
     shop_id,
     delivery_boy_id,
     activity_type,
-    message,
     amount,
     delivery_date,
     metadata
@@ -114,7 +120,6 @@ BEGIN
     p_shop_id,
     p_delivery_boy_id,
     'delivery_added',
-    'Delivery added to ' || v_shop_name || ': ₹' || v_total_amount,
     v_total_amount,
     p_delivery_date,
     jsonb_build_object('delivery_id', v_delivery_id)
@@ -263,11 +268,10 @@ BEGIN
   )
   WHERE id = v_payment_id;
 
-  -- Log activity
+  -- Log activity (message text is derived at read time by activity_message)
   INSERT INTO activity_log (
     shop_id,
     activity_type,
-    message,
     amount,
     delivery_date,
     metadata
@@ -277,7 +281,6 @@ BEGIN
       WHEN v_applied_amount = p_amount THEN 'payment_collected'
       ELSE 'payment_partial'
     END,
-    'Collected ₹' || p_amount || ' from ' || v_shop_name,
     p_amount,
     p_payment_date,
     jsonb_build_object('payment_id', v_payment_id)
@@ -297,6 +300,73 @@ BEGIN
 END;
 $$;
 
+-- Reset Deliveries Chunk
+-- Archives up to p_limit active deliveries of p_date (all of them when NULL)
+-- and moves each one's unpaid amount to shop_pending_history. A chunk
+-- (p_limit set) skips rows locked by a concurrent reset or payment, so
+-- chunks never wait on each other and never move a delivery twice; the
+-- job picks the skipped rows up in a later chunk. A full reset (p_limit
+-- NULL, process_daily_reset) waits for those locks instead, so it never
+-- leaves a delivery of the date behind.
+-- Shared by process_daily_reset and the chunked reset jobs.
+CREATE OR REPLACE FUNCTION reset_deliveries_chunk(
+  p_date DATE,
+  p_limit INTEGER DEFAULT NULL
+) RETURNS TABLE(processed INTEGER, pending_moved NUMERIC)
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+BEGIN
+  RETURN QUERY EXECUTE format($sql$
+  WITH batch AS (
+    SELECT d.id, d.shop_id, d.delivery_date, d.payment_status, d.total_amount, d.payment_amount
+    FROM deliveries d
+    WHERE d.delivery_date = $1
+      AND d.is_archived = false
+      AND d.payment_status IN ('paid', 'pending', 'partial', 'pay_tomorrow')
+    LIMIT $2
+    FOR UPDATE %s
+  ),
+  history AS (
+    -- Pending, partial, or pay tomorrow with an amount left: move to history
+    INSERT INTO shop_pending_history (
+      shop_id,
+      original_delivery_id,
+      original_date,
+      pending_amount,
+      note
+    )
+    SELECT
+      b.shop_id,
+      b.id,
+      b.delivery_date,
+      b.total_amount - b.payment_amount,
+      CASE
+        WHEN b.payment_status = 'pay_tomorrow' THEN 'Payment was deferred to tomorrow'
+        ELSE 'Pending from ' || $1::TEXT
+      END
+    FROM batch b
+    WHERE b.payment_status <> 'paid'
+      AND b.total_amount > b.payment_amount
+    RETURNING 1
+  ),
+  archived AS (
+    -- Archive every delivery in the batch (mark as processed for the day)
+    UPDATE deliveries d
+    SET is_archived = true,
+        updated_at = now()
+    FROM batch b
+    WHERE d.id = b.id
+    RETURNING 1
+  )
+  SELECT
+    (SELECT COUNT(*) FROM archived)::INTEGER,
+    (SELECT COALESCE(SUM(b.total_amount - b.payment_amount), 0) FROM batch b)
+  $sql$, CASE WHEN p_limit IS NULL THEN '' ELSE 'SKIP LOCKED' END)
+  USING p_date, p_limit;
+END;
+$$;
+
 -- Process Daily Reset Function
 CREATE OR REPLACE FUNCTION process_daily_reset(
   p_date DATE DEFAULT CURRENT_DATE
@@ -307,55 +377,11 @@ AS $$
 DECLARE
   v_processed_deliveries INTEGER := 0;
   v_total_pending NUMERIC := 0;
-  v_delivery RECORD;
 BEGIN
-  -- Process each delivery for the specified date
-  FOR v_delivery IN
-    SELECT * FROM deliveries
-    WHERE delivery_date = p_date
-      AND is_archived = false
-  LOOP
-    -- Calculate pending amount for this delivery
-    v_total_pending := v_total_pending + (v_delivery.total_amount - v_delivery.payment_amount);
-
-    -- Handle different payment statuses
-    IF v_delivery.payment_status = 'paid' THEN
-      -- Fully paid - just archive it
-      UPDATE deliveries
-      SET is_archived = true,
-          updated_at = now()
-      WHERE id = v_delivery.id;
-
-    ELSIF v_delivery.payment_status IN ('pending', 'partial', 'pay_tomorrow') THEN
-      -- Pending, partial, or pay tomorrow - move to history if there's pending amount
-      IF v_delivery.total_amount > v_delivery.payment_amount THEN
-        INSERT INTO shop_pending_history (
-          shop_id,
-          original_delivery_id,
-          original_date,
-          pending_amount,
-          note
-        ) VALUES (
-          v_delivery.shop_id,
-          v_delivery.id,
-          v_delivery.delivery_date,
-          v_delivery.total_amount - v_delivery.payment_amount,
-          CASE
-            WHEN v_delivery.payment_status = 'pay_tomorrow' THEN 'Payment was deferred to tomorrow'
-            ELSE 'Pending from ' || p_date::TEXT
-          END
-        );
-      END IF;
-
-      -- Archive the delivery (mark as processed for the day)
-      UPDATE deliveries
-      SET is_archived = true,
-          updated_at = now()
-      WHERE id = v_delivery.id;
-    END IF;
-
-    v_processed_deliveries := v_processed_deliveries + 1;
-  END LOOP;
+  -- Archive every delivery for the specified date in one statement
+  SELECT c.processed, c.pending_moved
+  INTO v_processed_deliveries, v_total_pending
+  FROM reset_deliveries_chunk(p_date) c;
 
   -- Return summary
   RETURN jsonb_build_object(
@@ -369,9 +395,14 @@ END;
 $$;
 
 -- Mark Pay Tomorrow Function
+-- Defers the shop's unpaid deliveries of p_date (default today). The old
+-- two-argument version is dropped first: next to this one it would make
+-- every two-argument call ambiguous.
+DROP FUNCTION IF EXISTS mark_pay_tomorrow(UUID, TEXT);
 CREATE OR REPLACE FUNCTION mark_pay_tomorrow(
   p_shop_id UUID,
-  p_notes TEXT DEFAULT NULL
+  p_notes TEXT DEFAULT NULL,
+  p_date DATE DEFAULT CURRENT_DATE
 ) RETURNS JSONB
 LANGUAGE plpgsql
 SET search_path = 'public'
@@ -380,11 +411,11 @@ DECLARE
   v_delivery RECORD;
   v_affected_count INTEGER := 0;
 BEGIN
-  -- Find today's deliveries for this shop that have pending amounts and aren't already deferred
+  -- Find the day's deliveries for this shop that have pending amounts and aren't already deferred
   FOR v_delivery IN
     SELECT * FROM deliveries
     WHERE shop_id = p_shop_id
-      AND delivery_date = CURRENT_DATE
+      AND delivery_date = p_date
       AND is_archived = false
       AND payment_status IN ('pending', 'partial')
       AND (total_amount - payment_amount) > 0
@@ -399,18 +430,16 @@ BEGIN
     v_affected_count := v_affected_count + 1;
   END LOOP;
 
-  -- Log activity
+  -- Log activity (message text is derived at read time by activity_message)
   INSERT INTO activity_log (
     shop_id,
     activity_type,
-    message,
     delivery_date,
     metadata
   ) VALUES (
     p_shop_id,
     'payment_deferred',
-    'Payment deferred to tomorrow for ' || v_affected_count || ' deliveries',
-    CURRENT_DATE,
+    p_date,
     jsonb_build_object(
       'affected_deliveries', v_affected_count,
       'notes', p_notes
@@ -426,6 +455,112 @@ BEGIN
 END;
 $$;
 
+-- Process Payments Batch Function
+-- Posts a collection sheet in one transaction. Each row runs process_payment
+-- in its own subtransaction, so a bad row is reported and skipped while the
+-- rest are posted. Rows: {"shop_id" | "shop_name", "amount", "collected_by",
+-- "payment_date", "notes", "ref"}; "ref" is echoed back to match results.
+CREATE OR REPLACE FUNCTION process_payments_batch(
+  p_payments JSONB
+) RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_row JSONB;
+  v_index INTEGER;
+  v_shop_id UUID;
+  v_matches INTEGER;
+  v_result JSONB;
+  v_results JSONB := '[]'::JSONB;
+  v_posted INTEGER := 0;
+  v_failed INTEGER := 0;
+  v_total_posted NUMERIC := 0;
+BEGIN
+  IF p_payments IS NULL OR jsonb_typeof(p_payments) != 'array' THEN
+    RETURN jsonb_build_object(
+      'success', false,
+      'error', 'Payments must be a JSON array'
+    );
+  END IF;
+
+  IF jsonb_array_length(p_payments) > 1000 THEN
+    RETURN jsonb_build_object(
+      'success', false,
+      'error', 'At most 1000 payments per batch'
+    );
+  END IF;
+
+  FOR v_row, v_index IN
+    SELECT value, ordinality::INTEGER FROM jsonb_array_elements(p_payments) WITH ORDINALITY
+  LOOP
+    BEGIN
+      v_shop_id := NULL;
+      v_result := NULL;
+      IF jsonb_typeof(v_row) != 'object' THEN
+        v_result := jsonb_build_object('success', false, 'error', 'Row must be a JSON object');
+      ELSIF COALESCE(v_row->>'shop_id', '') != '' THEN
+        v_shop_id := (v_row->>'shop_id')::UUID;
+      ELSIF COALESCE(trim(v_row->>'shop_name'), '') != '' THEN
+        SELECT min(id::TEXT)::UUID, count(*) INTO v_shop_id, v_matches
+        FROM shops
+        WHERE lower(name) = lower(trim(v_row->>'shop_name'))
+          AND is_active = true;
+        IF v_matches > 1 THEN
+          v_shop_id := NULL;
+          v_result := jsonb_build_object('success', false, 'error', 'Shop name is ambiguous');
+        ELSIF v_shop_id IS NULL THEN
+          v_result := jsonb_build_object('success', false, 'error', 'Shop not found');
+        END IF;
+      ELSE
+        v_result := jsonb_build_object('success', false, 'error', 'shop_id or shop_name is required');
+      END IF;
+
+      IF v_shop_id IS NOT NULL THEN
+        v_result := process_payment(
+          v_shop_id,
+          (v_row->>'amount')::NUMERIC,
+          v_row->>'collected_by',
+          COALESCE((v_row->>'payment_date')::DATE, CURRENT_DATE),
+          v_row->>'notes'
+        );
+      END IF;
+    EXCEPTION WHEN OTHERS THEN
+      -- Bad casts or a failing row roll back this row only
+      v_result := jsonb_build_object('success', false, 'error', SQLERRM);
+    END;
+
+    IF (v_result->>'success')::BOOLEAN THEN
+      v_posted := v_posted + 1;
+      v_total_posted := v_total_posted + (v_result->>'amount_paid')::NUMERIC;
+      v_result := jsonb_build_object(
+        'success', true,
+        'payment_id', v_result->'payment_id',
+        'amount_paid', v_result->'amount_paid',
+        'amount_applied', v_result->'amount_applied',
+        'amount_remaining', v_result->'amount_remaining'
+      );
+    ELSE
+      v_failed := v_failed + 1;
+    END IF;
+
+    v_results := v_results || (v_result || jsonb_build_object(
+      'index', v_index,
+      'ref', v_row->'ref',
+      'shop_id', v_shop_id
+    ));
+  END LOOP;
+
+  RETURN jsonb_build_object(
+    'success', true,
+    'posted', v_posted,
+    'failed', v_failed,
+    'total_posted', v_total_posted,
+    'results', v_results
+  );
+END;
+$$;
+
 -- ==============================================
 -- VIEW FUNCTIONS
 -- ==============================================
@@ -729,6 +864,637 @@ BEGIN
 END;
 $$;
 
+-- Get Shops Overview
+-- One row per active shop for the shops list: balance (same total_pending
+-- as get_shop_balance), whether it had an active delivery on p_date and
+-- its latest payment that day. Replaces one get_shop_balance call per shop.
+CREATE OR REPLACE FUNCTION get_shops_overview(p_date DATE DEFAULT CURRENT_DATE)
+RETURNS TABLE(
+  shop_id UUID,
+  shop_name TEXT,
+  owner_name TEXT,
+  phone TEXT,
+  route_number INTEGER,
+  total_pending NUMERIC,
+  delivered_today BOOLEAN,
+  last_payment_amount NUMERIC,
+  last_payment_at TIMESTAMPTZ
+)
+LANGUAGE plpgsql
+STABLE
+SET search_path = 'public'
+AS $$
+BEGIN
+  RETURN QUERY
+  WITH active_deliveries AS (
+    SELECT
+      d.shop_id as sid,
+      SUM(d.total_amount - d.payment_amount) as pending,
+      bool_or(d.delivery_date = p_date) as delivered
+    FROM deliveries d
+    WHERE d.is_archived = false
+    GROUP BY d.shop_id
+  ),
+  old_pending AS (
+    SELECT h.shop_id as sid, SUM(h.pending_amount) as pending
+    FROM shop_pending_history h
+    GROUP BY h.shop_id
+  ),
+  last_payments AS (
+    SELECT DISTINCT ON (p.shop_id)
+      p.shop_id as sid, p.amount, p.created_at
+    FROM payments p
+    WHERE p.payment_date = p_date
+    ORDER BY p.shop_id, p.created_at DESC
+  )
+  SELECT
+    s.id,
+    s.name::TEXT,
+    s.owner_name::TEXT,
+    s.phone::TEXT,
+    s.route_number,
+    COALESCE(ad.pending, 0) + COALESCE(op.pending, 0),
+    COALESCE(ad.delivered, false),
+    lp.amount,
+    lp.created_at
+  FROM shops s
+  LEFT JOIN active_deliveries ad ON ad.sid = s.id
+  LEFT JOIN old_pending op ON op.sid = s.id
+  LEFT JOIN last_payments lp ON lp.sid = s.id
+  WHERE s.is_active = true
+  ORDER BY COALESCE(ad.delivered, false), s.name;
+END;
+$$;
+
+-- ==============================================
+-- ACTIVITY LOG RETENTION
+-- ==============================================
+
+-- Activity Message (display text derived from structured activity data)
+CREATE OR REPLACE FUNCTION activity_message(
+  p_activity_type TEXT,
+  p_amount NUMERIC,
+  p_metadata JSONB,
+  p_shop_name TEXT
+) RETURNS TEXT
+LANGUAGE plpgsql
+IMMUTABLE
+SET search_path = 'public'
+AS $$
+BEGIN
+  RETURN CASE p_activity_type
+    WHEN 'delivery_added' THEN 'Delivery added to ' || COALESCE(p_shop_name, 'shop') || ': ₹' || p_amount
+    WHEN 'payment_collected' THEN 'Collected ₹' || p_amount || ' from ' || COALESCE(p_shop_name, 'shop')
+    WHEN 'payment_partial' THEN 'Collected ₹' || p_amount || ' from ' || COALESCE(p_shop_name, 'shop')
+    WHEN 'pending_added' THEN 'Manual pending added: ₹' || p_amount
+      || COALESCE(' - ' || NULLIF(p_metadata->>'note', ''), '')
+    WHEN 'payment_deferred' THEN 'Payment deferred to tomorrow for '
+      || COALESCE(p_metadata->>'affected_deliveries', '0') || ' deliveries'
+    ELSE initcap(replace(p_activity_type, '_', ' '))
+      || COALESCE(': ₹' || p_amount, '')
+  END;
+END;
+$$;
+
+-- Activity Summary Message (display text for one compacted day)
+CREATE OR REPLACE FUNCTION activity_summary_message(p_day activity_log_daily)
+RETURNS TEXT
+LANGUAGE plpgsql
+IMMUTABLE
+SET search_path = 'public'
+AS $$
+BEGIN
+  RETURN concat_ws(', ',
+    CASE WHEN p_day.deliveries_count > 0
+      THEN p_day.deliveries_count || ' delivered: ₹' || p_day.delivered_amount END,
+    CASE WHEN p_day.payments_count > 0
+      THEN p_day.payments_count || ' paid: ₹' || p_day.collected_amount END,
+    CASE WHEN p_day.pending_added_count > 0
+      THEN 'pending added: ₹' || p_day.pending_added_amount END,
+    CASE WHEN p_day.deferrals_count > 0
+      THEN 'deferred ' || p_day.deferrals_count || 'x' END
+  );
+END;
+$$;
+
+-- Get Shop Activity (newest first, bounded; compacted days appear as 'daily_summary' rows)
+CREATE OR REPLACE FUNCTION get_shop_activity(
+  p_shop_id UUID,
+  p_limit INTEGER DEFAULT 100,
+  p_before TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+  p_types TEXT[] DEFAULT NULL
+)
+RETURNS TABLE(
+  id UUID,
+  activity_type TEXT,
+  message TEXT,
+  amount NUMERIC,
+  activity_date DATE,
+  created_at TIMESTAMP WITH TIME ZONE,
+  metadata JSONB,
+  entry_count INTEGER
+)
+LANGUAGE plpgsql
+STABLE
+SET search_path = 'public'
+AS $$
+#variable_conflict use_column
+DECLARE
+  v_shop_name TEXT;
+BEGIN
+  SELECT name INTO v_shop_name FROM shops WHERE shops.id = p_shop_id;
+
+  RETURN QUERY
+  SELECT * FROM (
+    SELECT
+      a.id,
+      a.activity_type,
+      COALESCE(a.message, activity_message(a.activity_type, a.amount, a.metadata, v_shop_name)),
+      a.amount,
+      COALESCE(a.delivery_date, a.created_at::DATE),
+      a.created_at,
+      a.metadata,
+      1
+    FROM activity_log a
+    WHERE a.shop_id = p_shop_id
+      AND (p_before IS NULL OR a.created_at < p_before)
+      AND (p_types IS NULL OR a.activity_type = ANY(p_types))
+    ORDER BY a.created_at DESC
+    LIMIT p_limit
+  ) recent
+  UNION ALL
+  SELECT * FROM (
+    SELECT
+      d.id,
+      'daily_summary'::TEXT,
+      activity_summary_message(d),
+      d.delivered_amount,
+      d.activity_date,
+      d.last_at,
+      jsonb_build_object(
+        'deliveries_count', d.deliveries_count,
+        'delivered_amount', d.delivered_amount,
+        'payments_count', d.payments_count,
+        'collected_amount', d.collected_amount,
+        'pending_added_amount', d.pending_added_amount,
+        'deferrals_count', d.deferrals_count
+      ),
+      d.entry_count
+    FROM activity_log_daily d
+    WHERE d.shop_id = p_shop_id
+      AND (p_before IS NULL OR d.last_at < p_before)
+      AND (p_types IS NULL OR 'daily_summary' = ANY(p_types))
+    ORDER BY d.last_at DESC
+    LIMIT p_limit
+  ) summaries
+  ORDER BY 6 DESC
+  LIMIT p_limit;
+END;
+$$;
+
+-- Compact Activity Log (one batch: roll old rows into activity_log_daily, then delete them)
+-- Call repeatedly until 'done' is true; each call is its own short transaction.
+CREATE OR REPLACE FUNCTION compact_activity_log(
+  p_older_than INTERVAL DEFAULT INTERVAL '90 days',
+  p_batch_size INTEGER DEFAULT 5000
+) RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_cutoff TIMESTAMP WITH TIME ZONE := now() - p_older_than;
+  v_compacted INTEGER;
+  v_days INTEGER;
+BEGIN
+  IF p_batch_size <= 0 THEN
+    RETURN jsonb_build_object(
+      'success', false,
+      'error', 'Batch size must be greater than 0'
+    );
+  END IF;
+
+  WITH batch AS (
+    DELETE FROM activity_log
+    WHERE id IN (
+      SELECT id FROM activity_log
+      WHERE created_at < v_cutoff
+      ORDER BY created_at
+      LIMIT p_batch_size
+      FOR UPDATE SKIP LOCKED
+    )
+    RETURNING shop_id, activity_type, COALESCE(amount, 0) AS amount,
+              COALESCE(delivery_date, created_at::DATE) AS activity_date, created_at
+  ),
+  summarized AS (
+    INSERT INTO activity_log_daily (
+      shop_id, activity_date, entry_count,
+      deliveries_count, delivered_amount,
+      payments_count, collected_amount,
+      pending_added_count, pending_added_amount,
+      deferrals_count, first_at, last_at
+    )
+    SELECT
+      shop_id,
+      activity_date,
+      COUNT(*),
+      COUNT(*) FILTER (WHERE activity_type = 'delivery_added'),
+      COALESCE(SUM(amount) FILTER (WHERE activity_type = 'delivery_added'), 0),
+      COUNT(*) FILTER (WHERE activity_type IN ('payment_collected', 'payment_partial')),
+      COALESCE(SUM(amount) FILTER (WHERE activity_type IN ('payment_collected', 'payment_partial')), 0),
+      COUNT(*) FILTER (WHERE activity_type = 'pending_added'),
+      COALESCE(SUM(amount) FILTER (WHERE activity_type = 'pending_added'), 0),
+      COUNT(*) FILTER (WHERE activity_type = 'payment_deferred'),
+      MIN(created_at),
+      MAX(created_at)
+    FROM batch
+    GROUP BY shop_id, activity_date
+    ON CONFLICT (shop_id, activity_date) DO UPDATE
+    SET entry_count = activity_log_daily.entry_count + EXCLUDED.entry_count,
+        deliveries_count = activity_log_daily.deliveries_count + EXCLUDED.deliveries_count,
+        delivered_amount = activity_log_daily.delivered_amount + EXCLUDED.delivered_amount,
+        payments_count = activity_log_daily.payments_count + EXCLUDED.payments_count,
+        collected_amount = activity_log_daily.collected_amount + EXCLUDED.collected_amount,
+        pending_added_count = activity_log_daily.pending_added_count + EXCLUDED.pending_added_count,
+        pending_added_amount = activity_log_daily.pending_added_amount + EXCLUDED.pending_added_amount,
+        deferrals_count = activity_log_daily.deferrals_count + EXCLUDED.deferrals_count,
+        first_at = LEAST(activity_log_daily.first_at, EXCLUDED.first_at),
+        last_at = GREATEST(activity_log_daily.last_at, EXCLUDED.last_at)
+    RETURNING 1
+  )
+  SELECT (SELECT COUNT(*) FROM batch), (SELECT COUNT(*) FROM summarized)
+  INTO v_compacted, v_days;
+
+  RETURN jsonb_build_object(
+    'success', true,
+    'cutoff', v_cutoff,
+    'compacted', v_compacted,
+    'summary_rows', v_days,
+    'done', v_compacted < p_batch_size
+  );
+END;
+$$;
+
+-- ==============================================
+-- EFFECTIVE PRICES
+-- ==============================================
+
+-- Refresh Effective Prices
+-- Recomputes the effective_prices rows of one shop, one milk type, one pair
+-- or (both NULL) everything: the shop_rates price when the shop has one,
+-- else the milk_types price, for every active milk type. Rows that did not
+-- change are left alone; rows of inactive milk types are removed.
+CREATE OR REPLACE FUNCTION refresh_effective_prices(
+  p_shop_id UUID DEFAULT NULL,
+  p_milk_type_id UUID DEFAULT NULL
+) RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_updated INTEGER;
+  v_removed INTEGER;
+BEGIN
+  WITH wanted AS (
+    SELECT
+      s.id AS shop_id,
+      mt.id AS milk_type_id,
+      COALESCE(r.custom_price_per_packet, mt.price_per_packet) AS price_per_packet,
+      mt.price_per_packet AS base_price_per_packet,
+      r.id IS NOT NULL AS is_custom
+    FROM shops s
+    CROSS JOIN milk_types mt
+    LEFT JOIN shop_rates r ON r.shop_id = s.id AND r.milk_type_id = mt.id
+    WHERE mt.is_active = true
+    AND (p_shop_id IS NULL OR s.id = p_shop_id)
+    AND (p_milk_type_id IS NULL OR mt.id = p_milk_type_id)
+  ),
+  upserted AS (
+    INSERT INTO effective_prices AS ep (shop_id, milk_type_id, price_per_packet, base_price_per_packet, is_custom)
+    SELECT shop_id, milk_type_id, price_per_packet, base_price_per_packet, is_custom
+    FROM wanted
+    ON CONFLICT (shop_id, milk_type_id) DO UPDATE SET
+      price_per_packet = EXCLUDED.price_per_packet,
+      base_price_per_packet = EXCLUDED.base_price_per_packet,
+      is_custom = EXCLUDED.is_custom,
+      updated_at = NOW()
+    WHERE (ep.price_per_packet, ep.base_price_per_packet, ep.is_custom)
+      IS DISTINCT FROM (EXCLUDED.price_per_packet, EXCLUDED.base_price_per_packet, EXCLUDED.is_custom)
+    RETURNING 1
+  ),
+  removed AS (
+    DELETE FROM effective_prices ep
+    WHERE (p_shop_id IS NULL OR ep.shop_id = p_shop_id)
+    AND (p_milk_type_id IS NULL OR ep.milk_type_id = p_milk_type_id)
+    AND NOT EXISTS (
+      SELECT 1 FROM wanted w
+      WHERE w.shop_id = ep.shop_id AND w.milk_type_id = ep.milk_type_id
+    )
+    RETURNING 1
+  )
+  SELECT (SELECT COUNT(*) FROM upserted), (SELECT COUNT(*) FROM removed)
+  INTO v_updated, v_removed;
+
+  RETURN jsonb_build_object(
+    'success', true,
+    'updated', v_updated,
+    'removed', v_removed
+  );
+END;
+$$;
+
+-- Sync Effective Prices (trigger function)
+-- Keeps effective_prices current: a new shop gets a row per active milk
+-- type, a milk type's price or is_active change reprices it for every
+-- shop, and a shop_rates change reprices just that shop and milk type.
+CREATE OR REPLACE FUNCTION sync_effective_prices()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+BEGIN
+  IF TG_TABLE_NAME = 'shops' THEN
+    PERFORM refresh_effective_prices(NEW.id, NULL);
+  ELSIF TG_TABLE_NAME = 'milk_types' THEN
+    PERFORM refresh_effective_prices(NULL, NEW.id);
+  ELSE
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+      PERFORM refresh_effective_prices(OLD.shop_id, OLD.milk_type_id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+      PERFORM refresh_effective_prices(NEW.shop_id, NEW.milk_type_id);
+    END IF;
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS sync_effective_prices_shops ON shops;
+CREATE TRIGGER sync_effective_prices_shops
+  AFTER INSERT ON shops
+  FOR EACH ROW EXECUTE FUNCTION sync_effective_prices();
+
+DROP TRIGGER IF EXISTS sync_effective_prices_milk_types ON milk_types;
+CREATE TRIGGER sync_effective_prices_milk_types
+  AFTER INSERT OR UPDATE OF price_per_packet, is_active ON milk_types
+  FOR EACH ROW EXECUTE FUNCTION sync_effective_prices();
+
+DROP TRIGGER IF EXISTS sync_effective_prices_shop_rates ON shop_rates;
+CREATE TRIGGER sync_effective_prices_shop_rates
+  AFTER INSERT OR UPDATE OR DELETE ON shop_rates
+  FOR EACH ROW EXECUTE FUNCTION sync_effective_prices();
+
+-- Backfill every shop and milk type that existed before the triggers
+-- (schema.sql seeds shops and milk types before this file runs)
+SELECT refresh_effective_prices();
+
+-- ==============================================
+-- DAILY RESET JOBS
+-- ==============================================
+
+-- Get Reset Preview Data
+-- What process_daily_reset(p_date) would do, without touching any row: one
+-- index-only pass over idx_deliveries_active_date. estimated_ms is the
+-- expected reset time, from the per-delivery time of the last background
+-- resets (daily_reset_jobs.reset_ms), or a conservative default before any
+-- reset has run.
+CREATE OR REPLACE FUNCTION get_reset_preview_data(p_date DATE DEFAULT CURRENT_DATE)
+RETURNS TABLE(
+  total_deliveries BIGINT,
+  paid_deliveries BIGINT,
+  pending_deliveries BIGINT,
+  partial_deliveries BIGINT,
+  pay_tomorrow_deliveries BIGINT,
+  history_rows BIGINT,
+  total_paid_amount NUMERIC,
+  total_pending_amount NUMERIC,
+  shops_with_pending BIGINT,
+  estimated_ms NUMERIC
+)
+LANGUAGE plpgsql
+STABLE
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_ms_per_delivery NUMERIC;
+BEGIN
+  -- Recent resets big enough to be measured, else 0.1 ms per delivery
+  SELECT SUM(j.reset_ms) / SUM(j.processed_deliveries)
+  INTO v_ms_per_delivery
+  FROM (
+    SELECT reset_ms, processed_deliveries
+    FROM daily_reset_jobs
+    WHERE status = 'done' AND processed_deliveries >= 100 AND reset_ms > 0
+    ORDER BY reset_date DESC
+    LIMIT 7
+  ) j;
+
+  RETURN QUERY
+  SELECT
+    COUNT(*),
+    COUNT(*) FILTER (WHERE d.payment_status = 'paid'),
+    COUNT(*) FILTER (WHERE d.payment_status = 'pending'),
+    COUNT(*) FILTER (WHERE d.payment_status = 'partial'),
+    COUNT(*) FILTER (WHERE d.payment_status = 'pay_tomorrow'),
+    COUNT(*) FILTER (WHERE d.payment_status <> 'paid' AND d.total_amount > d.payment_amount),
+    COALESCE(SUM(d.payment_amount), 0),
+    COALESCE(SUM(d.total_amount - d.payment_amount), 0),
+    COUNT(DISTINCT d.shop_id) FILTER (WHERE d.payment_status <> 'paid' AND d.total_amount > d.payment_amount),
+    -- Fixed cost of the statement plus the per-delivery time
+    round(20 + COUNT(*) * COALESCE(v_ms_per_delivery, 0.1))
+  FROM deliveries d
+  WHERE d.delivery_date = p_date
+    AND d.is_archived = false
+    AND d.payment_status IN ('paid', 'pending', 'partial', 'pay_tomorrow');
+END;
+$$;
+
+-- Enqueue Daily Reset
+-- Queues the reset of p_date (default yesterday) for the reset worker
+-- (python -m database.tools.reset_worker). One job per date: an existing job
+-- is left alone unless it failed, in which case it is queued again.
+CREATE OR REPLACE FUNCTION enqueue_daily_reset(
+  p_date DATE DEFAULT CURRENT_DATE - 1,
+  p_chunk_size INTEGER DEFAULT 500
+) RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_job daily_reset_jobs;
+BEGIN
+  IF p_chunk_size <= 0 THEN
+    RETURN jsonb_build_object(
+      'success', false,
+      'error', 'Chunk size must be greater than 0'
+    );
+  END IF;
+
+  INSERT INTO daily_reset_jobs (reset_date, chunk_size)
+  VALUES (p_date, p_chunk_size)
+  ON CONFLICT (reset_date) DO UPDATE
+  SET status = 'pending',
+      chunk_size = EXCLUDED.chunk_size,
+      error = NULL
+  WHERE daily_reset_jobs.status = 'failed';
+
+  SELECT * INTO v_job FROM daily_reset_jobs WHERE reset_date = p_date;
+
+  RETURN jsonb_build_object(
+    'success', true,
+    'job_id', v_job.id,
+    'reset_date', v_job.reset_date,
+    'status', v_job.status
+  );
+END;
+$$;
+
+-- Claim Daily Reset Job
+-- Hands the oldest queued job to p_worker. A running job whose worker has
+-- not reported for p_stale_after is taken over: chunks already processed
+-- stay archived, so the new worker simply continues with what is left.
+CREATE OR REPLACE FUNCTION claim_daily_reset_job(
+  p_worker TEXT,
+  p_stale_after INTERVAL DEFAULT INTERVAL '2 minutes'
+) RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_job daily_reset_jobs;
+BEGIN
+  SELECT * INTO v_job
+  FROM daily_reset_jobs
+  WHERE status = 'pending'
+     OR (status = 'running' AND heartbeat_at < now() - p_stale_after)
+  ORDER BY reset_date
+  LIMIT 1
+  FOR UPDATE SKIP LOCKED;
+
+  IF NOT FOUND THEN
+    RETURN jsonb_build_object('success', true, 'job', NULL);
+  END IF;
+
+  UPDATE daily_reset_jobs
+  SET status = 'running',
+      worker = p_worker,
+      heartbeat_at = now(),
+      started_at = COALESCE(started_at, now())
+  WHERE id = v_job.id
+  RETURNING * INTO v_job;
+
+  RETURN jsonb_build_object('success', true, 'job', to_jsonb(v_job));
+END;
+$$;
+
+-- Run Daily Reset Chunk
+-- Processes the next chunk_size deliveries of a claimed job and records the
+-- progress in the same transaction, so an interrupted worker loses at most
+-- the chunk in flight. "done" means the chunk found nothing to process and
+-- no active delivery of the date is left; "waiting" means the rows left are
+-- locked by a concurrent write, so the worker backs off before retrying.
+-- Only chunks that processed rows are counted.
+-- reset_ms accumulates the archiving time, for get_reset_preview_data.
+CREATE OR REPLACE FUNCTION run_daily_reset_chunk(
+  p_job_id UUID,
+  p_worker TEXT
+) RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_job daily_reset_jobs;
+  v_processed INTEGER;
+  v_pending_moved NUMERIC;
+  v_done BOOLEAN;
+  v_started TIMESTAMP WITH TIME ZONE;
+BEGIN
+  SELECT * INTO v_job FROM daily_reset_jobs WHERE id = p_job_id FOR UPDATE;
+
+  IF NOT FOUND THEN
+    RETURN jsonb_build_object('success', false, 'error', 'Job not found');
+  END IF;
+
+  IF v_job.status <> 'running' OR v_job.worker IS DISTINCT FROM p_worker THEN
+    RETURN jsonb_build_object(
+      'success', false,
+      'error', 'Job is not running for this worker (status ' || v_job.status || ')'
+    );
+  END IF;
+
+  v_started := clock_timestamp();
+  SELECT c.processed, c.pending_moved
+  INTO v_processed, v_pending_moved
+  FROM reset_deliveries_chunk(v_job.reset_date, v_job.chunk_size) c;
+
+  -- Rows the chunk skipped as locked still match here: a job is done only
+  -- once a chunk finds nothing at all
+  v_done := v_processed = 0 AND NOT EXISTS (
+    SELECT 1 FROM deliveries
+    WHERE delivery_date = v_job.reset_date
+      AND is_archived = false
+      AND payment_status IN ('paid', 'pending', 'partial', 'pay_tomorrow')
+  );
+
+  UPDATE daily_reset_jobs
+  SET chunks = chunks + CASE WHEN v_processed > 0 THEN 1 ELSE 0 END,
+      processed_deliveries = processed_deliveries + v_processed,
+      total_pending_moved = total_pending_moved + v_pending_moved,
+      reset_ms = reset_ms + EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000,
+      heartbeat_at = now()
+  WHERE id = p_job_id
+  RETURNING * INTO v_job;
+
+  RETURN jsonb_build_object(
+    'success', true,
+    'processed', v_processed,
+    'pending_moved', v_pending_moved,
+    'processed_deliveries', v_job.processed_deliveries,
+    'total_pending_moved', v_job.total_pending_moved,
+    'done', v_done,
+    'waiting', v_processed = 0 AND NOT v_done
+  );
+END;
+$$;
+
+-- Finish Daily Reset Job
+-- Marks a claimed job done (with the timings of the aggregate warm-up that
+-- followed it) or failed with p_error; failed jobs are retried by the next
+-- enqueue_daily_reset for their date.
+CREATE OR REPLACE FUNCTION finish_daily_reset_job(
+  p_job_id UUID,
+  p_worker TEXT,
+  p_warm_stats JSONB DEFAULT NULL,
+  p_error TEXT DEFAULT NULL
+) RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_job daily_reset_jobs;
+BEGIN
+  UPDATE daily_reset_jobs
+  SET status = CASE WHEN p_error IS NULL THEN 'done' ELSE 'failed' END,
+      error = p_error,
+      warm_stats = COALESCE(p_warm_stats, warm_stats),
+      warmed_at = CASE WHEN p_warm_stats IS NULL THEN warmed_at ELSE now() END,
+      finished_at = now(),
+      heartbeat_at = now()
+  WHERE id = p_job_id
+    AND status = 'running'
+    AND worker IS NOT DISTINCT FROM p_worker
+  RETURNING * INTO v_job;
+
+  IF NOT FOUND THEN
+    RETURN jsonb_build_object(
+      'success', false,
+      'error', 'Job is not running for this worker'
+    );
+  END IF;
+
+  RETURN jsonb_build_object('success', true, 'job', to_jsonb(v_job));
+END;
+$$;
+
 -- ==============================================
 -- UTILITY FUNCTIONS
 -- ==============================================
@@ -889,6 +1655,251 @@ BEGIN
 END;
 $$;
 
+-- Get Shop Pending Breakdown
+-- The three numbers of the shop header in one call: today's unpaid
+-- deliveries, everything older (unpaid active deliveries before p_date plus
+-- all pending history) and their total. Two indexed aggregates
+-- (idx_deliveries_shop_date_status, idx_shop_pending_history_shop);
+-- overpaid rows count as 0, as in the client's old calculation.
+CREATE OR REPLACE FUNCTION get_shop_pending_breakdown(
+  p_shop_id UUID,
+  p_date DATE DEFAULT CURRENT_DATE
+) RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_today_pending NUMERIC;
+  v_older_pending NUMERIC;
+  v_manual_pending NUMERIC;
+BEGIN
+  SELECT
+    COALESCE(SUM(total_amount - payment_amount) FILTER (WHERE delivery_date = p_date), 0),
+    COALESCE(SUM(total_amount - payment_amount) FILTER (WHERE delivery_date < p_date), 0)
+  INTO v_today_pending, v_older_pending
+  FROM deliveries
+  WHERE shop_id = p_shop_id
+    AND is_archived = false
+    AND total_amount >= payment_amount;
+
+  SELECT COALESCE(SUM(pending_amount), 0)
+  INTO v_manual_pending
+  FROM shop_pending_history
+  WHERE shop_id = p_shop_id
+    AND pending_amount >= 0;
+
+  RETURN jsonb_build_object(
+    'success', true,
+    'shop_id', p_shop_id,
+    'date', p_date,
+    'today_pending', v_today_pending,
+    'previous_pending', v_older_pending + v_manual_pending,
+    'manual_pending', v_manual_pending,
+    'total_pending', v_today_pending + v_older_pending + v_manual_pending
+  );
+END;
+$$;
+
+-- Get Replication Lag Function
+-- Called on a read replica by the client's read router: reads go to the
+-- replica only while lag_ms stays under the configured staleness bound.
+-- On the primary (or an idle replica that has replayed everything it
+-- received) the lag is 0.
+CREATE OR REPLACE FUNCTION get_replication_lag()
+RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_replay_at TIMESTAMPTZ;
+BEGIN
+  IF NOT pg_is_in_recovery() THEN
+    RETURN jsonb_build_object('success', true, 'is_replica', false, 'lag_ms', 0);
+  END IF;
+
+  v_replay_at := pg_last_xact_replay_timestamp();
+
+  RETURN jsonb_build_object(
+    'success', true,
+    'is_replica', true,
+    'lag_ms', CASE
+      WHEN pg_last_wal_receive_lsn() IS NOT DISTINCT FROM pg_last_wal_replay_lsn() THEN 0
+      WHEN v_replay_at IS NULL THEN NULL
+      ELSE GREATEST(0, round(EXTRACT(EPOCH FROM (clock_timestamp() - v_replay_at)) * 1000))::bigint
+    END,
+    'last_replay_at', v_replay_at
+  );
+END;
+$$;
+
+-- Read RPC Function
+-- Calls one whitelisted read-only function by name with named JSON
+-- arguments and returns its result as JSONB; shared by batch_rpc and
+-- columnar_rpc. Set-returning functions give an array of rows, like
+-- PostgREST does.
+CREATE OR REPLACE FUNCTION read_rpc(p_fn TEXT, p_args JSONB DEFAULT '{}')
+RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_allowed CONSTANT TEXT[] := ARRAY[
+    'get_today_collection_view',
+    'get_reports_collection_view',
+    'get_reports_shop_detail_view',
+    'get_reports_daily_summary',
+    'get_shops_overview',
+    'get_route_stats',
+    'get_shop_balance',
+    'get_shop_pending_breakdown',
+    'get_shop_activity',
+    'get_reset_preview_data',
+    'get_replication_lag',
+    'analyze_query_performance',
+    'get_index_usage_stats',
+    'get_table_stats',
+    'get_slow_queries',
+    'get_connection_stats'
+  ];
+  v_args TEXT;
+  v_returns_set BOOLEAN;
+  v_data JSONB;
+BEGIN
+  IF p_fn IS NULL OR NOT (p_fn = ANY(v_allowed)) THEN
+    RAISE EXCEPTION 'Function % is not allowed in read_rpc', COALESCE(p_fn, '(none)')
+      USING ERRCODE = '42501';
+  END IF;
+
+  -- Named arguments as untyped literals, so each resolves to the
+  -- parameter's own type; JSON arrays become array literals.
+  SELECT COALESCE(string_agg(format('%I => %s', a.key,
+           CASE jsonb_typeof(a.value)
+             WHEN 'null' THEN 'NULL'
+             WHEN 'string' THEN quote_literal(a.value #>> '{}')
+             WHEN 'array' THEN quote_literal((
+               SELECT COALESCE(array_agg(e.value), '{}')::TEXT
+               FROM jsonb_array_elements_text(a.value) e))
+             ELSE quote_literal(a.value::TEXT)
+           END), ', '), '')
+  INTO v_args
+  FROM jsonb_each(COALESCE(p_args, '{}'::jsonb)) a;
+
+  SELECT bool_or(p.proretset OR t.typtype = 'c' OR p.prorettype = 'record'::regtype)
+  INTO v_returns_set
+  FROM pg_proc p
+  JOIN pg_type t ON t.oid = p.prorettype
+  WHERE p.proname = p_fn
+    AND p.pronamespace = 'public'::regnamespace;
+
+  IF v_returns_set IS NULL THEN
+    RAISE EXCEPTION 'Function % does not exist', p_fn USING ERRCODE = '42883';
+  ELSIF v_returns_set THEN
+    EXECUTE format('SELECT COALESCE(jsonb_agg(to_jsonb(r)), ''[]''::jsonb) FROM %I(%s) r', p_fn, v_args)
+      INTO v_data;
+  ELSE
+    EXECUTE format('SELECT to_jsonb(%I(%s))', p_fn, v_args) INTO v_data;
+  END IF;
+
+  RETURN v_data;
+END;
+$$;
+
+-- To Columnar Function
+-- Packs an array of row objects as {"format": "columnar", "columns": [...],
+-- "rows": [[...], ...]}: names are sent once instead of once per row.
+-- Anything that is not an array is returned unchanged.
+CREATE OR REPLACE FUNCTION to_columnar(p_rows JSONB)
+RETURNS JSONB
+LANGUAGE sql
+IMMUTABLE
+SET search_path = 'public'
+AS $$
+  SELECT CASE
+    WHEN jsonb_typeof(p_rows) IS DISTINCT FROM 'array' THEN p_rows
+    ELSE (
+      SELECT jsonb_build_object(
+        'format', 'columnar',
+        'columns', to_jsonb(c.cols),
+        'rows', COALESCE((
+          SELECT jsonb_agg((
+            SELECT jsonb_agg(r.value -> u.col ORDER BY u.pos)
+            FROM unnest(c.cols) WITH ORDINALITY u(col, pos)
+          ) ORDER BY r.n)
+          FROM jsonb_array_elements(p_rows) WITH ORDINALITY r(value, n)
+        ), '[]'::jsonb)
+      )
+      FROM (
+        SELECT COALESCE(array_agg(DISTINCT k.key), '{}') as cols
+        FROM jsonb_array_elements(p_rows) e
+        CROSS JOIN LATERAL jsonb_object_keys(
+          CASE WHEN jsonb_typeof(e.value) = 'object' THEN e.value ELSE '{}'::jsonb END
+        ) k(key)
+      ) c
+    )
+  END;
+$$;
+
+-- Columnar RPC Function
+-- read_rpc with list results packed by to_columnar, for the large list
+-- views (collection views, shops overview, activity history). The client
+-- decodes it back into row objects.
+CREATE OR REPLACE FUNCTION columnar_rpc(p_fn TEXT, p_args JSONB DEFAULT '{}')
+RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+SET search_path = 'public'
+AS $$
+BEGIN
+  RETURN to_columnar(read_rpc(p_fn, p_args));
+END;
+$$;
+
+-- Batch RPC Function
+-- Runs several read-only RPCs in one request, so a screen that needs five
+-- small reads pays for one round trip. Calls: [{"fn": "get_shop_balance",
+-- "args": {"p_shop_id": "..."}, "columnar": false}, ...]; fn must be one
+-- read_rpc allows. Each call runs in its own subtransaction and gets its
+-- own {"data": ...} or {"error": {"message", "code"}} entry, in order.
+-- STABLE, so PostgREST runs it in a read-only transaction.
+CREATE OR REPLACE FUNCTION batch_rpc(p_calls JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_call JSONB;
+  v_data JSONB;
+  v_results JSONB := '[]'::jsonb;
+BEGIN
+  IF jsonb_typeof(p_calls) IS DISTINCT FROM 'array' THEN
+    RAISE EXCEPTION 'p_calls must be a JSON array of {"fn", "args"} objects';
+  END IF;
+  IF jsonb_array_length(p_calls) > 50 THEN
+    RAISE EXCEPTION 'At most 50 calls per batch (got %)', jsonb_array_length(p_calls);
+  END IF;
+
+  FOR v_call IN SELECT value FROM jsonb_array_elements(p_calls)
+  LOOP
+    BEGIN
+      v_data := read_rpc(v_call->>'fn', v_call->'args');
+      IF COALESCE((v_call->>'columnar')::BOOLEAN, false) THEN
+        v_data := to_columnar(v_data);
+      END IF;
+      v_results := v_results || jsonb_build_array(jsonb_build_object('data', v_data));
+    EXCEPTION WHEN OTHERS THEN
+      v_results := v_results || jsonb_build_array(jsonb_build_object(
+        'error', jsonb_build_object('message', SQLERRM, 'code', SQLSTATE)
+      ));
+    END;
+  END LOOP;
+
+  RETURN jsonb_build_object('success', true, 'results', v_results);
+END;
+$$;
+
 -- Verify Functions
 CREATE OR REPLACE FUNCTION verify_functions()
 RETURNS TABLE(function_name TEXT, function_exists BOOLEAN)
@@ -910,13 +1921,33 @@ BEGIN
             ('add_delivery'),
             ('process_payment'),
             ('process_daily_reset'),
+            ('reset_deliveries_chunk'),
             ('mark_pay_tomorrow'),
+            ('process_payments_batch'),
             ('get_today_collection_view'),
             ('get_reports_collection_view'),
             ('get_reports_shop_detail_view'),
             ('get_reports_daily_summary'),
+            ('get_shops_overview'),
             ('get_route_stats'),
             ('get_shop_balance'),
+            ('get_shop_pending_breakdown'),
+            ('activity_message'),
+            ('activity_summary_message'),
+            ('get_shop_activity'),
+            ('compact_activity_log'),
+            ('refresh_effective_prices'),
+            ('sync_effective_prices'),
+            ('get_reset_preview_data'),
+            ('enqueue_daily_reset'),
+            ('claim_daily_reset_job'),
+            ('run_daily_reset_chunk'),
+            ('finish_daily_reset_job'),
+            ('get_replication_lag'),
+            ('read_rpc'),
+            ('to_columnar'),
+            ('columnar_rpc'),
+            ('batch_rpc'),
             ('verify_functions')
     ) AS f(func_name);
 END;
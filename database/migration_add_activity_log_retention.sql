@@ -0,0 +1,268 @@
+-- Migration: activity_log retention, compaction and lean writes
+-- Run this in Supabase SQL Editor, then re-run functions.sql so add_delivery,
+-- process_payment and mark_pay_tomorrow stop storing message text.
+--
+-- Old activity_log rows are rolled up into activity_log_daily (one row per
+-- shop and day) by compact_activity_log(), which deletes the
+-- originals one batch per call:
+--
+--   SELECT compact_activity_log(INTERVAL '90 days', 5000);  -- repeat until done
+--
+-- or run `python -m database.tools.retention --older-than-days 90`.
+
+-- Message text is now derived at read time from structured columns
+ALTER TABLE activity_log
+ALTER COLUMN message DROP NOT NULL;
+
+-- Allow every activity type the functions write ('payment_deferred' was missing)
+ALTER TABLE activity_log
+DROP CONSTRAINT IF EXISTS activity_log_activity_type_check;
+
+ALTER TABLE activity_log
+ADD CONSTRAINT activity_log_activity_type_check
+CHECK (activity_type IN (
+  'delivery_added',
+  'payment_collected',
+  'payment_partial',
+  'payment_pending',
+  'payment_deferred',
+  'reset_daily',
+  'delivery_updated',
+  'pending_added'
+));
+
+CREATE TABLE IF NOT EXISTS activity_log_daily (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  shop_id UUID REFERENCES shops(id) ON DELETE CASCADE,
+  activity_date DATE NOT NULL,
+  entry_count INTEGER NOT NULL DEFAULT 0,
+  deliveries_count INTEGER NOT NULL DEFAULT 0,
+  delivered_amount NUMERIC(12,2) NOT NULL DEFAULT 0,
+  payments_count INTEGER NOT NULL DEFAULT 0,
+  collected_amount NUMERIC(12,2) NOT NULL DEFAULT 0,
+  pending_added_count INTEGER NOT NULL DEFAULT 0,
+  pending_added_amount NUMERIC(12,2) NOT NULL DEFAULT 0,
+  deferrals_count INTEGER NOT NULL DEFAULT 0,
+  first_at TIMESTAMP WITH TIME ZONE,
+  last_at TIMESTAMP WITH TIME ZONE,
+  CONSTRAINT activity_log_daily_key UNIQUE NULLS NOT DISTINCT (shop_id, activity_date)
+);
+
+ALTER TABLE activity_log_daily ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Enable all access for owners" ON activity_log_daily;
+CREATE POLICY "Enable all access for owners" ON activity_log_daily
+  FOR ALL USING (true);
+
+DROP POLICY IF EXISTS "Enable read access for staff" ON activity_log_daily;
+CREATE POLICY "Enable read access for staff" ON activity_log_daily
+  FOR SELECT USING (true);
+
+-- Bounded chat history reads and batch selection by age
+CREATE INDEX IF NOT EXISTS idx_activity_log_shop_created ON activity_log(shop_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_activity_log_created ON activity_log(created_at);
+CREATE INDEX IF NOT EXISTS idx_activity_log_daily_shop_last ON activity_log_daily(shop_id, last_at DESC);
+
+-- Activity Message (display text derived from structured activity data)
+CREATE OR REPLACE FUNCTION activity_message(
+  p_activity_type TEXT,
+  p_amount NUMERIC,
+  p_metadata JSONB,
+  p_shop_name TEXT
+) RETURNS TEXT
+LANGUAGE plpgsql
+IMMUTABLE
+SET search_path = 'public'
+AS $$
+BEGIN
+  RETURN CASE p_activity_type
+    WHEN 'delivery_added' THEN 'Delivery added to ' || COALESCE(p_shop_name, 'shop') || ': ₹' || p_amount
+    WHEN 'payment_collected' THEN 'Collected ₹' || p_amount || ' from ' || COALESCE(p_shop_name, 'shop')
+    WHEN 'payment_partial' THEN 'Collected ₹' || p_amount || ' from ' || COALESCE(p_shop_name, 'shop')
+    WHEN 'pending_added' THEN 'Manual pending added: ₹' || p_amount
+      || COALESCE(' - ' || NULLIF(p_metadata->>'note', ''), '')
+    WHEN 'payment_deferred' THEN 'Payment deferred to tomorrow for '
+      || COALESCE(p_metadata->>'affected_deliveries', '0') || ' deliveries'
+    ELSE initcap(replace(p_activity_type, '_', ' '))
+      || COALESCE(': ₹' || p_amount, '')
+  END;
+END;
+$$;
+
+-- Activity Summary Message (display text for one compacted day)
+CREATE OR REPLACE FUNCTION activity_summary_message(p_day activity_log_daily)
+RETURNS TEXT
+LANGUAGE plpgsql
+IMMUTABLE
+SET search_path = 'public'
+AS $$
+BEGIN
+  RETURN concat_ws(', ',
+    CASE WHEN p_day.deliveries_count > 0
+      THEN p_day.deliveries_count || ' delivered: ₹' || p_day.delivered_amount END,
+    CASE WHEN p_day.payments_count > 0
+      THEN p_day.payments_count || ' paid: ₹' || p_day.collected_amount END,
+    CASE WHEN p_day.pending_added_count > 0
+      THEN 'pending added: ₹' || p_day.pending_added_amount END,
+    CASE WHEN p_day.deferrals_count > 0
+      THEN 'deferred ' || p_day.deferrals_count || 'x' END
+  );
+END;
+$$;
+
+-- Get Shop Activity (newest first, bounded; compacted days appear as 'daily_summary' rows)
+CREATE OR REPLACE FUNCTION get_shop_activity(
+  p_shop_id UUID,
+  p_limit INTEGER DEFAULT 100,
+  p_before TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+  p_types TEXT[] DEFAULT NULL
+)
+RETURNS TABLE(
+  id UUID,
+  activity_type TEXT,
+  message TEXT,
+  amount NUMERIC,
+  activity_date DATE,
+  created_at TIMESTAMP WITH TIME ZONE,
+  metadata JSONB,
+  entry_count INTEGER
+)
+LANGUAGE plpgsql
+STABLE
+SET search_path = 'public'
+AS $$
+#variable_conflict use_column
+DECLARE
+  v_shop_name TEXT;
+BEGIN
+  SELECT name INTO v_shop_name FROM shops WHERE shops.id = p_shop_id;
+
+  RETURN QUERY
+  SELECT * FROM (
+    SELECT
+      a.id,
+      a.activity_type,
+      COALESCE(a.message, activity_message(a.activity_type, a.amount, a.metadata, v_shop_name)),
+      a.amount,
+      COALESCE(a.delivery_date, a.created_at::DATE),
+      a.created_at,
+      a.metadata,
+      1
+    FROM activity_log a
+    WHERE a.shop_id = p_shop_id
+      AND (p_before IS NULL OR a.created_at < p_before)
+      AND (p_types IS NULL OR a.activity_type = ANY(p_types))
+    ORDER BY a.created_at DESC
+    LIMIT p_limit
+  ) recent
+  UNION ALL
+  SELECT * FROM (
+    SELECT
+      d.id,
+      'daily_summary'::TEXT,
+      activity_summary_message(d),
+      d.delivered_amount,
+      d.activity_date,
+      d.last_at,
+      jsonb_build_object(
+        'deliveries_count', d.deliveries_count,
+        'delivered_amount', d.delivered_amount,
+        'payments_count', d.payments_count,
+        'collected_amount', d.collected_amount,
+        'pending_added_amount', d.pending_added_amount,
+        'deferrals_count', d.deferrals_count
+      ),
+      d.entry_count
+    FROM activity_log_daily d
+    WHERE d.shop_id = p_shop_id
+      AND (p_before IS NULL OR d.last_at < p_before)
+      AND (p_types IS NULL OR 'daily_summary' = ANY(p_types))
+    ORDER BY d.last_at DESC
+    LIMIT p_limit
+  ) summaries
+  ORDER BY 6 DESC
+  LIMIT p_limit;
+END;
+$$;
+
+-- Compact Activity Log (one batch: roll old rows into activity_log_daily, then delete them)
+-- Call repeatedly until 'done' is true; each call is its own short transaction.
+CREATE OR REPLACE FUNCTION compact_activity_log(
+  p_older_than INTERVAL DEFAULT INTERVAL '90 days',
+  p_batch_size INTEGER DEFAULT 5000
+) RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_cutoff TIMESTAMP WITH TIME ZONE := now() - p_older_than;
+  v_compacted INTEGER;
+  v_days INTEGER;
+BEGIN
+  IF p_batch_size <= 0 THEN
+    RETURN jsonb_build_object(
+      'success', false,
+      'error', 'Batch size must be greater than 0'
+    );
+  END IF;
+
+  WITH batch AS (
+    DELETE FROM activity_log
+    WHERE id IN (
+      SELECT id FROM activity_log
+      WHERE created_at < v_cutoff
+      ORDER BY created_at
+      LIMIT p_batch_size
+      FOR UPDATE SKIP LOCKED
+    )
+    RETURNING shop_id, activity_type, COALESCE(amount, 0) AS amount,
+              COALESCE(delivery_date, created_at::DATE) AS activity_date, created_at
+  ),
+  summarized AS (
+    INSERT INTO activity_log_daily (
+      shop_id, activity_date, entry_count,
+      deliveries_count, delivered_amount,
+      payments_count, collected_amount,
+      pending_added_count, pending_added_amount,
+      deferrals_count, first_at, last_at
+    )
+    SELECT
+      shop_id,
+      activity_date,
+      COUNT(*),
+      COUNT(*) FILTER (WHERE activity_type = 'delivery_added'),
+      COALESCE(SUM(amount) FILTER (WHERE activity_type = 'delivery_added'), 0),
+      COUNT(*) FILTER (WHERE activity_type IN ('payment_collected', 'payment_partial')),
+      COALESCE(SUM(amount) FILTER (WHERE activity_type IN ('payment_collected', 'payment_partial')), 0),
+      COUNT(*) FILTER (WHERE activity_type = 'pending_added'),
+      COALESCE(SUM(amount) FILTER (WHERE activity_type = 'pending_added'), 0),
+      COUNT(*) FILTER (WHERE activity_type = 'payment_deferred'),
+      MIN(created_at),
+      MAX(created_at)
+    FROM batch
+    GROUP BY shop_id, activity_date
+    ON CONFLICT (shop_id, activity_date) DO UPDATE
+    SET entry_count = activity_log_daily.entry_count + EXCLUDED.entry_count,
+        deliveries_count = activity_log_daily.deliveries_count + EXCLUDED.deliveries_count,
+        delivered_amount = activity_log_daily.delivered_amount + EXCLUDED.delivered_amount,
+        payments_count = activity_log_daily.payments_count + EXCLUDED.payments_count,
+        collected_amount = activity_log_daily.collected_amount + EXCLUDED.collected_amount,
+        pending_added_count = activity_log_daily.pending_added_count + EXCLUDED.pending_added_count,
+        pending_added_amount = activity_log_daily.pending_added_amount + EXCLUDED.pending_added_amount,
+        deferrals_count = activity_log_daily.deferrals_count + EXCLUDED.deferrals_count,
+        first_at = LEAST(activity_log_daily.first_at, EXCLUDED.first_at),
+        last_at = GREATEST(activity_log_daily.last_at, EXCLUDED.last_at)
+    RETURNING 1
+  )
+  SELECT (SELECT COUNT(*) FROM batch), (SELECT COUNT(*) FROM summarized)
+  INTO v_compacted, v_days;
+
+  RETURN jsonb_build_object(
+    'success', true,
+    'cutoff', v_cutoff,
+    'compacted', v_compacted,
+    'summary_rows', v_days,
+    'done', v_compacted < p_batch_size
+  );
+END;
+$$;
@@ -0,0 +1,132 @@
+-- Migration: batch_rpc for coalescing small read RPCs into one request
+-- Run this in Supabase SQL Editor (functions.sql has the same function).
+--
+-- The frontend (services/api-simple.ts) collects read-only RPC calls made
+-- in the same tick and sends them as one batch_rpc call:
+--
+--   SELECT batch_rpc('[
+--     {"fn": "get_shop_balance", "args": {"p_shop_id": "<shop uuid>"}},
+--     {"fn": "get_reports_daily_summary", "args": {"p_date": "2025-04-01"}}
+--   ]');
+--   -- {"success": true, "results": [{"data": {...}}, {"data": [...]}]}
+--
+-- Also fixes get_connection_stats() ("state" was ambiguous with its own
+-- output column), which PerformanceMonitor batches with the other stats.
+
+-- Batch RPC Function
+-- Runs several read-only RPCs in one request, so a screen that needs five
+-- small reads pays for one round trip. Calls: [{"fn": "get_shop_balance",
+-- "args": {"p_shop_id": "..."}}, ...]. Only the functions listed below may
+-- be called. Each call runs in its own subtransaction and gets its own
+-- {"data": ...} or {"error": {"message", "code"}} entry, in order.
+-- Set-returning functions give an array of rows, like PostgREST does.
+-- STABLE, so PostgREST runs it in a read-only transaction.
+CREATE OR REPLACE FUNCTION batch_rpc(p_calls JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_allowed CONSTANT TEXT[] := ARRAY[
+    'get_today_collection_view',
+    'get_reports_collection_view',
+    'get_reports_shop_detail_view',
+    'get_reports_daily_summary',
+    'get_route_stats',
+    'get_shop_balance',
+    'get_shop_activity',
+    'get_reset_preview_data',
+    'get_replication_lag',
+    'analyze_query_performance',
+    'get_index_usage_stats',
+    'get_table_stats',
+    'get_slow_queries',
+    'get_connection_stats'
+  ];
+  v_call JSONB;
+  v_fn TEXT;
+  v_args TEXT;
+  v_returns_set BOOLEAN;
+  v_data JSONB;
+  v_results JSONB := '[]'::jsonb;
+BEGIN
+  IF jsonb_typeof(p_calls) IS DISTINCT FROM 'array' THEN
+    RAISE EXCEPTION 'p_calls must be a JSON array of {"fn", "args"} objects';
+  END IF;
+  IF jsonb_array_length(p_calls) > 50 THEN
+    RAISE EXCEPTION 'At most 50 calls per batch (got %)', jsonb_array_length(p_calls);
+  END IF;
+
+  FOR v_call IN SELECT value FROM jsonb_array_elements(p_calls)
+  LOOP
+    BEGIN
+      v_fn := v_call->>'fn';
+      IF v_fn IS NULL OR NOT (v_fn = ANY(v_allowed)) THEN
+        RAISE EXCEPTION 'Function % is not allowed in batch_rpc', COALESCE(v_fn, '(none)')
+          USING ERRCODE = '42501';
+      END IF;
+
+      -- Named arguments as untyped literals, so each resolves to the
+      -- parameter's own type; JSON arrays become array literals.
+      SELECT COALESCE(string_agg(format('%I => %s', a.key,
+               CASE jsonb_typeof(a.value)
+                 WHEN 'null' THEN 'NULL'
+                 WHEN 'string' THEN quote_literal(a.value #>> '{}')
+                 WHEN 'array' THEN quote_literal((
+                   SELECT COALESCE(array_agg(e.value), '{}')::TEXT
+                   FROM jsonb_array_elements_text(a.value) e))
+                 ELSE quote_literal(a.value::TEXT)
+               END), ', '), '')
+      INTO v_args
+      FROM jsonb_each(COALESCE(v_call->'args', '{}'::jsonb)) a;
+
+      SELECT bool_or(p.proretset OR t.typtype = 'c' OR p.prorettype = 'record'::regtype)
+      INTO v_returns_set
+      FROM pg_proc p
+      JOIN pg_type t ON t.oid = p.prorettype
+      WHERE p.proname = v_fn
+        AND p.pronamespace = 'public'::regnamespace;
+
+      IF v_returns_set IS NULL THEN
+        RAISE EXCEPTION 'Function % does not exist', v_fn USING ERRCODE = '42883';
+      ELSIF v_returns_set THEN
+        EXECUTE format('SELECT COALESCE(jsonb_agg(to_jsonb(r)), ''[]''::jsonb) FROM %I(%s) r', v_fn, v_args)
+          INTO v_data;
+      ELSE
+        EXECUTE format('SELECT to_jsonb(%I(%s))', v_fn, v_args) INTO v_data;
+      END IF;
+
+      v_results := v_results || jsonb_build_array(jsonb_build_object('data', v_data));
+    EXCEPTION WHEN OTHERS THEN
+      v_results := v_results || jsonb_build_array(jsonb_build_object(
+        'error', jsonb_build_object('message', SQLERRM, 'code', SQLSTATE)
+      ));
+    END;
+  END LOOP;
+
+  RETURN jsonb_build_object('success', true, 'results', v_results);
+END;
+$$;
+
+-- Function to get connection statistics
+CREATE OR REPLACE FUNCTION get_connection_stats()
+RETURNS TABLE(
+  state text,
+  count bigint
+)
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+BEGIN
+  RETURN QUERY
+  SELECT 
+    a.state::text,
+    count(*) as count
+  FROM pg_stat_activity a
+  WHERE a.datname = current_database()
+  GROUP BY a.state
+  ORDER BY 2 DESC;
+END;
+$$;
+
@@ -0,0 +1,244 @@
+-- Migration: shops overview and columnar list responses
+-- Run this in Supabase SQL Editor after migration_add_batch_rpc.sql
+-- (functions.sql has the same functions).
+--
+-- get_shops_overview() returns every active shop with its balance, today's
+-- delivery flag and last payment in one call, replacing the shops list's
+-- per-shop get_shop_balance calls. columnar_rpc() returns list results as
+-- column names plus arrays of values, which the frontend decodes:
+--
+--   SELECT columnar_rpc('get_shops_overview', '{}');
+--   -- {"format": "columnar", "columns": ["last_payment_amount", ...],
+--   --  "rows": [[null, ...], ...]}
+--
+-- batch_rpc() now shares read_rpc()'s whitelist and takes "columnar": true
+-- per call.
+
+-- Get Shops Overview
+-- One row per active shop for the shops list: balance (same total_pending
+-- as get_shop_balance), whether it had an active delivery on p_date and
+-- its latest payment that day. Replaces one get_shop_balance call per shop.
+CREATE OR REPLACE FUNCTION get_shops_overview(p_date DATE DEFAULT CURRENT_DATE)
+RETURNS TABLE(
+  shop_id UUID,
+  shop_name TEXT,
+  owner_name TEXT,
+  phone TEXT,
+  route_number INTEGER,
+  total_pending NUMERIC,
+  delivered_today BOOLEAN,
+  last_payment_amount NUMERIC,
+  last_payment_at TIMESTAMPTZ
+)
+LANGUAGE plpgsql
+STABLE
+SET search_path = 'public'
+AS $$
+BEGIN
+  RETURN QUERY
+  WITH active_deliveries AS (
+    SELECT
+      d.shop_id as sid,
+      SUM(d.total_amount - d.payment_amount) as pending,
+      bool_or(d.delivery_date = p_date) as delivered
+    FROM deliveries d
+    WHERE d.is_archived = false
+    GROUP BY d.shop_id
+  ),
+  old_pending AS (
+    SELECT h.shop_id as sid, SUM(h.pending_amount) as pending
+    FROM shop_pending_history h
+    GROUP BY h.shop_id
+  ),
+  last_payments AS (
+    SELECT DISTINCT ON (p.shop_id)
+      p.shop_id as sid, p.amount, p.created_at
+    FROM payments p
+    WHERE p.payment_date = p_date
+    ORDER BY p.shop_id, p.created_at DESC
+  )
+  SELECT
+    s.id,
+    s.name::TEXT,
+    s.owner_name::TEXT,
+    s.phone::TEXT,
+    s.route_number,
+    COALESCE(ad.pending, 0) + COALESCE(op.pending, 0),
+    COALESCE(ad.delivered, false),
+    lp.amount,
+    lp.created_at
+  FROM shops s
+  LEFT JOIN active_deliveries ad ON ad.sid = s.id
+  LEFT JOIN old_pending op ON op.sid = s.id
+  LEFT JOIN last_payments lp ON lp.sid = s.id
+  WHERE s.is_active = true
+  ORDER BY COALESCE(ad.delivered, false), s.name;
+END;
+$$;
+
+-- Read RPC Function
+-- Calls one whitelisted read-only function by name with named JSON
+-- arguments and returns its result as JSONB; shared by batch_rpc and
+-- columnar_rpc. Set-returning functions give an array of rows, like
+-- PostgREST does.
+CREATE OR REPLACE FUNCTION read_rpc(p_fn TEXT, p_args JSONB DEFAULT '{}')
+RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_allowed CONSTANT TEXT[] := ARRAY[
+    'get_today_collection_view',
+    'get_reports_collection_view',
+    'get_reports_shop_detail_view',
+    'get_reports_daily_summary',
+    'get_shops_overview',
+    'get_route_stats',
+    'get_shop_balance',
+    'get_shop_activity',
+    'get_reset_preview_data',
+    'get_replication_lag',
+    'analyze_query_performance',
+    'get_index_usage_stats',
+    'get_table_stats',
+    'get_slow_queries',
+    'get_connection_stats'
+  ];
+  v_args TEXT;
+  v_returns_set BOOLEAN;
+  v_data JSONB;
+BEGIN
+  IF p_fn IS NULL OR NOT (p_fn = ANY(v_allowed)) THEN
+    RAISE EXCEPTION 'Function % is not allowed in read_rpc', COALESCE(p_fn, '(none)')
+      USING ERRCODE = '42501';
+  END IF;
+
+  -- Named arguments as untyped literals, so each resolves to the
+  -- parameter's own type; JSON arrays become array literals.
+  SELECT COALESCE(string_agg(format('%I => %s', a.key,
+           CASE jsonb_typeof(a.value)
+             WHEN 'null' THEN 'NULL'
+             WHEN 'string' THEN quote_literal(a.value #>> '{}')
+             WHEN 'array' THEN quote_literal((
+               SELECT COALESCE(array_agg(e.value), '{}')::TEXT
+               FROM jsonb_array_elements_text(a.value) e))
+             ELSE quote_literal(a.value::TEXT)
+           END), ', '), '')
+  INTO v_args
+  FROM jsonb_each(COALESCE(p_args, '{}'::jsonb)) a;
+
+  SELECT bool_or(p.proretset OR t.typtype = 'c' OR p.prorettype = 'record'::regtype)
+  INTO v_returns_set
+  FROM pg_proc p
+  JOIN pg_type t ON t.oid = p.prorettype
+  WHERE p.proname = p_fn
+    AND p.pronamespace = 'public'::regnamespace;
+
+  IF v_returns_set IS NULL THEN
+    RAISE EXCEPTION 'Function % does not exist', p_fn USING ERRCODE = '42883';
+  ELSIF v_returns_set THEN
+    EXECUTE format('SELECT COALESCE(jsonb_agg(to_jsonb(r)), ''[]''::jsonb) FROM %I(%s) r', p_fn, v_args)
+      INTO v_data;
+  ELSE
+    EXECUTE format('SELECT to_jsonb(%I(%s))', p_fn, v_args) INTO v_data;
+  END IF;
+
+  RETURN v_data;
+END;
+$$;
+
+-- To Columnar Function
+-- Packs an array of row objects as {"format": "columnar", "columns": [...],
+-- "rows": [[...], ...]}: names are sent once instead of once per row.
+-- Anything that is not an array is returned unchanged.
+CREATE OR REPLACE FUNCTION to_columnar(p_rows JSONB)
+RETURNS JSONB
+LANGUAGE sql
+IMMUTABLE
+SET search_path = 'public'
+AS $$
+  SELECT CASE
+    WHEN jsonb_typeof(p_rows) IS DISTINCT FROM 'array' THEN p_rows
+    ELSE (
+      SELECT jsonb_build_object(
+        'format', 'columnar',
+        'columns', to_jsonb(c.cols),
+        'rows', COALESCE((
+          SELECT jsonb_agg((
+            SELECT jsonb_agg(r.value -> u.col ORDER BY u.pos)
+            FROM unnest(c.cols) WITH ORDINALITY u(col, pos)
+          ) ORDER BY r.n)
+          FROM jsonb_array_elements(p_rows) WITH ORDINALITY r(value, n)
+        ), '[]'::jsonb)
+      )
+      FROM (
+        SELECT COALESCE(array_agg(DISTINCT k.key), '{}') as cols
+        FROM jsonb_array_elements(p_rows) e
+        CROSS JOIN LATERAL jsonb_object_keys(
+          CASE WHEN jsonb_typeof(e.value) = 'object' THEN e.value ELSE '{}'::jsonb END
+        ) k(key)
+      ) c
+    )
+  END;
+$$;
+
+-- Columnar RPC Function
+-- read_rpc with list results packed by to_columnar, for the large list
+-- views (collection views, shops overview, activity history). The client
+-- decodes it back into row objects.
+CREATE OR REPLACE FUNCTION columnar_rpc(p_fn TEXT, p_args JSONB DEFAULT '{}')
+RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+SET search_path = 'public'
+AS $$
+BEGIN
+  RETURN to_columnar(read_rpc(p_fn, p_args));
+END;
+$$;
+
+-- Batch RPC Function
+-- Runs several read-only RPCs in one request, so a screen that needs five
+-- small reads pays for one round trip. Calls: [{"fn": "get_shop_balance",
+-- "args": {"p_shop_id": "..."}, "columnar": false}, ...]; fn must be one
+-- read_rpc allows. Each call runs in its own subtransaction and gets its
+-- own {"data": ...} or {"error": {"message", "code"}} entry, in order.
+-- STABLE, so PostgREST runs it in a read-only transaction.
+CREATE OR REPLACE FUNCTION batch_rpc(p_calls JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_call JSONB;
+  v_data JSONB;
+  v_results JSONB := '[]'::jsonb;
+BEGIN
+  IF jsonb_typeof(p_calls) IS DISTINCT FROM 'array' THEN
+    RAISE EXCEPTION 'p_calls must be a JSON array of {"fn", "args"} objects';
+  END IF;
+  IF jsonb_array_length(p_calls) > 50 THEN
+    RAISE EXCEPTION 'At most 50 calls per batch (got %)', jsonb_array_length(p_calls);
+  END IF;
+
+  FOR v_call IN SELECT value FROM jsonb_array_elements(p_calls)
+  LOOP
+    BEGIN
+      v_data := read_rpc(v_call->>'fn', v_call->'args');
+      IF COALESCE((v_call->>'columnar')::BOOLEAN, false) THEN
+        v_data := to_columnar(v_data);
+      END IF;
+      v_results := v_results || jsonb_build_array(jsonb_build_object('data', v_data));
+    EXCEPTION WHEN OTHERS THEN
+      v_results := v_results || jsonb_build_array(jsonb_build_object(
+        'error', jsonb_build_object('message', SQLERRM, 'code', SQLSTATE)
+      ));
+    END;
+  END LOOP;
+
+  RETURN jsonb_build_object('success', true, 'results', v_results);
+END;
+$$;
+
@@ -0,0 +1,298 @@
+-- Migration: effective prices
+-- Run this in Supabase SQL Editor.
+--
+-- Prices used to be resolved twice: ShopDetailScreen loaded milk_types and
+-- shop_rates on every open and applied custom rates by product name, while
+-- add_delivery ignored shop_rates and looked up milk_types one product at a
+-- time, so the same delivery could be priced differently depending on the
+-- screen. effective_prices holds the price every shop pays for every active
+-- milk type, kept current by triggers on shops, milk_types and shop_rates.
+-- add_delivery prices a whole delivery from it in one join, and clients read
+-- a shop's prices with a single select.
+
+-- Shop Rates table (custom price of a milk type for one shop)
+CREATE TABLE IF NOT EXISTS shop_rates (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  shop_id UUID NOT NULL REFERENCES shops(id) ON DELETE CASCADE,
+  milk_type_id UUID NOT NULL REFERENCES milk_types(id) ON DELETE CASCADE,
+  custom_price_per_packet NUMERIC(10,2) NOT NULL CHECK (custom_price_per_packet >= 0),
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE shop_rates ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+
+-- Saving a shop's rates deletes and re-inserts them, so duplicates are not
+-- expected; the pricing join relies on there being none
+CREATE UNIQUE INDEX IF NOT EXISTS idx_shop_rates_shop_milk ON shop_rates(shop_id, milk_type_id);
+
+DROP TRIGGER IF EXISTS update_shop_rates_updated_at ON shop_rates;
+CREATE TRIGGER update_shop_rates_updated_at BEFORE UPDATE ON shop_rates FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Effective Prices table (price each shop pays per active milk type: its
+-- shop_rates price, else the milk_types price; maintained by triggers)
+CREATE TABLE IF NOT EXISTS effective_prices (
+  shop_id UUID NOT NULL REFERENCES shops(id) ON DELETE CASCADE,
+  milk_type_id UUID NOT NULL REFERENCES milk_types(id) ON DELETE CASCADE,
+  price_per_packet NUMERIC(10,2) NOT NULL,
+  base_price_per_packet NUMERIC(10,2) NOT NULL,
+  is_custom BOOLEAN NOT NULL DEFAULT false,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  PRIMARY KEY (shop_id, milk_type_id)
+);
+
+ALTER TABLE shop_rates ENABLE ROW LEVEL SECURITY;
+ALTER TABLE effective_prices ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Enable all access for owners" ON shop_rates;
+CREATE POLICY "Enable all access for owners" ON shop_rates
+  FOR ALL USING (true);
+
+DROP POLICY IF EXISTS "Enable read access for staff" ON shop_rates;
+CREATE POLICY "Enable read access for staff" ON shop_rates
+  FOR SELECT USING (true);
+
+DROP POLICY IF EXISTS "Enable all access for owners" ON effective_prices;
+CREATE POLICY "Enable all access for owners" ON effective_prices
+  FOR ALL USING (true);
+
+DROP POLICY IF EXISTS "Enable read access for staff" ON effective_prices;
+CREATE POLICY "Enable read access for staff" ON effective_prices
+  FOR SELECT USING (true);
+
+-- Refresh Effective Prices
+-- Recomputes the effective_prices rows of one shop, one milk type, one pair
+-- or (both NULL) everything: the shop_rates price when the shop has one,
+-- else the milk_types price, for every active milk type. Rows that did not
+-- change are left alone; rows of inactive milk types are removed.
+CREATE OR REPLACE FUNCTION refresh_effective_prices(
+  p_shop_id UUID DEFAULT NULL,
+  p_milk_type_id UUID DEFAULT NULL
+) RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_updated INTEGER;
+  v_removed INTEGER;
+BEGIN
+  WITH wanted AS (
+    SELECT
+      s.id AS shop_id,
+      mt.id AS milk_type_id,
+      COALESCE(r.custom_price_per_packet, mt.price_per_packet) AS price_per_packet,
+      mt.price_per_packet AS base_price_per_packet,
+      r.id IS NOT NULL AS is_custom
+    FROM shops s
+    CROSS JOIN milk_types mt
+    LEFT JOIN shop_rates r ON r.shop_id = s.id AND r.milk_type_id = mt.id
+    WHERE mt.is_active = true
+    AND (p_shop_id IS NULL OR s.id = p_shop_id)
+    AND (p_milk_type_id IS NULL OR mt.id = p_milk_type_id)
+  ),
+  upserted AS (
+    INSERT INTO effective_prices AS ep (shop_id, milk_type_id, price_per_packet, base_price_per_packet, is_custom)
+    SELECT shop_id, milk_type_id, price_per_packet, base_price_per_packet, is_custom
+    FROM wanted
+    ON CONFLICT (shop_id, milk_type_id) DO UPDATE SET
+      price_per_packet = EXCLUDED.price_per_packet,
+      base_price_per_packet = EXCLUDED.base_price_per_packet,
+      is_custom = EXCLUDED.is_custom,
+      updated_at = NOW()
+    WHERE (ep.price_per_packet, ep.base_price_per_packet, ep.is_custom)
+      IS DISTINCT FROM (EXCLUDED.price_per_packet, EXCLUDED.base_price_per_packet, EXCLUDED.is_custom)
+    RETURNING 1
+  ),
+  removed AS (
+    DELETE FROM effective_prices ep
+    WHERE (p_shop_id IS NULL OR ep.shop_id = p_shop_id)
+    AND (p_milk_type_id IS NULL OR ep.milk_type_id = p_milk_type_id)
+    AND NOT EXISTS (
+      SELECT 1 FROM wanted w
+      WHERE w.shop_id = ep.shop_id AND w.milk_type_id = ep.milk_type_id
+    )
+    RETURNING 1
+  )
+  SELECT (SELECT COUNT(*) FROM upserted), (SELECT COUNT(*) FROM removed)
+  INTO v_updated, v_removed;
+
+  RETURN jsonb_build_object(
+    'success', true,
+    'updated', v_updated,
+    'removed', v_removed
+  );
+END;
+$$;
+
+-- Sync Effective Prices (trigger function)
+-- Keeps effective_prices current: a new shop gets a row per active milk
+-- type, a milk type's price or is_active change reprices it for every
+-- shop, and a shop_rates change reprices just that shop and milk type.
+CREATE OR REPLACE FUNCTION sync_effective_prices()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+BEGIN
+  IF TG_TABLE_NAME = 'shops' THEN
+    PERFORM refresh_effective_prices(NEW.id, NULL);
+  ELSIF TG_TABLE_NAME = 'milk_types' THEN
+    PERFORM refresh_effective_prices(NULL, NEW.id);
+  ELSE
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+      PERFORM refresh_effective_prices(OLD.shop_id, OLD.milk_type_id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+      PERFORM refresh_effective_prices(NEW.shop_id, NEW.milk_type_id);
+    END IF;
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS sync_effective_prices_shops ON shops;
+CREATE TRIGGER sync_effective_prices_shops
+  AFTER INSERT ON shops
+  FOR EACH ROW EXECUTE FUNCTION sync_effective_prices();
+
+DROP TRIGGER IF EXISTS sync_effective_prices_milk_types ON milk_types;
+CREATE TRIGGER sync_effective_prices_milk_types
+  AFTER INSERT OR UPDATE OF price_per_packet, is_active ON milk_types
+  FOR EACH ROW EXECUTE FUNCTION sync_effective_prices();
+
+DROP TRIGGER IF EXISTS sync_effective_prices_shop_rates ON shop_rates;
+CREATE TRIGGER sync_effective_prices_shop_rates
+  AFTER INSERT OR UPDATE OR DELETE ON shop_rates
+  FOR EACH ROW EXECUTE FUNCTION sync_effective_prices();
+
+-- Add Delivery Function
+-- Prices every product from effective_prices (the shop's custom rate or the
+-- milk type's price) in one join.
+CREATE OR REPLACE FUNCTION add_delivery(
+  p_shop_id UUID,
+  p_delivery_boy_id UUID,
+  p_products JSONB,
+  p_delivery_date DATE DEFAULT CURRENT_DATE,
+  p_notes TEXT DEFAULT NULL
+) RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_delivery_id UUID;
+  v_total_amount NUMERIC;
+  v_products_with_prices JSONB;
+  v_priced INTEGER;
+  v_bad_quantity BOOLEAN;
+BEGIN
+  -- Validate inputs
+  IF p_products IS NULL OR jsonb_array_length(p_products) = 0 THEN
+    RETURN jsonb_build_object(
+      'success', false,
+      'error', 'At least one product is required'
+    );
+  END IF;
+
+  IF NOT EXISTS (SELECT 1 FROM shops WHERE id = p_shop_id) THEN
+    RETURN jsonb_build_object(
+      'success', false,
+      'error', 'Shop not found'
+    );
+  END IF;
+
+  -- Price all products at once; effective_prices only has active milk types
+  SELECT
+    COUNT(ep.price_per_packet),
+    bool_or(COALESCE(p.quantity, 0) <= 0),
+    SUM(ep.price_per_packet * p.quantity),
+    jsonb_agg(
+      jsonb_build_object(
+        'milk_type_id', p.milk_type_id,
+        'name', mt.name,
+        'quantity', p.quantity,
+        'price_per_packet', ep.price_per_packet,
+        'subtotal', ep.price_per_packet * p.quantity
+      ) ORDER BY p.ord
+    )
+  INTO v_priced, v_bad_quantity, v_total_amount, v_products_with_prices
+  FROM (
+    SELECT (e.item->>'milk_type_id')::UUID AS milk_type_id,
+           (e.item->>'quantity')::INTEGER AS quantity,
+           e.ord
+    FROM jsonb_array_elements(p_products) WITH ORDINALITY AS e(item, ord)
+  ) p
+  LEFT JOIN effective_prices ep ON ep.shop_id = p_shop_id AND ep.milk_type_id = p.milk_type_id
+  LEFT JOIN milk_types mt ON mt.id = ep.milk_type_id;
+
+  IF v_priced < jsonb_array_length(p_products) THEN
+    RETURN jsonb_build_object(
+      'success', false,
+      'error', 'Invalid or inactive milk type'
+    );
+  END IF;
+
+  IF v_bad_quantity THEN
+    RETURN jsonb_build_object(
+      'success', false,
+      'error', 'Quantity must be greater than 0'
+    );
+  END IF;
+
+  -- Insert delivery
+  INSERT INTO deliveries (
+    shop_id,
+    delivery_boy_id,
+    delivery_date,
+    products,
+    total_amount,
+    payment_amount,
+    payment_status,
+    delivery_status,
+    is_archived,
+    notes,
+    delivered_at
+  ) VALUES (
+    p_shop_id,
+    p_delivery_boy_id,
+    p_delivery_date,
+    v_products_with_prices,
+    v_total_amount,
+    0,
+    'pending',
+    'delivered',
+    false,
+    p_notes,
+    NOW()
+  )
+  RETURNING id INTO v_delivery_id;
+
+  -- Log activity (message text is derived at read time by activity_message)
+  INSERT INTO activity_log (
+    shop_id,
+    delivery_boy_id,
+    activity_type,
+    amount,
+    delivery_date,
+    metadata
+  ) VALUES (
+    p_shop_id,
+    p_delivery_boy_id,
+    'delivery_added',
+    v_total_amount,
+    p_delivery_date,
+    jsonb_build_object('delivery_id', v_delivery_id)
+  );
+
+  -- Return success with delivery details
+  RETURN jsonb_build_object(
+    'success', true,
+    'delivery_id', v_delivery_id,
+    'total_amount', v_total_amount,
+    'products', v_products_with_prices,
+    'message', 'Delivery added successfully'
+  );
+END;
+$$;
+
+-- Backfill every shop and active milk type
+SELECT refresh_effective_prices();
@@ -0,0 +1,69 @@
+-- Migration: mark_pay_tomorrow for a given date
+-- Run this in Supabase SQL Editor.
+--
+-- mark_pay_tomorrow only ever deferred CURRENT_DATE's deliveries, while
+-- add_delivery, process_payment and process_daily_reset all take the date
+-- they act on. The optional p_date lets a back-dated correction, and the
+-- multi-day soak simulation (database/tools/soak.py), defer a given day;
+-- callers that leave it out keep today's behaviour.
+
+-- Mark Pay Tomorrow Function
+-- Defers the shop's unpaid deliveries of p_date (default today). The old
+-- two-argument version is dropped first: next to this one it would make
+-- every two-argument call ambiguous.
+DROP FUNCTION IF EXISTS mark_pay_tomorrow(UUID, TEXT);
+CREATE OR REPLACE FUNCTION mark_pay_tomorrow(
+  p_shop_id UUID,
+  p_notes TEXT DEFAULT NULL,
+  p_date DATE DEFAULT CURRENT_DATE
+) RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_delivery RECORD;
+  v_affected_count INTEGER := 0;
+BEGIN
+  -- Find the day's deliveries for this shop that have pending amounts and aren't already deferred
+  FOR v_delivery IN
+    SELECT * FROM deliveries
+    WHERE shop_id = p_shop_id
+      AND delivery_date = p_date
+      AND is_archived = false
+      AND payment_status IN ('pending', 'partial')
+      AND (total_amount - payment_amount) > 0
+  LOOP
+    -- Mark as pay tomorrow status (don't archive, don't move to history)
+    UPDATE deliveries
+    SET payment_status = 'pay_tomorrow',
+        notes = COALESCE(p_notes, 'Payment deferred to tomorrow'),
+        updated_at = now()
+    WHERE id = v_delivery.id;
+
+    v_affected_count := v_affected_count + 1;
+  END LOOP;
+
+  -- Log activity (message text is derived at read time by activity_message)
+  INSERT INTO activity_log (
+    shop_id,
+    activity_type,
+    delivery_date,
+    metadata
+  ) VALUES (
+    p_shop_id,
+    'payment_deferred',
+    p_date,
+    jsonb_build_object(
+      'affected_deliveries', v_affected_count,
+      'notes', p_notes
+    )
+  );
+
+  -- Return success
+  RETURN jsonb_build_object(
+    'success', true,
+    'message', 'Payment deferred to tomorrow',
+    'affected_deliveries', v_affected_count
+  );
+END;
+$$;
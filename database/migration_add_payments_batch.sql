@@ -0,0 +1,119 @@
+-- Migration: process_payments_batch for end-of-day collection sheets
+-- Run this in Supabase SQL Editor (functions.sql has the same function).
+--
+-- Posts many shop payments in one call and one transaction; each row runs
+-- process_payment's FIFO allocation in its own subtransaction and gets its
+-- own result, so one bad row does not stop the sheet:
+--
+--   SELECT process_payments_batch('[
+--     {"shop_name": "Sri Ganesh Stores", "amount": 450, "ref": "row 2"},
+--     {"shop_id": "<shop uuid>", "amount": 1200, "collected_by": "Ravi"}
+--   ]');
+--
+-- or load a CSV with `python -m database.tools.post_payments sheet.csv`.
+
+-- Process Payments Batch Function
+-- Posts a collection sheet in one transaction. Each row runs process_payment
+-- in its own subtransaction, so a bad row is reported and skipped while the
+-- rest are posted. Rows: {"shop_id" | "shop_name", "amount", "collected_by",
+-- "payment_date", "notes", "ref"}; "ref" is echoed back to match results.
+CREATE OR REPLACE FUNCTION process_payments_batch(
+  p_payments JSONB
+) RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_row JSONB;
+  v_index INTEGER;
+  v_shop_id UUID;
+  v_matches INTEGER;
+  v_result JSONB;
+  v_results JSONB := '[]'::JSONB;
+  v_posted INTEGER := 0;
+  v_failed INTEGER := 0;
+  v_total_posted NUMERIC := 0;
+BEGIN
+  IF p_payments IS NULL OR jsonb_typeof(p_payments) != 'array' THEN
+    RETURN jsonb_build_object(
+      'success', false,
+      'error', 'Payments must be a JSON array'
+    );
+  END IF;
+
+  IF jsonb_array_length(p_payments) > 1000 THEN
+    RETURN jsonb_build_object(
+      'success', false,
+      'error', 'At most 1000 payments per batch'
+    );
+  END IF;
+
+  FOR v_row, v_index IN
+    SELECT value, ordinality::INTEGER FROM jsonb_array_elements(p_payments) WITH ORDINALITY
+  LOOP
+    BEGIN
+      v_shop_id := NULL;
+      v_result := NULL;
+      IF jsonb_typeof(v_row) != 'object' THEN
+        v_result := jsonb_build_object('success', false, 'error', 'Row must be a JSON object');
+      ELSIF COALESCE(v_row->>'shop_id', '') != '' THEN
+        v_shop_id := (v_row->>'shop_id')::UUID;
+      ELSIF COALESCE(trim(v_row->>'shop_name'), '') != '' THEN
+        SELECT min(id::TEXT)::UUID, count(*) INTO v_shop_id, v_matches
+        FROM shops
+        WHERE lower(name) = lower(trim(v_row->>'shop_name'))
+          AND is_active = true;
+        IF v_matches > 1 THEN
+          v_shop_id := NULL;
+          v_result := jsonb_build_object('success', false, 'error', 'Shop name is ambiguous');
+        ELSIF v_shop_id IS NULL THEN
+          v_result := jsonb_build_object('success', false, 'error', 'Shop not found');
+        END IF;
+      ELSE
+        v_result := jsonb_build_object('success', false, 'error', 'shop_id or shop_name is required');
+      END IF;
+
+      IF v_shop_id IS NOT NULL THEN
+        v_result := process_payment(
+          v_shop_id,
+          (v_row->>'amount')::NUMERIC,
+          v_row->>'collected_by',
+          COALESCE((v_row->>'payment_date')::DATE, CURRENT_DATE),
+          v_row->>'notes'
+        );
+      END IF;
+    EXCEPTION WHEN OTHERS THEN
+      -- Bad casts or a failing row roll back this row only
+      v_result := jsonb_build_object('success', false, 'error', SQLERRM);
+    END;
+
+    IF (v_result->>'success')::BOOLEAN THEN
+      v_posted := v_posted + 1;
+      v_total_posted := v_total_posted + (v_result->>'amount_paid')::NUMERIC;
+      v_result := jsonb_build_object(
+        'success', true,
+        'payment_id', v_result->'payment_id',
+        'amount_paid', v_result->'amount_paid',
+        'amount_applied', v_result->'amount_applied',
+        'amount_remaining', v_result->'amount_remaining'
+      );
+    ELSE
+      v_failed := v_failed + 1;
+    END IF;
+
+    v_results := v_results || (v_result || jsonb_build_object(
+      'index', v_index,
+      'ref', v_row->'ref',
+      'shop_id', v_shop_id
+    ));
+  END LOOP;
+
+  RETURN jsonb_build_object(
+    'success', true,
+    'posted', v_posted,
+    'failed', v_failed,
+    'total_posted', v_total_posted,
+    'results', v_results
+  );
+END;
+$$;
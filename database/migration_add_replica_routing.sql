@@ -0,0 +1,43 @@
+-- Migration: get_replication_lag for read-replica routing
+-- Run this in Supabase SQL Editor on the primary (functions.sql has the same
+-- function); physical replicas pick it up through replication.
+--
+-- The frontend sends read-only RPCs and table reads to the replica set in
+-- VITE_REACT_APP_SUPABASE_REPLICA_URL while this reports a lag under
+-- VITE_REACT_APP_REPLICA_MAX_LAG_MS, and to the primary otherwise:
+--
+--   SELECT get_replication_lag();
+--   -- {"success": true, "is_replica": true, "lag_ms": 120, "last_replay_at": "..."}
+
+-- Get Replication Lag Function
+-- Called on a read replica by the client's read router: reads go to the
+-- replica only while lag_ms stays under the configured staleness bound.
+-- On the primary (or an idle replica that has replayed everything it
+-- received) the lag is 0.
+CREATE OR REPLACE FUNCTION get_replication_lag()
+RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_replay_at TIMESTAMPTZ;
+BEGIN
+  IF NOT pg_is_in_recovery() THEN
+    RETURN jsonb_build_object('success', true, 'is_replica', false, 'lag_ms', 0);
+  END IF;
+
+  v_replay_at := pg_last_xact_replay_timestamp();
+
+  RETURN jsonb_build_object(
+    'success', true,
+    'is_replica', true,
+    'lag_ms', CASE
+      WHEN pg_last_wal_receive_lsn() IS NOT DISTINCT FROM pg_last_wal_replay_lsn() THEN 0
+      WHEN v_replay_at IS NULL THEN NULL
+      ELSE GREATEST(0, round(EXTRACT(EPOCH FROM (clock_timestamp() - v_replay_at)) * 1000))::bigint
+    END,
+    'last_replay_at', v_replay_at
+  );
+END;
+$$;
+
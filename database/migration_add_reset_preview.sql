@@ -0,0 +1,145 @@
+-- Migration: reset preview with cost estimate
+-- Run this in Supabase SQL Editor after migration_add_reset_worker.sql.
+--
+-- ResetDialog called get_reset_preview_data, which no schema file defined.
+-- This adds it as a read-only aggregate over a small covering partial index
+-- (active deliveries only), plus the per-job archiving time it uses to
+-- estimate how long a reset will take:
+--
+--   SELECT * FROM get_reset_preview_data(CURRENT_DATE);
+
+ALTER TABLE daily_reset_jobs
+ADD COLUMN IF NOT EXISTS reset_ms NUMERIC(12,1) NOT NULL DEFAULT 0;
+
+-- Active deliveries of a day with the amounts, for index-only reset
+-- previews and reset batches (archived rows drop out of the index)
+CREATE INDEX IF NOT EXISTS idx_deliveries_active_date
+ON deliveries(delivery_date, payment_status) INCLUDE (shop_id, total_amount, payment_amount)
+WHERE is_archived = false;
+
+-- Get Reset Preview Data
+-- What process_daily_reset(p_date) would do, without touching any row: one
+-- index-only pass over idx_deliveries_active_date. estimated_ms is the
+-- expected reset time, from the per-delivery time of the last background
+-- resets (daily_reset_jobs.reset_ms), or a conservative default before any
+-- reset has run.
+CREATE OR REPLACE FUNCTION get_reset_preview_data(p_date DATE DEFAULT CURRENT_DATE)
+RETURNS TABLE(
+  total_deliveries BIGINT,
+  paid_deliveries BIGINT,
+  pending_deliveries BIGINT,
+  partial_deliveries BIGINT,
+  pay_tomorrow_deliveries BIGINT,
+  history_rows BIGINT,
+  total_paid_amount NUMERIC,
+  total_pending_amount NUMERIC,
+  shops_with_pending BIGINT,
+  estimated_ms NUMERIC
+)
+LANGUAGE plpgsql
+STABLE
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_ms_per_delivery NUMERIC;
+BEGIN
+  -- Recent resets big enough to be measured, else 0.1 ms per delivery
+  SELECT SUM(j.reset_ms) / SUM(j.processed_deliveries)
+  INTO v_ms_per_delivery
+  FROM (
+    SELECT reset_ms, processed_deliveries
+    FROM daily_reset_jobs
+    WHERE status = 'done' AND processed_deliveries >= 100 AND reset_ms > 0
+    ORDER BY reset_date DESC
+    LIMIT 7
+  ) j;
+
+  RETURN QUERY
+  SELECT
+    COUNT(*),
+    COUNT(*) FILTER (WHERE d.payment_status = 'paid'),
+    COUNT(*) FILTER (WHERE d.payment_status = 'pending'),
+    COUNT(*) FILTER (WHERE d.payment_status = 'partial'),
+    COUNT(*) FILTER (WHERE d.payment_status = 'pay_tomorrow'),
+    COUNT(*) FILTER (WHERE d.payment_status <> 'paid' AND d.total_amount > d.payment_amount),
+    COALESCE(SUM(d.payment_amount), 0),
+    COALESCE(SUM(d.total_amount - d.payment_amount), 0),
+    COUNT(DISTINCT d.shop_id) FILTER (WHERE d.payment_status <> 'paid' AND d.total_amount > d.payment_amount),
+    -- Fixed cost of the statement plus the per-delivery time
+    round(20 + COUNT(*) * COALESCE(v_ms_per_delivery, 0.1))
+  FROM deliveries d
+  WHERE d.delivery_date = p_date
+    AND d.is_archived = false
+    AND d.payment_status IN ('paid', 'pending', 'partial', 'pay_tomorrow');
+END;
+$$;
+
+-- Run Daily Reset Chunk
+-- Processes the next chunk_size deliveries of a claimed job and records the
+-- progress in the same transaction, so an interrupted worker loses at most
+-- the chunk in flight. "done" means the chunk found nothing to process and
+-- no active delivery of the date is left; "waiting" means the rows left are
+-- locked by a concurrent write, so the worker backs off before retrying.
+-- Only chunks that processed rows are counted.
+-- reset_ms accumulates the archiving time, for get_reset_preview_data.
+CREATE OR REPLACE FUNCTION run_daily_reset_chunk(
+  p_job_id UUID,
+  p_worker TEXT
+) RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_job daily_reset_jobs;
+  v_processed INTEGER;
+  v_pending_moved NUMERIC;
+  v_done BOOLEAN;
+  v_started TIMESTAMP WITH TIME ZONE;
+BEGIN
+  SELECT * INTO v_job FROM daily_reset_jobs WHERE id = p_job_id FOR UPDATE;
+
+  IF NOT FOUND THEN
+    RETURN jsonb_build_object('success', false, 'error', 'Job not found');
+  END IF;
+
+  IF v_job.status <> 'running' OR v_job.worker IS DISTINCT FROM p_worker THEN
+    RETURN jsonb_build_object(
+      'success', false,
+      'error', 'Job is not running for this worker (status ' || v_job.status || ')'
+    );
+  END IF;
+
+  v_started := clock_timestamp();
+  SELECT c.processed, c.pending_moved
+  INTO v_processed, v_pending_moved
+  FROM reset_deliveries_chunk(v_job.reset_date, v_job.chunk_size) c;
+
+  -- Rows the chunk skipped as locked still match here: a job is done only
+  -- once a chunk finds nothing at all
+  v_done := v_processed = 0 AND NOT EXISTS (
+    SELECT 1 FROM deliveries
+    WHERE delivery_date = v_job.reset_date
+      AND is_archived = false
+      AND payment_status IN ('paid', 'pending', 'partial', 'pay_tomorrow')
+  );
+
+  UPDATE daily_reset_jobs
+  SET chunks = chunks + CASE WHEN v_processed > 0 THEN 1 ELSE 0 END,
+      processed_deliveries = processed_deliveries + v_processed,
+      total_pending_moved = total_pending_moved + v_pending_moved,
+      reset_ms = reset_ms + EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000,
+      heartbeat_at = now()
+  WHERE id = p_job_id
+  RETURNING * INTO v_job;
+
+  RETURN jsonb_build_object(
+    'success', true,
+    'processed', v_processed,
+    'pending_moved', v_pending_moved,
+    'processed_deliveries', v_job.processed_deliveries,
+    'total_pending_moved', v_job.total_pending_moved,
+    'done', v_done,
+    'waiting', v_processed = 0 AND NOT v_done
+  );
+END;
+$$;
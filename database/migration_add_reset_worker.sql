@@ -0,0 +1,325 @@
+-- Migration: background daily reset worker
+-- Run this in Supabase SQL Editor, then start the worker next to the database:
+--
+--   python -m database.tools.reset_worker
+--
+-- process_daily_reset used to run only when someone opened ResetDialog, inside
+-- a client request with a 30 second timeout. The worker enqueues yesterday's
+-- reset shortly after midnight in daily_reset_jobs, runs it in chunks (each
+-- chunk commits together with its progress, so an interrupted run resumes
+-- where it stopped) and then warms the new day's aggregates. Jobs can also be
+-- queued by hand:
+--
+--   SELECT enqueue_daily_reset('2024-01-15');
+
+-- Daily Reset Jobs table (queue and progress of the background daily reset)
+CREATE TABLE IF NOT EXISTS daily_reset_jobs (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  reset_date DATE NOT NULL UNIQUE,
+  status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'done', 'failed')),
+  chunk_size INTEGER NOT NULL DEFAULT 500 CHECK (chunk_size > 0),
+  chunks INTEGER NOT NULL DEFAULT 0,
+  processed_deliveries INTEGER NOT NULL DEFAULT 0,
+  total_pending_moved NUMERIC(12,2) NOT NULL DEFAULT 0,
+  worker TEXT,
+  heartbeat_at TIMESTAMP WITH TIME ZONE,
+  started_at TIMESTAMP WITH TIME ZONE,
+  finished_at TIMESTAMP WITH TIME ZONE,
+  warmed_at TIMESTAMP WITH TIME ZONE,
+  warm_stats JSONB,
+  error TEXT,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_daily_reset_jobs_status ON daily_reset_jobs(status, reset_date);
+
+DROP TRIGGER IF EXISTS update_daily_reset_jobs_updated_at ON daily_reset_jobs;
+CREATE TRIGGER update_daily_reset_jobs_updated_at BEFORE UPDATE ON daily_reset_jobs FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+ALTER TABLE daily_reset_jobs ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Enable all access for owners" ON daily_reset_jobs;
+CREATE POLICY "Enable all access for owners" ON daily_reset_jobs
+  FOR ALL USING (true);
+
+DROP POLICY IF EXISTS "Enable read access for staff" ON daily_reset_jobs;
+CREATE POLICY "Enable read access for staff" ON daily_reset_jobs
+  FOR SELECT USING (true);
+
+-- Reset Deliveries Chunk
+-- Archives up to p_limit active deliveries of p_date (all of them when NULL)
+-- and moves each one's unpaid amount to shop_pending_history. A chunk
+-- (p_limit set) skips rows locked by a concurrent reset or payment, so
+-- chunks never wait on each other and never move a delivery twice; the
+-- job picks the skipped rows up in a later chunk. A full reset (p_limit
+-- NULL, process_daily_reset) waits for those locks instead, so it never
+-- leaves a delivery of the date behind.
+-- Shared by process_daily_reset and the chunked reset jobs.
+CREATE OR REPLACE FUNCTION reset_deliveries_chunk(
+  p_date DATE,
+  p_limit INTEGER DEFAULT NULL
+) RETURNS TABLE(processed INTEGER, pending_moved NUMERIC)
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+BEGIN
+  RETURN QUERY EXECUTE format($sql$
+  WITH batch AS (
+    SELECT d.id, d.shop_id, d.delivery_date, d.payment_status, d.total_amount, d.payment_amount
+    FROM deliveries d
+    WHERE d.delivery_date = $1
+      AND d.is_archived = false
+      AND d.payment_status IN ('paid', 'pending', 'partial', 'pay_tomorrow')
+    LIMIT $2
+    FOR UPDATE %s
+  ),
+  history AS (
+    -- Pending, partial, or pay tomorrow with an amount left: move to history
+    INSERT INTO shop_pending_history (
+      shop_id,
+      original_delivery_id,
+      original_date,
+      pending_amount,
+      note
+    )
+    SELECT
+      b.shop_id,
+      b.id,
+      b.delivery_date,
+      b.total_amount - b.payment_amount,
+      CASE
+        WHEN b.payment_status = 'pay_tomorrow' THEN 'Payment was deferred to tomorrow'
+        ELSE 'Pending from ' || $1::TEXT
+      END
+    FROM batch b
+    WHERE b.payment_status <> 'paid'
+      AND b.total_amount > b.payment_amount
+    RETURNING 1
+  ),
+  archived AS (
+    -- Archive every delivery in the batch (mark as processed for the day)
+    UPDATE deliveries d
+    SET is_archived = true,
+        updated_at = now()
+    FROM batch b
+    WHERE d.id = b.id
+    RETURNING 1
+  )
+  SELECT
+    (SELECT COUNT(*) FROM archived)::INTEGER,
+    (SELECT COALESCE(SUM(b.total_amount - b.payment_amount), 0) FROM batch b)
+  $sql$, CASE WHEN p_limit IS NULL THEN '' ELSE 'SKIP LOCKED' END)
+  USING p_date, p_limit;
+END;
+$$;
+
+-- Process Daily Reset Function
+CREATE OR REPLACE FUNCTION process_daily_reset(
+  p_date DATE DEFAULT CURRENT_DATE
+) RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_processed_deliveries INTEGER := 0;
+  v_total_pending NUMERIC := 0;
+BEGIN
+  -- Archive every delivery for the specified date in one statement
+  SELECT c.processed, c.pending_moved
+  INTO v_processed_deliveries, v_total_pending
+  FROM reset_deliveries_chunk(p_date) c;
+
+  -- Return summary
+  RETURN jsonb_build_object(
+    'success', true,
+    'date_reset', p_date,
+    'processed_deliveries', v_processed_deliveries,
+    'total_pending_moved', v_total_pending,
+    'message', 'Daily reset completed successfully'
+  );
+END;
+$$;
+
+-- Enqueue Daily Reset
+-- Queues the reset of p_date (default yesterday) for the reset worker
+-- (python -m database.tools.reset_worker). One job per date: an existing job
+-- is left alone unless it failed, in which case it is queued again.
+CREATE OR REPLACE FUNCTION enqueue_daily_reset(
+  p_date DATE DEFAULT CURRENT_DATE - 1,
+  p_chunk_size INTEGER DEFAULT 500
+) RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_job daily_reset_jobs;
+BEGIN
+  IF p_chunk_size <= 0 THEN
+    RETURN jsonb_build_object(
+      'success', false,
+      'error', 'Chunk size must be greater than 0'
+    );
+  END IF;
+
+  INSERT INTO daily_reset_jobs (reset_date, chunk_size)
+  VALUES (p_date, p_chunk_size)
+  ON CONFLICT (reset_date) DO UPDATE
+  SET status = 'pending',
+      chunk_size = EXCLUDED.chunk_size,
+      error = NULL
+  WHERE daily_reset_jobs.status = 'failed';
+
+  SELECT * INTO v_job FROM daily_reset_jobs WHERE reset_date = p_date;
+
+  RETURN jsonb_build_object(
+    'success', true,
+    'job_id', v_job.id,
+    'reset_date', v_job.reset_date,
+    'status', v_job.status
+  );
+END;
+$$;
+
+-- Claim Daily Reset Job
+-- Hands the oldest queued job to p_worker. A running job whose worker has
+-- not reported for p_stale_after is taken over: chunks already processed
+-- stay archived, so the new worker simply continues with what is left.
+CREATE OR REPLACE FUNCTION claim_daily_reset_job(
+  p_worker TEXT,
+  p_stale_after INTERVAL DEFAULT INTERVAL '2 minutes'
+) RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_job daily_reset_jobs;
+BEGIN
+  SELECT * INTO v_job
+  FROM daily_reset_jobs
+  WHERE status = 'pending'
+     OR (status = 'running' AND heartbeat_at < now() - p_stale_after)
+  ORDER BY reset_date
+  LIMIT 1
+  FOR UPDATE SKIP LOCKED;
+
+  IF NOT FOUND THEN
+    RETURN jsonb_build_object('success', true, 'job', NULL);
+  END IF;
+
+  UPDATE daily_reset_jobs
+  SET status = 'running',
+      worker = p_worker,
+      heartbeat_at = now(),
+      started_at = COALESCE(started_at, now())
+  WHERE id = v_job.id
+  RETURNING * INTO v_job;
+
+  RETURN jsonb_build_object('success', true, 'job', to_jsonb(v_job));
+END;
+$$;
+
+-- Run Daily Reset Chunk
+-- Processes the next chunk_size deliveries of a claimed job and records the
+-- progress in the same transaction, so an interrupted worker loses at most
+-- the chunk in flight. "done" means the chunk found nothing to process and
+-- no active delivery of the date is left; "waiting" means the rows left are
+-- locked by a concurrent write, so the worker backs off before retrying.
+-- Only chunks that processed rows are counted.
+CREATE OR REPLACE FUNCTION run_daily_reset_chunk(
+  p_job_id UUID,
+  p_worker TEXT
+) RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_job daily_reset_jobs;
+  v_processed INTEGER;
+  v_pending_moved NUMERIC;
+  v_done BOOLEAN;
+BEGIN
+  SELECT * INTO v_job FROM daily_reset_jobs WHERE id = p_job_id FOR UPDATE;
+
+  IF NOT FOUND THEN
+    RETURN jsonb_build_object('success', false, 'error', 'Job not found');
+  END IF;
+
+  IF v_job.status <> 'running' OR v_job.worker IS DISTINCT FROM p_worker THEN
+    RETURN jsonb_build_object(
+      'success', false,
+      'error', 'Job is not running for this worker (status ' || v_job.status || ')'
+    );
+  END IF;
+
+  SELECT c.processed, c.pending_moved
+  INTO v_processed, v_pending_moved
+  FROM reset_deliveries_chunk(v_job.reset_date, v_job.chunk_size) c;
+
+  -- Rows the chunk skipped as locked still match here: a job is done only
+  -- once a chunk finds nothing at all
+  v_done := v_processed = 0 AND NOT EXISTS (
+    SELECT 1 FROM deliveries
+    WHERE delivery_date = v_job.reset_date
+      AND is_archived = false
+      AND payment_status IN ('paid', 'pending', 'partial', 'pay_tomorrow')
+  );
+
+  UPDATE daily_reset_jobs
+  SET chunks = chunks + CASE WHEN v_processed > 0 THEN 1 ELSE 0 END,
+      processed_deliveries = processed_deliveries + v_processed,
+      total_pending_moved = total_pending_moved + v_pending_moved,
+      heartbeat_at = now()
+  WHERE id = p_job_id
+  RETURNING * INTO v_job;
+
+  RETURN jsonb_build_object(
+    'success', true,
+    'processed', v_processed,
+    'pending_moved', v_pending_moved,
+    'processed_deliveries', v_job.processed_deliveries,
+    'total_pending_moved', v_job.total_pending_moved,
+    'done', v_done,
+    'waiting', v_processed = 0 AND NOT v_done
+  );
+END;
+$$;
+
+-- Finish Daily Reset Job
+-- Marks a claimed job done (with the timings of the aggregate warm-up that
+-- followed it) or failed with p_error; failed jobs are retried by the next
+-- enqueue_daily_reset for their date.
+CREATE OR REPLACE FUNCTION finish_daily_reset_job(
+  p_job_id UUID,
+  p_worker TEXT,
+  p_warm_stats JSONB DEFAULT NULL,
+  p_error TEXT DEFAULT NULL
+) RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_job daily_reset_jobs;
+BEGIN
+  UPDATE daily_reset_jobs
+  SET status = CASE WHEN p_error IS NULL THEN 'done' ELSE 'failed' END,
+      error = p_error,
+      warm_stats = COALESCE(p_warm_stats, warm_stats),
+      warmed_at = CASE WHEN p_warm_stats IS NULL THEN warmed_at ELSE now() END,
+      finished_at = now(),
+      heartbeat_at = now()
+  WHERE id = p_job_id
+    AND status = 'running'
+    AND worker IS NOT DISTINCT FROM p_worker
+  RETURNING * INTO v_job;
+
+  IF NOT FOUND THEN
+    RETURN jsonb_build_object(
+      'success', false,
+      'error', 'Job is not running for this worker'
+    );
+  END IF;
+
+  RETURN jsonb_build_object('success', true, 'job', to_jsonb(v_job));
+END;
+$$;
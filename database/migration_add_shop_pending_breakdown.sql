@@ -0,0 +1,127 @@
+-- Migration: shop pending breakdown in one call
+-- Run this in Supabase SQL Editor.
+--
+-- ShopDetailScreen used five queries (today's deliveries, today's payments,
+-- all active deliveries, every payment of the shop and all pending history)
+-- to show today / previous / total pending. get_shop_pending_breakdown
+-- returns the three numbers from two indexed aggregates; read_rpc lists it
+-- so the screen can send it through batch_rpc with its other reads.
+
+-- Get Shop Pending Breakdown
+-- The three numbers of the shop header in one call: today's unpaid
+-- deliveries, everything older (unpaid active deliveries before p_date plus
+-- all pending history) and their total. Two indexed aggregates
+-- (idx_deliveries_shop_date_status, idx_shop_pending_history_shop);
+-- overpaid rows count as 0, as in the client's old calculation.
+CREATE OR REPLACE FUNCTION get_shop_pending_breakdown(
+  p_shop_id UUID,
+  p_date DATE DEFAULT CURRENT_DATE
+) RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_today_pending NUMERIC;
+  v_older_pending NUMERIC;
+  v_manual_pending NUMERIC;
+BEGIN
+  SELECT
+    COALESCE(SUM(total_amount - payment_amount) FILTER (WHERE delivery_date = p_date), 0),
+    COALESCE(SUM(total_amount - payment_amount) FILTER (WHERE delivery_date < p_date), 0)
+  INTO v_today_pending, v_older_pending
+  FROM deliveries
+  WHERE shop_id = p_shop_id
+    AND is_archived = false
+    AND total_amount >= payment_amount;
+
+  SELECT COALESCE(SUM(pending_amount), 0)
+  INTO v_manual_pending
+  FROM shop_pending_history
+  WHERE shop_id = p_shop_id
+    AND pending_amount >= 0;
+
+  RETURN jsonb_build_object(
+    'success', true,
+    'shop_id', p_shop_id,
+    'date', p_date,
+    'today_pending', v_today_pending,
+    'previous_pending', v_older_pending + v_manual_pending,
+    'manual_pending', v_manual_pending,
+    'total_pending', v_today_pending + v_older_pending + v_manual_pending
+  );
+END;
+$$;
+
+-- Read RPC Function
+-- Calls one whitelisted read-only function by name with named JSON
+-- arguments and returns its result as JSONB; shared by batch_rpc and
+-- columnar_rpc. Set-returning functions give an array of rows, like
+-- PostgREST does.
+CREATE OR REPLACE FUNCTION read_rpc(p_fn TEXT, p_args JSONB DEFAULT '{}')
+RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_allowed CONSTANT TEXT[] := ARRAY[
+    'get_today_collection_view',
+    'get_reports_collection_view',
+    'get_reports_shop_detail_view',
+    'get_reports_daily_summary',
+    'get_shops_overview',
+    'get_route_stats',
+    'get_shop_balance',
+    'get_shop_pending_breakdown',
+    'get_shop_activity',
+    'get_reset_preview_data',
+    'get_replication_lag',
+    'analyze_query_performance',
+    'get_index_usage_stats',
+    'get_table_stats',
+    'get_slow_queries',
+    'get_connection_stats'
+  ];
+  v_args TEXT;
+  v_returns_set BOOLEAN;
+  v_data JSONB;
+BEGIN
+  IF p_fn IS NULL OR NOT (p_fn = ANY(v_allowed)) THEN
+    RAISE EXCEPTION 'Function % is not allowed in read_rpc', COALESCE(p_fn, '(none)')
+      USING ERRCODE = '42501';
+  END IF;
+
+  -- Named arguments as untyped literals, so each resolves to the
+  -- parameter's own type; JSON arrays become array literals.
+  SELECT COALESCE(string_agg(format('%I => %s', a.key,
+           CASE jsonb_typeof(a.value)
+             WHEN 'null' THEN 'NULL'
+             WHEN 'string' THEN quote_literal(a.value #>> '{}')
+             WHEN 'array' THEN quote_literal((
+               SELECT COALESCE(array_agg(e.value), '{}')::TEXT
+               FROM jsonb_array_elements_text(a.value) e))
+             ELSE quote_literal(a.value::TEXT)
+           END), ', '), '')
+  INTO v_args
+  FROM jsonb_each(COALESCE(p_args, '{}'::jsonb)) a;
+
+  SELECT bool_or(p.proretset OR t.typtype = 'c' OR p.prorettype = 'record'::regtype)
+  INTO v_returns_set
+  FROM pg_proc p
+  JOIN pg_type t ON t.oid = p.prorettype
+  WHERE p.proname = p_fn
+    AND p.pronamespace = 'public'::regnamespace;
+
+  IF v_returns_set IS NULL THEN
+    RAISE EXCEPTION 'Function % does not exist', p_fn USING ERRCODE = '42883';
+  ELSIF v_returns_set THEN
+    EXECUTE format('SELECT COALESCE(jsonb_agg(to_jsonb(r)), ''[]''::jsonb) FROM %I(%s) r', p_fn, v_args)
+      INTO v_data;
+  ELSE
+    EXECUTE format('SELECT to_jsonb(%I(%s))', p_fn, v_args) INTO v_data;
+  END IF;
+
+  RETURN v_data;
+END;
+$$;
@@ -17,16 +17,16 @@ ON deliveries(delivery_date, is_archived, payment_status);
 CREATE INDEX IF NOT EXISTS idx_deliveries_boy_date 
 ON deliveries(delivery_boy_id, delivery_date, is_archived);
 
-CREATE INDEX IF NOT EXISTS idx_payments_shop_date 
-ON payments(shop_id, payment_date);
-
 CREATE INDEX IF NOT EXISTS idx_activity_log_shop_date_type 
 ON activity_log(shop_id, delivery_date, activity_type);
 
-CREATE INDEX IF NOT EXISTS idx_shop_pending_history_shop 
-ON shop_pending_history(shop_id, original_date);
-
 -- Partial indexes for active records only
+-- Active deliveries of a day with the amounts, for index-only reset
+-- previews and reset batches (archived rows drop out of the index)
+CREATE INDEX IF NOT EXISTS idx_deliveries_active_date
+ON deliveries(delivery_date, payment_status) INCLUDE (shop_id, total_amount, payment_amount)
+WHERE is_archived = false;
+
 CREATE INDEX IF NOT EXISTS idx_shops_active 
 ON shops(id, name) WHERE is_active = true;
 
@@ -231,8 +231,8 @@ AS $$
 BEGIN
   RETURN QUERY
   SELECT 
-    schemaname||'.'||tablename as table_name,
-    indexrelname as index_name,
+    schemaname||'.'||relname as table_name,
+    indexrelname::text as index_name,
     idx_scan as index_scans,
     idx_tup_read as tuples_read,
     idx_tup_fetch as tuples_fetched
@@ -257,14 +257,14 @@ AS $$
 BEGIN
   RETURN QUERY
   SELECT 
-    schemaname||'.'||tablename as table_name,
+    schemaname||'.'||relname as table_name,
     n_tup_ins + n_tup_upd + n_tup_del as row_count,
-    pg_size_pretty(pg_total_relation_size(schemaname||'.'||tablename)) as table_size,
-    pg_size_pretty(pg_indexes_size(schemaname||'.'||tablename)) as index_size,
-    pg_size_pretty(pg_total_relation_size(schemaname||'.'||tablename)) as total_size
+    pg_size_pretty(pg_total_relation_size(schemaname||'.'||relname)) as table_size,
+    pg_size_pretty(pg_indexes_size(schemaname||'.'||relname)) as index_size,
+    pg_size_pretty(pg_total_relation_size(schemaname||'.'||relname)) as total_size
   FROM pg_stat_user_tables
   WHERE schemaname = 'public'
-  ORDER BY pg_total_relation_size(schemaname||'.'||tablename) DESC;
+  ORDER BY pg_total_relation_size(schemaname||'.'||relname) DESC;
 END;
 $$;
 
@@ -362,12 +362,289 @@ AS $$
 BEGIN
   RETURN QUERY
   SELECT 
-    state,
+    a.state::text,
     count(*) as count
-  FROM pg_stat_activity
-  WHERE datname = current_database()
-  GROUP BY state
-  ORDER BY count DESC;
+  FROM pg_stat_activity a
+  WHERE a.datname = current_database()
+  GROUP BY a.state
+  ORDER BY 2 DESC;
+END;
+$$;
+
+-- ==============================================
+-- INDEX ADVISOR
+-- ==============================================
+
+-- Schema an extension is installed in, or NULL when it is not installed
+-- (Supabase keeps extensions in "extensions", a plain PostgreSQL in "public")
+CREATE OR REPLACE FUNCTION extension_schema(p_extension text)
+RETURNS text
+LANGUAGE plpgsql
+STABLE
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_schema text;
+BEGIN
+  SELECT n.nspname INTO v_schema
+  FROM pg_extension e
+  JOIN pg_namespace n ON n.oid = e.extnamespace
+  WHERE e.extname = p_extension;
+  RETURN v_schema;
+END;
+$$;
+
+-- Planner cost of a query (EXPLAIN without ANALYZE, nothing is executed)
+CREATE OR REPLACE FUNCTION explain_cost(p_query text)
+RETURNS numeric
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_plan json;
+BEGIN
+  EXECUTE 'EXPLAIN (FORMAT JSON) ' || p_query INTO v_plan;
+  RETURN (v_plan->0->'Plan'->>'Total Cost')::numeric;
+END;
+$$;
+
+-- Calls and total execution time of the statements matching a pattern
+-- (NULLs when pg_stat_statements is not installed)
+CREATE OR REPLACE FUNCTION get_statement_workload(p_pattern text)
+RETURNS TABLE(
+  calls bigint,
+  total_ms numeric
+)
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+DECLARE
+  v_schema text := extension_schema('pg_stat_statements');
+BEGIN
+  IF v_schema IS NULL THEN
+    RETURN QUERY SELECT NULL::bigint, NULL::numeric;
+    RETURN;
+  END IF;
+
+  RETURN QUERY EXECUTE format(
+    'SELECT COALESCE(SUM(s.calls), 0)::bigint, COALESCE(SUM(s.total_exec_time), 0)::numeric
+     FROM %I.pg_stat_statements s
+     WHERE s.dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+       AND s.query ~* $1', v_schema)
+  USING p_pattern;
+END;
+$$;
+
+-- Index advice for the app's real query patterns
+--
+-- 'create' rows: each candidate below is checked against a sample of shops.
+-- Its probe query is planned with and without the index (a hypothetical
+-- hypopg index when the extension is installed, otherwise a real build
+-- that is rolled back when p_allow_build is true). The cost reduction is
+-- weighted by the time pg_stat_statements attributes to the matching RPCs.
+--
+-- 'drop' rows: non-unique indexes whose columns are a leading prefix of
+-- another index on the same table, and indexes never scanned since the
+-- statistics were last reset.
+CREATE OR REPLACE FUNCTION get_index_advice(
+  p_samples integer DEFAULT 5,
+  p_allow_build boolean DEFAULT false
+)
+RETURNS TABLE(
+  action text,
+  index_name text,
+  table_name text,
+  definition text,
+  reason text,
+  calls bigint,
+  cost_before numeric,
+  cost_after numeric,
+  estimated_benefit_ms numeric
+)
+LANGUAGE plpgsql
+SET search_path = 'public'
+AS $$
+#variable_conflict use_column
+DECLARE
+  v_hypopg text := extension_schema('hypopg');
+  v_shops uuid[];
+  v_shop uuid;
+  v_candidate record;
+  v_workload record;
+  v_before numeric;
+  v_after numeric;
+BEGIN
+  v_shops := ARRAY(SELECT s.id FROM shops s WHERE s.is_active = true ORDER BY random() LIMIT GREATEST(p_samples, 1));
+  IF cardinality(v_shops) = 0 THEN
+    v_shops := ARRAY[NULL::uuid];
+  END IF;
+
+  FOR v_candidate IN
+    SELECT * FROM (VALUES
+      (
+        'idx_deliveries_unpaid_fifo', 'deliveries',
+        'CREATE INDEX idx_deliveries_unpaid_fifo ON deliveries (shop_id, delivery_date, created_at) WHERE is_archived = false AND payment_status <> ''paid''',
+        'SELECT id, total_amount, payment_amount FROM deliveries WHERE shop_id = :shop_id AND is_archived = false AND payment_status <> ''paid'' ORDER BY delivery_date, created_at',
+        'process_payment|payment_status\s*(!=|<>)\s*',
+        'FIFO scan of unpaid deliveries in process_payment'
+      ),
+      (
+        'idx_deliveries_active_shop', 'deliveries',
+        'CREATE INDEX idx_deliveries_active_shop ON deliveries (shop_id) INCLUDE (total_amount, payment_amount, payment_status, delivery_date) WHERE is_archived = false',
+        'SELECT SUM(total_amount), SUM(payment_amount), MAX(delivery_date) FROM deliveries WHERE shop_id = :shop_id AND is_archived = false',
+        'get_shop_balance|get_route_stats',
+        'Active balance totals per shop (get_shop_balance) as an index-only scan'
+      ),
+      (
+        'idx_payments_shop_created', 'payments',
+        'CREATE INDEX idx_payments_shop_created ON payments (shop_id, created_at DESC) INCLUDE (amount)',
+        'SELECT amount, created_at FROM payments WHERE shop_id = :shop_id ORDER BY created_at DESC LIMIT 1',
+        'payments.*order by.*created_at',
+        'Last payment per shop ordered by created_at'
+      ),
+      (
+        'idx_payments_date_created', 'payments',
+        'CREATE INDEX idx_payments_date_created ON payments (payment_date, created_at DESC) INCLUDE (shop_id, amount)',
+        'SELECT shop_id, amount, created_at FROM payments WHERE payment_date = CURRENT_DATE ORDER BY created_at DESC',
+        'payments.*payment_date.*order by.*created_at',
+        'Today''s payments newest first (shops list)'
+      ),
+      (
+        'idx_activity_log_shop_type_created', 'activity_log',
+        'CREATE INDEX idx_activity_log_shop_type_created ON activity_log (shop_id, activity_type, created_at DESC)',
+        'SELECT id, amount, created_at FROM activity_log WHERE shop_id = :shop_id AND activity_type = ''delivery_added'' ORDER BY created_at DESC LIMIT 100',
+        'activity_log.*activity_type|get_shop_activity',
+        'Activity by shop and type, newest first'
+      )
+    ) AS c(name, tbl, ddl, probe, pattern, purpose)
+  LOOP
+    CONTINUE WHEN EXISTS (
+      SELECT 1 FROM pg_indexes i WHERE i.schemaname = 'public' AND i.indexname = v_candidate.name
+    );
+
+    v_before := 0;
+    FOREACH v_shop IN ARRAY v_shops LOOP
+      v_before := v_before + explain_cost(replace(v_candidate.probe, ':shop_id', quote_nullable(v_shop)));
+    END LOOP;
+
+    v_after := NULL;
+    IF v_hypopg IS NOT NULL THEN
+      EXECUTE format('SELECT %I.hypopg_create_index(%L)', v_hypopg, v_candidate.ddl);
+      v_after := 0;
+      FOREACH v_shop IN ARRAY v_shops LOOP
+        v_after := v_after + explain_cost(replace(v_candidate.probe, ':shop_id', quote_nullable(v_shop)));
+      END LOOP;
+      EXECUTE format('SELECT %I.hypopg_reset()', v_hypopg);
+    ELSIF p_allow_build THEN
+      BEGIN
+        EXECUTE v_candidate.ddl;
+        v_after := 0;
+        FOREACH v_shop IN ARRAY v_shops LOOP
+          v_after := v_after + explain_cost(replace(v_candidate.probe, ':shop_id', quote_nullable(v_shop)));
+        END LOOP;
+        -- Undo the trial build; v_after survives the rollback
+        RAISE EXCEPTION USING ERRCODE = 'IA001';
+      EXCEPTION WHEN SQLSTATE 'IA001' THEN
+        NULL;
+      END;
+    END IF;
+
+    -- Skip candidates the planner would not profit from
+    CONTINUE WHEN v_after IS NOT NULL AND v_after >= v_before * 0.9;
+
+    SELECT * INTO v_workload FROM get_statement_workload(v_candidate.pattern);
+
+    action := 'create';
+    index_name := v_candidate.name;
+    table_name := v_candidate.tbl;
+    definition := v_candidate.ddl;
+    reason := v_candidate.purpose || CASE
+      WHEN v_after IS NULL THEN ' (cost not estimated: install hypopg or pass p_allow_build => true)'
+      ELSE format(' (plan cost %s -> %s per call)',
+                  round(v_before / cardinality(v_shops), 1), round(v_after / cardinality(v_shops), 1))
+    END;
+    calls := v_workload.calls;
+    cost_before := round(v_before / cardinality(v_shops), 2);
+    cost_after := round(v_after / cardinality(v_shops), 2);
+    estimated_benefit_ms := round(v_workload.total_ms * (1 - v_after / NULLIF(v_before, 0)), 1);
+    RETURN NEXT;
+  END LOOP;
+
+  RETURN QUERY
+  WITH indexes AS (
+    SELECT
+      i.indexrelid,
+      i.indrelid,
+      -- Key columns only (INCLUDE columns come after indnkeyatts), with
+      -- their sort order, opclass and collation; slices are 1-based
+      (i.indkey::int2[])[0:i.indnkeyatts - 1] AS keys,
+      (i.indoption::int2[])[0:i.indnkeyatts - 1] AS options,
+      (i.indclass::oid[])[0:i.indnkeyatts - 1] AS classes,
+      (i.indcollation::oid[])[0:i.indnkeyatts - 1] AS collations,
+      i.indnatts > i.indnkeyatts AS has_include,
+      i.indisunique OR i.indisprimary AS is_unique,
+      i.indpred IS NULL AND i.indexprs IS NULL AS is_plain,
+      c.relam,
+      EXISTS (SELECT 1 FROM pg_constraint k WHERE k.conindid = i.indexrelid) AS backs_constraint
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = 'public'
+  ),
+  unused AS (
+    SELECT
+      s.indexrelid,
+      s.relid AS indrelid,
+      format('unused: 0 scans since statistics reset, %s', pg_size_pretty(pg_relation_size(s.indexrelid))) AS why
+    FROM pg_stat_user_indexes s
+    JOIN indexes x ON x.indexrelid = s.indexrelid
+    JOIN pg_stat_user_tables t ON t.relid = s.relid
+    WHERE s.schemaname = 'public'
+      AND s.idx_scan = 0
+      AND NOT x.is_unique
+      AND NOT x.backs_constraint
+      -- Only judge tables the workload actually reads
+      AND t.seq_scan + COALESCE(t.idx_scan, 0) >= 1000
+      AND t.n_live_tup >= 1000
+  ),
+  duplicates AS (
+    -- Only indexes kept by a covering index that is itself worth keeping.
+    -- b covers a when a's key columns are a prefix of b's with the same
+    -- sort order, opclass and collation; an index with INCLUDE columns is
+    -- never reported (b may not carry them for index-only scans).
+    SELECT DISTINCT ON (a.indexrelid)
+      a.indexrelid,
+      a.indrelid,
+      format('duplicate: columns covered by %s', b.indexrelid::regclass) AS why
+    FROM indexes a
+    JOIN indexes b ON b.indrelid = a.indrelid AND b.indexrelid <> a.indexrelid AND b.relam = a.relam
+    WHERE NOT a.is_unique AND NOT a.backs_constraint AND a.is_plain AND b.is_plain
+      AND NOT a.has_include
+      AND b.indexrelid NOT IN (SELECT u.indexrelid FROM unused u)
+      AND a.indexrelid NOT IN (SELECT u.indexrelid FROM unused u)
+      AND b.keys[1:cardinality(a.keys)] = a.keys
+      AND b.options[1:cardinality(a.keys)] = a.options
+      AND b.classes[1:cardinality(a.keys)] = a.classes
+      AND b.collations[1:cardinality(a.keys)] = a.collations
+      AND (
+        cardinality(b.keys) > cardinality(a.keys)
+        OR b.is_unique
+        OR b.indexrelid < a.indexrelid
+      )
+    ORDER BY a.indexrelid, cardinality(b.keys) DESC
+  )
+  SELECT
+    'drop'::text,
+    r.indexrelid::regclass::text,
+    r.indrelid::regclass::text,
+    'DROP INDEX ' || r.indexrelid::regclass::text,
+    r.why,
+    NULL::bigint,
+    NULL::numeric,
+    NULL::numeric,
+    NULL::numeric
+  FROM (SELECT * FROM duplicates UNION ALL SELECT * FROM unused) r
+  ORDER BY 5, 2;
 END;
 $$;
 
@@ -375,7 +652,7 @@ $$;
 -- OPTIMIZATION RECOMMENDATIONS
 -- ==============================================
 
--- Function to get optimization recommendations
+-- Function to get optimization recommendations (derived from the live database)
 CREATE OR REPLACE FUNCTION get_optimization_recommendations()
 RETURNS TABLE(
   recommendation text,
@@ -387,29 +664,57 @@ SET search_path = 'public'
 AS $$
 BEGIN
   RETURN QUERY
-  SELECT 
-    'Index Usage' as recommendation,
-    'High' as priority,
-    'Monitor index usage and consider adding indexes for frequently queried columns' as description
-  UNION ALL
-  SELECT 
-    'Query Performance',
-    'High',
-    'Review slow queries and optimize them with better indexes or query patterns'
-  UNION ALL
-  SELECT 
-    'Table Statistics',
-    'Medium',
-    'Regularly update table statistics with ANALYZE for better query planning'
-  UNION ALL
-  SELECT 
-    'Connection Pooling',
-    'Medium',
-    'Consider using connection pooling for better resource management'
-  UNION ALL
-  SELECT 
-    'Archival Strategy',
-    'Low',
-    'Implement data archival strategy for old records to improve performance';
+  WITH advice AS (
+    SELECT * FROM get_index_advice()
+  ),
+  items AS (
+    SELECT
+      CASE a.action WHEN 'create' THEN 'Create index ' ELSE 'Drop index ' END || a.index_name AS rec,
+      CASE
+        WHEN a.action = 'create' AND (a.estimated_benefit_ms > 1000 OR a.cost_after < a.cost_before * 0.5) THEN 1
+        WHEN a.action = 'create' OR a.reason LIKE 'duplicate%' THEN 2
+        ELSE 3
+      END AS rank,
+      a.reason || ': ' || a.definition AS descr
+    FROM advice a
+
+    UNION ALL
+
+    -- Planner statistics are stale after many changes since the last ANALYZE
+    SELECT
+      'Analyze ' || t.relname,
+      2,
+      format('%s rows changed since the last ANALYZE: run update_table_statistics()', t.n_mod_since_analyze)
+    FROM pg_stat_user_tables t
+    WHERE t.schemaname = 'public'
+      AND t.n_mod_since_analyze > GREATEST(1000, 0.1 * t.n_live_tup)
+
+    UNION ALL
+
+    -- Dead tuples slow every scan until vacuumed
+    SELECT
+      'Vacuum ' || t.relname,
+      2,
+      format('%s dead rows (%s%% of live): run maintenance_cleanup()',
+             t.n_dead_tup, round(100.0 * t.n_dead_tup / GREATEST(t.n_live_tup, 1)))
+    FROM pg_stat_user_tables t
+    WHERE t.schemaname = 'public'
+      AND t.n_dead_tup > GREATEST(1000, 0.2 * t.n_live_tup)
+
+    UNION ALL
+
+    -- activity_log keeps growing unless old rows are compacted
+    SELECT
+      'Compact activity_log',
+      3,
+      'Rows older than 90 days found: run compact_activity_log() until done'
+    WHERE EXISTS (SELECT 1 FROM activity_log WHERE created_at < now() - INTERVAL '90 days')
+  )
+  SELECT
+    i.rec,
+    CASE i.rank WHEN 1 THEN 'High' WHEN 2 THEN 'Medium' ELSE 'Low' END,
+    i.descr
+  FROM items i
+  ORDER BY i.rank, i.rec;
 END;
 $$;
@@ -46,6 +46,20 @@ CREATE POLICY "Enable insert access for staff" ON milk_types
 CREATE POLICY "Enable update access for staff" ON milk_types
   FOR UPDATE USING (true);
 
+-- Shop Rates Table Policies
+CREATE POLICY "Enable all access for owners" ON shop_rates
+  FOR ALL USING (true);
+
+CREATE POLICY "Enable read access for staff" ON shop_rates
+  FOR SELECT USING (true);
+
+-- Effective Prices Table Policies (rows are written by the pricing triggers)
+CREATE POLICY "Enable all access for owners" ON effective_prices
+  FOR ALL USING (true);
+
+CREATE POLICY "Enable read access for staff" ON effective_prices
+  FOR SELECT USING (true);
+
 -- Deliveries Table Policies
 CREATE POLICY "Enable all access for owners" ON deliveries
   FOR ALL USING (true);
@@ -98,6 +112,20 @@ CREATE POLICY "Enable insert access for staff" ON activity_log
 CREATE POLICY "Enable update access for staff" ON activity_log
   FOR UPDATE USING (true);
 
+-- Activity Log Daily Table Policies (rows are written by compact_activity_log)
+CREATE POLICY "Enable all access for owners" ON activity_log_daily
+  FOR ALL USING (true);
+
+CREATE POLICY "Enable read access for staff" ON activity_log_daily
+  FOR SELECT USING (true);
+
+-- Daily Reset Jobs Table Policies (rows are written by the reset worker)
+CREATE POLICY "Enable all access for owners" ON daily_reset_jobs
+  FOR ALL USING (true);
+
+CREATE POLICY "Enable read access for staff" ON daily_reset_jobs
+  FOR SELECT USING (true);
+
 -- User Roles Table Policies
 CREATE POLICY "Enable all access for owners" ON user_roles
   FOR ALL USING (true);
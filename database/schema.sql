@@ -40,6 +40,28 @@ CREATE TABLE IF NOT EXISTS milk_types (
   updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Shop Rates table (custom price of a milk type for one shop)
+CREATE TABLE IF NOT EXISTS shop_rates (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  shop_id UUID NOT NULL REFERENCES shops(id) ON DELETE CASCADE,
+  milk_type_id UUID NOT NULL REFERENCES milk_types(id) ON DELETE CASCADE,
+  custom_price_per_packet NUMERIC(10,2) NOT NULL CHECK (custom_price_per_packet >= 0),
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Effective Prices table (price each shop pays per active milk type: its
+-- shop_rates price, else the milk_types price; maintained by triggers)
+CREATE TABLE IF NOT EXISTS effective_prices (
+  shop_id UUID NOT NULL REFERENCES shops(id) ON DELETE CASCADE,
+  milk_type_id UUID NOT NULL REFERENCES milk_types(id) ON DELETE CASCADE,
+  price_per_packet NUMERIC(10,2) NOT NULL,
+  base_price_per_packet NUMERIC(10,2) NOT NULL,
+  is_custom BOOLEAN NOT NULL DEFAULT false,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  PRIMARY KEY (shop_id, milk_type_id)
+);
+
 -- Deliveries table
 CREATE TABLE IF NOT EXISTS deliveries (
   id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -90,13 +112,52 @@ CREATE TABLE IF NOT EXISTS activity_log (
   shop_id UUID REFERENCES shops(id) ON DELETE CASCADE,
   delivery_boy_id UUID REFERENCES delivery_boys(id) ON DELETE SET NULL,
   activity_type TEXT NOT NULL,
-  message TEXT NOT NULL,
+  message TEXT,  -- legacy free text; new rows derive it via activity_message()
   amount NUMERIC(10,2),
   delivery_date DATE,
   metadata JSONB,
   created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Activity Log Daily table (old activity_log rows compacted into one row per shop and day)
+CREATE TABLE IF NOT EXISTS activity_log_daily (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  shop_id UUID REFERENCES shops(id) ON DELETE CASCADE,
+  activity_date DATE NOT NULL,
+  entry_count INTEGER NOT NULL DEFAULT 0,
+  deliveries_count INTEGER NOT NULL DEFAULT 0,
+  delivered_amount NUMERIC(12,2) NOT NULL DEFAULT 0,
+  payments_count INTEGER NOT NULL DEFAULT 0,
+  collected_amount NUMERIC(12,2) NOT NULL DEFAULT 0,
+  pending_added_count INTEGER NOT NULL DEFAULT 0,
+  pending_added_amount NUMERIC(12,2) NOT NULL DEFAULT 0,
+  deferrals_count INTEGER NOT NULL DEFAULT 0,
+  first_at TIMESTAMP WITH TIME ZONE,
+  last_at TIMESTAMP WITH TIME ZONE,
+  CONSTRAINT activity_log_daily_key UNIQUE NULLS NOT DISTINCT (shop_id, activity_date)
+);
+
+-- Daily Reset Jobs table (queue and progress of the background daily reset)
+CREATE TABLE IF NOT EXISTS daily_reset_jobs (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  reset_date DATE NOT NULL UNIQUE,
+  status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'done', 'failed')),
+  chunk_size INTEGER NOT NULL DEFAULT 500 CHECK (chunk_size > 0),
+  chunks INTEGER NOT NULL DEFAULT 0,
+  processed_deliveries INTEGER NOT NULL DEFAULT 0,
+  total_pending_moved NUMERIC(12,2) NOT NULL DEFAULT 0,
+  reset_ms NUMERIC(12,1) NOT NULL DEFAULT 0,
+  worker TEXT,
+  heartbeat_at TIMESTAMP WITH TIME ZONE,
+  started_at TIMESTAMP WITH TIME ZONE,
+  finished_at TIMESTAMP WITH TIME ZONE,
+  warmed_at TIMESTAMP WITH TIME ZONE,
+  warm_stats JSONB,
+  error TEXT,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
 -- User Roles table
 CREATE TABLE IF NOT EXISTS user_roles (
   id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -127,7 +188,12 @@ CREATE INDEX IF NOT EXISTS idx_deliveries_shop_date ON deliveries(shop_id, deliv
 CREATE INDEX IF NOT EXISTS idx_deliveries_status ON deliveries(payment_status, is_archived);
 CREATE INDEX IF NOT EXISTS idx_payments_shop_date ON payments(shop_id, payment_date);
 CREATE INDEX IF NOT EXISTS idx_activity_log_shop_date ON activity_log(shop_id, delivery_date);
+CREATE INDEX IF NOT EXISTS idx_activity_log_shop_created ON activity_log(shop_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_activity_log_created ON activity_log(created_at);
+CREATE INDEX IF NOT EXISTS idx_activity_log_daily_shop_last ON activity_log_daily(shop_id, last_at DESC);
 CREATE INDEX IF NOT EXISTS idx_shop_pending_history_shop ON shop_pending_history(shop_id);
+CREATE INDEX IF NOT EXISTS idx_daily_reset_jobs_status ON daily_reset_jobs(status, reset_date);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_shop_rates_shop_milk ON shop_rates(shop_id, milk_type_id);
 
 -- ==============================================
 -- TRIGGERS
@@ -146,8 +212,10 @@ $$ language 'plpgsql';
 CREATE TRIGGER update_shops_updated_at BEFORE UPDATE ON shops FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_delivery_boys_updated_at BEFORE UPDATE ON delivery_boys FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_milk_types_updated_at BEFORE UPDATE ON milk_types FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+CREATE TRIGGER update_shop_rates_updated_at BEFORE UPDATE ON shop_rates FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_deliveries_updated_at BEFORE UPDATE ON deliveries FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_shop_pending_history_updated_at BEFORE UPDATE ON shop_pending_history FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+CREATE TRIGGER update_daily_reset_jobs_updated_at BEFORE UPDATE ON daily_reset_jobs FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_user_roles_updated_at BEFORE UPDATE ON user_roles FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_user_profiles_updated_at BEFORE UPDATE ON user_profiles FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
@@ -159,10 +227,14 @@ CREATE TRIGGER update_user_profiles_updated_at BEFORE UPDATE ON user_profiles FO
 ALTER TABLE shops ENABLE ROW LEVEL SECURITY;
 ALTER TABLE delivery_boys ENABLE ROW LEVEL SECURITY;
 ALTER TABLE milk_types ENABLE ROW LEVEL SECURITY;
+ALTER TABLE shop_rates ENABLE ROW LEVEL SECURITY;
+ALTER TABLE effective_prices ENABLE ROW LEVEL SECURITY;
 ALTER TABLE deliveries ENABLE ROW LEVEL SECURITY;
 ALTER TABLE payments ENABLE ROW LEVEL SECURITY;
 ALTER TABLE shop_pending_history ENABLE ROW LEVEL SECURITY;
 ALTER TABLE activity_log ENABLE ROW LEVEL SECURITY;
+ALTER TABLE activity_log_daily ENABLE ROW LEVEL SECURITY;
+ALTER TABLE daily_reset_jobs ENABLE ROW LEVEL SECURITY;
 ALTER TABLE user_roles ENABLE ROW LEVEL SECURITY;
 ALTER TABLE user_profiles ENABLE ROW LEVEL SECURITY;
 
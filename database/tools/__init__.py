@@ -0,0 +1,5 @@
+"""Python tooling for the Milk Delivery App database.
+
+These modules run against a plain PostgreSQL instance (a throwaway local
+cluster or a Supabase connection string) and need ``psycopg`` (v3).
+"""
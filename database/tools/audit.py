@@ -0,0 +1,443 @@
+"""Ledger reconciliation: check that payments, deliveries and pending agree.
+
+The invariants the app relies on but never verifies:
+
+``payment_allocations``
+    The amounts ``process_payment`` recorded in ``applied_to_deliveries``
+    add up to ``payments.amount`` (payments written without allocations,
+    e.g. by the payment modal, are reported as ``payment_unallocated``).
+``delivery_payments``
+    ``deliveries.payment_amount`` equals the allocations made against the
+    delivery and never exceeds ``total_amount``.
+``reset_pending``
+    Every archived delivery with an outstanding balance was moved to
+    ``shop_pending_history`` by ``process_daily_reset``: the live row's
+    pending amount plus what payments have since taken off it equals the
+    outstanding amount. Rows that were paid off are deleted, so for those
+    the allocations against deleted rows are compared per shop and day.
+
+Each table is streamed with binary ``COPY`` and decoded straight into
+NumPy arrays, ``--chunk-rows`` rows at a time. Ids travel as two int64
+halves and money as integer paise, so the checks are exact vectorized
+joins and comparisons; only the offending rows are turned back into UUIDs
+for the report.
+
+Usage::
+
+    python -m database.tools.audit
+    python -m database.tools.audit --dsn postgresql://... --csv tmp/audit.csv --limit 50
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+import uuid
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass, field
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import psycopg
+from psycopg import pq
+
+from .db import connect
+
+CHECKS = ("payment_allocations", "delivery_payments", "reset_pending")
+
+_MASK = (1 << 64) - 1
+_NIL = "'00000000-0000-0000-0000-000000000000'::uuid"
+
+# Binary COPY framing: 11-byte signature, flags and extension length up front,
+# an int16 field count before every row and -1 as the trailer
+_HEADER_SIZE = 19
+_TRAILER = b"\xff\xff"
+
+# Binary size of each column kind; every column is NOT NULL (COALESCEd), so
+# every row has the same width and a chunk decodes with one np.frombuffer
+_KINDS = {"uuid": 16, "int8": 8, "int4": 4, "date": 4}
+
+
+def _id(expr: str) -> str:
+    return f"COALESCE(({expr})::uuid, {_NIL})"
+
+
+def _paise(expr: str) -> str:
+    return f"COALESCE(round(({expr}) * 100)::bigint, 0)"
+
+
+def _day(expr: str) -> str:
+    return f"COALESCE(({expr})::date, DATE '2000-01-01')"
+
+
+PAYMENTS_SQL = f"""
+    SELECT {_id('id')}, {_id('shop_id')}, {_paise('amount')},
+           (applied_to_deliveries IS NOT NULL)::int
+    FROM payments
+"""
+
+# Same shapes as process_payment writes: {"deliveries": [...], "history": [...]},
+# or a bare deliveries array in older rows
+ALLOCATIONS_SQL = f"""
+    SELECT {_id('p.id')}, {_id('p.shop_id')}, a.is_history,
+           {_id("COALESCE(a.item->>'delivery_id', a.item->>'history_id')")},
+           {_day("a.item->>'original_date'")},
+           {_paise("(a.item->>'amount_applied')::numeric")}
+    FROM payments p
+    CROSS JOIN LATERAL (
+      SELECT 0 AS is_history, item
+      FROM jsonb_array_elements(
+        CASE jsonb_typeof(p.applied_to_deliveries)
+          WHEN 'array' THEN p.applied_to_deliveries
+          WHEN 'object' THEN COALESCE(p.applied_to_deliveries->'deliveries', '[]'::jsonb)
+          ELSE '[]'::jsonb
+        END
+      ) AS d(item)
+      UNION ALL
+      SELECT 1, item
+      FROM jsonb_array_elements(
+        CASE WHEN jsonb_typeof(p.applied_to_deliveries->'history') = 'array'
+          THEN p.applied_to_deliveries->'history' ELSE '[]'::jsonb END
+      ) AS h(item)
+    ) a
+"""
+
+DELIVERIES_SQL = f"""
+    SELECT {_id('id')}, {_id('shop_id')}, {_day('delivery_date')},
+           {_paise('total_amount')}, {_paise('payment_amount')},
+           COALESCE(is_archived, false)::int
+    FROM deliveries
+"""
+
+HISTORY_SQL = f"""
+    SELECT {_id('id')}, {_id('shop_id')}, {_id('original_delivery_id')},
+           (original_delivery_id IS NOT NULL)::int, {_paise('pending_amount')}
+    FROM shop_pending_history
+"""
+
+# Output columns of each query: uuids become <name>_hi/<name>_lo int64 halves
+_COLUMNS = {
+    "payments": [("payment", "uuid"), ("shop", "uuid"), ("amount", "int8"),
+                 ("has_allocations", "int4")],
+    "allocations": [("payment", "uuid"), ("shop", "uuid"), ("is_history", "int4"),
+                    ("target", "uuid"), ("target_day", "date"), ("applied", "int8")],
+    "deliveries": [("delivery", "uuid"), ("shop", "uuid"), ("day", "date"), ("total", "int8"),
+                   ("paid", "int8"), ("is_archived", "int4")],
+    "history": [("history", "uuid"), ("shop", "uuid"), ("delivery", "uuid"),
+                ("has_delivery", "int4"), ("pending", "int8")],
+}
+
+PAYMENT = ["payment_hi", "payment_lo"]
+DELIVERY = ["delivery_hi", "delivery_lo"]
+HISTORY = ["history_hi", "history_lo"]
+TARGET = ["target_hi", "target_lo"]
+SHOP = ["shop_hi", "shop_lo"]
+
+
+@dataclass
+class Finding:
+    check: str
+    kind: str
+    shop_id: str | None
+    payment_id: str | None = None
+    delivery_id: str | None = None
+    history_id: str | None = None
+    expected: str | None = None
+    actual: str | None = None
+
+
+@dataclass
+class AuditReport:
+    rows: dict[str, int] = field(default_factory=dict)
+    findings: list[Finding] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def counts(self) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for finding in self.findings:
+            counts[finding.kind] = counts.get(finding.kind, 0) + 1
+        return counts
+
+
+def _row_dtype(columns: list[tuple[str, str]]) -> np.dtype:
+    fields = [("_fields", ">i2")]
+    for name, kind in columns:
+        fields.append((f"_{name}_size", ">i4"))
+        if kind == "uuid":
+            fields += [(f"{name}_hi", ">i8"), (f"{name}_lo", ">i8")]
+        else:
+            fields.append((name, {"int8": ">i8", "int4": ">i4", "date": ">i4"}[kind]))
+    return np.dtype(fields)
+
+
+def _frame(rows: np.ndarray, columns: list[tuple[str, str]]) -> pd.DataFrame:
+    for name, kind in columns:
+        if (rows[f"_{name}_size"] != _KINDS[kind]).any():
+            raise ValueError(f"column {name} is NULL or not {kind} in the COPY stream")
+    names = [n for n in rows.dtype.names if not n.startswith("_")]
+    return pd.DataFrame({name: rows[name].astype(np.int64) for name in names})
+
+
+def _copy_blocks(conn: psycopg.Connection, query: str) -> Iterator[bytes]:
+    """Messages of ``COPY (query) TO STDOUT (FORMAT binary)``, one per row.
+
+    Reads through libpq directly: psycopg's ``Copy`` iterator costs a Python
+    wait per message, which doubles the time of a million-row COPY.
+    """
+    pgconn = conn.pgconn
+    pgconn.send_query(f"COPY ({query}) TO STDOUT (FORMAT binary)".encode())
+    result = pgconn.get_result()
+    try:
+        if result.status != pq.ExecStatus.COPY_OUT:
+            raise psycopg.DatabaseError(result.error_message.decode(errors="replace").strip())
+        while True:
+            nbytes, data = pgconn.get_copy_data(0)
+            if nbytes < 0:
+                break
+            yield data
+        result = pgconn.get_result()
+        if result.status != pq.ExecStatus.COMMAND_OK:
+            raise psycopg.DatabaseError(result.error_message.decode(errors="replace").strip())
+    finally:
+        while pgconn.get_result() is not None:
+            pass
+
+
+def read_chunks(conn: psycopg.Connection, query: str, columns: list[tuple[str, str]],
+                chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Stream ``query`` through binary COPY as int64 DataFrames of ``chunk_rows`` rows."""
+    dtype = _row_dtype(columns)
+    chunk_bytes = dtype.itemsize * chunk_rows
+    blocks, size, header = [], 0, True
+    for block in _copy_blocks(conn, query):
+        blocks.append(block)
+        size += len(block)
+        if size >= chunk_bytes + _HEADER_SIZE:
+            data = b"".join(blocks)
+            if header:
+                data, header = data[_HEADER_SIZE:], False
+            whole = len(data) - len(data) % dtype.itemsize
+            yield _frame(np.frombuffer(data, dtype, count=whole // dtype.itemsize), columns)
+            blocks, size = [data[whole:]], len(data) - whole
+    data = b"".join(blocks)
+    if header:
+        data = data[_HEADER_SIZE:]
+    if not data.endswith(_TRAILER) or (len(data) - len(_TRAILER)) % dtype.itemsize:
+        raise ValueError("truncated COPY stream")
+    if len(data) > len(_TRAILER):
+        yield _frame(np.frombuffer(data, dtype, count=(len(data) - len(_TRAILER)) // dtype.itemsize),
+                     columns)
+
+
+def _empty(columns: list[tuple[str, str]]) -> pd.DataFrame:
+    names = [n for n in _row_dtype(columns).names if not n.startswith("_")]
+    return pd.DataFrame({name: np.empty(0, np.int64) for name in names})
+
+
+def _read_all(conn, query: str, columns: list[tuple[str, str]], chunk_rows: int) -> pd.DataFrame:
+    chunks = list(read_chunks(conn, query, columns, chunk_rows))
+    return pd.concat(chunks, ignore_index=True) if chunks else _empty(columns)
+
+
+def _sum_by(frames: list[pd.DataFrame], keys: list[str], value: str) -> pd.DataFrame:
+    """Combine per-chunk partial sums into one total per key."""
+    if not frames:
+        return pd.DataFrame({**{k: np.empty(0, np.int64) for k in keys}, value: np.empty(0, np.int64)})
+    return pd.concat(frames, ignore_index=True).groupby(keys, as_index=False, sort=False)[value].sum()
+
+
+def _read_allocations(conn, chunk_rows: int) -> tuple[int, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Allocation totals per payment, per delivery and per history row."""
+    rows, per_payment, per_delivery, per_history = 0, [], [], []
+    for chunk in read_chunks(conn, ALLOCATIONS_SQL, _COLUMNS["allocations"], chunk_rows):
+        rows += len(chunk)
+        per_payment.append(chunk.groupby(PAYMENT, as_index=False, sort=False)["applied"].sum())
+        history = chunk["is_history"] == 1
+        per_delivery.append(chunk[~history].groupby(TARGET, as_index=False, sort=False)["applied"].sum())
+        per_history.append(chunk[history].groupby(TARGET + SHOP + ["target_day"], as_index=False,
+                                                  sort=False)["applied"].sum())
+    return (rows,
+            _sum_by(per_payment, PAYMENT, "applied"),
+            _sum_by(per_delivery, TARGET, "applied"),
+            _sum_by(per_history, TARGET + SHOP + ["target_day"], "applied"))
+
+
+def _uuid(hi, lo) -> str | None:
+    hi, lo = int(hi), int(lo)
+    if hi == 0 and lo == 0:
+        return None
+    return str(uuid.UUID(int=((hi & _MASK) << 64) | (lo & _MASK)))
+
+
+def _rupees(paise) -> str:
+    return str(Decimal(int(paise)).scaleb(-2))
+
+
+def _findings(frame: pd.DataFrame, check: str, kind: str, expected: str | None = None,
+              actual: str | None = None) -> list[Finding]:
+    """Turn the offending rows of a vectorized check into report entries."""
+    found = []
+    columns = set(frame.columns)
+    for row in frame.itertuples(index=False):
+        ids = {
+            name: _uuid(getattr(row, f"{name}_hi"), getattr(row, f"{name}_lo"))
+            for name in ("shop", "payment", "delivery", "history") if f"{name}_hi" in columns
+        }
+        found.append(Finding(
+            check, kind, ids.get("shop"),
+            payment_id=ids.get("payment"), delivery_id=ids.get("delivery"),
+            history_id=ids.get("history"),
+            expected=_rupees(getattr(row, expected)) if expected else None,
+            actual=_rupees(getattr(row, actual)) if actual else None,
+        ))
+    return found
+
+
+def check_payment_allocations(payments: pd.DataFrame, applied: pd.DataFrame) -> list[Finding]:
+    merged = payments.merge(applied, on=PAYMENT, how="left")
+    merged["applied"] = merged["applied"].fillna(0).astype(np.int64)
+    allocated = merged["has_allocations"] == 1
+    mismatched = merged[allocated & (merged["applied"] != merged["amount"])]
+    unallocated = merged[~allocated]
+    return (_findings(mismatched, "payment_allocations", "payment_allocation_mismatch", "amount", "applied")
+            + _findings(unallocated, "payment_allocations", "payment_unallocated", "amount", "applied"))
+
+
+def check_delivery_payments(deliveries: pd.DataFrame, applied: pd.DataFrame) -> list[Finding]:
+    applied = applied.rename(columns={"target_hi": "delivery_hi", "target_lo": "delivery_lo"})
+    merged = deliveries.merge(applied, on=DELIVERY, how="outer", indicator=True)
+    unknown = merged[merged["_merge"] == "right_only"]
+    merged = merged[merged["_merge"] != "right_only"].copy()
+    merged["applied"] = merged["applied"].fillna(0).astype(np.int64)
+    mismatched = merged[merged["paid"] != merged["applied"]]
+    overpaid = merged[merged["paid"] > merged["total"]]
+    unknown = unknown.assign(shop_hi=0, shop_lo=0, applied=unknown["applied"].astype(np.int64))
+    return (_findings(mismatched, "delivery_payments", "delivery_paid_mismatch", "applied", "paid")
+            + _findings(overpaid, "delivery_payments", "delivery_overpaid", "total", "paid")
+            + _findings(unknown, "delivery_payments", "allocation_unknown_delivery", None, "applied"))
+
+
+def check_reset_pending(deliveries: pd.DataFrame, history: pd.DataFrame,
+                        applied: pd.DataFrame) -> list[Finding]:
+    found = []
+    outstanding = deliveries[(deliveries["is_archived"] == 1) & (deliveries["total"] > deliveries["paid"])]
+    outstanding = outstanding.assign(outstanding=outstanding["total"] - outstanding["paid"])
+
+    # Live rows: what is still pending plus what payments took off it
+    taken = applied.groupby(TARGET, as_index=False, sort=False)["applied"].sum().rename(
+        columns={"target_hi": "history_hi", "target_lo": "history_lo"})
+    live = history[history["has_delivery"] == 1].merge(taken, on=HISTORY, how="left")
+    live["applied"] = live["applied"].fillna(0).astype(np.int64)
+    live["moved"] = live["pending"] + live["applied"]
+
+    duplicated = live[live.duplicated(DELIVERY, keep=False)]
+    found += _findings(duplicated, "reset_pending", "reset_duplicate_history", None, "moved")
+
+    joined = live.merge(outstanding[DELIVERY + ["outstanding"]], on=DELIVERY, how="left", indicator=True)
+    stray = joined[joined["_merge"] == "left_only"]
+    found += _findings(stray, "reset_pending", "history_without_outstanding_delivery", None, "moved")
+    matched = joined[(joined["_merge"] == "both") & ~joined.duplicated(DELIVERY, keep=False)]
+    found += _findings(matched[matched["moved"] != matched["outstanding"]], "reset_pending",
+                       "reset_pending_mismatch", "outstanding", "moved")
+
+    # Rows paid off since the reset are deleted; compare per shop and day
+    missing = outstanding.merge(live[DELIVERY], on=DELIVERY, how="left", indicator=True)
+    missing = missing[missing["_merge"] == "left_only"].drop(columns="_merge")
+    deleted = applied.merge(history[HISTORY].rename(columns={"history_hi": "target_hi",
+                                                             "history_lo": "target_lo"}),
+                            on=TARGET, how="left", indicator=True)
+    deleted = deleted[deleted["_merge"] == "left_only"]
+    paid_off = deleted.groupby(SHOP + ["target_day"], as_index=False, sort=False)["applied"].sum()
+    paid_off = paid_off.rename(columns={"target_day": "day", "applied": "paid_off"})
+    buckets = missing.groupby(SHOP + ["day"], as_index=False, sort=False)["outstanding"].sum()
+    buckets = buckets.rename(columns={"outstanding": "bucket_outstanding"}).merge(
+        paid_off, on=SHOP + ["day"], how="left")
+    buckets["paid_off"] = buckets["paid_off"].fillna(0).astype(np.int64)
+    short = buckets[buckets["paid_off"] < buckets["bucket_outstanding"]]
+    never_moved = missing.merge(short, on=SHOP + ["day"])
+    found += _findings(never_moved, "reset_pending", "reset_pending_missing", "outstanding", "paid_off")
+    return found
+
+
+def audit(dsn: str | None = None, checks: tuple[str, ...] = CHECKS,
+          chunk_rows: int = 500_000) -> AuditReport:
+    """Run ``checks`` against one consistent snapshot of the database."""
+    report = AuditReport()
+    started = time.perf_counter()
+    with connect(dsn) as conn:
+        conn.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+        conn.read_only = True
+        with conn.transaction():
+            rows, per_payment, per_delivery, per_history = _read_allocations(conn, chunk_rows)
+            report.rows["allocations"] = rows
+            if "payment_allocations" in checks:
+                payments = _read_all(conn, PAYMENTS_SQL, _COLUMNS["payments"], chunk_rows)
+                report.rows["payments"] = len(payments)
+                report.findings += check_payment_allocations(payments, per_payment)
+                del payments
+            if "delivery_payments" in checks or "reset_pending" in checks:
+                deliveries = _read_all(conn, DELIVERIES_SQL, _COLUMNS["deliveries"], chunk_rows)
+                report.rows["deliveries"] = len(deliveries)
+                if "delivery_payments" in checks:
+                    report.findings += check_delivery_payments(deliveries, per_delivery)
+                if "reset_pending" in checks:
+                    history = _read_all(conn, HISTORY_SQL, _COLUMNS["history"], chunk_rows)
+                    report.rows["shop_pending_history"] = len(history)
+                    report.findings += check_reset_pending(deliveries, history, per_history)
+    report.seconds = round(time.perf_counter() - started, 2)
+    return report
+
+
+def write_csv(report: AuditReport, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    names = [f.name for f in Finding.__dataclass_fields__.values()]
+    with path.open("w", newline="") as out:
+        writer = csv.DictWriter(out, fieldnames=names)
+        writer.writeheader()
+        writer.writerows(asdict(finding) for finding in report.findings)
+
+
+def print_report(report: AuditReport, limit: int = 20, out=sys.stdout) -> None:
+    scanned = ", ".join(f"{rows:,} {name}" for name, rows in report.rows.items())
+    print(f"scanned {scanned} in {report.seconds:.1f}s", file=out)
+    counts = report.counts()
+    if not counts:
+        print("books balance: no findings", file=out)
+        return
+    for kind, count in sorted(counts.items()):
+        print(f"  {kind:<38} {count:>8,}", file=out)
+    for finding in report.findings[:limit]:
+        ids = " ".join(f"{name}={value}" for name, value in (
+            ("shop", finding.shop_id), ("payment", finding.payment_id),
+            ("delivery", finding.delivery_id), ("history", finding.history_id)) if value)
+        print(f"  {finding.kind}: {ids} expected {finding.expected} actual {finding.actual}", file=out)
+    if len(report.findings) > limit:
+        print(f"  ... {len(report.findings) - limit:,} more (use --csv for the full list)", file=out)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Check that payments, deliveries and pending history reconcile.")
+    parser.add_argument("--dsn", help="database to audit (default DATABASE_URL)")
+    parser.add_argument("--check", action="append", dest="checks", choices=CHECKS,
+                        help="checks to run (default all)")
+    parser.add_argument("--chunk-rows", type=int, default=500_000, help="rows per streamed chunk")
+    parser.add_argument("--limit", type=int, default=20, help="findings to print")
+    parser.add_argument("--csv", type=Path, help="write every finding to this CSV file")
+    parser.add_argument("--json", type=Path, help="write the summary and findings as JSON")
+    args = parser.parse_args(argv)
+
+    report = audit(args.dsn, tuple(args.checks or CHECKS), args.chunk_rows)
+    print_report(report, args.limit)
+    if args.csv:
+        write_csv(report, args.csv)
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(json.dumps({"counts": report.counts(), **asdict(report)}, indent=2))
+    return 1 if report.findings else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,399 @@
+"""RPC microbenchmarks and EXPLAIN-plan regressions for ``functions.sql``.
+
+Each benchmark case calls one RPC repeatedly against a database loaded by
+:mod:`database.tools.scale_fixture` (or an existing one given by ``--dsn``)
+and records the timing distribution. The plans of the statements *inside*
+the function are captured with ``EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)``:
+
+* through ``auto_explain`` with ``log_nested_statements`` when the server
+  can load it, which sees exactly what the PL/pgSQL code runs;
+* otherwise through the probe statements listed with each case, which
+  mirror the hot queries of the function body and must be kept in step
+  with ``functions.sql``.
+
+Results are written as JSON. Given a baseline (a previous results file,
+see ``--update-baseline``), the run fails on median slowdowns beyond the
+threshold and on sequential scans of ``deliveries``, ``payments`` or
+``activity_log`` that the baseline did not have.
+
+Usage::
+
+    python -m database.tools.benchmark --scale 100x1 --scale 1000x1 \\
+        --out tmp/bench.json --baseline database/benchmarks/baseline.json
+
+``process_payment`` runs inside a transaction that is rolled back after
+every call, so the data stays identical between iterations and runs.
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+import psycopg
+
+from .db import DATABASE_DIR, connect
+from .scale_fixture import LOADED_TABLES, ScaleConfig, scale_database
+
+BASELINE_FILE = DATABASE_DIR / "benchmarks" / "baseline.json"
+
+# Tables large enough that a new sequential scan on them is a regression
+WATCHED_TABLES = {"deliveries", "payments", "activity_log"}
+
+# Shops sampled per scale; calls rotate through them to avoid one hot shop
+SAMPLE_SHOPS = 50
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    call: str
+    probes: tuple[str, ...] = ()
+    mutates: bool = False
+
+
+CASES = [
+    Case(
+        "get_today_collection_view",
+        "SELECT * FROM get_today_collection_view(%(date)s)",
+        probes=(
+            """SELECT d.shop_id, SUM(d.total_amount), SUM(d.payment_amount), COUNT(*)
+               FROM deliveries d
+               WHERE d.delivery_date = %(date)s AND d.is_archived = false
+               GROUP BY d.shop_id""",
+        ),
+    ),
+    Case(
+        "get_reports_collection_view",
+        "SELECT * FROM get_reports_collection_view(%(date)s)",
+        probes=(
+            """SELECT s.id,
+                      SUM(CASE WHEN d.delivery_date = %(date)s THEN d.total_amount ELSE 0 END),
+                      SUM(CASE WHEN d.delivery_date < %(date)s THEN d.total_amount - d.payment_amount ELSE 0 END),
+                      COUNT(CASE WHEN d.delivery_date = %(date)s THEN 1 END)
+               FROM shops s LEFT JOIN deliveries d ON s.id = d.shop_id
+               GROUP BY s.id""",
+            """SELECT shop_id, SUM(pending_amount) FROM shop_pending_history GROUP BY shop_id""",
+        ),
+    ),
+    Case(
+        "get_reports_shop_detail_view",
+        "SELECT * FROM get_reports_shop_detail_view(%(shop_id)s, %(date)s)",
+        probes=(
+            """SELECT d.id, d.products, d.total_amount, d.payment_amount
+               FROM deliveries d
+               WHERE d.shop_id = %(shop_id)s AND d.delivery_date = %(date)s""",
+            """SELECT p.id, p.amount FROM payments p
+               WHERE p.shop_id = %(shop_id)s AND p.payment_date = %(date)s""",
+        ),
+    ),
+    Case(
+        "get_route_stats",
+        "SELECT get_route_stats()",
+        probes=(
+            """SELECT SUM(total_amount), SUM(payment_amount), COUNT(DISTINCT shop_id)
+               FROM deliveries WHERE delivery_date = CURRENT_DATE AND is_archived = false""",
+            """SELECT shop_id, SUM(total_amount - payment_amount)
+               FROM deliveries WHERE is_archived = false GROUP BY shop_id""",
+        ),
+    ),
+    Case(
+        "get_shop_balance",
+        "SELECT get_shop_balance(%(shop_id)s)",
+        probes=(
+            """SELECT SUM(total_amount), SUM(payment_amount), COUNT(*), MAX(delivery_date)
+               FROM deliveries WHERE shop_id = %(shop_id)s AND is_archived = false""",
+            """SELECT SUM(pending_amount) FROM shop_pending_history WHERE shop_id = %(shop_id)s""",
+        ),
+    ),
+    Case(
+        "process_payment",
+        "SELECT process_payment(%(shop_id)s, %(amount)s, 'benchmark', %(date)s, NULL)",
+        probes=(
+            """SELECT * FROM deliveries
+               WHERE shop_id = %(shop_id)s AND is_archived = false AND payment_status != 'paid'
+               ORDER BY delivery_date ASC, created_at ASC""",
+            """SELECT * FROM shop_pending_history WHERE shop_id = %(shop_id)s
+               ORDER BY original_date ASC, created_at ASC""",
+        ),
+        mutates=True,
+    ),
+]
+
+
+@dataclass
+class CaseResult:
+    name: str
+    timings_ms: list[float]
+    plans: list[dict] = field(default_factory=list)
+
+    def summary(self) -> dict:
+        values = sorted(self.timings_ms)
+        cuts = statistics.quantiles(values, n=100, method="inclusive") if len(values) > 1 else values * 99
+        return {
+            "n": len(values),
+            "min": round(values[0], 3),
+            "p50": round(statistics.median(values), 3),
+            "p95": round(cuts[94], 3),
+            "p99": round(cuts[98], 3),
+            "max": round(values[-1], 3),
+            "mean": round(statistics.fmean(values), 3),
+            "stdev": round(statistics.stdev(values), 3) if len(values) > 1 else 0.0,
+        }
+
+    def seq_scans(self) -> list[str]:
+        return sorted({table for plan in self.plans for table in plan["seq_scans"]})
+
+    def to_dict(self) -> dict:
+        return {"timings_ms": self.summary(), "seq_scans": self.seq_scans(), "plans": self.plans}
+
+
+def _walk(node: dict):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _walk(child)
+
+
+def summarize_plan(explain: dict, query: str, source: str) -> dict:
+    """Reduce one ``FORMAT JSON`` plan to what the regression checks need."""
+    root = explain["Plan"]
+    nodes = list(_walk(root))
+    return {
+        "source": source,
+        "query": " ".join(query.split())[:500],
+        "execution_ms": explain.get("Execution Time", root.get("Actual Total Time")),
+        "shared_hit_blocks": root.get("Shared Hit Blocks", 0),
+        "shared_read_blocks": root.get("Shared Read Blocks", 0),
+        "seq_scans": sorted({
+            node["Relation Name"] for node in nodes
+            if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in WATCHED_TABLES
+        }),
+        "plan": explain,
+    }
+
+
+def _enable_auto_explain(conn: psycopg.Connection) -> bool:
+    try:
+        conn.execute("LOAD 'auto_explain'")
+    except psycopg.Error:
+        conn.rollback()
+        return False
+    for setting, value in [
+        ("auto_explain.log_analyze", "on"),
+        ("auto_explain.log_buffers", "on"),
+        ("auto_explain.log_format", "json"),
+        ("auto_explain.log_nested_statements", "on"),
+        ("auto_explain.log_level", "notice"),
+    ]:
+        conn.execute(f"SET {setting} = {value}")
+    conn.execute("SET auto_explain.log_min_duration = -1")
+    conn.commit()
+    return True
+
+
+def _capture_auto_explain(conn: psycopg.Connection, case: Case, params: dict) -> list[dict]:
+    """Run ``case`` once with auto_explain logging every nested statement."""
+    messages = []
+    handler = messages.append
+    conn.add_notice_handler(handler)
+    try:
+        conn.execute("SET auto_explain.log_min_duration = 0")
+        conn.execute(case.call, params).fetchall()
+    finally:
+        conn.rollback()
+        conn.remove_notice_handler(handler)
+
+    plans = []
+    for diag in messages:
+        text = diag.message_primary or ""
+        _, marker, body = text.partition("plan:\n")
+        if not marker:
+            continue
+        explain = json.loads(body)
+        query = explain.get("Query Text", "")
+        # The top-level SELECT of the RPC only wraps the function call
+        if case.name + "(" in query:
+            continue
+        plans.append(summarize_plan(explain, query, "auto_explain"))
+    return plans
+
+
+def _explain_probes(conn: psycopg.Connection, case: Case, params: dict) -> list[dict]:
+    plans = []
+    try:
+        for probe in case.probes:
+            row = conn.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + probe, params).fetchone()
+            explain = row[0][0] if isinstance(row[0], list) else json.loads(row[0])[0]
+            plans.append(summarize_plan(explain, probe, "probe"))
+    finally:
+        conn.rollback()
+    return plans
+
+
+def _sample_shops(conn: psycopg.Connection, seed: int) -> list[str]:
+    # Prefer shops that still owe money so process_payment has work to do
+    rows = conn.execute(
+        """SELECT DISTINCT shop_id FROM deliveries
+           WHERE is_archived = false AND payment_status != 'paid'"""
+    ).fetchall()
+    if not rows:
+        rows = conn.execute("SELECT id FROM shops WHERE is_active = true").fetchall()
+    shops = sorted(str(row[0]) for row in rows)
+    random.Random(seed).shuffle(shops)
+    return shops[:SAMPLE_SHOPS]
+
+
+def run_case(conn: psycopg.Connection, case: Case, shops: list[str], bench_date,
+             repeat: int, warmup: int, use_auto_explain: bool, seed: int = 0) -> CaseResult:
+    rng = random.Random(seed)
+
+    def params(i: int) -> dict:
+        return {"shop_id": shops[i % len(shops)], "date": bench_date,
+                "amount": rng.randint(1, 40) * 50}
+
+    timings = []
+    for i in range(warmup + repeat):
+        p = params(i)
+        started = time.perf_counter()
+        conn.execute(case.call, p).fetchall()
+        elapsed = (time.perf_counter() - started) * 1000
+        if case.mutates:
+            conn.rollback()
+        else:
+            conn.commit()
+        if i >= warmup:
+            timings.append(elapsed)
+
+    p = params(0)
+    plans = _capture_auto_explain(conn, case, p) if use_auto_explain else []
+    if not plans:
+        plans = _explain_probes(conn, case, p)
+    return CaseResult(case.name, timings, plans)
+
+
+def benchmark_database(dsn: str, cases: list[Case], repeat: int, warmup: int, seed: int = 42) -> dict:
+    """Run ``cases`` against one loaded database and return its results."""
+    with connect(dsn) as conn:
+        use_auto_explain = _enable_auto_explain(conn)
+        rows = {table: conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+                for table in LOADED_TABLES}
+        bench_date = conn.execute(
+            "SELECT COALESCE(MAX(delivery_date), CURRENT_DATE) FROM deliveries"
+        ).fetchone()[0]
+        shops = _sample_shops(conn, seed)
+        server_version = conn.info.server_version
+        conn.commit()
+        if not shops:
+            raise RuntimeError("no shops to benchmark; load data first")
+        results = {}
+        for case in cases:
+            result = run_case(conn, case, shops, bench_date, repeat, warmup, use_auto_explain, seed)
+            results[case.name] = result.to_dict()
+            print(f"  {case.name:<32} p50 {result.summary()['p50']:9.3f} ms"
+                  f"  seq scans: {', '.join(result.seq_scans()) or '-'}", file=sys.stderr)
+    return {
+        "server_version": server_version,
+        "rows": rows,
+        "date": bench_date.isoformat(),
+        "plan_source": "auto_explain" if use_auto_explain else "probe",
+        "cases": results,
+    }
+
+
+def parse_scale(text: str) -> ScaleConfig:
+    """``1000x2`` -> 1000 shops, 2 years of history."""
+    shops, _, years = text.lower().partition("x")
+    return ScaleConfig(shops=int(shops), years=float(years or 1))
+
+
+def scale_label(config: ScaleConfig) -> str:
+    return f"{config.shops}x{config.years:g}"
+
+
+def compare(results: dict, baseline: dict, threshold: float = 0.25, min_ms: float = 0.5) -> list[str]:
+    """Findings for median slowdowns and new sequential scans vs ``baseline``."""
+    findings = []
+    for scale, current in results["scales"].items():
+        previous = baseline.get("scales", {}).get(scale)
+        if previous is None:
+            continue
+        for name, case in current["cases"].items():
+            old = previous["cases"].get(name)
+            if old is None:
+                continue
+            now_p50, old_p50 = case["timings_ms"]["p50"], old["timings_ms"]["p50"]
+            if now_p50 > old_p50 * (1 + threshold) and now_p50 - old_p50 > min_ms:
+                findings.append(f"{scale} {name}: p50 {old_p50:.3f} -> {now_p50:.3f} ms "
+                                f"(+{(now_p50 / old_p50 - 1) * 100:.0f}%)")
+            for table in sorted(set(case["seq_scans"]) - set(old["seq_scans"])):
+                findings.append(f"{scale} {name}: new sequential scan on {table}")
+    return findings
+
+
+def strip_plans(results: dict) -> dict:
+    """Results without the full plan trees, small enough to check in."""
+    stripped = json.loads(json.dumps(results))
+    for scale in stripped["scales"].values():
+        for case in scale["cases"].values():
+            for plan in case["plans"]:
+                plan.pop("plan", None)
+    return stripped
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the RPCs in functions.sql.")
+    parser.add_argument("--scale", action="append", dest="scales", type=parse_scale,
+                        help="SHOPSxYEARS to load into a throwaway cluster, repeatable (default 100x1, 1000x1)")
+    parser.add_argument("--dsn", help="benchmark this already loaded database instead")
+    parser.add_argument("--case", action="append", dest="cases", choices=[c.name for c in CASES])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--out", type=Path, help="write full results (with plans) here")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="flag median slowdowns above this fraction (default 0.25)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store this run as the new baseline instead of comparing")
+    args = parser.parse_args(argv)
+
+    cases = [c for c in CASES if not args.cases or c.name in args.cases]
+    results = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "scales": {},
+    }
+    if args.dsn:
+        print("Benchmarking existing database", file=sys.stderr)
+        results["scales"]["dsn"] = benchmark_database(args.dsn, cases, args.repeat, args.warmup)
+    else:
+        for config in args.scales or [parse_scale("100x1"), parse_scale("1000x1")]:
+            print(f"Scale {scale_label(config)}", file=sys.stderr)
+            with scale_database(config) as db:
+                results["scales"][scale_label(config)] = benchmark_database(
+                    db.dsn, cases, args.repeat, args.warmup, config.seed)
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(results, indent=2, default=str))
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(strip_plans(results), indent=2, default=str) + "\n")
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; nothing to compare", file=sys.stderr)
+        return 0
+    findings = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+    for finding in findings:
+        print(f"REGRESSION  {finding}")
+    return 1 if findings else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""Connection and schema helpers shared by the database tools."""
+
+import os
+import re
+from pathlib import Path
+
+import psycopg
+
+DATABASE_DIR = Path(__file__).resolve().parent.parent
+
+# Files applied to a fresh database, in order. New migrations go at the end.
+SCHEMA_FILES = [
+    "schema.sql",
+    "functions.sql",
+    "optimizations.sql",
+    "migration_add_get_route_stats.sql",
+    "migration_add_pending_added.sql",
+    "migration_add_activity_log_retention.sql",
+    "migration_add_index_advisor.sql",
+    "migration_add_payments_batch.sql",
+    "migration_add_replica_routing.sql",
+    "migration_add_batch_rpc.sql",
+    "migration_add_columnar_rpc.sql",
+    "migration_add_reset_worker.sql",
+    "migration_add_reset_preview.sql",
+    "migration_add_shop_pending_breakdown.sql",
+    "migration_add_effective_prices.sql",
+    "migration_add_pay_tomorrow_date.sql",
+]
+
+# schema.sql ends with hand-written sample rows (some with invalid UUIDs);
+# everything from this banner on is skipped when building a database.
+_SAMPLE_DATA_BANNER = re.compile(r"^-- =+\s*\n-- SAMPLE DATA", re.MULTILINE)
+
+
+def default_dsn() -> str:
+    """DSN from ``DATABASE_URL``, falling back to libpq environment defaults."""
+    return os.environ.get("DATABASE_URL", "")
+
+
+def connect(dsn: str | None = None, **kwargs) -> psycopg.Connection:
+    return psycopg.connect(dsn if dsn is not None else default_dsn(), **kwargs)
+
+
+def read_sql(name: str) -> str:
+    sql = (DATABASE_DIR / name).read_text(encoding="utf-8")
+    if name == "schema.sql":
+        match = _SAMPLE_DATA_BANNER.search(sql)
+        if match:
+            sql = sql[:match.start()]
+    return sql
+
+
+def apply_schema(dsn: str | None = None, files: list[str] | None = None) -> None:
+    """Apply the schema, functions, optimizations and migrations in order."""
+    with connect(dsn, autocommit=True) as conn:
+        for name in files or SCHEMA_FILES:
+            conn.execute(read_sql(name))
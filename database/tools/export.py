@@ -0,0 +1,303 @@
+"""Stream deliveries, payments, pending history and allocations to disk.
+
+Month-end reconciliation needs every row of a date range, which PostgREST
+only hands out page by page. This tool reads each dataset through a
+server-side cursor inside one ``REPEATABLE READ`` snapshot and writes
+rows as they arrive, so memory stays flat whether the range is a day or
+a year, and the four files agree with each other.
+
+Datasets (one file each, optionally split into parts of ``--chunk-rows``):
+
+``deliveries``       one row per product line, delivery columns repeated
+``payments``         one row per payment
+``pending_history``  manual/reset pending rows by original date
+``allocations``      one row per delivery or pending row a payment paid,
+                     flattened from ``payments.applied_to_deliveries``
+
+CSV rows are formatted client-side; NDJSON lines come from
+``row_to_json`` so numerics keep their exact decimal text.
+
+Usage::
+
+    python -m database.tools.export --from 2025-04-01 --to 2025-04-30 --out tmp/export-2025-04
+    python -m database.tools.export --from 2024-04-01 --to 2025-03-31 --format ndjson --gzip \\
+        --chunk-rows 1000000 --out tmp/export-fy2024
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import psycopg
+from psycopg import sql
+
+from .db import connect
+
+FORMATS = ("csv", "ndjson")
+
+# Each query takes %(date_from)s and %(date_to)s (inclusive) and is ordered
+# so that two exports of the same range produce identical files.
+DATASETS = {
+    "deliveries": """
+        SELECT
+          d.id AS delivery_id,
+          d.delivery_date,
+          d.shop_id,
+          s.name AS shop_name,
+          d.delivery_boy_id,
+          d.payment_status,
+          d.total_amount,
+          d.payment_amount,
+          d.is_archived,
+          d.created_at,
+          line.line_no,
+          line.item->>'milk_type_id' AS milk_type_id,
+          mt.name AS milk_type_name,
+          (line.item->>'quantity')::integer AS quantity,
+          (line.item->>'price_per_packet')::numeric AS price_per_packet,
+          COALESCE((line.item->>'subtotal')::numeric,
+                   (line.item->>'quantity')::numeric * (line.item->>'price_per_packet')::numeric) AS subtotal
+        FROM deliveries d
+        LEFT JOIN shops s ON s.id = d.shop_id
+        LEFT JOIN LATERAL jsonb_array_elements(
+          CASE WHEN jsonb_typeof(d.products) = 'array' THEN d.products ELSE '[]'::jsonb END
+        ) WITH ORDINALITY AS line(item, line_no) ON true
+        LEFT JOIN milk_types mt ON mt.id::text = line.item->>'milk_type_id'
+        WHERE d.delivery_date BETWEEN %(date_from)s AND %(date_to)s
+        ORDER BY d.delivery_date, d.created_at, d.id, line.line_no
+    """,
+    "payments": """
+        SELECT
+          p.id AS payment_id,
+          p.payment_date,
+          p.shop_id,
+          s.name AS shop_name,
+          p.delivery_boy_id,
+          p.amount,
+          p.payment_type,
+          p.collected_by,
+          p.notes,
+          p.created_at
+        FROM payments p
+        LEFT JOIN shops s ON s.id = p.shop_id
+        WHERE p.payment_date BETWEEN %(date_from)s AND %(date_to)s
+        ORDER BY p.payment_date, p.created_at, p.id
+    """,
+    "pending_history": """
+        SELECT
+          h.id AS history_id,
+          h.original_date,
+          h.shop_id,
+          s.name AS shop_name,
+          h.original_delivery_id,
+          h.pending_amount,
+          h.note,
+          h.created_at,
+          h.updated_at
+        FROM shop_pending_history h
+        LEFT JOIN shops s ON s.id = h.shop_id
+        WHERE h.original_date BETWEEN %(date_from)s AND %(date_to)s
+        ORDER BY h.original_date, h.created_at, h.id
+    """,
+    # process_payment stores {"deliveries": [...], "history": [...]}; older
+    # rows may hold the deliveries array on its own.
+    "allocations": """
+        SELECT
+          p.id AS payment_id,
+          p.payment_date,
+          p.shop_id,
+          a.target,
+          a.line_no,
+          COALESCE(a.item->>'delivery_id', a.item->>'history_id') AS target_id,
+          COALESCE(a.item->>'delivery_date', a.item->>'original_date') AS target_date,
+          (a.item->>'amount_applied')::numeric AS amount_applied
+        FROM payments p
+        CROSS JOIN LATERAL (
+          SELECT 'delivery' AS target, item, line_no
+          FROM jsonb_array_elements(
+            CASE jsonb_typeof(p.applied_to_deliveries)
+              WHEN 'array' THEN p.applied_to_deliveries
+              WHEN 'object' THEN COALESCE(p.applied_to_deliveries->'deliveries', '[]'::jsonb)
+              ELSE '[]'::jsonb
+            END
+          ) WITH ORDINALITY AS d(item, line_no)
+          UNION ALL
+          SELECT 'history', item, line_no
+          FROM jsonb_array_elements(
+            CASE WHEN jsonb_typeof(p.applied_to_deliveries->'history') = 'array'
+              THEN p.applied_to_deliveries->'history' ELSE '[]'::jsonb END
+          ) WITH ORDINALITY AS h(item, line_no)
+        ) a
+        WHERE p.payment_date BETWEEN %(date_from)s AND %(date_to)s
+        ORDER BY p.payment_date, p.created_at, p.id, a.target, a.line_no
+    """,
+}
+
+
+@dataclass
+class DatasetExport:
+    name: str
+    rows: int = 0
+    bytes: int = 0
+    files: list[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+@dataclass
+class ExportManifest:
+    date_from: str
+    date_to: str
+    format: str
+    exported_at: str
+    datasets: list[DatasetExport] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        lines = [f"{self.date_from} .. {self.date_to} ({self.format})"]
+        for d in self.datasets:
+            lines.append(f"  {d.name:<16} {d.rows:>12,} rows {d.bytes / 1024 / 1024:>9.1f} MB "
+                         f"in {len(d.files)} file(s), {d.seconds:.1f}s")
+        return "\n".join(lines)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class _ChunkedWriter:
+    """Writes rows to ``<name>.<ext>`` or ``<name>-0001.<ext>`` parts."""
+
+    def __init__(self, out_dir: Path, name: str, fmt: str, header: list[str],
+                 chunk_rows: int, compress: bool, result: DatasetExport):
+        self._out_dir = out_dir
+        self._name = name
+        self._fmt = fmt
+        self._header = header
+        self._chunk_rows = chunk_rows
+        self._compress = compress
+        self._result = result
+        self._file = None
+        self._csv = None
+        self._rows_in_file = 0
+
+    def _path(self) -> Path:
+        suffix = f".{self._fmt}" + (".gz" if self._compress else "")
+        if not self._chunk_rows:
+            return self._out_dir / f"{self._name}{suffix}"
+        return self._out_dir / f"{self._name}-{len(self._result.files) + 1:04d}{suffix}"
+
+    def _open(self) -> None:
+        path = self._path()
+        opener = gzip.open if self._compress else open
+        self._file = opener(path, "wt", encoding="utf-8", newline="")
+        self._result.files.append(path.name)
+        self._rows_in_file = 0
+        if self._fmt == "csv":
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(self._header)
+
+    def _close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._result.bytes += (self._out_dir / self._result.files[-1]).stat().st_size
+            self._file = None
+
+    def write(self, rows) -> None:
+        for row in rows:
+            if self._file is None or (self._chunk_rows and self._rows_in_file >= self._chunk_rows):
+                self._close()
+                self._open()
+            if self._csv is not None:
+                self._csv.writerow([_csv_value(value) for value in row])
+            else:
+                self._file.write(row[0])
+                self._file.write("\n")
+            self._rows_in_file += 1
+            self._result.rows += 1
+
+    def finish(self) -> None:
+        if self._file is None:
+            self._open()  # an empty range still produces a (header-only) file
+        self._close()
+
+
+def export_dataset(conn: psycopg.Connection, name: str, date_from: date, date_to: date,
+                   out_dir: Path, fmt: str = "csv", fetch_size: int = 5000,
+                   chunk_rows: int = 0, compress: bool = False) -> DatasetExport:
+    """Stream one dataset through a server-side cursor into ``out_dir``."""
+    query = sql.SQL(DATASETS[name])
+    if fmt == "ndjson":
+        query = sql.SQL("SELECT row_to_json(t)::text FROM ({}) t").format(query)
+    result = DatasetExport(name)
+    started = time.perf_counter()
+    with conn.cursor(name=f"export_{name}") as cur:
+        cur.itersize = fetch_size
+        cur.execute(query, {"date_from": date_from, "date_to": date_to})
+        header = [column.name for column in cur.description] if fmt == "csv" else []
+        writer = _ChunkedWriter(out_dir, name, fmt, header, chunk_rows, compress, result)
+        try:
+            while rows := cur.fetchmany(fetch_size):
+                writer.write(rows)
+        finally:
+            writer.finish()
+    result.seconds = round(time.perf_counter() - started, 2)
+    return result
+
+
+def export_range(date_from: date, date_to: date, out_dir: Path, fmt: str = "csv",
+                 datasets: list[str] | None = None, dsn: str | None = None,
+                 fetch_size: int = 5000, chunk_rows: int = 0,
+                 compress: bool = False) -> ExportManifest:
+    """Export ``datasets`` for ``date_from``..``date_to`` from one snapshot."""
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r} (known: {', '.join(FORMATS)})")
+    if date_to < date_from:
+        raise ValueError("date_to is before date_from")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = ExportManifest(date_from.isoformat(), date_to.isoformat(), fmt,
+                              datetime.now(timezone.utc).isoformat(timespec="seconds"))
+    with connect(dsn) as conn:
+        conn.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+        conn.read_only = True
+        with conn.transaction():
+            for name in datasets or list(DATASETS):
+                manifest.datasets.append(export_dataset(
+                    conn, name, date_from, date_to, out_dir, fmt, fetch_size, chunk_rows, compress))
+    (out_dir / "manifest.json").write_text(json.dumps(asdict(manifest), indent=2))
+    return manifest
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Stream a date range of ledger data to CSV/NDJSON files.")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, required=True)
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, required=True)
+    parser.add_argument("--out", type=Path, required=True, help="output directory")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--dataset", action="append", dest="datasets", choices=list(DATASETS),
+                        help="datasets to export (default all)")
+    parser.add_argument("--dsn", help="database to export from (default DATABASE_URL)")
+    parser.add_argument("--fetch-size", type=int, default=5000, help="rows per cursor fetch")
+    parser.add_argument("--chunk-rows", type=int, default=0,
+                        help="split each dataset into files of this many rows (default one file)")
+    parser.add_argument("--gzip", action="store_true", help="gzip the output files")
+    args = parser.parse_args(argv)
+
+    manifest = export_range(args.date_from, args.date_to, args.out, args.format, args.datasets,
+                            args.dsn, args.fetch_size, args.chunk_rows, args.gzip)
+    print(manifest)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
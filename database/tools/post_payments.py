@@ -0,0 +1,151 @@
+"""Post an end-of-day collection sheet through ``process_payments_batch``.
+
+The sheet is a CSV with a header row. Columns (extra columns are ignored):
+
+``shop_id`` or ``shop_name``  which shop paid (names match active shops, case-insensitively)
+``amount``                    cash collected
+``collected_by``              optional, defaults to ``--collected-by``
+``payment_date``              optional ``YYYY-MM-DD``, defaults to ``--date`` or today
+``notes``                     optional
+
+Rows are sent in batches of ``--batch-size``; each batch is one call and one
+transaction, and every row gets its own result, so a typo in one line is
+reported without holding back the rest. ``--dry-run`` runs the batches and
+rolls them back, which shows exactly what would be posted.
+
+Usage::
+
+    python -m database.tools.post_payments sheet.csv --collected-by Ravi
+    python -m database.tools.post_payments sheet.csv --dry-run --out tmp/sheet-results.csv
+"""
+
+import argparse
+import csv
+import json
+import sys
+from dataclasses import asdict, dataclass
+from datetime import date
+from decimal import Decimal
+from functools import partial
+from pathlib import Path
+
+from psycopg.types.json import Jsonb, set_json_loads
+
+from .db import connect
+
+MAX_BATCH = 1000  # process_payments_batch rejects larger arrays
+
+_FIELDS = ("shop_id", "shop_name", "amount", "collected_by", "payment_date", "notes")
+
+
+@dataclass
+class PostResult:
+    line: int
+    shop: str
+    amount: str
+    success: bool
+    payment_id: str | None = None
+    amount_applied: str | None = None
+    amount_remaining: str | None = None
+    error: str | None = None
+
+
+def read_sheet(path: Path, collected_by: str | None = None,
+               payment_date: date | None = None) -> list[dict]:
+    """CSV rows as ``process_payments_batch`` payloads, ``ref`` = CSV line number."""
+    rows = []
+    with path.open(newline="", encoding="utf-8-sig") as sheet:
+        reader = csv.DictReader(sheet)
+        for row in reader:
+            cleaned = {key.strip().lower(): (value or "").strip() for key, value in row.items() if key}
+            if not any(cleaned.values()):
+                continue
+            payload = {name: cleaned[name] for name in _FIELDS if cleaned.get(name)}
+            if collected_by and "collected_by" not in payload:
+                payload["collected_by"] = collected_by
+            if payment_date and "payment_date" not in payload:
+                payload["payment_date"] = payment_date.isoformat()
+            payload["ref"] = reader.line_num
+            rows.append(payload)
+    return rows
+
+
+def post_rows(rows: list[dict], dsn: str | None = None, batch_size: int = 200,
+              dry_run: bool = False) -> list[PostResult]:
+    """Post ``rows`` in batches and return one result per row, in order."""
+    batch_size = max(1, min(batch_size, MAX_BATCH))
+    by_ref = {row["ref"]: row for row in rows}
+    results = []
+    with connect(dsn) as conn:
+        # Keep amounts exact instead of round-tripping them through float
+        set_json_loads(partial(json.loads, parse_float=Decimal), conn)
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            with conn.transaction(force_rollback=dry_run):
+                response = conn.execute("SELECT process_payments_batch(%s)", (Jsonb(batch),)).fetchone()[0]
+            if not response["success"]:
+                raise RuntimeError(response["error"])
+            for item in response["results"]:
+                row = by_ref[item["ref"]]
+                results.append(PostResult(
+                    line=item["ref"],
+                    shop=row.get("shop_name") or row.get("shop_id", ""),
+                    amount=row.get("amount", ""),
+                    success=item["success"],
+                    payment_id=item.get("payment_id"),
+                    amount_applied=_text(item.get("amount_applied")),
+                    amount_remaining=_text(item.get("amount_remaining")),
+                    error=item.get("error"),
+                ))
+    return results
+
+
+def _text(value) -> str | None:
+    return None if value is None else str(value)
+
+
+def write_results(results: list[PostResult], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", newline="") as out:
+        writer = csv.DictWriter(out, fieldnames=list(PostResult.__dataclass_fields__))
+        writer.writeheader()
+        writer.writerows(asdict(result) for result in results)
+
+
+def print_results(results: list[PostResult], dry_run: bool = False, out=sys.stdout) -> None:
+    posted = [r for r in results if r.success]
+    total = sum(Decimal(r.amount) for r in posted)
+    for r in results:
+        if not r.success:
+            print(f"  line {r.line}: {r.shop} {r.amount} FAILED: {r.error}", file=out)
+        elif r.amount_remaining and Decimal(r.amount_remaining) > 0:
+            print(f"  line {r.line}: {r.shop} {r.amount} posted, {r.amount_remaining} not applied "
+                  f"(more than was pending)", file=out)
+    verb = "would post" if dry_run else "posted"
+    print(f"{verb} {len(posted)}/{len(results)} payments, total {total}", file=out)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Post a CSV collection sheet as one batch of payments.")
+    parser.add_argument("sheet", type=Path, help="CSV file with shop_id or shop_name and amount columns")
+    parser.add_argument("--dsn", help="database to post to (default DATABASE_URL)")
+    parser.add_argument("--collected-by", help="collector for rows that do not name one")
+    parser.add_argument("--date", type=date.fromisoformat, help="payment date for rows without one (default today)")
+    parser.add_argument("--batch-size", type=int, default=200, help=f"rows per call (max {MAX_BATCH})")
+    parser.add_argument("--dry-run", action="store_true", help="run everything, then roll back")
+    parser.add_argument("--out", type=Path, help="write per-row results to this CSV file")
+    args = parser.parse_args(argv)
+
+    rows = read_sheet(args.sheet, args.collected_by, args.date)
+    if not rows:
+        print("no payment rows in sheet", file=sys.stderr)
+        return 2
+    results = post_rows(rows, args.dsn, args.batch_size, args.dry_run)
+    print_results(results, args.dry_run)
+    if args.out:
+        write_results(results, args.out)
+    return 0 if all(r.success for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
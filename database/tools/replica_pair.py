@@ -0,0 +1,167 @@
+"""A throwaway primary plus streaming read replica for read-routing tests.
+
+The frontend sends read-only RPCs and table reads to the replica in
+``VITE_REACT_APP_SUPABASE_REPLICA_URL`` while ``get_replication_lag()``
+stays under ``VITE_REACT_APP_REPLICA_MAX_LAG_MS`` (see
+``frontend/src/lib/readRouting.ts``). This module builds the two
+databases that setup needs on one machine: a ``LocalPostgres`` primary
+with the schema applied, and a hot standby cloned from it with
+``pg_basebackup -R``. ``--delay-ms`` sets ``recovery_min_apply_delay`` on
+the standby, so stale reads and the router falling back to the primary
+can be reproduced on demand.
+
+``--check`` writes on the primary and reports how long the row takes to
+show up on the replica and what ``get_replication_lag()`` says meanwhile.
+``--keep`` leaves both clusters running and prints their DSNs, e.g. for
+two PostgREST instances behind the primary and replica URLs.
+
+Usage::
+
+    python -m database.tools.replica_pair --check
+    python -m database.tools.replica_pair --check --delay-ms 3000
+    python -m database.tools.replica_pair --keep --delay-ms 1000
+
+Like ``scale_fixture`` this needs the PostgreSQL binaries on ``PATH`` (or
+``PG_BIN``) and refuses to run as root.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from .db import apply_schema, connect
+from .scale_fixture import LocalPostgres, _pg_bin
+
+
+class LocalStandby(LocalPostgres):
+    """A hot standby of ``primary``, streaming over its unix socket."""
+
+    def __init__(self, primary: LocalPostgres, apply_delay_ms: int = 0,
+                 port: int | None = None, keep: bool = False):
+        super().__init__(port=port, keep=keep)
+        self.primary = primary
+        self.apply_delay_ms = apply_delay_ms
+
+    def start(self) -> str:
+        self.root = Path(tempfile.mkdtemp(prefix="milk-pg-replica-"))
+        subprocess.run(
+            [_pg_bin("pg_basebackup"), "-D", str(self.data_dir), "-R", "-X", "stream",
+             "-c", "fast", "-h", str(self.primary.root), "-p", str(self.primary.port),
+             "-U", "postgres", "--no-sync"],
+            check=True, capture_output=True,
+        )
+        with (self.data_dir / "postgresql.auto.conf").open("a") as conf:
+            conf.write("hot_standby = on\n")
+            conf.write(f"recovery_min_apply_delay = '{self.apply_delay_ms}ms'\n")
+        self._pg_ctl_start()
+        return self.dsn
+
+
+@dataclass
+class ReplicaPair:
+    primary_dsn: str
+    replica_dsn: str
+
+
+@contextmanager
+def replica_pair(apply_delay_ms: int = 0, keep: bool = False):
+    """Yield a ``ReplicaPair`` whose replica already has the schema."""
+    primary = LocalPostgres(keep=keep)
+    standby = None
+    try:
+        primary.start()
+        apply_schema(primary.dsn)
+        standby = LocalStandby(primary, apply_delay_ms, keep=keep)
+        standby.start()
+        yield ReplicaPair(primary.dsn, standby.dsn)
+    finally:
+        if not keep:
+            if standby is not None:
+                standby.stop()
+            primary.stop()
+
+
+@dataclass
+class ReplicaCheck:
+    visible_after_ms: float
+    lag_while_behind: dict | None
+    lag_after_catch_up: dict
+    primary_lag: dict
+
+    def __str__(self) -> str:
+        return "\n".join([
+            f"write visible on replica after {self.visible_after_ms:.0f} ms",
+            f"replica lag while behind (max): {json.dumps(self.lag_while_behind)}",
+            f"replica lag after catch-up: {json.dumps(self.lag_after_catch_up)}",
+            f"primary: {json.dumps(self.primary_lag)}",
+        ])
+
+
+def _lag(conn) -> dict:
+    lag = conn.execute("SELECT get_replication_lag()").fetchone()[0]
+    lag.pop("last_replay_at", None)
+    return lag
+
+
+def _wait_visible(replica, name: str, written: float, timeout: float) -> dict | None:
+    """Poll until shop ``name`` is on the replica; return the worst lag seen."""
+    worst = None
+    while not replica.execute("SELECT 1 FROM shops WHERE name = %s", (name,)).fetchone():
+        # Right after the commit the replica may not have received the WAL
+        # yet and still reports 0, so keep the worst reading (unknown wins).
+        lag = _lag(replica)
+        if worst is None or lag["lag_ms"] is None or (
+                worst["lag_ms"] is not None and lag["lag_ms"] > worst["lag_ms"]):
+            worst = lag
+        if time.perf_counter() - written > timeout:
+            raise TimeoutError(f"write not replicated within {timeout:.0f}s")
+        time.sleep(0.01)
+    return worst
+
+
+def check_pair(pair: ReplicaPair, timeout: float = 30.0) -> ReplicaCheck:
+    """Write a shop on the primary and time its arrival on the replica."""
+    with connect(pair.primary_dsn, autocommit=True) as primary, \
+            connect(pair.replica_dsn, autocommit=True) as replica:
+        # A fresh standby has replayed no transaction and reports its lag
+        # as unknown; one warm-up write gives it a replay timestamp.
+        names = [f"replica-check-{uuid.uuid4().hex[:8]}" for _ in range(2)]
+        for name in names:
+            primary.execute("INSERT INTO shops (name) VALUES (%s)", (name,))
+            written = time.perf_counter()
+            lag_while_behind = _wait_visible(replica, name, written, timeout)
+        visible_after_ms = (time.perf_counter() - written) * 1000
+        primary.execute("DELETE FROM shops WHERE name = ANY(%s)", (names,))
+        return ReplicaCheck(visible_after_ms, lag_while_behind, _lag(replica), _lag(primary))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Start a local primary and streaming read replica.")
+    parser.add_argument("--delay-ms", type=int, default=0,
+                        help="recovery_min_apply_delay on the replica, to simulate lag")
+    parser.add_argument("--check", action="store_true",
+                        help="write on the primary and time its arrival on the replica")
+    parser.add_argument("--json", action="store_true", help="print the check result as JSON")
+    parser.add_argument("--keep", action="store_true",
+                        help="leave both clusters running and print their DSNs")
+    args = parser.parse_args(argv)
+
+    with replica_pair(args.delay_ms, keep=args.keep) as pair:
+        if args.check:
+            result = check_pair(pair, timeout=max(30.0, args.delay_ms / 1000 * 3))
+            print(json.dumps(asdict(result), indent=2) if args.json else result)
+        if args.keep:
+            print(f"primary: {pair.primary_dsn}")
+            print(f"replica: {pair.replica_dsn}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
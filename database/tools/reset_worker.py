@@ -0,0 +1,257 @@
+"""Background daily reset: run ``process_daily_reset`` off the morning critical path.
+
+The worker polls ``daily_reset_jobs``. Once the database clock is past
+midnight plus ``--after``, it enqueues yesterday's reset (and
+``--catch-up-days`` earlier dates, e.g. after downtime). Every queued
+job is claimed and run through ``run_daily_reset_chunk``, ``--chunk-size``
+deliveries per call. Each chunk commits together with the job's
+progress, so a worker that dies mid-reset is replaced by the next one
+(a job whose heartbeat is older than ``--stale-after`` is taken over)
+and only the remaining deliveries are processed.
+
+After the last chunk the day's aggregates are warmed: the reset tables
+are ANALYZEd and the first screens' RPCs (shops overview, route stats,
+collection view, daily summary) are run once, so their pages are cached
+before the first user opens the app. The timings are stored on the job.
+
+Jobs can also be queued by hand, from SQL (``SELECT enqueue_daily_reset(...)``)
+or with ``--date``.
+
+Usage::
+
+    python -m database.tools.reset_worker
+    python -m database.tools.reset_worker --once
+    python -m database.tools.reset_worker --date 2024-01-15 --chunk-size 2000
+    python -m database.tools.reset_worker --status
+"""
+
+import argparse
+import os
+import socket
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from psycopg.types.json import Jsonb
+
+from .db import connect
+
+# First screens of the day, run once after a reset so they start warm
+WARM_QUERIES = {
+    "get_shops_overview": "SELECT COUNT(*) FROM get_shops_overview(%(today)s)",
+    "get_route_stats": "SELECT get_route_stats()",
+    "get_today_collection_view": "SELECT COUNT(*) FROM get_today_collection_view(%(today)s)",
+    "get_reports_daily_summary": "SELECT COUNT(*) FROM get_reports_daily_summary(%(today)s)",
+}
+
+# Back-off while the deliveries left are row-locked by a concurrent write
+# (a payment being posted): first and longest wait, in seconds
+LOCKED_BACKOFF = (0.1, 5.0)
+
+
+@dataclass
+class JobResult:
+    reset_date: date
+    chunks: int = 0
+    processed_deliveries: int = 0
+    total_pending_moved: str = "0"
+    seconds: float = 0.0
+    warm_ms: dict[str, float] = field(default_factory=dict)
+    error: str | None = None
+
+    def __str__(self) -> str:
+        if self.error:
+            return f"reset {self.reset_date}: FAILED after {self.chunks} chunks: {self.error}"
+        warm = ", ".join(f"{name} {ms:.0f} ms" for name, ms in self.warm_ms.items())
+        return (f"reset {self.reset_date}: {self.processed_deliveries:,} deliveries in "
+                f"{self.chunks} chunks, {self.total_pending_moved} pending moved "
+                f"({self.seconds:.1f}s); warmed {warm}")
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _check(result: dict) -> dict:
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+    return result
+
+
+def enqueue(conn, reset_date: date | None = None, chunk_size: int = 500) -> dict:
+    """Queue the reset of ``reset_date`` (default yesterday, by the database clock)."""
+    if reset_date is None:
+        row = conn.execute("SELECT enqueue_daily_reset(p_chunk_size => %s)", (chunk_size,)).fetchone()
+    else:
+        row = conn.execute("SELECT enqueue_daily_reset(%s, %s)", (reset_date, chunk_size)).fetchone()
+    return _check(row[0])
+
+
+def enqueue_due(conn, after: timedelta = timedelta(minutes=5), catch_up_days: int = 1,
+                chunk_size: int = 500) -> int:
+    """Queue the last ``catch_up_days`` resets once it is ``after`` past midnight."""
+    today, past_start = conn.execute(
+        "SELECT CURRENT_DATE, now() - date_trunc('day', now()) >= %s", (after,)
+    ).fetchone()
+    if not past_start:
+        return 0
+    for days_back in range(catch_up_days, 0, -1):
+        enqueue(conn, today - timedelta(days=days_back), chunk_size)
+    return catch_up_days
+
+
+def warm(conn) -> dict[str, float]:
+    """ANALYZE the tables a reset rewrote and run the first screens' RPCs once."""
+    timings = {}
+    started = time.perf_counter()
+    conn.execute("ANALYZE deliveries")
+    conn.execute("ANALYZE shop_pending_history")
+    timings["analyze"] = (time.perf_counter() - started) * 1000
+    today = conn.execute("SELECT CURRENT_DATE").fetchone()[0]
+    for name, sql in WARM_QUERIES.items():
+        started = time.perf_counter()
+        conn.execute(sql, {"today": today}).fetchall()
+        timings[name] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+def run_job(conn, job: dict, worker: str, pause: float = 0.0) -> JobResult:
+    """Run a claimed job's remaining chunks, warm up and mark it done."""
+    result = JobResult(date.fromisoformat(job["reset_date"]))
+    started = time.perf_counter()
+    backoff = LOCKED_BACKOFF[0]
+    try:
+        while True:
+            chunk = _check(conn.execute(
+                "SELECT run_daily_reset_chunk(%s, %s)", (job["id"], worker)
+            ).fetchone()[0])
+            result.processed_deliveries = chunk["processed_deliveries"]
+            result.total_pending_moved = str(chunk["total_pending_moved"])
+            if chunk["done"]:
+                break
+            if chunk.get("waiting"):
+                # Only locked rows are left: wait for their writers to commit
+                time.sleep(backoff)
+                backoff = min(backoff * 2, LOCKED_BACKOFF[1])
+                continue
+            result.chunks += 1
+            backoff = LOCKED_BACKOFF[0]
+            if pause:
+                time.sleep(pause)
+        result.warm_ms = warm(conn)
+        conn.execute(
+            "SELECT finish_daily_reset_job(%s, %s, %s)",
+            (job["id"], worker, Jsonb({name: round(ms, 1) for name, ms in result.warm_ms.items()})),
+        )
+    except Exception as error:
+        result.error = str(error)
+        conn.execute("SELECT finish_daily_reset_job(%s, %s, p_error => %s)",
+                     (job["id"], worker, result.error))
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def run_pending(dsn: str | None = None, worker: str | None = None,
+                stale_after: timedelta = timedelta(minutes=2), pause: float = 0.0) -> list[JobResult]:
+    """Claim and run queued jobs, oldest date first, until none is left."""
+    worker = worker or worker_id()
+    results = []
+    with connect(dsn, autocommit=True) as conn:
+        while True:
+            job = _check(conn.execute(
+                "SELECT claim_daily_reset_job(%s, %s)", (worker, stale_after)
+            ).fetchone()[0])["job"]
+            if job is None:
+                return results
+            results.append(run_job(conn, job, worker, pause))
+
+
+def serve(dsn: str | None = None, after: timedelta = timedelta(minutes=5),
+          catch_up_days: int = 1, chunk_size: int = 500, poll: float = 60.0,
+          stale_after: timedelta = timedelta(minutes=2), pause: float = 0.0) -> None:
+    """Enqueue due resets and run queued jobs every ``poll`` seconds, forever."""
+    worker = worker_id()
+    print(f"reset worker {worker}: polling every {poll:.0f}s", flush=True)
+    while True:
+        try:
+            with connect(dsn, autocommit=True) as conn:
+                enqueue_due(conn, after, catch_up_days, chunk_size)
+            for result in run_pending(dsn, worker, stale_after, pause):
+                print(f"{datetime.now():%Y-%m-%d %H:%M:%S} {result}", flush=True)
+        except Exception as error:  # keep serving through restarts of the database
+            print(f"{datetime.now():%Y-%m-%d %H:%M:%S} reset worker error: {error}",
+                  file=sys.stderr, flush=True)
+        time.sleep(poll)
+
+
+def print_status(dsn: str | None = None, limit: int = 10, out=sys.stdout) -> None:
+    with connect(dsn) as conn:
+        rows = conn.execute(
+            """SELECT reset_date, status, chunks, processed_deliveries, total_pending_moved,
+                      worker, finished_at, error
+               FROM daily_reset_jobs ORDER BY reset_date DESC LIMIT %s""",
+            (limit,),
+        ).fetchall()
+    if not rows:
+        print("no reset jobs", file=out)
+    for reset_date, status, chunks, processed, moved, worker, finished_at, error in rows:
+        line = f"{reset_date}  {status:<8} {processed:>8,} deliveries  {chunks:>4} chunks  {moved} moved"
+        if finished_at:
+            line += f"  finished {finished_at:%Y-%m-%d %H:%M}"
+        elif worker:
+            line += f"  ({worker})"
+        if error:
+            line += f"  error: {error}"
+        print(line, file=out)
+
+
+def _time_of_day(value: str) -> timedelta:
+    hours, minutes = value.split(":")
+    return timedelta(hours=int(hours), minutes=int(minutes))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the daily reset in the background, in resumable chunks.")
+    parser.add_argument("--dsn", help="database to reset (default DATABASE_URL)")
+    parser.add_argument("--once", action="store_true",
+                        help="enqueue due resets, run every queued job, then exit")
+    parser.add_argument("--date", type=date.fromisoformat,
+                        help="enqueue the reset of this date, run queued jobs, then exit")
+    parser.add_argument("--status", action="store_true", help="show the most recent jobs and exit")
+    parser.add_argument("--after", type=_time_of_day, default=timedelta(minutes=5),
+                        help="time after midnight (HH:MM, database clock) to enqueue yesterday's reset")
+    parser.add_argument("--catch-up-days", type=int, default=1,
+                        help="also enqueue resets of this many past days (default just yesterday)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="deliveries per transaction")
+    parser.add_argument("--poll", type=float, default=60.0, help="seconds between job table checks")
+    parser.add_argument("--stale-after", type=int, default=120,
+                        help="seconds without a heartbeat before a running job is taken over")
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between chunks")
+    args = parser.parse_args(argv)
+
+    if args.status:
+        print_status(args.dsn)
+        return 0
+
+    stale_after = timedelta(seconds=args.stale_after)
+    if not (args.once or args.date):
+        serve(args.dsn, args.after, args.catch_up_days, args.chunk_size, args.poll,
+              stale_after, args.pause)
+        return 0
+
+    with connect(args.dsn, autocommit=True) as conn:
+        if args.date:
+            enqueue(conn, args.date, args.chunk_size)
+        else:
+            enqueue_due(conn, args.after, args.catch_up_days, args.chunk_size)
+    results = run_pending(args.dsn, stale_after=stale_after, pause=args.pause)
+    for result in results:
+        print(result)
+    if not results:
+        print("no reset jobs queued")
+    return 0 if all(result.error is None for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""activity_log retention: compact old rows into daily summaries in batches.
+
+Each ``compact_activity_log`` call rolls up to ``--batch-size`` rows older
+than the cutoff into ``activity_log_daily`` and deletes the originals.
+The summary table holds one row per shop and day, with the counts and
+amounts of each activity type as columns of that row. Every batch commits
+on its own, so locks stay short and an interrupted run simply resumes
+next time.
+
+Usage::
+
+    python -m database.tools.retention --older-than-days 90
+    python -m database.tools.retention --older-than-days 30 --batch-size 2000 --vacuum
+"""
+
+import argparse
+import sys
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from .db import connect
+
+
+@dataclass
+class RetentionStats:
+    batches: int = 0
+    compacted: int = 0
+    summary_rows: int = 0
+    seconds: float = 0.0
+
+    def __str__(self) -> str:
+        return (f"compacted {self.compacted:,} activity_log rows into {self.summary_rows:,} "
+                f"summary upserts in {self.batches} batches ({self.seconds:.1f}s)")
+
+
+def compact(dsn: str | None = None, older_than: timedelta = timedelta(days=90),
+            batch_size: int = 5000, max_batches: int | None = None,
+            pause: float = 0.0) -> RetentionStats:
+    """Run ``compact_activity_log`` until no row older than the cutoff is left."""
+    stats = RetentionStats()
+    started = time.perf_counter()
+    with connect(dsn, autocommit=True) as conn:
+        while max_batches is None or stats.batches < max_batches:
+            result = conn.execute(
+                "SELECT compact_activity_log(%s, %s)", (older_than, batch_size)
+            ).fetchone()[0]
+            if not result["success"]:
+                raise RuntimeError(result["error"])
+            stats.batches += 1
+            stats.compacted += result["compacted"]
+            stats.summary_rows += result["summary_rows"]
+            if result["done"]:
+                break
+            if pause:
+                time.sleep(pause)
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def vacuum(dsn: str | None = None) -> None:
+    with connect(dsn, autocommit=True) as conn:
+        conn.execute("VACUUM (ANALYZE) activity_log")
+        conn.execute("VACUUM (ANALYZE) activity_log_daily")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Compact old activity_log rows into daily summaries.")
+    parser.add_argument("--dsn", help="database to compact (default DATABASE_URL)")
+    parser.add_argument("--older-than-days", type=int, default=90)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--max-batches", type=int, help="stop after this many batches")
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM (ANALYZE) afterwards")
+    args = parser.parse_args(argv)
+
+    stats = compact(args.dsn, timedelta(days=args.older_than_days), args.batch_size,
+                    args.max_batches, args.pause)
+    print(stats)
+    if args.vacuum:
+        vacuum(args.dsn)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,536 @@
+"""Scale fixture: a throwaway PostgreSQL loaded with multi-year synthetic data.
+
+``sample_data.sql`` seeds six shops, which says nothing about how the
+functions in ``functions.sql`` behave after years of history. This module
+starts a private PostgreSQL cluster, applies the schema, functions,
+optimizations and migrations, and bulk-loads a reproducible synthetic
+history with ``COPY``:
+
+* a configurable number of shops, each with its own (skewed) delivery
+  frequency and payment behaviour,
+* full, partial and skipped payments applied FIFO the same way
+  ``process_payment`` does, plus pay-tomorrow deferrals,
+* a daily reset at the end of every day that archives the deliveries and
+  moves unpaid amounts into ``shop_pending_history``.
+
+Generation is split into shop chunks that run in worker processes, each
+COPYing straight into the database. Every shop draws from its own RNG
+seeded with ``(seed, shop index)``, so the data is identical regardless of
+the worker count.
+
+Usage::
+
+    with scale_database(ScaleConfig(shops=10_000, years=2)) as db:
+        run_queries(db.dsn)
+
+    python -m database.tools.scale_fixture --shops 10000 --years 2 --keep
+
+The cluster needs ``initdb`` and ``pg_ctl`` on ``PATH`` (or ``PG_BIN``) and,
+like any PostgreSQL server, refuses to run as root.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+
+from .db import apply_schema, connect
+
+# Realistic catalogue (see TASKS.md, task 1.3); prices in paise.
+MILK_TYPES = [
+    ("Smart - 26", 27200),
+    ("Tone milk 180ml", 1050),
+    ("DTM 180ml", 900),
+    ("Vikas gold", 3550),
+    ("Dahi 180ml", 1800),
+    ("Vikas Tak", 1500),
+]
+
+LOADED_TABLES = [
+    "shops",
+    "delivery_boys",
+    "milk_types",
+    "deliveries",
+    "payments",
+    "shop_pending_history",
+    "activity_log",
+]
+
+
+@dataclass(frozen=True)
+class ScaleConfig:
+    shops: int = 1000
+    years: float = 1.0
+    end_date: date = field(default_factory=date.today)
+    delivery_boys: int = 20
+    routes: int = 12
+    seed: int = 42
+    workers: int = os.cpu_count() or 1
+    chunk_size: int = 250
+    # Delivery frequency per shop is Beta(alpha, beta): most shops take
+    # milk nearly every day, a long tail only occasionally.
+    frequency_alpha: float = 2.0
+    frequency_beta: float = 0.8
+    # Share of delivery days on which the shop defers, skips or part-pays.
+    defer_rate: float = 0.05
+    skip_rate: float = 0.12
+    partial_rate: float = 0.18
+    # Chance of a backlog-only payment on a day without a delivery.
+    backlog_payment_rate: float = 0.15
+    with_activity_log: bool = True
+    # Bypass FK triggers while loading; needs a superuser connection.
+    disable_triggers: bool = True
+
+    @property
+    def start_date(self) -> date:
+        return self.end_date - timedelta(days=max(1, round(self.years * 365)) - 1)
+
+
+@dataclass
+class LoadStats:
+    rows: dict[str, int]
+    seconds: float
+
+    def __str__(self) -> str:
+        counts = ", ".join(f"{table}={count:,}" for table, count in self.rows.items())
+        return f"{counts} in {self.seconds:.1f}s"
+
+
+# ==============================================
+# LOCAL POSTGRES
+# ==============================================
+
+def _pg_bin(tool: str) -> str:
+    bin_dir = os.environ.get("PG_BIN")
+    if bin_dir:
+        return str(Path(bin_dir) / tool)
+    found = shutil.which(tool)
+    if found:
+        return found
+    pg_config = shutil.which("pg_config")
+    if pg_config:
+        out = subprocess.run([pg_config, "--bindir"], capture_output=True, text=True, check=True)
+        return str(Path(out.stdout.strip()) / tool)
+    raise FileNotFoundError(f"{tool} not found; install PostgreSQL or set PG_BIN")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LocalPostgres:
+    """A private PostgreSQL cluster in a temporary directory.
+
+    Durability is switched off (``fsync``, ``synchronous_commit``,
+    ``full_page_writes``) because the cluster is thrown away afterwards.
+    """
+
+    def __init__(self, port: int | None = None, keep: bool = False):
+        self.port = port or _free_port()
+        self.keep = keep
+        self.root: Path | None = None
+
+    @property
+    def data_dir(self) -> Path:
+        return self.root / "data"
+
+    @property
+    def dsn(self) -> str:
+        return f"host={self.root} port={self.port} user=postgres dbname=postgres"
+
+    def start(self) -> str:
+        self.root = Path(tempfile.mkdtemp(prefix="milk-pg-"))
+        subprocess.run(
+            [_pg_bin("initdb"), "-D", str(self.data_dir), "-U", "postgres",
+             "-A", "trust", "-E", "UTF8", "--no-sync"],
+            check=True, capture_output=True,
+        )
+        self._pg_ctl_start()
+        return self.dsn
+
+    def _pg_ctl_start(self) -> None:
+        options = " ".join([
+            f"-p {self.port}",
+            f"-k {self.root}",
+            "-c listen_addresses=''",
+            "-c fsync=off",
+            "-c synchronous_commit=off",
+            "-c full_page_writes=off",
+            "-c max_wal_size=4GB",
+            "-c maintenance_work_mem=256MB",
+        ])
+        subprocess.run(
+            [_pg_bin("pg_ctl"), "-D", str(self.data_dir), "-o", options,
+             "-l", str(self.root / "postgres.log"), "-w", "start"],
+            check=True, capture_output=True,
+        )
+
+    def stop(self) -> None:
+        if self.root is None:
+            return
+        subprocess.run(
+            [_pg_bin("pg_ctl"), "-D", str(self.data_dir), "-m", "immediate", "-w", "stop"],
+            capture_output=True,
+        )
+        if not self.keep:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    def __enter__(self) -> "LocalPostgres":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+# ==============================================
+# SYNTHETIC DATA
+# ==============================================
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _money(paise: int) -> str:
+    return f"{paise // 100}.{paise % 100:02d}"
+
+
+def _ts(day: date, seconds: int) -> str:
+    return f"{day.isoformat()} {seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}+00"
+
+
+def _copy_text(value) -> str:
+    """Render one value in COPY text format."""
+    if value is None:
+        return "\\N"
+    text = str(value)
+    if "\\" in text or "\t" in text or "\n" in text or "\r" in text:
+        text = (text.replace("\\", "\\\\").replace("\t", "\\t")
+                .replace("\n", "\\n").replace("\r", "\\r"))
+    return text
+
+
+def _line(*values) -> str:
+    return "\t".join(_copy_text(v) for v in values) + "\n"
+
+
+def _reference_data(config: ScaleConfig) -> dict:
+    rng = random.Random(f"{config.seed}/reference")
+    milk_types = [(_uuid(rng), name, price) for name, price in MILK_TYPES]
+    boys = [_uuid(rng) for _ in range(config.delivery_boys)]
+    return {"milk_types": milk_types, "delivery_boys": boys}
+
+
+def _shop_identity(config: ScaleConfig, index: int) -> tuple[str, str, int]:
+    rng = random.Random(f"{config.seed}/shop/{index}")
+    return _uuid(rng), f"Shop {index + 1:05d}", index % config.routes + 1
+
+
+class _Buffers:
+    def __init__(self):
+        self.lines: dict[str, list[str]] = {
+            "deliveries": [], "payments": [], "shop_pending_history": [], "activity_log": [],
+        }
+
+    def add(self, table: str, *values) -> None:
+        self.lines[table].append(_line(*values))
+
+
+DELIVERY_COLUMNS = ("id, shop_id, delivery_boy_id, delivery_date, products, total_amount, "
+                    "payment_amount, payment_status, delivery_status, is_archived, notes, "
+                    "delivered_at, created_at, updated_at")
+PAYMENT_COLUMNS = ("id, shop_id, delivery_boy_id, payment_date, amount, payment_type, "
+                   "collected_by, notes, applied_to_deliveries, created_at")
+HISTORY_COLUMNS = ("id, shop_id, original_delivery_id, original_date, pending_amount, note, "
+                   "created_at, updated_at")
+ACTIVITY_COLUMNS = ("id, shop_id, delivery_boy_id, activity_type, message, amount, "
+                    "delivery_date, metadata, created_at")
+
+
+def _generate_shop(config: ScaleConfig, reference: dict, index: int, out: _Buffers) -> None:
+    """Simulate one shop's full history into ``out``.
+
+    Mirrors the app's workflow day by day: a delivery, a payment applied
+    FIFO (today's delivery first, then the oldest pending history), and the
+    nightly ``process_daily_reset`` archiving the day.
+    """
+    shop_id, _name, _route = _shop_identity(config, index)
+    rng = random.Random(f"{config.seed}/history/{index}")
+    milk_types = reference["milk_types"]
+    boy_id = rng.choice(reference["delivery_boys"])
+    frequency = rng.betavariate(config.frequency_alpha, config.frequency_beta)
+    basket = [(mt, rng.randint(2, 40)) for mt in rng.sample(milk_types, rng.randint(1, 3))]
+    log = config.with_activity_log
+
+    # Pending history, oldest first: [id, delivery_id, date, remaining, created_at, touched_at]
+    history: list[list] = []
+    deferred = False
+    day = config.start_date
+    while day <= config.end_date:
+        is_today = day == config.end_date
+        delivered = rng.random() < frequency
+        delivery = None
+        if delivered:
+            products, total = [], 0
+            for (mt_id, _name, price), base in basket:
+                quantity = max(1, base + rng.randint(-base // 4, base // 4))
+                subtotal = price * quantity
+                total += subtotal
+                products.append(
+                    f'{{"milk_type_id": "{mt_id}", "quantity": {quantity}, '
+                    f'"price_per_packet": {_money(price)}, "subtotal": {_money(subtotal)}}}'
+                )
+            delivery = {
+                "id": _uuid(rng),
+                "products": "[" + ", ".join(products) + "]",
+                "total": total,
+                "paid": 0,
+                "status": "pending",
+                "created": _ts(day, rng.randint(5 * 3600, 10 * 3600)),
+            }
+            if log:
+                out.add("activity_log", _uuid(rng), shop_id, boy_id, "delivery_added",
+                        None, _money(total), day,
+                        f'{{"delivery_id": "{delivery["id"]}"}}', delivery["created"])
+
+        backlog = sum(entry[3] for entry in history)
+        amount = 0
+        if delivery is not None:
+            draw = rng.random()
+            if draw < config.defer_rate:
+                delivery["status"] = "pay_tomorrow"
+                deferred = True
+            elif draw < config.defer_rate + config.skip_rate:
+                pass
+            elif draw < config.defer_rate + config.skip_rate + config.partial_rate:
+                amount = delivery["total"] * rng.randint(30, 90) // 100
+            else:
+                # Full payment; a shop that deferred yesterday clears the backlog too.
+                share = 100 if deferred else rng.choice((0, 0, 50, 100))
+                amount = delivery["total"] + backlog * share // 100
+                deferred = False
+        elif backlog and rng.random() < config.backlog_payment_rate:
+            amount = backlog * rng.randint(20, 100) // 100
+
+        if amount > 0:
+            payment_id = _uuid(rng)
+            paid_at = _ts(day, rng.randint(11 * 3600, 20 * 3600))
+            remaining = amount
+            applied_deliveries, applied_history = [], []
+            if delivery is not None:
+                to_apply = min(remaining, delivery["total"])
+                delivery["paid"] = to_apply
+                delivery["status"] = "paid" if to_apply >= delivery["total"] else "partial"
+                remaining -= to_apply
+                applied_deliveries.append(
+                    f'{{"delivery_id": "{delivery["id"]}", "delivery_date": "{day}", '
+                    f'"amount_applied": {_money(to_apply)}}}'
+                )
+            while remaining > 0 and history:
+                entry = history[0]
+                to_apply = min(remaining, entry[3])
+                applied_history.append(
+                    f'{{"history_id": "{entry[0]}", "original_date": "{entry[2]}", '
+                    f'"amount_applied": {_money(to_apply)}}}'
+                )
+                remaining -= to_apply
+                entry[3] -= to_apply
+                entry[5] = paid_at
+                if entry[3] == 0:
+                    history.pop(0)
+            applied = ('{"deliveries": [' + ", ".join(applied_deliveries) + '], "history": ['
+                       + ", ".join(applied_history) + "]}")
+            out.add("payments", payment_id, shop_id, None, day, _money(amount), "collection",
+                    "delivery_boy", None, applied, paid_at)
+            if log:
+                out.add("activity_log", _uuid(rng), shop_id, None,
+                        "payment_collected" if remaining == 0 else "payment_partial",
+                        None, _money(amount), day,
+                        f'{{"payment_id": "{payment_id}"}}', paid_at)
+
+        if delivery is not None:
+            unpaid = delivery["total"] - delivery["paid"]
+            out.add("deliveries", delivery["id"], shop_id, boy_id, day, delivery["products"],
+                    _money(delivery["total"]), _money(delivery["paid"]), delivery["status"],
+                    "delivered", not is_today,
+                    "Payment deferred to tomorrow" if delivery["status"] == "pay_tomorrow" else None,
+                    delivery["created"], delivery["created"], delivery["created"])
+            if not is_today and unpaid > 0:
+                # Nightly reset: the unpaid remainder moves to pending history.
+                reset_at = _ts(day, 23 * 3600 + 59 * 60)
+                note = ("Payment was deferred to tomorrow" if delivery["status"] == "pay_tomorrow"
+                        else f"Pending from {day}")
+                history.append([_uuid(rng), delivery["id"], day, unpaid, reset_at, reset_at, note])
+        day += timedelta(days=1)
+
+    for entry_id, delivery_id, original_date, remaining, created, touched, note in history:
+        out.add("shop_pending_history", entry_id, shop_id, delivery_id, original_date,
+                _money(remaining), note, created, touched)
+
+
+def _load_chunk(dsn: str, config: ScaleConfig, reference: dict, first: int, last: int) -> dict[str, int]:
+    out = _Buffers()
+    for index in range(first, last):
+        _generate_shop(config, reference, index, out)
+
+    columns = {
+        "deliveries": DELIVERY_COLUMNS,
+        "payments": PAYMENT_COLUMNS,
+        "shop_pending_history": HISTORY_COLUMNS,
+        "activity_log": ACTIVITY_COLUMNS,
+    }
+    with connect(dsn) as conn:
+        if config.disable_triggers:
+            conn.execute("SET session_replication_role = replica")
+        with conn.cursor() as cur:
+            for table, lines in out.lines.items():
+                if not lines:
+                    continue
+                with cur.copy(f"COPY {table} ({columns[table]}) FROM STDIN") as copy:
+                    for start in range(0, len(lines), 5000):
+                        copy.write("".join(lines[start:start + 5000]))
+    return {table: len(lines) for table, lines in out.lines.items()}
+
+
+def _load_reference(dsn: str, config: ScaleConfig, reference: dict) -> dict[str, int]:
+    created = _ts(config.start_date, 0)
+    with connect(dsn) as conn, conn.cursor() as cur:
+        with cur.copy("COPY milk_types (id, name, price_per_packet, created_at, updated_at) FROM STDIN") as copy:
+            for mt_id, name, price in reference["milk_types"]:
+                copy.write(_line(mt_id, name, _money(price), created, created))
+        with cur.copy("COPY delivery_boys (id, name, phone, created_at, updated_at) FROM STDIN") as copy:
+            for n, boy_id in enumerate(reference["delivery_boys"]):
+                copy.write(_line(boy_id, f"Delivery Boy {n + 1}", f"90000{n:05d}", created, created))
+        with cur.copy("COPY shops (id, name, owner_name, phone, address, route_number, "
+                      "created_at, updated_at) FROM STDIN") as copy:
+            for index in range(config.shops):
+                shop_id, name, route = _shop_identity(config, index)
+                copy.write(_line(shop_id, name, f"Owner {index + 1}", f"8{index:09d}",
+                                 f"Route {route}, Stop {index // config.routes + 1}",
+                                 route, created, created))
+    return {
+        "shops": config.shops,
+        "delivery_boys": len(reference["delivery_boys"]),
+        "milk_types": len(reference["milk_types"]),
+    }
+
+
+def load_synthetic(dsn: str, config: ScaleConfig) -> LoadStats:
+    """Bulk-load the synthetic history described by ``config`` into ``dsn``."""
+    started = time.perf_counter()
+    reference = _reference_data(config)
+    rows = dict.fromkeys(LOADED_TABLES, 0)
+    rows.update(_load_reference(dsn, config, reference))
+
+    chunks = [(first, min(first + config.chunk_size, config.shops))
+              for first in range(0, config.shops, config.chunk_size)]
+    if config.workers <= 1:
+        results = [_load_chunk(dsn, config, reference, first, last) for first, last in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=config.workers) as pool:
+            futures = [pool.submit(_load_chunk, dsn, config, reference, first, last)
+                       for first, last in chunks]
+            results = [future.result() for future in futures]
+    for counts in results:
+        for table, count in counts.items():
+            rows[table] += count
+
+    with connect(dsn, autocommit=True) as conn:
+        for table in LOADED_TABLES:
+            conn.execute(f"VACUUM (ANALYZE) {table}")
+    return LoadStats(rows=rows, seconds=time.perf_counter() - started)
+
+
+# ==============================================
+# FIXTURE
+# ==============================================
+
+@dataclass
+class ScaleDatabase:
+    dsn: str
+    config: ScaleConfig
+    stats: LoadStats
+
+
+@contextmanager
+def scale_database(config: ScaleConfig | None = None, dsn: str | None = None, keep: bool = False):
+    """Yield a :class:`ScaleDatabase` with schema and synthetic data loaded.
+
+    Without ``dsn`` a throwaway cluster is started and removed afterwards
+    (unless ``keep``). With ``dsn`` the given, empty, database is used.
+    """
+    config = config or ScaleConfig()
+    server = None
+    if dsn is None:
+        server = LocalPostgres(keep=keep)
+        dsn = server.start()
+    try:
+        apply_schema(dsn)
+        stats = load_synthetic(dsn, config)
+        yield ScaleDatabase(dsn=dsn, config=config, stats=stats)
+    finally:
+        if server is not None:
+            server.stop()
+
+
+try:
+    import pytest
+except ImportError:  # pragma: no cover - pytest is optional
+    pytest = None
+
+if pytest is not None:
+    @pytest.fixture(scope="session")
+    def scale_db():
+        """Session-wide scale database; size via SCALE_SHOPS / SCALE_YEARS."""
+        config = ScaleConfig(
+            shops=int(os.environ.get("SCALE_SHOPS", "1000")),
+            years=float(os.environ.get("SCALE_YEARS", "1")),
+            seed=int(os.environ.get("SCALE_SEED", "42")),
+        )
+        with scale_database(config, dsn=os.environ.get("SCALE_DSN")) as db:
+            yield db
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shops", type=int, default=ScaleConfig.shops)
+    parser.add_argument("--years", type=float, default=ScaleConfig.years)
+    parser.add_argument("--seed", type=int, default=ScaleConfig.seed)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--end-date", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--no-activity-log", action="store_true")
+    parser.add_argument("--dsn", help="load into an existing empty database instead of a throwaway one")
+    parser.add_argument("--keep", action="store_true",
+                        help="leave the throwaway cluster running and print its DSN")
+    args = parser.parse_args(argv)
+
+    config = ScaleConfig(shops=args.shops, years=args.years, seed=args.seed, workers=args.workers,
+                         end_date=args.end_date, with_activity_log=not args.no_activity_log)
+    print(f"Loading {asdict(config)}", file=sys.stderr)
+    if args.keep and args.dsn is None:
+        server = LocalPostgres(keep=True)
+        dsn = server.start()
+        apply_schema(dsn)
+        print(load_synthetic(dsn, config), file=sys.stderr)
+        print(dsn)
+        return 0
+    with scale_database(config, dsn=args.dsn) as db:
+        print(db.stats, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
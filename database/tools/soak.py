@@ -0,0 +1,378 @@
+"""Accelerated soak: how the RPCs slow down as months of history pile up.
+
+``TC008_Daily_Reset_Archiving_and_Preservation.py`` covers one daily reset
+through the UI; the slowdowns that matter only show after months of
+deliveries, payments and pending history. This engine drives the same
+RPCs the app calls through hundreds of synthetic days against a local
+database, in the order a real day runs them:
+
+1. ``add_delivery`` for every shop that takes milk that day,
+2. ``get_shop_balance`` as the shop's screen opens, then a full or partial
+   ``process_payment``, a ``mark_pay_tomorrow`` deferral or nothing,
+3. ``get_today_collection_view`` and ``get_reports_collection_view`` once
+   the round is done,
+4. ``process_daily_reset`` at the end of the day.
+
+Every call is timed. The database clock cannot be moved, so the simulated
+days end today and each RPC is given its date explicitly. Shops, milk
+types and delivery boys come from :mod:`database.tools.scale_fixture`; the
+shop behaviour (delivery frequency, skip/partial/defer rates) uses the same
+knobs as the scale fixture, drawn from one seeded RNG.
+
+The timings are grouped into windows of ``--window`` days. Per RPC the
+median latency is fitted to ``days ** k``: ``k`` near 0 is flat, near 1
+grows with the history, above 1 is super-linear. ``--plot`` draws the
+median per window as an SVG; ``--check`` fails when an exponent is above
+``--max-exponent``.
+
+Usage::
+
+    python -m database.tools.soak --shops 50 --days 365 --plot tmp/soak.svg --out tmp/soak.json
+    python -m database.tools.soak --dsn "postgresql://localhost/milk_soak" --days 720 --check
+
+Without ``--dsn`` a throwaway cluster is started (see
+:class:`~database.tools.scale_fixture.LocalPostgres`); a given database
+must be empty.
+"""
+
+import argparse
+import json
+import math
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+
+from psycopg.types.json import Jsonb
+
+from .db import apply_schema, connect
+from .scale_fixture import LocalPostgres, ScaleConfig, _load_reference, _reference_data
+
+# Timed RPCs, in the order a day calls them
+RPCS = (
+    "add_delivery",
+    "get_shop_balance",
+    "process_payment",
+    "mark_pay_tomorrow",
+    "get_today_collection_view",
+    "get_reports_collection_view",
+    "process_daily_reset",
+)
+
+# Row counts recorded at the end of every window
+GROWING_TABLES = ("deliveries", "payments", "shop_pending_history", "activity_log")
+
+_CALLS = {
+    "add_delivery": "SELECT add_delivery(%s, %s, %s, %s)",
+    "get_shop_balance": "SELECT get_shop_balance(%s)",
+    "process_payment": "SELECT process_payment(%s, %s::numeric, 'soak', %s)",
+    "mark_pay_tomorrow": "SELECT mark_pay_tomorrow(%s, NULL, %s)",
+    "get_today_collection_view": "SELECT * FROM get_today_collection_view(%s)",
+    "get_reports_collection_view": "SELECT * FROM get_reports_collection_view(%s)",
+    "process_daily_reset": "SELECT process_daily_reset(%s)",
+}
+
+# Column headers of the text report
+_LABELS = {
+    "add_delivery": "delivery",
+    "get_shop_balance": "balance",
+    "process_payment": "payment",
+    "mark_pay_tomorrow": "defer",
+    "get_today_collection_view": "today view",
+    "get_reports_collection_view": "reports view",
+    "process_daily_reset": "reset",
+}
+
+_COLORS = ("#2563eb", "#dc2626", "#16a34a", "#9333ea", "#ea580c", "#0891b2", "#4b5563")
+
+
+@dataclass(frozen=True)
+class SoakConfig:
+    shops: int = 50
+    days: int = 365
+    end_date: date = field(default_factory=date.today)
+    seed: int = 42
+    delivery_boys: int = 4
+    # Delivery frequency per shop is Beta(alpha, beta), as in ScaleConfig
+    frequency_alpha: float = 2.0
+    frequency_beta: float = 0.8
+    # Share of delivery days on which the shop defers, skips or part-pays
+    defer_rate: float = 0.05
+    skip_rate: float = 0.12
+    partial_rate: float = 0.18
+    # Chance of a backlog payment on a day without a delivery
+    backlog_payment_rate: float = 0.15
+
+    @property
+    def start_date(self) -> date:
+        return self.end_date - timedelta(days=self.days - 1)
+
+    def scale_config(self) -> ScaleConfig:
+        return ScaleConfig(shops=self.shops, years=self.days / 365, end_date=self.end_date,
+                           delivery_boys=self.delivery_boys, seed=self.seed)
+
+
+@dataclass
+class Window:
+    first_day: int
+    last_day: int
+    rows: dict[str, int]
+    calls: dict[str, int]
+    p50_ms: dict[str, float]
+    p95_ms: dict[str, float]
+
+
+@dataclass
+class SoakResult:
+    config: SoakConfig
+    windows: list[Window] = field(default_factory=list)
+    # Fitted k of p50 ~ days ** k, and last window p50 / first window p50
+    exponents: dict[str, float] = field(default_factory=dict)
+    growth: dict[str, float] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    def super_linear(self, max_exponent: float) -> list[str]:
+        return [name for name, k in self.exponents.items() if k > max_exponent]
+
+
+class _Timer:
+    """Runs the RPCs on one connection and keeps their latencies per day."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.day = 0
+        self.timings: dict[str, list[tuple[int, float]]] = defaultdict(list)
+        self.seen: set[str] = set()
+
+    def call(self, name: str, *params):
+        started = time.perf_counter()
+        rows = self.conn.execute(_CALLS[name], params).fetchall()
+        elapsed = (time.perf_counter() - started) * 1000
+        # The first call of each RPC plans its statements; keep it out
+        if name in self.seen:
+            self.timings[name].append((self.day, elapsed))
+        self.seen.add(name)
+        if len(rows) == 1 and isinstance(rows[0][0], dict):
+            result = rows[0][0]
+            if not result.get("success"):
+                raise RuntimeError(f"{name}: {result.get('error')}")
+            return result
+        return rows
+
+
+def _simulate_day(timer: _Timer, config: SoakConfig, rng: random.Random, day: date,
+                  shops: list[tuple[str, float]], reference: dict) -> None:
+    milk_types = [mt_id for mt_id, _, _ in reference["milk_types"]]
+    boys = reference["delivery_boys"]
+    order = list(shops)
+    rng.shuffle(order)
+    for shop_id, frequency in order:
+        if rng.random() >= frequency:
+            if rng.random() < config.backlog_payment_rate:
+                balance = timer.call("get_shop_balance", shop_id)
+                pending = float(balance["total_pending"])
+                if pending > 0:
+                    timer.call("process_payment", shop_id, round(pending, 2), day)
+            continue
+
+        products = [{"milk_type_id": mt_id, "quantity": rng.randint(1, 12)}
+                    for mt_id in rng.sample(milk_types, rng.randint(1, 3))]
+        delivery = timer.call("add_delivery", shop_id, rng.choice(boys), Jsonb(products), day)
+        total = float(delivery["total_amount"])
+
+        timer.call("get_shop_balance", shop_id)
+        outcome = rng.random()
+        if outcome < config.defer_rate:
+            timer.call("mark_pay_tomorrow", shop_id, day)
+        elif outcome < config.defer_rate + config.skip_rate:
+            pass
+        elif outcome < config.defer_rate + config.skip_rate + config.partial_rate:
+            timer.call("process_payment", shop_id, round(total * rng.uniform(0.2, 0.8), 2), day)
+        else:
+            timer.call("process_payment", shop_id, round(total, 2), day)
+
+    timer.call("get_today_collection_view", day)
+    timer.call("get_reports_collection_view", day)
+    timer.call("process_daily_reset", day)
+
+
+def _row_counts(conn) -> dict[str, int]:
+    return {table: conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+            for table in GROWING_TABLES}
+
+
+def _window(timer: _Timer, first_day: int, last_day: int) -> Window:
+    calls, p50, p95 = {}, {}, {}
+    for name in RPCS:
+        values = sorted(ms for day, ms in timer.timings[name] if first_day <= day <= last_day)
+        if not values:
+            continue
+        calls[name] = len(values)
+        p50[name] = round(statistics.median(values), 3)
+        p95[name] = round(values[min(len(values) - 1, math.ceil(len(values) * 0.95) - 1)], 3)
+    return Window(first_day, last_day, _row_counts(timer.conn), calls, p50, p95)
+
+
+def fit_exponent(points: list[tuple[float, float]]) -> float:
+    """Least-squares slope of log(ms) over log(day): the k in ms ~ day ** k."""
+    points = [(math.log(x), math.log(y)) for x, y in points if x > 0 and y > 0]
+    if len(points) < 2:
+        return 0.0
+    mean_x = statistics.fmean(x for x, _ in points)
+    mean_y = statistics.fmean(y for _, y in points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if spread == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+
+def summarize(result: SoakResult) -> SoakResult:
+    """Fill in the growth exponents and ratios from ``result.windows``."""
+    for name in RPCS:
+        points = [((w.first_day + w.last_day) / 2, w.p50_ms[name])
+                  for w in result.windows if name in w.p50_ms]
+        if len(points) < 2:
+            continue
+        result.exponents[name] = round(fit_exponent(points), 2)
+        result.growth[name] = round(points[-1][1] / points[0][1], 2) if points[0][1] else 0.0
+    return result
+
+
+def run_soak(dsn: str, config: SoakConfig, window: int, progress=sys.stderr) -> SoakResult:
+    """Apply the schema to the empty database ``dsn`` and simulate ``config.days`` days."""
+    started = time.perf_counter()
+    apply_schema(dsn)
+    reference = _reference_data(config.scale_config())
+    _load_reference(dsn, config.scale_config(), reference)
+
+    rng = random.Random(config.seed)
+    result = SoakResult(config)
+    with connect(dsn, autocommit=True) as conn:
+        shop_ids = [str(row[0]) for row in conn.execute("SELECT id FROM shops ORDER BY name")]
+        shops = [(shop_id, rng.betavariate(config.frequency_alpha, config.frequency_beta))
+                 for shop_id in shop_ids]
+        timer = _Timer(conn)
+        first_day = 1
+        for index in range(config.days):
+            timer.day = index + 1
+            _simulate_day(timer, config, rng, config.start_date + timedelta(days=index), shops, reference)
+            if timer.day - first_day + 1 == window or timer.day == config.days:
+                # Keep the planner's statistics as fresh as autovacuum would
+                conn.execute("ANALYZE")
+                result.windows.append(_window(timer, first_day, timer.day))
+                print(f"  day {timer.day:>4}/{config.days}  "
+                      + "  ".join(f"{name} {ms:.2f}" for name, ms in result.windows[-1].p50_ms.items()),
+                      file=progress, flush=True)
+                first_day = timer.day + 1
+    result.seconds = round(time.perf_counter() - started, 1)
+    return summarize(result)
+
+
+# ==============================================
+# REPORT
+# ==============================================
+
+def print_report(result: SoakResult, max_exponent: float, out=sys.stdout) -> None:
+    config = result.config
+    print(f"{config.shops} shops x {config.days} days "
+          f"({config.start_date} .. {config.end_date}) in {result.seconds:.0f}s", file=out)
+    names = [name for name in RPCS if name in result.exponents]
+    print(f"p50 ms per window of {result.windows[0].last_day if result.windows else 0} days", file=out)
+    print(f"{'days':<11}{'deliveries':>12}{'history':>9}"
+          + "".join(f"{_LABELS[name]:>14}" for name in names), file=out)
+    for w in result.windows:
+        print(f"{w.first_day:>5}-{w.last_day:<5}{w.rows['deliveries']:>12,}"
+              f"{w.rows['shop_pending_history']:>9,}"
+              + "".join(f"{w.p50_ms.get(name, 0):>14.2f}" for name in names), file=out)
+    print(file=out)
+    for name in names:
+        k = result.exponents[name]
+        flag = "  SUPER-LINEAR" if k > max_exponent else ""
+        print(f"{name:<30} p50 x{result.growth[name]:<7} k={k:+.2f}{flag}", file=out)
+
+
+def plot_svg(result: SoakResult, path: Path, width: int = 860, height: int = 480) -> None:
+    """Median latency per window and RPC against simulated days, as an SVG."""
+    left, right, top, bottom = 60, 230, 30, 50
+    plot_w, plot_h = width - left - right, height - top - bottom
+    names = [name for name in RPCS if name in result.exponents]
+    max_day = max((w.last_day for w in result.windows), default=1)
+    max_ms = max((w.p50_ms.get(name, 0) for w in result.windows for name in names), default=1) or 1
+
+    def x(day: float) -> float:
+        return left + plot_w * day / max_day
+
+    def y(ms: float) -> float:
+        return top + plot_h * (1 - ms / max_ms)
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="sans-serif" font-size="12">',
+        f'<rect width="{width}" height="{height}" fill="white"/>',
+        f'<text x="{left}" y="18" font-size="14">p50 latency by simulated day '
+        f'({result.config.shops} shops)</text>',
+        f'<line x1="{left}" y1="{top + plot_h}" x2="{left + plot_w}" y2="{top + plot_h}" stroke="black"/>',
+        f'<line x1="{left}" y1="{top}" x2="{left}" y2="{top + plot_h}" stroke="black"/>',
+        f'<text x="{left + plot_w / 2}" y="{height - 10}" text-anchor="middle">day</text>',
+        f'<text x="14" y="{top + plot_h / 2}" transform="rotate(-90 14 {top + plot_h / 2})" '
+        f'text-anchor="middle">ms</text>',
+    ]
+    for tick in range(5):
+        day, ms = max_day * tick / 4, max_ms * tick / 4
+        parts.append(f'<text x="{x(day):.1f}" y="{top + plot_h + 16}" text-anchor="middle">{day:.0f}</text>')
+        parts.append(f'<text x="{left - 6}" y="{y(ms) + 4:.1f}" text-anchor="end">{ms:.1f}</text>')
+        parts.append(f'<line x1="{left}" y1="{y(ms):.1f}" x2="{left + plot_w}" y2="{y(ms):.1f}" '
+                     f'stroke="#e5e7eb"/>')
+    for index, name in enumerate(names):
+        color = _COLORS[index % len(_COLORS)]
+        points = " ".join(f"{x((w.first_day + w.last_day) / 2):.1f},{y(w.p50_ms[name]):.1f}"
+                          for w in result.windows if name in w.p50_ms)
+        parts.append(f'<polyline points="{points}" fill="none" stroke="{color}" stroke-width="2"/>')
+        legend_y = top + 10 + index * 18
+        parts.append(f'<line x1="{left + plot_w + 12}" y1="{legend_y}" x2="{left + plot_w + 32}" '
+                     f'y2="{legend_y}" stroke="{color}" stroke-width="2"/>')
+        parts.append(f'<text x="{left + plot_w + 38}" y="{legend_y + 4}">{name} '
+                     f'(k={result.exponents[name]:+.2f})</text>')
+    parts.append("</svg>")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(parts) + "\n")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Simulate months of daily use and chart RPC latency growth.")
+    parser.add_argument("--shops", type=int, default=SoakConfig.shops)
+    parser.add_argument("--days", type=int, default=SoakConfig.days)
+    parser.add_argument("--seed", type=int, default=SoakConfig.seed)
+    parser.add_argument("--window", type=int, help="days per measurement window (default days / 20)")
+    parser.add_argument("--dsn", help="simulate in this empty database instead of a throwaway cluster")
+    parser.add_argument("--out", type=Path, help="write windows and exponents as JSON")
+    parser.add_argument("--plot", type=Path, help="write the growth curves as SVG")
+    parser.add_argument("--max-exponent", type=float, default=1.0,
+                        help="exponent above which growth is reported as super-linear (default 1.0)")
+    parser.add_argument("--check", action="store_true", help="exit non-zero on super-linear growth")
+    args = parser.parse_args(argv)
+
+    config = SoakConfig(shops=args.shops, days=args.days, seed=args.seed)
+    window = args.window or max(1, config.days // 20)
+    print(f"Simulating {config.shops} shops over {config.days} days", file=sys.stderr)
+    if args.dsn:
+        result = run_soak(args.dsn, config, window)
+    else:
+        with LocalPostgres() as server:
+            result = run_soak(server.dsn, config, window)
+
+    print_report(result, args.max_exponent)
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(asdict(result), indent=2, default=str))
+    if args.plot:
+        plot_svg(result, args.plot)
+    return 1 if args.check and result.super_linear(args.max_exponent) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+// Precompress a build and write its asset manifest.
+//
+// For every text asset in the output directory this writes `<file>.br`
+// (Brotli, max quality) and `<file>.gz` (gzip -9) next to it, keeping a
+// variant only when it is actually smaller. `asset-manifest.json` lists
+// every file with its size, the variants it has and the Cache-Control it
+// should be served with: content-hashed files under assets/ never change,
+// so they are `immutable`; everything else (index.html, public/ files)
+// must be revalidated.
+//
+// precompressPlugin() runs it at the end of every `vite build`; it can also
+// be run on an existing build:  node scripts/precompress.js dist
+
+import { promisify } from 'node:util'
+import { createHash } from 'node:crypto'
+import { readdir, readFile, stat, writeFile } from 'node:fs/promises'
+import path from 'node:path'
+import { fileURLToPath } from 'node:url'
+import zlib from 'node:zlib'
+
+const brotli = promisify(zlib.brotliCompress)
+const gzip = promisify(zlib.gzip)
+
+export const MANIFEST_FILE = 'asset-manifest.json'
+
+export const IMMUTABLE = 'public, max-age=31536000, immutable'
+export const REVALIDATE = 'no-cache'
+
+const COMPRESSIBLE = /\.(js|mjs|css|html|svg|json|webmanifest|txt|xml|map)$/
+const MIN_SIZE = 1024
+
+// Vite names hashed output <name>-<8 char hash>.<ext> under assets/
+const HASHED = /^assets\/.+-[\w-]{8}\.\w+$/
+
+const walk = async (dir, base = dir) => {
+  const files = []
+  for (const entry of await readdir(dir, { withFileTypes: true })) {
+    const full = path.join(dir, entry.name)
+    if (entry.isDirectory()) {
+      files.push(...(await walk(full, base)))
+    } else {
+      files.push(path.relative(base, full).split(path.sep).join('/'))
+    }
+  }
+  return files
+}
+
+const isVariant = file => file.endsWith('.br') || file.endsWith('.gz') || file === MANIFEST_FILE
+
+export const cacheControlFor = file => (HASHED.test(file) ? IMMUTABLE : REVALIDATE)
+
+export async function precompress(outDir, { minSize = MIN_SIZE } = {}) {
+  const files = {}
+  for (const file of (await walk(outDir)).filter(f => !isVariant(f)).sort()) {
+    const full = path.join(outDir, file)
+    const content = await readFile(full)
+    const entry = {
+      size: content.length,
+      etag: `"${createHash('sha1').update(content).digest('base64url').slice(0, 16)}"`,
+      cacheControl: cacheControlFor(file),
+      encodings: {}
+    }
+
+    if (COMPRESSIBLE.test(file) && content.length >= minSize) {
+      const [br, gz] = await Promise.all([
+        brotli(content, {
+          params: {
+            [zlib.constants.BROTLI_PARAM_QUALITY]: zlib.constants.BROTLI_MAX_QUALITY,
+            [zlib.constants.BROTLI_PARAM_SIZE_HINT]: content.length
+          }
+        }),
+        gzip(content, { level: 9 })
+      ])
+      for (const [encoding, suffix, data] of [['br', '.br', br], ['gzip', '.gz', gz]]) {
+        if (data.length < content.length) {
+          await writeFile(full + suffix, data)
+          entry.encodings[encoding] = { file: file + suffix, size: data.length }
+        }
+      }
+    }
+    files['/' + file] = entry
+  }
+
+  const manifest = { generatedAt: new Date().toISOString(), files }
+  await writeFile(path.join(outDir, MANIFEST_FILE), JSON.stringify(manifest, null, 2) + '\n')
+  return manifest
+}
+
+export const summarize = manifest => {
+  let raw = 0
+  let br = 0
+  let gz = 0
+  for (const entry of Object.values(manifest.files)) {
+    raw += entry.size
+    br += entry.encodings.br?.size ?? entry.size
+    gz += entry.encodings.gzip?.size ?? entry.size
+  }
+  const kb = bytes => `${(bytes / 1024).toFixed(1)} kB`
+  return `${Object.keys(manifest.files).length} files, ${kb(raw)} raw, ${kb(gz)} gzip, ${kb(br)} brotli`
+}
+
+// Vite plugin: precompress the output after every production build
+export const precompressPlugin = () => {
+  let outDir = 'dist'
+  return {
+    name: 'precompress',
+    apply: 'build',
+    configResolved(config) {
+      outDir = path.resolve(config.root, config.build.outDir)
+    },
+    async closeBundle() {
+      console.log(`precompress: ${summarize(await precompress(outDir))}`)
+    }
+  }
+}
+
+if (process.argv[1] && path.resolve(process.argv[1]) === fileURLToPath(import.meta.url)) {
+  const outDir = process.argv[2] || 'dist'
+  await stat(outDir)
+  console.log(summarize(await precompress(outDir)))
+}
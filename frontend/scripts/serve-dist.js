@@ -0,0 +1,108 @@
+// Static server for a production build that serves the precompressed
+// variants written by scripts/precompress.js, with the Cache-Control and
+// ETag from dist/asset-manifest.json. Unknown paths without an extension
+// get index.html (client-side routes).
+//
+//   npm run build && npm run serve            # http://localhost:4173
+//   PORT=8080 node scripts/serve-dist.js dist
+
+import { readFile } from 'node:fs/promises'
+import http from 'node:http'
+import path from 'node:path'
+import { fileURLToPath } from 'node:url'
+import { MANIFEST_FILE } from './precompress.js'
+
+const CONTENT_TYPES = {
+  '.html': 'text/html; charset=utf-8',
+  '.js': 'text/javascript; charset=utf-8',
+  '.mjs': 'text/javascript; charset=utf-8',
+  '.css': 'text/css; charset=utf-8',
+  '.json': 'application/json; charset=utf-8',
+  '.webmanifest': 'application/manifest+json',
+  '.map': 'application/json; charset=utf-8',
+  '.svg': 'image/svg+xml',
+  '.png': 'image/png',
+  '.jpg': 'image/jpeg',
+  '.ico': 'image/x-icon',
+  '.woff2': 'font/woff2',
+  '.txt': 'text/plain; charset=utf-8'
+}
+
+// Preferred first
+const ENCODINGS = [['br', 'br'], ['gzip', 'gzip']]
+
+const accepts = (header, encoding) =>
+  (header || '').split(',').some(part => {
+    const [name, ...params] = part.trim().split(';')
+    const q = params.map(p => p.trim()).find(p => p.startsWith('q='))
+    return name.trim() === encoding && (!q || Number(q.slice(2)) > 0)
+  })
+
+export function createServer(outDir) {
+  const manifestPromise = readFile(path.join(outDir, MANIFEST_FILE), 'utf8').then(JSON.parse)
+
+  const serve = async (req, res) => {
+    if (req.method !== 'GET' && req.method !== 'HEAD') {
+      res.writeHead(405, { Allow: 'GET, HEAD' }).end()
+      return
+    }
+
+    const { files } = await manifestPromise
+    let urlPath
+    try {
+      urlPath = decodeURIComponent(new URL(req.url, 'http://localhost').pathname)
+    } catch {
+      res.writeHead(400, { 'Content-Type': 'text/plain; charset=utf-8' }).end('Bad request')
+      return
+    }
+    if (urlPath.endsWith('/')) urlPath += 'index.html'
+    if (!files[urlPath] && !path.extname(urlPath)) urlPath = '/index.html'
+
+    const entry = files[urlPath]
+    if (!entry) {
+      res.writeHead(404, { 'Content-Type': 'text/plain; charset=utf-8' }).end('Not found')
+      return
+    }
+
+    const match = ENCODINGS.find(([encoding]) => entry.encodings[encoding] && accepts(req.headers['accept-encoding'], encoding))
+    const variant = match ? entry.encodings[match[0]] : null
+    const etag = variant ? entry.etag.replace(/"$/, `-${match[0]}"`) : entry.etag
+    const headers = {
+      'Content-Type': CONTENT_TYPES[path.extname(urlPath)] || 'application/octet-stream',
+      'Cache-Control': entry.cacheControl,
+      ETag: etag,
+      Vary: 'Accept-Encoding'
+    }
+
+    if (req.headers['if-none-match'] === etag) {
+      res.writeHead(304, headers).end()
+      return
+    }
+
+    const body = await readFile(path.join(outDir, variant ? variant.file : urlPath.slice(1)))
+    if (variant) headers['Content-Encoding'] = match[1]
+    headers['Content-Length'] = body.length
+    res.writeHead(200, headers)
+    res.end(req.method === 'HEAD' ? undefined : body)
+  }
+
+  // A failed request must not take the server down with it
+  return http.createServer((req, res) => {
+    serve(req, res).catch(error => {
+      console.error(`${req.method} ${req.url}:`, error)
+      if (res.headersSent) {
+        res.destroy()
+      } else {
+        res.writeHead(500, { 'Content-Type': 'text/plain; charset=utf-8' }).end('Internal server error')
+      }
+    })
+  })
+}
+
+if (process.argv[1] && path.resolve(process.argv[1]) === fileURLToPath(import.meta.url)) {
+  const outDir = path.resolve(process.argv[2] || 'dist')
+  const port = Number(process.env.PORT) || 4173
+  createServer(outDir).listen(port, () => {
+    console.log(`Serving ${outDir} on http://localhost:${port}`)
+  })
+}
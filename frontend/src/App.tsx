@@ -12,6 +12,7 @@ import ShopDetailScreen from './screens/ShopDetailScreen'
 import PaymentModal from './screens/PaymentModal'
 import { Shop, CollectionViewRow } from './lib/supabase'
 import { SessionManager } from './utils/sessionManager'
+import { clearSnapshots } from './lib/snapshot'
 
 // Tab type is defined in AppContext
 type ShopsView = 'shops-list' | 'shop-detail'
@@ -31,6 +32,8 @@ function AppContent() {
     setAuthenticated(false)
     setActiveTab('home')
     SessionManager.clearSession()
+    // The next user on this device must not start from our data
+    clearSnapshots()
     addNotification({
       type: 'info',
       message: 'Logged out successfully',
@@ -61,8 +64,6 @@ function AppContent() {
   const handleBackToShopList = () => {
     setSelectedShop(null)
     setShopsView('shops-list')
-    // Trigger refresh to update shop list with latest data
-    triggerRefresh('shops')
   }
 
 
@@ -70,26 +71,30 @@ function AppContent() {
   const renderContent = () => {
     // Shops Tab Logic
     if (state.activeTab === 'shops') {
-      if (shopsView === 'shop-detail' && selectedShop) {
-        return (
-          <ShopDetailScreen
-            shopId={selectedShop.id}
-            onBack={handleBackToShopList}
-          />
-        )
-      }
-      
+      const detailShop = shopsView === 'shop-detail' ? selectedShop : null
+      // The list stays mounted under the detail screen: writes there patch
+      // its rows, and going back shows it without a reload
       return (
-        <AppLayout 
-          title="Shops" 
-          showLogoutButton={state.user?.role === 'staff'} 
-          onLogout={handleLogout}
-        >
-          <ShopsScreen 
-            onSelectShop={handleSelectShop} 
-            refreshTrigger={state.refreshTriggers.shops}
-          />
-        </AppLayout>
+        <>
+          {detailShop && (
+            <ShopDetailScreen
+              shopId={detailShop.id}
+              onBack={handleBackToShopList}
+            />
+          )}
+          <div hidden={!!detailShop}>
+            <AppLayout 
+              title="Shops" 
+              showLogoutButton={state.user?.role === 'staff'} 
+              onLogout={handleLogout}
+            >
+              <ShopsScreen 
+                onSelectShop={handleSelectShop} 
+                refreshTrigger={state.refreshTriggers.shops}
+              />
+            </AppLayout>
+          </div>
+        </>
       )
     }
 
@@ -150,8 +155,8 @@ function AppContent() {
               message: 'Payment processed successfully!',
               autoHide: true
             })
+            // The modal has already patched the shop's row
             setSelectedCollectionShop(null)
-            triggerRefresh('shops')
           }}
         />
       )}
@@ -1,13 +1,9 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useMemo } from 'react';
 import { supabase } from '../lib/supabase';
+import { useEntities, MilkTypeEntity } from '../context/AppContext';
+import { selectList, selectSelectedEntities, selectSelectionTotal } from '../lib/entityStore';
 import { X, Plus, Minus } from 'lucide-react';
 
-interface MilkType {
-  id: string;
-  name: string;
-  price_per_packet: number;
-}
-
 interface DeliveryModalProps {
   shopId: string;
   shopName: string;
@@ -16,43 +12,48 @@ interface DeliveryModalProps {
 }
 
 const DeliveryModal: React.FC<DeliveryModalProps> = ({ shopId, shopName, onClose, onSuccess }) => {
-  const [milkTypes, setMilkTypes] = useState<MilkType[]>([]);
+  // Milk types come from the shared entity store; only this shop's prices
+  // (custom rates applied) are loaded here, keyed by milk type id
+  const { milkTypes: milkTypeTable } = useEntities();
+  const [shopPrices, setShopPrices] = useState<{[key: string]: number}>({});
   const [selectedProducts, setSelectedProducts] = useState<{[key: string]: number}>({});
-  const [totalAmount, setTotalAmount] = useState(0);
   const [loading, setLoading] = useState(false);
   const [description, setDescription] = useState('');
 
-  useEffect(() => {
-    loadMilkTypes();
-  }, []);
+  const unitPrice = (milk: MilkTypeEntity) =>
+    shopPrices[milk.id] !== undefined ? shopPrices[milk.id] : milk.price_per_packet;
+
+  const milkTypes = useMemo(
+    () => selectList(milkTypeTable).map(milk => ({ ...milk, price_per_packet: unitPrice(milk) })),
+    [milkTypeTable, shopPrices]
+  );
+  const totalAmount = useMemo(
+    () => selectSelectionTotal(milkTypeTable, selectedProducts, unitPrice),
+    [milkTypeTable, selectedProducts, shopPrices]
+  );
 
   useEffect(() => {
-    calculateTotal();
-  }, [selectedProducts, milkTypes]);
+    loadShopPrices();
+  }, []);
 
-  const loadMilkTypes = async () => {
+  const loadShopPrices = async () => {
     try {
       const { data, error } = await supabase
-        .from('milk_types')
-        .select('*')
-        .eq('is_active', true)
-        .order('name');
+        .from('effective_prices')
+        .select('milk_type_id, price_per_packet')
+        .eq('shop_id', shopId);
 
       if (error) throw error;
-      setMilkTypes(data || []);
+      const prices: {[key: string]: number} = {};
+      (data || []).forEach((row: any) => {
+        prices[row.milk_type_id] = Number(row.price_per_packet);
+      });
+      setShopPrices(prices);
     } catch (error) {
-      console.error('Error loading milk types:', error);
+      console.error('Error loading shop prices:', error);
     }
   };
 
-  const calculateTotal = () => {
-    const total = milkTypes.reduce((sum, milk) => {
-      const quantity = selectedProducts[milk.id] || 0;
-      return sum + (milk.price_per_packet * quantity);
-    }, 0);
-    setTotalAmount(total);
-  };
-
   const updateQuantity = (milkId: string, quantity: number) => {
     if (quantity < 0) return;
     setSelectedProducts(prev => ({
@@ -70,39 +71,26 @@ const DeliveryModal: React.FC<DeliveryModalProps> = ({ shopId, shopName, onClose
     try {
       setLoading(true);
       
-      const products = milkTypes
-        .filter(milk => selectedProducts[milk.id] > 0)
-        .map(milk => ({
-          id: milk.id,
-          name: milk.name,
-          price: milk.price_per_packet,
-          quantity: selectedProducts[milk.id]
+      const products = selectSelectedEntities(milkTypeTable, selectedProducts)
+        .map(({ entity, quantity }) => ({
+          milk_type_id: entity.id,
+          quantity
         }));
 
-      // Create delivery record
-      const { data: deliveryData, error: deliveryError } = await supabase
-        .from('deliveries')
-        .insert({
-          shop_id: shopId,
-          delivery_boy_id: '270cf1bb-44ff-4d62-b98f-24cb2aedcbcb', // First delivery boy
-          delivery_date: new Date().toISOString().split('T')[0],
-          products: products,
-          total_amount: totalAmount,
-          payment_status: 'pending',
-          payment_amount: 0,
-          delivery_status: 'delivered',
-          notes: description || `Delivered milk to ${shopName}`,
-          delivered_at: new Date().toISOString()
-        })
-        .select()
-        .single();
+      // add_delivery prices the products from effective_prices
+      const { data: deliveryData, error: deliveryError } = await supabase.rpc('add_delivery', {
+        p_shop_id: shopId,
+        p_delivery_boy_id: '270cf1bb-44ff-4d62-b98f-24cb2aedcbcb', // First delivery boy
+        p_products: products,
+        p_delivery_date: new Date().toISOString().split('T')[0],
+        p_notes: description || `Delivered milk to ${shopName}`
+      });
 
       if (deliveryError) throw deliveryError;
+      if (!deliveryData?.success) throw new Error(deliveryData?.error);
 
-      if (deliveryData) {
-        onSuccess();
-        onClose();
-      }
+      onSuccess();
+      onClose();
     } catch (error) {
       console.error('Error saving delivery:', error);
       alert('Error saving delivery. Please try again.');
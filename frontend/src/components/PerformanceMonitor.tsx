@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react'
 import { Activity, Database, Clock, TrendingUp, AlertTriangle } from 'lucide-react'
 import { supabase } from '../lib/supabase'
+import { rpcRead } from '../services/api-simple'
 
 interface PerformanceMetrics {
   queryPerformance: Array<{
@@ -57,11 +58,12 @@ export default function PerformanceMonitor() {
         slowQueries,
         connectionStats
       ] = await Promise.all([
-        supabase.rpc('analyze_query_performance'),
-        supabase.rpc('get_index_usage_stats'),
-        supabase.rpc('get_table_stats'),
-        supabase.rpc('get_slow_queries', { threshold_ms: 1000 }),
-        supabase.rpc('get_connection_stats')
+        // Sent together as one batch_rpc request
+        rpcRead('analyze_query_performance'),
+        rpcRead('get_index_usage_stats'),
+        rpcRead('get_table_stats'),
+        rpcRead('get_slow_queries', { threshold_ms: 1000 }),
+        rpcRead('get_connection_stats')
       ])
 
       if (queryPerformance.error) throw queryPerformance.error
@@ -1,6 +1,15 @@
-import React, { createContext, useContext, useReducer, useEffect, ReactNode } from 'react'
-import { supabase } from '../lib/supabase'
+import React, { createContext, useContext, useReducer, useEffect, useRef, ReactNode } from 'react'
+import { supabase, Shop, DeliveryBoy, MilkType } from '../lib/supabase'
 import { SessionManager } from '../utils/sessionManager'
+import { loadSnapshot, saveSnapshot } from '../lib/snapshot'
+import {
+  EntityTable,
+  emptyTable,
+  indexEntities,
+  upsertEntities,
+  removeEntities,
+  selectList
+} from '../lib/entityStore'
 
 // Types
 export interface User {
@@ -10,18 +19,28 @@ export interface User {
   name: string
 }
 
+// Reference data as loaded into the entity store (only the listed columns)
+export type ShopEntity = Pick<Shop, 'id' | 'name' | 'address' | 'phone' | 'owner_name' | 'route_number'>
+export type DeliveryBoyEntity = Pick<DeliveryBoy, 'id' | 'name' | 'phone'>
+export type MilkTypeEntity = Pick<MilkType, 'id' | 'name' | 'price_per_packet'>
+
+export type EntityName = 'shops' | 'deliveryBoys' | 'milkTypes'
+
 export interface AppState {
   // Authentication
   user: User | null
   isAuthenticated: boolean
   isLoading: boolean
   
-  // Data
-  shops: any[]
-  deliveryBoys: any[]
-  milkTypes: any[]
+  // Data: active reference data, normalized (lib/entityStore). Screens
+  // read it through useEntities() and patch it after their mutations.
+  shops: EntityTable<ShopEntity>
+  deliveryBoys: EntityTable<DeliveryBoyEntity>
+  milkTypes: EntityTable<MilkTypeEntity>
   deliveries: any[]
   payments: any[]
+  // Reference data came from the local snapshot and is being refreshed
+  isStale: boolean
   
   // UI State
   activeTab: string
@@ -53,6 +72,9 @@ type AppAction =
   | { type: 'SET_MILK_TYPES'; payload: any[] }
   | { type: 'SET_DELIVERIES'; payload: any[] }
   | { type: 'SET_PAYMENTS'; payload: any[] }
+  | { type: 'UPSERT_ENTITIES'; payload: { table: EntityName; rows: Array<{ id: string; [field: string]: any }> } }
+  | { type: 'REMOVE_ENTITIES'; payload: { table: EntityName; ids: string[] } }
+  | { type: 'SET_STALE'; payload: boolean }
   | { type: 'SET_ACTIVE_TAB'; payload: string }
   | { type: 'TRIGGER_REFRESH'; payload: 'shops' | 'reports' }
   | { type: 'SET_ERROR'; payload: string | null }
@@ -65,11 +87,12 @@ const initialState: AppState = {
   user: null,
   isAuthenticated: false,
   isLoading: true,
-  shops: [],
-  deliveryBoys: [],
-  milkTypes: [],
+  shops: emptyTable(),
+  deliveryBoys: emptyTable(),
+  milkTypes: emptyTable(),
   deliveries: [],
   payments: [],
+  isStale: false,
   activeTab: 'shops',
   refreshTriggers: {
     shops: 0,
@@ -92,13 +115,23 @@ function appReducer(state: AppState, action: AppAction): AppState {
       return { ...state, isAuthenticated: action.payload }
     
     case 'SET_SHOPS':
-      return { ...state, shops: action.payload }
+      return { ...state, shops: indexEntities(action.payload) }
     
     case 'SET_DELIVERY_BOYS':
-      return { ...state, deliveryBoys: action.payload }
+      return { ...state, deliveryBoys: indexEntities(action.payload) }
     
     case 'SET_MILK_TYPES':
-      return { ...state, milkTypes: action.payload }
+      return { ...state, milkTypes: indexEntities(action.payload) }
+    
+    case 'UPSERT_ENTITIES': {
+      const { table, rows } = action.payload
+      return { ...state, [table]: upsertEntities<any>(state[table], rows) }
+    }
+    
+    case 'REMOVE_ENTITIES': {
+      const { table, ids } = action.payload
+      return { ...state, [table]: removeEntities<any>(state[table], ids) }
+    }
     
     case 'SET_DELIVERIES':
       return { ...state, deliveries: action.payload }
@@ -106,6 +139,9 @@ function appReducer(state: AppState, action: AppAction): AppState {
     case 'SET_PAYMENTS':
       return { ...state, payments: action.payload }
     
+    case 'SET_STALE':
+      return { ...state, isStale: action.payload }
+    
     case 'SET_ACTIVE_TAB':
       return { ...state, activeTab: action.payload }
     
@@ -155,6 +191,21 @@ const AppContext = createContext<{
 // Provider Component
 export function AppProvider({ children }: { children: ReactNode }) {
   const [state, dispatch] = useReducer(appReducer, initialState)
+  // Set once fresh data is in the store; from then on every change of a
+  // table (a load or a screen's patch) is written to its snapshot
+  const loaded = useRef(false)
+
+  useEffect(() => {
+    if (loaded.current) saveSnapshot('shops', selectList(state.shops))
+  }, [state.shops])
+
+  useEffect(() => {
+    if (loaded.current) saveSnapshot('delivery_boys', selectList(state.deliveryBoys))
+  }, [state.deliveryBoys])
+
+  useEffect(() => {
+    if (loaded.current) saveSnapshot('milk_types', selectList(state.milkTypes))
+  }, [state.milkTypes])
 
   // Initialize app
   useEffect(() => {
@@ -167,10 +218,17 @@ export function AppProvider({ children }: { children: ReactNode }) {
         if (session) {
           dispatch({ type: 'SET_USER', payload: session.user })
           dispatch({ type: 'SET_AUTHENTICATED', payload: true })
-          
-          // Load initial data
-          await loadInitialData()
         }
+
+        // Every screen reads reference data from the store (login is
+        // skipped in this build, so don't wait for a session). Render from
+        // the last snapshot right away, then refresh in the background.
+        const restored = await loadSnapshotData()
+        if (restored) {
+          dispatch({ type: 'SET_STALE', payload: true })
+          dispatch({ type: 'SET_LOADING', payload: false })
+        }
+        await loadInitialData()
       } catch (error) {
         console.error('App initialization error:', error)
         dispatch({ type: 'SET_ERROR', payload: 'Failed to initialize app' })
@@ -182,32 +240,49 @@ export function AppProvider({ children }: { children: ReactNode }) {
     initializeApp()
   }, [])
 
+  // Restore reference data saved by the last successful load
+  const loadSnapshotData = async () => {
+    const [shops, deliveryBoys, milkTypes] = await Promise.all([
+      loadSnapshot<any[]>('shops'),
+      loadSnapshot<any[]>('delivery_boys'),
+      loadSnapshot<any[]>('milk_types')
+    ])
+    if (shops) dispatch({ type: 'SET_SHOPS', payload: shops.data })
+    if (deliveryBoys) dispatch({ type: 'SET_DELIVERY_BOYS', payload: deliveryBoys.data })
+    if (milkTypes) dispatch({ type: 'SET_MILK_TYPES', payload: milkTypes.data })
+    return !!(shops || deliveryBoys || milkTypes)
+  }
+
   // Load initial data
   const loadInitialData = async () => {
     try {
-      // Load shops
-      const { data: shops } = await supabase
-        .from('shops')
-        .select('*')
-        .eq('is_active', true)
-        .order('name')
-      dispatch({ type: 'SET_SHOPS', payload: shops || [] })
-
-      // Load delivery boys
-      const { data: deliveryBoys } = await supabase
-        .from('delivery_boys')
-        .select('*')
-        .eq('is_active', true)
-        .order('name')
-      dispatch({ type: 'SET_DELIVERY_BOYS', payload: deliveryBoys || [] })
+      // Only the columns the lists use, loaded in parallel
+      const [shopsResult, deliveryBoysResult, milkTypesResult] = await Promise.all([
+        supabase
+          .from('shops')
+          .select('id, name, address, phone, owner_name, route_number')
+          .eq('is_active', true)
+          .order('name'),
+        supabase
+          .from('delivery_boys')
+          .select('id, name, phone')
+          .eq('is_active', true)
+          .order('name'),
+        supabase
+          .from('milk_types')
+          .select('id, name, price_per_packet')
+          .eq('is_active', true)
+          .order('name')
+      ])
+      if (shopsResult.error) throw shopsResult.error
+      if (deliveryBoysResult.error) throw deliveryBoysResult.error
+      if (milkTypesResult.error) throw milkTypesResult.error
 
-      // Load milk types
-      const { data: milkTypes } = await supabase
-        .from('milk_types')
-        .select('*')
-        .eq('is_active', true)
-        .order('name')
-      dispatch({ type: 'SET_MILK_TYPES', payload: milkTypes || [] })
+      loaded.current = true
+      dispatch({ type: 'SET_SHOPS', payload: shopsResult.data || [] })
+      dispatch({ type: 'SET_DELIVERY_BOYS', payload: deliveryBoysResult.data || [] })
+      dispatch({ type: 'SET_MILK_TYPES', payload: milkTypesResult.data || [] })
+      dispatch({ type: 'SET_STALE', payload: false })
     } catch (error) {
       console.error('Error loading initial data:', error)
       dispatch({ type: 'SET_ERROR', payload: 'Failed to load initial data' })
@@ -230,6 +305,19 @@ export function useApp() {
   return context
 }
 
+// Entity tables. A table keeps its identity until it changes, so values
+// derived from it with useMemo/selectList are recomputed only then.
+export function useEntities() {
+  const { state } = useApp()
+  return {
+    shops: state.shops,
+    deliveryBoys: state.deliveryBoys,
+    milkTypes: state.milkTypes,
+    isLoading: state.isLoading,
+    isStale: state.isStale
+  }
+}
+
 // Action Creators
 export const useAppActions = () => {
   const { dispatch } = useApp()
@@ -259,6 +347,13 @@ export const useAppActions = () => {
     setPayments: (payments: any[]) => 
       dispatch({ type: 'SET_PAYMENTS', payload: payments }),
     
+    // Patch the store in place after a mutation instead of reloading
+    upsertEntities: (table: EntityName, rows: Array<{ id: string; [field: string]: any }>) => 
+      dispatch({ type: 'UPSERT_ENTITIES', payload: { table, rows } }),
+    
+    removeEntities: (table: EntityName, ids: string[]) => 
+      dispatch({ type: 'REMOVE_ENTITIES', payload: { table, ids } }),
+    
     setActiveTab: (tab: string) => 
       dispatch({ type: 'SET_ACTIVE_TAB', payload: tab }),
     
@@ -0,0 +1,124 @@
+// Normalized reference data (shops, milk types, delivery boys) shared by
+// every screen through AppContext.
+//
+// Each entity is stored once and indexed by id and by name, so lookups in
+// render paths and loops over a selection are O(1) instead of an
+// Array.find per item. Tables are immutable: upsertEntities/removeEntities
+// return a new table that reuses every entity object they did not touch, so
+// memoized selectors and React.memo rows only recompute for what changed.
+
+export type Entity = {
+  id: string
+  name: string
+}
+
+export type EntityTable<T extends Entity> = {
+  // Display order (the order rows were loaded or added in)
+  ids: string[]
+  byId: Map<string, T>
+  byName: Map<string, T>
+}
+
+export const emptyTable = <T extends Entity>(): EntityTable<T> => ({
+  ids: [],
+  byId: new Map(),
+  byName: new Map()
+})
+
+export function indexEntities<T extends Entity>(rows: T[]): EntityTable<T> {
+  const table = emptyTable<T>()
+  rows.forEach(row => {
+    if (!table.byId.has(row.id)) table.ids.push(row.id)
+    table.byId.set(row.id, row)
+    table.byName.set(row.name, row)
+  })
+  return table
+}
+
+// Merge `rows` into the table: known ids are patched field by field, new
+// ones are appended
+export function upsertEntities<T extends Entity>(
+  table: EntityTable<T>,
+  rows: Array<Partial<T> & { id: string }>
+): EntityTable<T> {
+  if (rows.length === 0) return table
+  const ids = [...table.ids]
+  const byId = new Map(table.byId)
+  const byName = new Map(table.byName)
+  rows.forEach(row => {
+    const current = byId.get(row.id)
+    if (current) {
+      // Another entity may share the name; only drop our own entry
+      if (byName.get(current.name) === current) byName.delete(current.name)
+    } else {
+      ids.push(row.id)
+    }
+    const next = { ...current, ...row } as T
+    byId.set(row.id, next)
+    byName.set(next.name, next)
+  })
+  return { ids, byId, byName }
+}
+
+export function removeEntities<T extends Entity>(table: EntityTable<T>, removed: string[]): EntityTable<T> {
+  const gone = new Set(removed.filter(id => table.byId.has(id)))
+  if (gone.size === 0) return table
+  const byId = new Map(table.byId)
+  const byName = new Map(table.byName)
+  gone.forEach(id => {
+    const entity = byId.get(id)!
+    byId.delete(id)
+    if (byName.get(entity.name) === entity) byName.delete(entity.name)
+  })
+  return { ids: table.ids.filter(id => !gone.has(id)), byId, byName }
+}
+
+// ==============================================
+// SELECTORS
+// ==============================================
+
+// The same table always yields the same array, so it can be a dependency
+// of useMemo/useEffect without re-running them
+const lists = new WeakMap<EntityTable<any>, any[]>()
+
+export function selectList<T extends Entity>(table: EntityTable<T>): T[] {
+  let list = lists.get(table)
+  if (!list) {
+    list = table.ids.map(id => table.byId.get(id)!)
+    lists.set(table, list)
+  }
+  return list
+}
+
+// Quantities keyed by entity id (e.g. a delivery form's selection)
+export type Selection = { [id: string]: number }
+
+// Sum of quantity x unit price over a selection; ids missing from the
+// table are skipped
+export function selectSelectionTotal<T extends Entity>(
+  table: EntityTable<T>,
+  selection: Selection,
+  unitPrice: (entity: T) => number
+): number {
+  let total = 0
+  for (const id in selection) {
+    const quantity = selection[id]
+    const entity = quantity > 0 ? table.byId.get(id) : undefined
+    if (entity) total += unitPrice(entity) * quantity
+  }
+  return total
+}
+
+// The selected entities with their quantities, in selection order
+export function selectSelectedEntities<T extends Entity>(
+  table: EntityTable<T>,
+  selection: Selection
+): Array<{ entity: T; quantity: number }> {
+  const selected: Array<{ entity: T; quantity: number }> = []
+  for (const id in selection) {
+    const quantity = selection[id]
+    const entity = quantity > 0 ? table.byId.get(id) : undefined
+    if (entity) selected.push({ entity, quantity })
+  }
+  return selected
+}
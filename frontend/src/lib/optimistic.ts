@@ -0,0 +1,151 @@
+// Optimistic writes for add_delivery, process_payment and mark_pay_tomorrow.
+//
+// A screen applies a write's expected effect to its own state before the RPC
+// goes out, corrects the estimate from the JSON the RPC returns, and undoes
+// it if the RPC fails. Nothing is re-read after a write. Effects are kept as
+// deltas rather than before/after copies, so undoing one write never
+// discards another write that landed in the meantime.
+
+// ==============================================
+// PENDING AMOUNTS
+// ==============================================
+
+// A shop's unpaid amounts split the way process_payment settles them: older
+// deliveries first, then the day's deliveries, then manual pending history.
+// get_shop_pending_breakdown's previous_pending is older + manual.
+export type PendingBreakdown = {
+  today: number
+  older: number
+  manual: number
+}
+
+export const NO_PENDING: PendingBreakdown = { today: 0, older: 0, manual: 0 }
+
+export const pendingTotal = (pending: PendingBreakdown) => pending.today + pending.older + pending.manual
+
+export const addPending = (a: PendingBreakdown, b: PendingBreakdown): PendingBreakdown => ({
+  today: a.today + b.today,
+  older: a.older + b.older,
+  manual: a.manual + b.manual
+})
+
+export const negatePending = (delta: PendingBreakdown): PendingBreakdown => ({
+  today: -delta.today,
+  older: -delta.older,
+  manual: -delta.manual
+})
+
+// add_delivery: the day's pending grows by the delivery total
+export const deliveryEffect = (totalAmount: number): PendingBreakdown => ({ ...NO_PENDING, today: totalAmount })
+
+// process_payment, estimated: FIFO over older deliveries, the day's
+// deliveries, then manual history; anything beyond the total stays unapplied
+export function paymentEffect(pending: PendingBreakdown, amount: number): PendingBreakdown {
+  let left = amount
+  const take = (available: number) => {
+    const applied = Math.min(left, Math.max(available, 0))
+    left -= applied
+    return -applied
+  }
+  const older = take(pending.older)
+  const today = take(pending.today)
+  const manual = take(pending.manual)
+  return { today, older, manual }
+}
+
+// process_payment, as applied: the RPC reports every delivery and history
+// row it paid down, with the amount
+export function paymentResultEffect(result: any, date: string): PendingBreakdown {
+  const delta = { ...NO_PENDING }
+  ;(result?.affected_deliveries || []).forEach((item: any) => {
+    const applied = Number(item.amount_applied) || 0
+    if (item.delivery_date === date) {
+      delta.today -= applied
+    } else {
+      delta.older -= applied
+    }
+  })
+  ;(result?.affected_history || []).forEach((item: any) => {
+    delta.manual -= Number(item.amount_applied) || 0
+  })
+  return delta
+}
+
+// ==============================================
+// RUNNER
+// ==============================================
+
+export type OptimisticWrite<T> = {
+  // Apply the expected effect; returns its undo
+  apply: () => () => void
+  // The write itself; reject (or throw) on failure
+  run: () => Promise<T>
+  // Replace the estimate with what the server actually did
+  reconcile?: (result: T) => void
+}
+
+export async function optimistic<T>({ apply, run, reconcile }: OptimisticWrite<T>): Promise<T> {
+  const undo = apply()
+  let result: T
+  try {
+    result = await run()
+  } catch (error) {
+    undo()
+    throw error
+  }
+  reconcile?.(result)
+  return result
+}
+
+// Supabase rpc() resolves with { data, error }; the write RPCs also report
+// failure as { success: false, error }. Either way this throws.
+export async function rpcWrite(call: PromiseLike<{ data: any; error: any }>, failure: string): Promise<any> {
+  const { data, error } = await call
+  if (error) throw error
+  if (!data?.success) throw new Error(data?.error || failure)
+  return data
+}
+
+// ==============================================
+// SHOP LIST
+// ==============================================
+
+// Fields of a shop list row that a write changes
+export type ShopRowPatch = {
+  current_balance?: number
+  daily_status?: 'delivered' | 'not_delivered'
+  last_transaction?: {
+    type: 'delivery' | 'payment'
+    amount: number
+    description: string
+    created_at: string
+  }
+}
+
+// The list applies a patch and returns the values it replaced, or null if
+// it does not show the shop
+type ShopRowListener = (shopId: string, patch: ShopRowPatch) => ShopRowPatch | null
+
+const shopRowListeners = new Set<ShopRowListener>()
+
+// Subscribe the shop list to row patches. Returns an unsubscribe function.
+export function onShopRowPatch(listener: ShopRowListener): () => void {
+  shopRowListeners.add(listener)
+  return () => {
+    shopRowListeners.delete(listener)
+  }
+}
+
+// Patch the shop's row wherever a list shows it. Returns the undo.
+export function patchShopRow(shopId: string, patch: ShopRowPatch): () => void {
+  const replaced: Array<[ShopRowListener, ShopRowPatch]> = []
+  shopRowListeners.forEach(listener => {
+    const previous = listener(shopId, patch)
+    if (previous) replaced.push([listener, previous])
+  })
+  return () => {
+    replaced.forEach(([listener, previous]) => {
+      if (shopRowListeners.has(listener)) listener(shopId, previous)
+    })
+  }
+}
@@ -0,0 +1,118 @@
+// Read routing between the primary database and an optional read replica.
+//
+// Read-only RPCs and table selects go to the replica while its last measured
+// replication lag is within the staleness bound. Everything else - writes,
+// unknown RPCs, and any read within the bound after a write from this tab
+// (read-your-writes) - goes to the primary.
+
+// RPCs that never write. Anything not listed here is treated as a write.
+export const READ_ONLY_RPCS = new Set([
+  'get_today_collection_view',
+  'get_reports_collection_view',
+  'get_reports_shop_detail_view',
+  'get_reports_daily_summary',
+  'get_shops_overview',
+  'get_route_stats',
+  'get_shop_balance',
+  'get_shop_pending_breakdown',
+  'get_shop_activity',
+  'get_reset_preview_data',
+  'analyze_query_performance',
+  'get_index_usage_stats',
+  'get_table_stats',
+  'get_slow_queries',
+  'get_connection_stats',
+  'get_replication_lag',
+  'read_rpc',
+  'columnar_rpc',
+  'batch_rpc'
+])
+
+const WRITE_METHODS = new Set(['insert', 'update', 'upsert', 'delete'])
+
+export type LagProbe = () => Promise<number | null>
+
+export class ReadRouter {
+  private lastWriteAt = -Infinity
+  private lagMs: number | null = null
+  private lagCheckedAt = -Infinity
+  private probing = false
+
+  constructor(
+    private readonly probeLag: LagProbe,
+    readonly maxLagMs: number,
+    private readonly probeIntervalMs = 10000,
+    private readonly now: () => number = Date.now
+  ) {}
+
+  // Call on every mutation: reads stay on the primary until the replica
+  // is guaranteed to have caught up with it.
+  noteWrite(): void {
+    this.lastWriteAt = this.now()
+  }
+
+  useReplica(): boolean {
+    const now = this.now()
+    if (now - this.lagCheckedAt >= this.probeIntervalMs) {
+      this.refreshLag()
+    }
+    // A replica within maxLagMs has every write older than maxLagMs
+    if (now - this.lastWriteAt < this.maxLagMs) return false
+    // Missing or old measurements (probe failing) mean primary
+    if (this.lagMs === null || now - this.lagCheckedAt > 2 * this.probeIntervalMs) return false
+    return this.lagMs <= this.maxLagMs
+  }
+
+  private refreshLag(): void {
+    if (this.probing) return
+    this.probing = true
+    this.probeLag()
+      .catch(() => null)
+      .then(lag => {
+        this.lagMs = lag
+        this.lagCheckedAt = this.now()
+      })
+      .finally(() => {
+        this.probing = false
+      })
+  }
+}
+
+type RoutableClient = {
+  from: (relation: string) => any
+  rpc: (fn: string, ...rest: any[]) => any
+}
+
+// Wrap `primary` so that from()/rpc() follow `router`; every other
+// property (auth, channels, ...) is the primary's own.
+export function routeReads<C extends RoutableClient>(primary: C, replica: C, router: ReadRouter): C {
+  const rpc = (fn: string, ...rest: any[]) => {
+    if (READ_ONLY_RPCS.has(fn)) {
+      return (router.useReplica() ? replica : primary).rpc(fn, ...rest)
+    }
+    router.noteWrite()
+    return primary.rpc(fn, ...rest)
+  }
+
+  const from = (relation: string) =>
+    new Proxy(primary.from(relation), {
+      get(builder, prop, receiver) {
+        if (prop === 'select') {
+          return (...args: any[]) =>
+            (router.useReplica() ? replica.from(relation) : builder).select(...args)
+        }
+        if (typeof prop === 'string' && WRITE_METHODS.has(prop)) {
+          router.noteWrite()
+        }
+        return Reflect.get(builder, prop, receiver)
+      }
+    })
+
+  return new Proxy(primary, {
+    get(target, prop, receiver) {
+      if (prop === 'rpc') return rpc
+      if (prop === 'from') return from
+      return Reflect.get(target, prop, receiver)
+    }
+  })
+}
@@ -0,0 +1,117 @@
+// One timer for every time-based job in the app (midnight rollover, session
+// expiry, cache TTLs).
+//
+// Each task knows its next deadline as an absolute timestamp; the scheduler
+// arms a single setTimeout for the earliest one. Nothing ticks while the page
+// is hidden: on visibilitychange back to visible, every task whose deadline
+// passed in the meantime runs once, then the timer is re-armed. Deadlines are
+// compared against the wall clock when the timer fires, so a throttled or
+// late timer still runs the task instead of missing an exact minute.
+
+// A task returns its next deadline (ms since epoch) given the current time;
+// Infinity means not until reschedule()
+export type NextDeadline = (now: number) => number
+
+type Task = {
+  next: NextDeadline
+  run: () => void
+  due: number
+}
+
+// Re-check at least this often while visible, so wall-clock changes
+// (device sleep, timezone or clock adjustments) are noticed
+const MAX_DELAY_MS = 60 * 60 * 1000
+
+export class Scheduler {
+  private tasks = new Set<Task>()
+  private timer: ReturnType<typeof setTimeout> | null = null
+  private listening = false
+
+  constructor(private readonly now: () => number = Date.now) {}
+
+  // Run `run` at every deadline produced by `next`. Returns a cancel function.
+  every(next: NextDeadline, run: () => void): () => void {
+    const task: Task = { next, run, due: next(this.now()) }
+    this.tasks.add(task)
+    this.listen()
+    this.arm()
+    return () => {
+      this.tasks.delete(task)
+      this.arm()
+    }
+  }
+
+  // Recompute every deadline, e.g. after a session was extended
+  reschedule(): void {
+    const now = this.now()
+    this.tasks.forEach(task => {
+      task.due = task.next(now)
+    })
+    this.arm()
+  }
+
+  private isHidden(): boolean {
+    return typeof document !== 'undefined' && document.visibilityState === 'hidden'
+  }
+
+  private listen(): void {
+    if (this.listening || typeof document === 'undefined') return
+    this.listening = true
+    document.addEventListener('visibilitychange', () => {
+      if (this.isHidden()) {
+        this.disarm()
+      } else {
+        this.runDue()
+      }
+    })
+  }
+
+  private disarm(): void {
+    if (this.timer !== null) {
+      clearTimeout(this.timer)
+      this.timer = null
+    }
+  }
+
+  private arm(): void {
+    this.disarm()
+    if (this.tasks.size === 0 || this.isHidden()) return
+    let earliest = Infinity
+    this.tasks.forEach(task => {
+      earliest = Math.min(earliest, task.due)
+    })
+    const delay = Math.min(Math.max(0, earliest - this.now()), MAX_DELAY_MS)
+    this.timer = setTimeout(() => this.runDue(), delay)
+  }
+
+  private runDue(): void {
+    const now = this.now()
+    // Snapshot first: a task may cancel itself or add another one
+    Array.from(this.tasks).forEach(task => {
+      if (task.due > now || !this.tasks.has(task)) return
+      try {
+        task.run()
+      } catch (error) {
+        console.error('Scheduled task failed:', error)
+      } finally {
+        // After the run, so the task can act on what it just changed
+        task.due = task.next(this.now())
+      }
+    })
+    this.arm()
+  }
+}
+
+export const scheduler = new Scheduler()
+
+// Next local midnight strictly after `now`
+export const nextMidnight: NextDeadline = now => {
+  const midnight = new Date(now)
+  midnight.setHours(24, 0, 0, 0)
+  return midnight.getTime()
+}
+
+// Run `run` on every local day rollover (caught up on return if the page
+// was hidden or asleep at midnight)
+export const onMidnight = (run: () => void) => scheduler.every(nextMidnight, run)
+
@@ -0,0 +1,102 @@
+// Last-known data persisted in IndexedDB, so screens can render immediately
+// on a cold start and refresh from the server in the background.
+//
+// Every record carries SNAPSHOT_SCHEMA_VERSION. Bump it whenever the shape
+// of a snapshotted value changes: the store is recreated on upgrade and
+// records from another version are ignored.
+
+export const SNAPSHOT_SCHEMA_VERSION = 1
+
+export type SnapshotKey = 'shops' | 'shops_overview' | 'delivery_boys' | 'milk_types' | 'stock'
+
+export type Snapshot<T> = {
+  data: T
+  savedAt: number
+}
+
+type SnapshotRecord = {
+  key: SnapshotKey
+  version: number
+  savedAt: number
+  data: unknown
+}
+
+const DB_NAME = 'milk_delivery_snapshot'
+const STORE = 'snapshots'
+
+let dbPromise: Promise<IDBDatabase | null> | null = null
+
+const openDb = (): Promise<IDBDatabase | null> => {
+  if (!dbPromise) {
+    dbPromise = new Promise(resolve => {
+      if (typeof indexedDB === 'undefined') {
+        resolve(null)
+        return
+      }
+      const request = indexedDB.open(DB_NAME, SNAPSHOT_SCHEMA_VERSION)
+      request.onupgradeneeded = () => {
+        const db = request.result
+        if (db.objectStoreNames.contains(STORE)) db.deleteObjectStore(STORE)
+        db.createObjectStore(STORE, { keyPath: 'key' })
+      }
+      request.onsuccess = () => resolve(request.result)
+      // Private browsing, quota, a newer version open elsewhere...: no snapshot
+      request.onerror = () => resolve(null)
+      request.onblocked = () => resolve(null)
+    })
+  }
+  return dbPromise
+}
+
+export async function loadSnapshot<T>(key: SnapshotKey): Promise<Snapshot<T> | null> {
+  try {
+    const db = await openDb()
+    if (!db) return null
+    const record = await new Promise<SnapshotRecord | undefined>((resolve, reject) => {
+      const request = db.transaction(STORE, 'readonly').objectStore(STORE).get(key)
+      request.onsuccess = () => resolve(request.result)
+      request.onerror = () => reject(request.error)
+    })
+    if (!record || record.version !== SNAPSHOT_SCHEMA_VERSION) return null
+    return { data: record.data as T, savedAt: record.savedAt }
+  } catch (error) {
+    console.warn('Snapshot read failed:', key, error)
+    return null
+  }
+}
+
+export async function saveSnapshot<T>(key: SnapshotKey, data: T): Promise<void> {
+  try {
+    const db = await openDb()
+    if (!db) return
+    const record: SnapshotRecord = { key, version: SNAPSHOT_SCHEMA_VERSION, savedAt: Date.now(), data }
+    await new Promise<void>((resolve, reject) => {
+      const tx = db.transaction(STORE, 'readwrite')
+      tx.objectStore(STORE).put(record)
+      tx.oncomplete = () => resolve()
+      tx.onerror = () => reject(tx.error)
+    })
+  } catch (error) {
+    console.warn('Snapshot write failed:', key, error)
+  }
+}
+
+export async function clearSnapshots(): Promise<void> {
+  try {
+    const db = await openDb()
+    if (!db) return
+    await new Promise<void>((resolve, reject) => {
+      const tx = db.transaction(STORE, 'readwrite')
+      tx.objectStore(STORE).clear()
+      tx.oncomplete = () => resolve()
+      tx.onerror = () => reject(tx.error)
+    })
+  } catch (error) {
+    console.warn('Snapshot clear failed:', error)
+  }
+}
+
+// Whether a snapshot was taken on an earlier calendar day (local time), so
+// per-day values in it (delivered today, today's payments) no longer apply
+export const isFromEarlierDay = (snapshot: Snapshot<unknown>) =>
+  new Date(snapshot.savedAt).toDateString() !== new Date().toDateString()
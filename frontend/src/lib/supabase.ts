@@ -1,9 +1,40 @@
 import { createClient } from '@supabase/supabase-js'
+import { ReadRouter, routeReads } from './readRouting'
 
 const supabaseUrl = import.meta.env.VITE_REACT_APP_SUPABASE_URL
 const supabaseAnonKey = import.meta.env.VITE_REACT_APP_SUPABASE_ANON_KEY
 
-export const supabase = createClient(supabaseUrl, supabaseAnonKey)
+// Optional read replica: read-only RPCs and table reads go there while its
+// replication lag is within VITE_REACT_APP_REPLICA_MAX_LAG_MS (default 5s)
+const replicaUrl = import.meta.env.VITE_REACT_APP_SUPABASE_REPLICA_URL
+const replicaAnonKey = import.meta.env.VITE_REACT_APP_SUPABASE_REPLICA_ANON_KEY || supabaseAnonKey
+const replicaMaxLagMs = Number(import.meta.env.VITE_REACT_APP_REPLICA_MAX_LAG_MS) || 5000
+
+// Always the primary, for reads that must see the latest writes
+export const supabasePrimary = createClient(supabaseUrl, supabaseAnonKey)
+
+const createRoutedClient = () => {
+  if (!replicaUrl) return supabasePrimary
+
+  // The replica has no session of its own: every request carries the
+  // primary's current access token (the anon key when signed out), so RLS
+  // evaluates routed reads as the same user on both. The replica must
+  // accept the primary's JWTs (a Supabase read replica shares its secret).
+  const replica = createClient(replicaUrl, replicaAnonKey, {
+    accessToken: async () => {
+      const { data } = await supabasePrimary.auth.getSession()
+      return data.session?.access_token ?? null
+    }
+  })
+  const router = new ReadRouter(async () => {
+    const { data, error } = await replica.rpc('get_replication_lag')
+    if (error || !data?.success) return null
+    return data.lag_ms ?? null
+  }, replicaMaxLagMs)
+  return routeReads(supabasePrimary, replica, router)
+}
+
+export const supabase = createRoutedClient()
 
 // TypeScript types for our database
 export type Shop = {
@@ -1,5 +1,7 @@
 import { useState, useEffect } from 'react'
-import { supabase, Shop, MilkType } from '../lib/supabase'
+import { supabase, Shop } from '../lib/supabase'
+import { useEntities } from '../context/AppContext'
+import { selectList } from '../lib/entityStore'
 import { Minus, Plus, Share2, MessageCircle, X } from 'lucide-react'
 
 interface AddDeliveryScreenProps {
@@ -21,31 +23,40 @@ export default function AddDeliveryScreen({ shop, onBack, onSuccess }: AddDelive
   const [saving, setSaving] = useState(false)
   const [error, setError] = useState<string | null>(null)
   const [deliveryBoyId, setDeliveryBoyId] = useState<string>('')
-  const [deliveryBoys, setDeliveryBoys] = useState<any[]>([])
+  const { deliveryBoys: deliveryBoyTable } = useEntities()
+  const deliveryBoys = selectList(deliveryBoyTable)
   const [showShareDialog, setShowShareDialog] = useState(false)
   const [deliveryData, setDeliveryData] = useState<any>(null)
 
   useEffect(() => {
     fetchMilkTypes()
-    fetchDeliveryBoys()
   }, [])
 
+  // Default to the first delivery boy once the store has them
+  useEffect(() => {
+    if (!deliveryBoyId && deliveryBoys.length > 0) {
+      setDeliveryBoyId(deliveryBoys[0].id)
+    }
+  }, [deliveryBoys])
+
   const fetchMilkTypes = async () => {
     try {
+      // The prices add_delivery will charge this shop (custom rates applied)
       const { data, error } = await supabase
-        .from('milk_types')
-        .select('*')
-        .eq('is_active', true)
-        .order('name')
+        .from('effective_prices')
+        .select('price_per_packet, milk_types!inner(id, name)')
+        .eq('shop_id', shop.id)
       
       if (error) throw error
       
-      const productQuantities: ProductQuantity[] = (data || []).map((mt: MilkType) => ({
-        milk_type_id: mt.id,
-        name: mt.name,
-        price: Number(mt.price_per_packet),
-        quantity: 0,
-      }))
+      const productQuantities: ProductQuantity[] = (data || [])
+        .map((row: any) => ({
+          milk_type_id: row.milk_types.id,
+          name: row.milk_types.name,
+          price: Number(row.price_per_packet),
+          quantity: 0,
+        }))
+        .sort((a, b) => a.name.localeCompare(b.name))
       
       setProducts(productQuantities)
     } catch (err) {
@@ -56,24 +67,6 @@ export default function AddDeliveryScreen({ shop, onBack, onSuccess }: AddDelive
     }
   }
 
-  const fetchDeliveryBoys = async () => {
-    try {
-      const { data, error } = await supabase
-        .from('delivery_boys')
-        .select('*')
-        .eq('is_active', true)
-      
-      if (error) throw error
-      
-      setDeliveryBoys(data || [])
-      if (data && data.length > 0) {
-        setDeliveryBoyId(data[0].id)
-      }
-    } catch (err) {
-      console.error('Error fetching delivery boys:', err)
-    }
-  }
-
   const updateQuantity = (index: number, change: number) => {
     setProducts(prev => prev.map((p, i) => {
       if (i === index) {
@@ -120,7 +113,7 @@ export default function AddDeliveryScreen({ shop, onBack, onSuccess }: AddDelive
     })
     
     message += `\n💰 *Total Amount:* ₹${totalAmount.toFixed(2)}\n`
-    message += `🚚 *Delivery Boy:* ${deliveryBoys.find(db => db.id === deliveryBoyId)?.name || 'N/A'}\n\n`
+    message += `🚚 *Delivery Boy:* ${deliveryBoyTable.byId.get(deliveryBoyId)?.name || 'N/A'}\n\n`
     message += `Thank you for your business! 🙏`
     
     return message
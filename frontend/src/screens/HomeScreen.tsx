@@ -1,5 +1,7 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { supabase } from '../lib/supabase'
+import { loadSnapshot, saveSnapshot } from '../lib/snapshot'
+import { onMidnight } from '../lib/scheduler'
 import { Store, Clock, DollarSign, TrendingUp, Package, Edit3, Save, X, Plus, Minus, Calendar } from 'lucide-react'
 
 interface HomeScreenProps {
@@ -37,16 +39,22 @@ export default function HomeScreen({ onDeliveryRefresh, onCollectionRefresh, ref
   const [isEditingStock, setIsEditingStock] = useState(false)
   const [editingQuantities, setEditingQuantities] = useState<{[key: string]: number}>({})
   const [simulatingTomorrow, setSimulatingTomorrow] = useState(false)
+  // Stock shown from the last snapshot until the first fetch lands
+  const [stockStale, setStockStale] = useState(false)
+  const stockLoaded = useRef(false)
 
   const fetchStockData = async () => {
     try {
       const { data, error } = await supabase
         .from('stock')
-        .select('*')
+        .select('id, product_name, current_quantity, low_stock_threshold')
         .order('product_name')
 
       if (error) throw error
+      stockLoaded.current = true
       setStockItems(data || [])
+      setStockStale(false)
+      saveSnapshot('stock', data || [])
     } catch (error) {
       console.error('Error fetching stock data:', error)
     }
@@ -164,6 +172,12 @@ export default function HomeScreen({ onDeliveryRefresh, onCollectionRefresh, ref
   }
 
   useEffect(() => {
+    loadSnapshot<StockItem[]>('stock').then(snapshot => {
+      // A fetch that already landed wins over the snapshot
+      if (!snapshot || stockLoaded.current) return
+      setStockItems(snapshot.data)
+      setStockStale(true)
+    })
     fetchRouteStats()
     fetchStockData()
   }, [])
@@ -176,25 +190,12 @@ export default function HomeScreen({ onDeliveryRefresh, onCollectionRefresh, ref
     }
   }, [refreshTrigger])
 
-  // Daily reset at midnight (12:00 AM)
-  useEffect(() => {
-    const checkMidnight = () => {
-      const now = new Date()
-      const hours = now.getHours()
-      const minutes = now.getMinutes()
-      
-      // Check if it's exactly midnight (12:00 AM)
-      if (hours === 0 && minutes === 0) {
-        console.log('Midnight detected - resetting route stats')
-        fetchRouteStats()
-      }
-    }
-
-    // Check every minute for midnight
-    const interval = setInterval(checkMidnight, 60000) // 60 seconds
-
-    return () => clearInterval(interval)
-  }, [])
+  // Daily reset at midnight (12:00 AM), caught up when the app comes back
+  // to the foreground after midnight
+  useEffect(() => onMidnight(() => {
+    console.log('Midnight detected - resetting route stats')
+    fetchRouteStats()
+  }), [])
 
   const currentDate = new Date().toLocaleDateString('en-GB', {
     day: '2-digit',
@@ -292,7 +293,7 @@ export default function HomeScreen({ onDeliveryRefresh, onCollectionRefresh, ref
             </div>
             <div>
               <h3 className="font-bold text-gray-900">Stock Status</h3>
-              <p className="text-sm text-gray-600">Current Inventory</p>
+              <p className="text-sm text-gray-600">{stockStale ? 'Last known inventory, updating…' : 'Current Inventory'}</p>
             </div>
           </div>
           
@@ -324,7 +325,7 @@ export default function HomeScreen({ onDeliveryRefresh, onCollectionRefresh, ref
           )}
         </div>
         
-        <div className="grid grid-cols-2 gap-2">
+        <div className={`grid grid-cols-2 gap-2 ${stockStale ? 'opacity-60' : ''}`}>
           {stockItems.map((item) => {
             const isLowStock = item.current_quantity <= item.low_stock_threshold
             const editingQuantity = editingQuantities[item.id] ?? item.current_quantity
@@ -1,5 +1,6 @@
 import { useState } from 'react'
 import { supabase, CollectionViewRow } from '../lib/supabase'
+import { optimistic, rpcWrite, patchShopRow } from '../lib/optimistic'
 import { X, CreditCard, AlertCircle, Clock } from 'lucide-react'
 
 interface PaymentModalProps {
@@ -15,6 +16,8 @@ export default function PaymentModal({ shop, onClose, onSuccess }: PaymentModalP
   const [processing, setProcessing] = useState(false)
   const [error, setError] = useState<string | null>(null)
   const [message, setMessage] = useState<string | null>(null)
+  // Shown optimistically once the shop is deferred
+  const [status, setStatus] = useState(shop.status)
 
   const todayAmount = Number(shop.today_pending)
   const oldAmount = Number(shop.old_pending)
@@ -57,22 +60,28 @@ export default function PaymentModal({ shop, onClose, onSuccess }: PaymentModalP
       setProcessing(true)
       setError(null)
 
-      // Call the process_payment PostgreSQL function
-      const { data, error } = await supabase.rpc('process_payment', {
-        p_shop_id: shop.shop_id,
-        p_amount: amount,
-        p_collected_by: 'Collection Staff', // TODO: Get from user context
-        p_payment_date: new Date().toISOString().split('T')[0],
-        p_notes: notes || null
+      // The shop list shows the new balance while the payment is posted;
+      // nothing is reloaded afterwards
+      await optimistic({
+        apply: () => patchShopRow(shop.shop_id, {
+          current_balance: totalAmount - amount,
+          last_transaction: {
+            type: 'payment',
+            amount,
+            description: `Payment of ₹${amount}`,
+            created_at: new Date().toISOString()
+          }
+        }),
+        run: () => rpcWrite(supabase.rpc('process_payment', {
+          p_shop_id: shop.shop_id,
+          p_amount: amount,
+          p_collected_by: 'Collection Staff', // TODO: Get from user context
+          p_payment_date: new Date().toISOString().split('T')[0],
+          p_notes: notes || null
+        }), 'Failed to process payment')
       })
 
-      if (error) throw error
-
-      if (data && data.success) {
-        onSuccess()
-      } else {
-        throw new Error(data?.error || 'Failed to process payment')
-      }
+      onSuccess()
     } catch (err: any) {
       console.error('Error processing payment:', err)
       setError(err.message || 'Failed to process payment')
@@ -87,23 +96,35 @@ export default function PaymentModal({ shop, onClose, onSuccess }: PaymentModalP
       setError(null)
       setMessage(null)
 
-      // Move today's delivery to pending history (if not already deferred)
-      if (shop.status !== 'pay_tomorrow') {
-        const { data, error } = await supabase.rpc('mark_pay_tomorrow', {
-          p_shop_id: shop.shop_id,
-          p_notes: notes || 'Payment deferred to tomorrow'
+      // Defer today's unpaid deliveries (if not already deferred); the
+      // status is shown as deferred while the write is in flight
+      if (status !== 'pay_tomorrow') {
+        const previousStatus = status
+        await optimistic({
+          apply: () => {
+            setStatus('pay_tomorrow')
+            setMessage('✅ Payment deferred to tomorrow!')
+            return () => {
+              setStatus(previousStatus)
+              setMessage(null)
+            }
+          },
+          run: () => rpcWrite(supabase.rpc('mark_pay_tomorrow', {
+            p_shop_id: shop.shop_id,
+            p_notes: notes || 'Payment deferred to tomorrow'
+          }), 'Failed to mark as pay tomorrow'),
+          reconcile: data => {
+            // Nothing unpaid today: the status did not change
+            if (data.affected_deliveries === 0) {
+              setStatus(previousStatus)
+              setMessage('ℹ️ No unpaid delivery today to defer')
+            }
+          }
         })
 
-        if (error) throw error
-
-        if (data && data.success) {
-          setMessage('✅ Payment deferred to tomorrow!')
-          setTimeout(() => {
-            onSuccess()
-          }, 1500) // Show message for 1.5 seconds then close
-        } else {
-          throw new Error(data?.error || 'Failed to mark as pay tomorrow')
-        }
+        setTimeout(() => {
+          onSuccess()
+        }, 1500) // Show message for 1.5 seconds then close
       } else {
         setMessage('ℹ️ Payment already deferred to tomorrow')
         setTimeout(() => {
@@ -136,22 +157,22 @@ export default function PaymentModal({ shop, onClose, onSuccess }: PaymentModalP
         <div className="p-4 space-y-4">
           {/* Shop Info with Status */}
           <div className={`border rounded-lg p-4 ${
-            shop.status === 'paid'
+            status === 'paid'
               ? 'bg-green-50 border-green-200'
-              : shop.status === 'partial'
+              : status === 'partial'
               ? 'bg-yellow-50 border-yellow-200'
-              : shop.status === 'pay_tomorrow'
+              : status === 'pay_tomorrow'
               ? 'bg-orange-50 border-orange-200'
               : 'bg-red-50 border-red-200'
           }`}>
             <div className="flex items-center justify-between">
               <div>
                 <h3 className={`font-semibold ${
-                  shop.status === 'paid'
+                  status === 'paid'
                     ? 'text-green-900'
-                    : shop.status === 'partial'
+                    : status === 'partial'
                     ? 'text-yellow-900'
-                    : shop.status === 'pay_tomorrow'
+                    : status === 'pay_tomorrow'
                     ? 'text-orange-900'
                     : 'text-red-900'
                 }`}>
@@ -159,11 +180,11 @@ export default function PaymentModal({ shop, onClose, onSuccess }: PaymentModalP
                 </h3>
                 {shop.shop_owner && (
                   <p className={`text-sm ${
-                    shop.status === 'paid'
+                    status === 'paid'
                       ? 'text-green-700'
-                      : shop.status === 'partial'
+                      : status === 'partial'
                       ? 'text-yellow-700'
-                      : shop.status === 'pay_tomorrow'
+                      : status === 'pay_tomorrow'
                       ? 'text-orange-700'
                       : 'text-red-700'
                   }`}>
@@ -172,15 +193,15 @@ export default function PaymentModal({ shop, onClose, onSuccess }: PaymentModalP
                 )}
               </div>
               <div className={`px-3 py-1 rounded-full text-xs font-medium ${
-                shop.status === 'paid'
+                status === 'paid'
                   ? 'bg-green-100 text-green-800'
-                  : shop.status === 'partial'
+                  : status === 'partial'
                   ? 'bg-yellow-100 text-yellow-800'
-                  : shop.status === 'pay_tomorrow'
+                  : status === 'pay_tomorrow'
                   ? 'bg-orange-100 text-orange-800'
                   : 'bg-red-100 text-red-800'
               }`}>
-                {shop.status === 'paid' ? 'Fully Paid' : shop.status === 'partial' ? 'Partially Paid' : shop.status === 'pay_tomorrow' ? 'Pay Tomorrow' : 'Pending'}
+                {status === 'paid' ? 'Fully Paid' : status === 'partial' ? 'Partially Paid' : status === 'pay_tomorrow' ? 'Pay Tomorrow' : 'Pending'}
               </div>
             </div>
           </div>
@@ -275,7 +296,7 @@ export default function PaymentModal({ shop, onClose, onSuccess }: PaymentModalP
           </div>
 
           {/* Payment Status Sections */}
-          {shop.status === 'partial' && (
+          {status === 'partial' && (
             <div className="bg-yellow-50 border border-yellow-200 rounded-lg p-3">
               <div className="flex items-center space-x-2 mb-2">
                 <div className="w-2 h-2 bg-yellow-400 rounded-full"></div>
@@ -288,7 +309,7 @@ export default function PaymentModal({ shop, onClose, onSuccess }: PaymentModalP
             </div>
           )}
 
-          {shop.status === 'paid' && (
+          {status === 'paid' && (
             <div className="bg-green-50 border border-green-200 rounded-lg p-3">
               <div className="flex items-center space-x-2 mb-2">
                 <div className="w-2 h-2 bg-green-400 rounded-full"></div>
@@ -300,7 +321,7 @@ export default function PaymentModal({ shop, onClose, onSuccess }: PaymentModalP
             </div>
           )}
 
-          {shop.status === 'pay_tomorrow' && (
+          {status === 'pay_tomorrow' && (
             <div className="bg-orange-50 border border-orange-200 rounded-lg p-3">
               <div className="flex items-center space-x-2 mb-2">
                 <div className="w-2 h-2 bg-orange-400 rounded-full"></div>
@@ -376,7 +397,7 @@ export default function PaymentModal({ shop, onClose, onSuccess }: PaymentModalP
           </div>
 
           {/* Process Payment Button - Only show if there's today's amount and not already deferred */}
-          {todayAmount > 0 && shop.status !== 'pay_tomorrow' && (
+          {todayAmount > 0 && status !== 'pay_tomorrow' && (
             <div className="mt-3">
               <button
                 onClick={handlePayTomorrow}
@@ -1,5 +1,6 @@
 import { useState, useEffect } from 'react'
 import { supabase } from '../lib/supabase'
+import { useEntities, useAppActions } from '../context/AppContext'
 import { Plus, Edit, Trash2, Save, X, ArrowLeft } from 'lucide-react'
 
 interface Product {
@@ -16,6 +17,8 @@ interface ProductManagementScreenProps {
 
 export default function ProductManagementScreen({ onBack }: ProductManagementScreenProps) {
   const [products, setProducts] = useState<Product[]>([])
+  const { milkTypes } = useEntities()
+  const { upsertEntities, removeEntities } = useAppActions()
   const [loading, setLoading] = useState(true)
   const [showAddForm, setShowAddForm] = useState(false)
   const [editingProduct, setEditingProduct] = useState<Product | null>(null)
@@ -45,36 +48,54 @@ export default function ProductManagementScreen({ onBack }: ProductManagementScr
     fetchProducts()
   }, [])
 
+  // Put a saved row into this list and the shared store (active milk types
+  // only) without reloading either
+  const applySaved = (saved: Product) => {
+    setProducts(prev =>
+      [...prev.filter(p => p.id !== saved.id), saved].sort((a, b) => a.name.localeCompare(b.name))
+    )
+    if (saved.is_active) {
+      upsertEntities('milkTypes', [{ id: saved.id, name: saved.name, price_per_packet: saved.price_per_packet }])
+    } else if (milkTypes.byId.has(saved.id)) {
+      removeEntities('milkTypes', [saved.id])
+    }
+  }
+
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault()
     try {
       if (editingProduct) {
         // Update existing product
-        const { error } = await supabase
+        const { data, error } = await supabase
           .from('milk_types')
           .update({
             name: formData.name,
             price_per_packet: formData.price_per_packet
           })
           .eq('id', editingProduct.id)
+          .select('*')
+          .single()
 
         if (error) throw error
+        applySaved(data)
       } else {
         // Add new product
-        const { error } = await supabase
+        const { data, error } = await supabase
           .from('milk_types')
           .insert([{
             name: formData.name,
             price_per_packet: formData.price_per_packet
           }])
+          .select('*')
+          .single()
 
         if (error) throw error
+        applySaved(data)
       }
 
       setShowAddForm(false)
       setEditingProduct(null)
       setFormData({ name: '', price_per_packet: 0 })
-      fetchProducts()
     } catch (error) {
       console.error('Error saving product:', error)
     }
@@ -93,13 +114,15 @@ export default function ProductManagementScreen({ onBack }: ProductManagementScr
     if (!confirm('Are you sure you want to delete this product? This will not affect past data.')) return
 
     try {
-      const { error } = await supabase
+      const { data, error } = await supabase
         .from('milk_types')
         .update({ is_active: false })
         .eq('id', productId)
+        .select('*')
+        .single()
 
       if (error) throw error
-      fetchProducts()
+      applySaved(data)
     } catch (error) {
       console.error('Error deleting product:', error)
     }
@@ -7,9 +7,12 @@ interface ResetPreviewData {
   paid_deliveries: number
   pending_deliveries: number
   partial_deliveries: number
+  pay_tomorrow_deliveries: number
+  history_rows: number
   total_paid_amount: number
   total_pending_amount: number
   shops_with_pending: number
+  estimated_ms: number
 }
 
 interface ResetDialogProps {
@@ -173,7 +176,7 @@ export default function ResetDialog({ isOpen, onClose, onSuccess }: ResetDialogP
                   <div className="animate-spin rounded-full h-6 w-6 border-b-2 border-blue-600 mx-auto mb-2"></div>
                   <p className="text-sm text-gray-600">Loading reset preview...</p>
                 </div>
-              ) : previewData ? (
+              ) : previewData && previewData.total_deliveries > 0 ? (
                 <div className="space-y-3">
                   <h3 className="text-sm font-semibold text-gray-900">Reset Preview</h3>
                   
@@ -196,6 +199,12 @@ export default function ResetDialog({ isOpen, onClose, onSuccess }: ResetDialogP
                         <span className="text-gray-600">Partial Deliveries:</span>
                         <span className="font-medium text-yellow-600">{previewData.partial_deliveries}</span>
                       </div>
+                      {previewData.pay_tomorrow_deliveries > 0 && (
+                        <div className="flex justify-between">
+                          <span className="text-gray-600">Pay Tomorrow:</span>
+                          <span className="font-medium text-purple-600">{previewData.pay_tomorrow_deliveries}</span>
+                        </div>
+                      )}
                     </div>
                   </div>
 
@@ -226,9 +235,10 @@ export default function ResetDialog({ isOpen, onClose, onSuccess }: ResetDialogP
                     <h4 className="text-sm font-medium text-blue-800 mb-2">What will happen:</h4>
                     <ul className="text-xs text-blue-700 space-y-1">
                       <li>• {previewData.paid_deliveries} paid deliveries will be archived</li>
-                      <li>• {previewData.pending_deliveries + previewData.partial_deliveries} pending/partial deliveries will be moved to history</li>
+                      <li>• {previewData.history_rows} pending/partial/deferred deliveries will be moved to history</li>
                       <li>• {formatCurrency(previewData.total_pending_amount)} will be added to pending history</li>
                       <li>• New day will start with clean delivery records</li>
+                      <li>• Estimated time: {previewData.estimated_ms < 1000 ? 'under a second' : `about ${Math.ceil(previewData.estimated_ms / 1000)} s`}</li>
                     </ul>
                   </div>
                 </div>
@@ -1,16 +1,36 @@
-import React, { useState, useEffect, useRef } from 'react'
+import React, { useState, useEffect, useRef, useMemo } from 'react'
 import { ArrowLeft, ArrowUp, ArrowDown, Plus, Minus, X, DollarSign, Settings, Clock } from 'lucide-react'
 import { supabase } from '../lib/supabase'
+import { rpcRead } from '../services/api-simple'
 import { formatCurrency } from '../utils/formatCurrency'
+import { useEntities, useAppActions, ShopEntity, MilkTypeEntity } from '../context/AppContext'
+import { selectList, selectSelectedEntities, selectSelectionTotal } from '../lib/entityStore'
+import {
+  optimistic,
+  rpcWrite,
+  patchShopRow,
+  PendingBreakdown,
+  NO_PENDING,
+  pendingTotal,
+  addPending,
+  negatePending,
+  deliveryEffect,
+  paymentEffect,
+  paymentResultEffect
+} from '../lib/optimistic'
 
 interface ShopDetailScreenProps {
   shopId: string
   onBack: () => void
 }
 
+// Chat history shows the most recent entries only; older days come back as
+// compacted 'daily_summary' rows from get_shop_activity
+const CHAT_HISTORY_LIMIT = 200
+
 interface ChatMessage {
   id: string
-  type: 'delivery' | 'payment' | 'pending'
+  type: 'delivery' | 'payment' | 'pending' | 'summary'
   content: string
   amount: number
   timestamp: string
@@ -18,24 +38,26 @@ interface ChatMessage {
   created_at: string
 }
 
-interface MilkProduct {
-  id: string
-  name: string
-  price_per_packet: number
-}
-
 export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenProps) {
-  const [shop, setShop] = useState<any>(null)
+  // Shop and milk types come from the shared entity store; a shop that is
+  // not in it (inactive, or the store is still loading) is fetched directly
+  const { shops, milkTypes } = useEntities()
+  const { upsertEntities } = useAppActions()
+  const [fetchedShop, setFetchedShop] = useState<ShopEntity | null>(null)
+  const shop = shops.byId.get(shopId) ?? fetchedShop
+  const milkProducts = selectList(milkTypes)
   const [messages, setMessages] = useState<ChatMessage[]>([])
-  const [milkProducts, setMilkProducts] = useState<MilkProduct[]>([])
   const [selectedProducts, setSelectedProducts] = useState<{[key: string]: number}>({})
   const [paymentAmount, setPaymentAmount] = useState<number>(0)
   const [showMilkModal, setShowMilkModal] = useState(false)
   const [showPaymentModal, setShowPaymentModal] = useState(false)
   const [loading, setLoading] = useState(true)
-  const [todayPending, setTodayPending] = useState<number>(0)
-  const [previousPending, setPreviousPending] = useState<number>(0)
-  const [totalPending, setTotalPending] = useState<number>(0)
+  // Writes adjust this locally (see lib/optimistic) instead of reloading it
+  const [pending, setPending] = useState<PendingBreakdown>(NO_PENDING)
+  const pendingLoaded = useRef(false)
+  const todayPending = pending.today
+  const previousPending = pending.older + pending.manual
+  const totalPending = pendingTotal(pending)
   const [showEditModal, setShowEditModal] = useState(false)
   const [editForm, setEditForm] = useState({
     name: '',
@@ -47,12 +69,25 @@ export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenPro
   const [stockLevels, setStockLevels] = useState<{[key: string]: number}>({})
   const [showCustomRatesModal, setShowCustomRatesModal] = useState(false)
   const [customRates, setCustomRates] = useState<{[key: string]: number}>({})
-  const [defaultRates, setDefaultRates] = useState<{[key: string]: number}>({})
   const [showPendingModal, setShowPendingModal] = useState(false)
   const [pendingAmount, setPendingAmount] = useState<number>(0)
   const [pendingNote, setPendingNote] = useState<string>('')
   const [paymentLoading, setPaymentLoading] = useState(false)
   const chatEndRef = useRef<HTMLDivElement>(null)
+  // Chat entries shown before their write returns have temporary ids
+  const optimisticIds = useRef(0)
+
+  // Derived from the store and the form; recomputed only when one changes
+  const selectedMilk = useMemo(
+    () => selectSelectedEntities(milkTypes, selectedProducts),
+    [milkTypes, selectedProducts]
+  )
+  const totalAmount = useMemo(
+    () => selectSelectionTotal(milkTypes, selectedProducts, (product: MilkTypeEntity) =>
+      customRates[product.name] !== undefined ? customRates[product.name] : product.price_per_packet
+    ),
+    [milkTypes, selectedProducts, customRates]
+  )
 
   // Load all data when shop changes
   useEffect(() => {
@@ -61,6 +96,12 @@ export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenPro
     }
   }, [shopId])
 
+  // Keep the shop list's balance in step with ours, including optimistic
+  // changes and their rollbacks, so it needs no reload
+  useEffect(() => {
+    if (pendingLoaded.current) patchShopRow(shopId, { current_balance: totalPending })
+  }, [totalPending])
+
   const loadStockLevels = async () => {
     try {
       const { data, error } = await supabase
@@ -82,33 +123,22 @@ export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenPro
 
   const loadCustomRates = async () => {
     try {
-      // Load default rates
-      const { data: defaultData, error: defaultError } = await supabase
-        .from('milk_types')
-        .select('id, name, price_per_packet')
-      
-      if (defaultError) throw defaultError
-      
-      const defaultMap: {[key: string]: number} = {}
-      defaultData?.forEach((item: any) => {
-        defaultMap[item.name] = item.price_per_packet
-      })
-      setDefaultRates(defaultMap)
-      
-      // Load custom rates for this shop
-      const { data: customData, error: customError } = await supabase
-        .from('shop_rates')
+      // One select: effective_prices already resolves shop rates against
+      // the milk_types prices
+      const { data, error } = await supabase
+        .from('effective_prices')
         .select(`
-          custom_price_per_packet,
+          price_per_packet,
+          is_custom,
           milk_types!inner(name)
         `)
         .eq('shop_id', shopId)
       
-      if (customError) throw customError
+      if (error) throw error
       
       const customMap: {[key: string]: number} = {}
-      customData?.forEach((item: any) => {
-        customMap[item.milk_types.name] = item.custom_price_per_packet
+      data?.forEach((item: any) => {
+        if (item.is_custom) customMap[item.milk_types.name] = Number(item.price_per_packet)
       })
       setCustomRates(customMap)
     } catch (error) {
@@ -126,7 +156,7 @@ export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenPro
       
       // Insert new custom rates
       const ratesToInsert = Object.entries(customRates).map(([productName, price]) => {
-        const product = milkProducts.find(p => p.name === productName)
+        const product = milkTypes.byName.get(productName)
         return {
           shop_id: shopId,
           milk_type_id: product?.id,
@@ -184,10 +214,9 @@ export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenPro
       const { data: activityData, error: activityError } = await supabase.from('activity_log').insert({
         shop_id: shopId,
         activity_type: 'pending_added',
-        message: `Manual pending added: ₹${pendingAmount}${pendingNote ? ' - ' + pendingNote : ''}`,
         amount: pendingAmount,
         delivery_date: new Date().toISOString().split('T')[0],
-        metadata: { pending_history_id: pendingHistoryId }
+        metadata: { pending_history_id: pendingHistoryId, note: pendingNote || null }
       }).select()
 
       if (activityError) {
@@ -222,7 +251,6 @@ export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenPro
       // Load all data in parallel for better performance
       await Promise.all([
         loadShopData(),
-        loadMilkProducts(),
         loadMessages(),
         loadPendingAmounts(),
         loadStockLevels(),
@@ -235,7 +263,6 @@ export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenPro
         try {
           await Promise.all([
             loadShopData(),
-            loadMilkProducts(),
             loadMessages(),
             loadPendingAmounts()
           ])
@@ -254,6 +281,7 @@ export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenPro
   }, [messages])
 
   const loadShopData = async () => {
+    if (shops.byId.has(shopId)) return
     try {
       const { data, error } = await supabase
         .from('shops')
@@ -262,143 +290,33 @@ export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenPro
         .single()
 
       if (error) throw error
-      setShop(data)
+      setFetchedShop(data)
     } catch (error) {
       console.error('Error loading shop:', error)
     }
   }
 
-  const loadMilkProducts = async () => {
-    try {
-      const { data, error } = await supabase
-        .from('milk_types')
-        .select('*')
-        .order('name')
-
-      if (error) throw error
-      setMilkProducts(data || [])
-    } catch (error) {
-      console.error('Error loading milk products:', error)
-    }
-  }
-
   const loadPendingAmounts = async () => {
     try {
       const today = new Date().toISOString().split('T')[0]
-      
-      // Load all data in parallel for better performance
-      const [todayDeliveriesResult, todayPaymentsResult, allDeliveriesResult, allPaymentsResult, pendingHistoryResult] = await Promise.all([
-        supabase
-          .from('deliveries')
-          .select('total_amount, payment_amount')
-          .eq('shop_id', shopId)
-          .eq('delivery_date', today)
-          .eq('is_archived', false),  // CRITICAL: Only active deliveries for today
-        supabase
-          .from('payments')
-          .select('amount')
-          .eq('shop_id', shopId)
-          .eq('payment_date', today),
-        supabase
-          .from('deliveries')
-          .select('total_amount, payment_amount, delivery_date')
-          .eq('shop_id', shopId)
-          .eq('is_archived', false),  // CRITICAL: Exclude archived deliveries
-        supabase
-          .from('payments')
-          .select('amount, payment_date')
-          .eq('shop_id', shopId),
-        supabase
-          .from('shop_pending_history')
-          .select('pending_amount, original_date')
-          .eq('shop_id', shopId)
-      ])
-
-      if (todayDeliveriesResult.error) throw todayDeliveriesResult.error
-      if (todayPaymentsResult.error) throw todayPaymentsResult.error
-      if (allDeliveriesResult.error) throw allDeliveriesResult.error
-      if (allPaymentsResult.error) throw allPaymentsResult.error
-      if (pendingHistoryResult.error) throw pendingHistoryResult.error
-
-      const todayDeliveries = todayDeliveriesResult.data || []
-      const todayPayments = todayPaymentsResult.data || []
-      const allDeliveries = allDeliveriesResult.data || []
-      const allPayments = allPaymentsResult.data || []
-      const pendingHistory = pendingHistoryResult.data || []
-
-      // Calculate today's pending - use unpaid amount per delivery
-      const todayPendingAmount = todayDeliveries?.reduce((sum, d) => {
-        const totalAmount = Number(d.total_amount) || 0
-        const paidAmount = Number(d.payment_amount) || 0
-        const unpaid = totalAmount - paidAmount
-        if (isNaN(unpaid) || unpaid < 0) {
-          console.error('Invalid delivery amount calculation:', d)
-          return sum
-        }
-        return sum + unpaid
-      }, 0) || 0
-
-      // Calculate previous pending (before today) - use unpaid amount per delivery
-      const previousDeliveries = allDeliveries?.filter(d => {
-        const deliveryDate = new Date(d.delivery_date).toISOString().split('T')[0]
-        return deliveryDate < today
-      }) || []
-      
-      const previousPendingAmount = previousDeliveries.reduce((sum, d) => {
-        const totalAmount = Number(d.total_amount) || 0
-        const paidAmount = Number(d.payment_amount) || 0
-        const unpaid = totalAmount - paidAmount
-        if (isNaN(unpaid) || unpaid < 0) {
-          console.error('Invalid previous delivery amount calculation:', d)
-          return sum
-        }
-        return sum + unpaid
-      }, 0)
-
-      // ALL manual pending goes to Previous Pending (as per business logic)
-      const manualPendingAmount = pendingHistory.reduce((sum, p) => {
-        const amount = Number(p.pending_amount) || 0
-        if (isNaN(amount) || amount < 0) {
-          console.error('Invalid manual pending amount:', p)
-          return sum
-        }
-        return sum + amount
-      }, 0)
 
-      // Calculate final pending amounts
-      // Today Pending = Only today's deliveries (unpaid amount)
-      // Previous Pending = Old deliveries (unpaid amount) + ALL manual pending
-      const adjustedTodayPending = todayPendingAmount
-      const adjustedPreviousPending = previousPendingAmount + manualPendingAmount
-
-      // Calculate total pending (delivery-based + manual pending)
-      const totalPendingAmount = adjustedTodayPending + adjustedPreviousPending
-
-      // Enhanced Debug logging for Smart Store investigation
-      console.log('🔍 SMART STORE DEBUG - Pending Amounts:', {
-        shopId,
-        today,
-        todayDeliveries: todayDeliveries.map(d => ({ total: d.total_amount, paid: d.payment_amount, unpaid: d.total_amount - d.payment_amount })),
-        previousDeliveries: previousDeliveries.map(d => ({ total: d.total_amount, paid: d.payment_amount, unpaid: d.total_amount - d.payment_amount, date: d.delivery_date })),
-        manualPendingHistory: pendingHistory.map(p => ({ amount: p.pending_amount, date: p.original_date })),
-        todayPendingAmount,
-        manualPendingAmount,
-        adjustedTodayPending,
-        previousPendingAmount,
-        adjustedPreviousPending,
-        totalPendingAmount,
-        calculation: `${todayPendingAmount} (today delivery only) + ${previousPendingAmount} (old delivery unpaid) + ${manualPendingAmount} (all manual pending) = ${adjustedPreviousPending} (previous total) = ${totalPendingAmount} (grand total)`
-      })
-      
-      console.log('🎯 FINAL STATE VALUES:', {
-        adjustedTodayPending,
-        adjustedPreviousPending,
-        totalPendingAmount
+      // Today / previous (old unpaid deliveries + all manual pending) / total,
+      // summed server-side; batched with the screen's other reads
+      const { data, error } = await rpcRead('get_shop_pending_breakdown', {
+        p_shop_id: shopId,
+        p_date: today
       })
 
-      setTodayPending(adjustedTodayPending)
-      setPreviousPending(adjustedPreviousPending)
-      setTotalPending(totalPendingAmount)
+      if (error) throw error
+      if (!data?.success) throw new Error(data?.error || 'Failed to load pending amounts')
+
+      const manual = Number(data.manual_pending) || 0
+      pendingLoaded.current = true
+      setPending({
+        today: Number(data.today_pending) || 0,
+        older: (Number(data.previous_pending) || 0) - manual,
+        manual
+      })
     } catch (error) {
       console.error('Error loading pending amounts:', error)
     }
@@ -413,18 +331,20 @@ export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenPro
           .select('id, total_amount, products, created_at')
           .eq('shop_id', shopId)
           // REMOVED is_archived filter to show complete history
-          .order('created_at', { ascending: false }),
+          .order('created_at', { ascending: false })
+          .limit(CHAT_HISTORY_LIMIT),
         supabase
           .from('payments')
           .select('id, amount, created_at')
           .eq('shop_id', shopId)
-          .order('created_at', { ascending: false }),
-        supabase
-          .from('activity_log')
-          .select('id, message, amount, created_at, activity_type, metadata')
-          .eq('shop_id', shopId)
-          .in('activity_type', ['delivery_added', 'payment_collected', 'payment_partial', 'pending_added'])
           .order('created_at', { ascending: false })
+          .limit(CHAT_HISTORY_LIMIT),
+        // Message text is derived server-side from structured activity data
+        rpcRead('get_shop_activity', {
+          p_shop_id: shopId,
+          p_limit: CHAT_HISTORY_LIMIT,
+          p_types: ['delivery_added', 'payment_collected', 'payment_partial', 'pending_added', 'daily_summary']
+        }, { columnar: true })
       ])
 
       if (deliveriesResult.error) throw deliveriesResult.error
@@ -445,30 +365,18 @@ export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenPro
       })
 
       // Convert to chat messages from actual deliveries/payments data
-      const deliveryMessages: ChatMessage[] = (deliveries || []).map(delivery => ({
-        id: `delivery-${delivery.id}`,
-        type: 'delivery',
-        content: formatDeliveryContent(delivery),
-        amount: delivery.total_amount,
-        timestamp: formatTimestamp(delivery.created_at),
-        date: new Date(delivery.created_at).toLocaleDateString(),
-        created_at: delivery.created_at
-      }))
+      const deliveryMessages: ChatMessage[] = (deliveries || []).map(delivery =>
+        deliveryMessage(`delivery-${delivery.id}`, delivery)
+      )
 
-      const paymentMessages: ChatMessage[] = (payments || []).map(payment => ({
-        id: `payment-${payment.id}`,
-        type: 'payment',
-        content: `${formatCurrency(payment.amount)} Paid`,
-        amount: payment.amount,
-        timestamp: formatTimestamp(payment.created_at),
-        date: new Date(payment.created_at).toLocaleDateString(),
-        created_at: payment.created_at
-      }))
+      const paymentMessages: ChatMessage[] = (payments || []).map(payment =>
+        paymentMessage(`payment-${payment.id}`, payment)
+      )
 
       // Convert activity logs to messages (for manual pending and any missing entries)
       const activityMessages: ChatMessage[] = (activityLogs || []).map(activity => ({
         id: `activity-${activity.id}`,
-        type: activity.activity_type === 'pending_added' ? 'pending' : activity.activity_type === 'delivery_added' ? 'delivery' : 'payment',
+        type: activity.activity_type === 'daily_summary' ? 'summary' : activity.activity_type === 'pending_added' ? 'pending' : activity.activity_type === 'delivery_added' ? 'delivery' : 'payment',
         content: activity.message,
         amount: activity.amount,
         timestamp: formatTimestamp(activity.created_at),
@@ -514,6 +422,26 @@ export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenPro
     return `${productLines}\nTotal: ${formatCurrency(total)}`
   }
 
+  const deliveryMessage = (id: string, delivery: any): ChatMessage => ({
+    id,
+    type: 'delivery',
+    content: formatDeliveryContent(delivery),
+    amount: delivery.total_amount,
+    timestamp: formatTimestamp(delivery.created_at),
+    date: new Date(delivery.created_at).toLocaleDateString(),
+    created_at: delivery.created_at
+  })
+
+  const paymentMessage = (id: string, payment: any): ChatMessage => ({
+    id,
+    type: 'payment',
+    content: `${formatCurrency(payment.amount)} Paid`,
+    amount: payment.amount,
+    timestamp: formatTimestamp(payment.created_at),
+    date: new Date(payment.created_at).toLocaleDateString(),
+    created_at: payment.created_at
+  })
+
   const scrollToBottom = () => {
     chatEndRef.current?.scrollIntoView({ behavior: 'smooth' })
   }
@@ -601,34 +529,29 @@ export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenPro
   const checkStockAvailability = async () => {
     const insufficientStock = []
     
-    for (const [productId, quantity] of Object.entries(selectedProducts)) {
-      if (quantity > 0) {
-        const product = milkProducts.find(p => p.id === productId)
-        if (product) {
-          try {
-            const { data: stockData, error } = await supabase
-              .from('stock')
-              .select('current_quantity')
-              .eq('product_name', product.name)
-
-            if (error) {
-              console.error('Error checking stock for', product.name, ':', error)
-              insufficientStock.push({ product: product.name, available: 0, requested: quantity })
-            } else if (!stockData || stockData.length === 0) {
-              // Product not found in stock table - assume no stock
-              console.warn('Product not found in stock:', product.name)
-              insufficientStock.push({ product: product.name, available: 0, requested: quantity })
-            } else {
-              const available = stockData[0]?.current_quantity || 0
-              if (available < quantity) {
-                insufficientStock.push({ product: product.name, available, requested: quantity })
-              }
-            }
-          } catch (error) {
-            console.error('Error checking stock for', product.name, ':', error)
-            insufficientStock.push({ product: product.name, available: 0, requested: quantity })
+    for (const { entity: product, quantity } of selectedMilk) {
+      try {
+        const { data: stockData, error } = await supabase
+          .from('stock')
+          .select('current_quantity')
+          .eq('product_name', product.name)
+
+        if (error) {
+          console.error('Error checking stock for', product.name, ':', error)
+          insufficientStock.push({ product: product.name, available: 0, requested: quantity })
+        } else if (!stockData || stockData.length === 0) {
+          // Product not found in stock table - assume no stock
+          console.warn('Product not found in stock:', product.name)
+          insufficientStock.push({ product: product.name, available: 0, requested: quantity })
+        } else {
+          const available = stockData[0]?.current_quantity || 0
+          if (available < quantity) {
+            insufficientStock.push({ product: product.name, available, requested: quantity })
           }
         }
+      } catch (error) {
+        console.error('Error checking stock for', product.name, ':', error)
+        insufficientStock.push({ product: product.name, available: 0, requested: quantity })
       }
     }
     
@@ -649,137 +572,110 @@ export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenPro
         return
       }
 
-      // Calculate total using custom rates if available
-      const totalAmount = Object.entries(selectedProducts).reduce((sum, [productId, quantity]) => {
-        const product = milkProducts.find(p => p.id === productId)
-        if (!product) return sum
-        
-        // Use custom rate if available, otherwise use default rate
-        const customRate = customRates[product.name]
-        const rate = customRate !== undefined ? customRate : product.price_per_packet
-        
-        return sum + (rate * quantity)
-      }, 0)
-
-      const products = Object.entries(selectedProducts)
-        .filter(([_, quantity]) => quantity > 0)
-        .map(([productId, quantity]) => {
-          const product = milkProducts.find(p => p.id === productId)
-          
-          // Use custom rate if available, otherwise use default rate
-          const customRate = customRates[product.name]
-          const rate = customRate !== undefined ? customRate : product.price_per_packet
-          
-          return {
-            id: productId,
-            name: product?.name || '',
-            price_per_packet: rate, // Use custom rate if set
-            quantity
-          }
+      // add_delivery prices the products from effective_prices (custom
+      // rates included) and logs the activity in the same transaction
+      const products = selectedMilk.map(({ entity, quantity }) => ({ milk_type_id: entity.id, quantity }))
+
+      // Shown at once from our prices; the RPC's pricing replaces it
+      const selection = selectedProducts
+      const delivered = selectedMilk
+      const expectedTotal = totalAmount
+      const tempId = `delivery-optimistic-${++optimisticIds.current}`
+      const createdAt = new Date().toISOString()
+      const changeStock = (sign: number) => setStockLevels(prev => {
+        const next = { ...prev }
+        delivered.forEach(({ entity, quantity }) => {
+          next[entity.name] = Math.max(0, (next[entity.name] || 0) + sign * quantity)
         })
+        return next
+      })
 
-      console.log('🥛 MILK DELIVERY DEBUG - Before saving:', {
-        shopId,
-        selectedProducts,
-        products,
-        totalAmount,
-        deliveryDate: new Date().toISOString().split('T')[0],
-        currentPending: { todayPending, previousPending, totalPending }
+      const result = await optimistic({
+        apply: () => {
+          const effect = deliveryEffect(expectedTotal)
+          setPending(prev => addPending(prev, effect))
+          changeStock(-1)
+          setMessages(prev => [...prev, deliveryMessage(tempId, {
+            total_amount: expectedTotal,
+            products: delivered.map(({ entity, quantity }) => ({
+              name: entity.name,
+              quantity,
+              price_per_packet: customRates[entity.name] !== undefined ? customRates[entity.name] : entity.price_per_packet
+            })),
+            created_at: createdAt
+          })])
+          const undoRow = patchShopRow(shopId, { daily_status: 'delivered' })
+          setSelectedProducts({})
+          setShowMilkModal(false)
+          return () => {
+            setPending(prev => addPending(prev, negatePending(effect)))
+            changeStock(1)
+            setMessages(prev => prev.filter(message => message.id !== tempId))
+            undoRow()
+            // Give the form back so the delivery can be retried
+            setSelectedProducts(selection)
+            setShowMilkModal(true)
+          }
+        },
+        run: () => rpcWrite(supabase.rpc('add_delivery', {
+          p_shop_id: shopId,
+          p_delivery_boy_id: '270cf1bb-44ff-4d62-b98f-24cb2aedcbcb',
+          p_products: products,
+          p_delivery_date: new Date().toISOString().split('T')[0],
+          p_notes: `Milk delivered to ${shop?.name}`
+        }), 'Failed to add delivery'),
+        reconcile: data => {
+          const total = Number(data.total_amount) || 0
+          setPending(prev => addPending(prev, deliveryEffect(total - expectedTotal)))
+          setMessages(prev => prev.map(message => message.id === tempId
+            ? deliveryMessage(`delivery-${data.delivery_id}`, { ...data, total_amount: total, created_at: createdAt })
+            : message
+          ))
+        }
       })
 
-      const { data: deliveryData, error } = await supabase
-        .from('deliveries')
-        .insert({
-          shop_id: shopId,
-          delivery_boy_id: '270cf1bb-44ff-4d62-b98f-24cb2aedcbcb',
-          delivery_date: new Date().toISOString().split('T')[0],
-          products: products,
-          total_amount: totalAmount,
-          payment_status: 'pending',
-          payment_amount: 0,
-          delivery_status: 'delivered',
-          notes: `Milk delivered to ${shop?.name}`,
-          delivered_at: new Date().toISOString()
-        })
-        .select()
-        .single()
+      console.log('✅ MILK DELIVERY SAVED - Amount:', result.total_amount, 'ID:', result.delivery_id)
 
-      if (error) throw error
+      // Reduce stock for delivered products (already shown locally)
+      for (const { entity: product, quantity } of delivered) {
+        try {
+          // Get current stock
+          const { data: stockData, error: stockError } = await supabase
+            .from('stock')
+            .select('current_quantity')
+            .eq('product_name', product.name)
 
-      console.log('✅ MILK DELIVERY SAVED - Amount:', totalAmount, 'ID:', deliveryData?.id)
+          if (stockError) {
+            console.error('Error fetching stock for', product.name, ':', stockError)
+            continue
+          }
 
-      // Create activity log entry for chat history
-      if (deliveryData?.id) {
-        const { error: activityError } = await supabase.from('activity_log').insert({
-          shop_id: shopId,
-          delivery_boy_id: '270cf1bb-44ff-4d62-b98f-24cb2aedcbcb',
-          activity_type: 'delivery_added',
-          message: `Delivery added to ${shop?.name || 'shop'}: ${formatCurrency(totalAmount)}`,
-          amount: totalAmount,
-          delivery_date: new Date().toISOString().split('T')[0],
-          metadata: { delivery_id: deliveryData.id }
-        })
+          if (!stockData || stockData.length === 0) {
+            console.warn('Product not found in stock for reduction:', product.name)
+            continue
+          }
 
-        if (activityError) {
-          console.error('❌ Error creating activity log:', activityError)
-        } else {
-          console.log('✅ Activity log created for delivery')
-        }
-      }
+          const currentQuantity = stockData[0]?.current_quantity || 0
+          const newQuantity = Math.max(0, currentQuantity - quantity)
+          
+          // Update stock
+          const { error: updateError } = await supabase
+            .from('stock')
+            .update({ current_quantity: newQuantity })
+            .eq('product_name', product.name)
 
-      // Reduce stock for delivered products
-      for (const [productId, quantity] of Object.entries(selectedProducts)) {
-        if (quantity > 0) {
-          const product = milkProducts.find(p => p.id === productId)
-          if (product) {
-            try {
-              // Get current stock
-              const { data: stockData, error: stockError } = await supabase
-                .from('stock')
-                .select('current_quantity')
-                .eq('product_name', product.name)
-
-              if (stockError) {
-                console.error('Error fetching stock for', product.name, ':', stockError)
-                continue
-              }
-
-              if (!stockData || stockData.length === 0) {
-                console.warn('Product not found in stock for reduction:', product.name)
-                continue
-              }
-
-              const currentQuantity = stockData[0]?.current_quantity || 0
-              const newQuantity = Math.max(0, currentQuantity - quantity)
-              
-              // Update stock
-              const { error: updateError } = await supabase
-                .from('stock')
-                .update({ current_quantity: newQuantity })
-                .eq('product_name', product.name)
-
-              if (updateError) {
-                console.error('Error updating stock for', product.name, ':', updateError)
-              } else {
-                console.log(`📦 STOCK REDUCED - ${product.name}: ${quantity} units (${currentQuantity} → ${newQuantity})`)
-              }
-            } catch (stockError) {
-              console.error('Error reducing stock for', product.name, ':', stockError)
-            }
+          if (updateError) {
+            console.error('Error updating stock for', product.name, ':', updateError)
+          } else {
+            console.log(`📦 STOCK REDUCED - ${product.name}: ${quantity} units (${currentQuantity} → ${newQuantity})`)
           }
+        } catch (stockError) {
+          console.error('Error reducing stock for', product.name, ':', stockError)
         }
       }
-
-      // Reset form
-      setSelectedProducts({})
-      setShowMilkModal(false)
-      
-      // Reload all data to refresh the UI
-      await loadAllData()
-      
-      console.log('🔄 DATA RELOADED - New pending amounts will be calculated')
     } catch (error) {
       console.error('❌ Error saving delivery:', error)
+      alert('Failed to save delivery. Please try again.')
     }
   }
 
@@ -800,27 +696,54 @@ export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenPro
         currentPending: { todayPending, previousPending, totalPending }
       })
 
-      // Use process_payment RPC function to handle FIFO logic and manual pending amounts
-      const { data, error } = await supabase.rpc('process_payment', {
-        p_shop_id: shopId,
-        p_amount: paymentAmount,
-        p_collected_by: 'delivery_boy',
-        p_payment_date: new Date().toISOString().split('T')[0],
-        p_notes: `Payment from ${shop?.name}`
+      // process_payment settles FIFO (older deliveries, today's, then manual
+      // pending); the estimate is replaced by what it reports it applied
+      const amount = paymentAmount
+      const paymentDate = new Date().toISOString().split('T')[0]
+      const expected = paymentEffect(pending, amount)
+      const tempId = `payment-optimistic-${++optimisticIds.current}`
+      const createdAt = new Date().toISOString()
+
+      const data = await optimistic({
+        apply: () => {
+          setPending(prev => addPending(prev, expected))
+          setMessages(prev => [...prev, paymentMessage(tempId, { amount, created_at: createdAt })])
+          const undoRow = patchShopRow(shopId, {
+            last_transaction: {
+              type: 'payment',
+              amount,
+              description: `Payment of ₹${amount}`,
+              created_at: createdAt
+            }
+          })
+          setPaymentAmount(0)
+          setShowPaymentModal(false)
+          return () => {
+            setPending(prev => addPending(prev, negatePending(expected)))
+            setMessages(prev => prev.filter(message => message.id !== tempId))
+            undoRow()
+            setPaymentAmount(amount)
+            setShowPaymentModal(true)
+          }
+        },
+        run: () => rpcWrite(supabase.rpc('process_payment', {
+          p_shop_id: shopId,
+          p_amount: amount,
+          p_collected_by: 'delivery_boy',
+          p_payment_date: paymentDate,
+          p_notes: `Payment from ${shop?.name}`
+        }), 'Failed to process payment'),
+        reconcile: result => {
+          const applied = paymentResultEffect(result, paymentDate)
+          setPending(prev => addPending(addPending(prev, negatePending(expected)), applied))
+          setMessages(prev => prev.map(message => message.id === tempId
+            ? { ...message, id: `payment-${result.payment_id}` }
+            : message
+          ))
+        }
       })
 
-      if (error) throw error
-
       console.log('✅ PAYMENT PROCESSED - Result:', data)
-
-      // Reset form
-      setPaymentAmount(0)
-      setShowPaymentModal(false)
-      
-      // Reload all data to refresh the UI
-      await loadAllData()
-      
-      console.log('🔄 DATA RELOADED - New pending amounts will be calculated')
     } catch (error) {
       console.error('❌ Error saving payment:', error)
       alert('Failed to process payment. Please try again.')
@@ -836,22 +759,9 @@ export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenPro
     }))
   }
 
-  const getTotalAmount = () => {
-    return Object.entries(selectedProducts).reduce((sum, [productId, quantity]) => {
-      const product = milkProducts.find(p => p.id === productId)
-      if (!product) return sum
-      
-      // Use custom rate if available, otherwise use default rate
-      const customRate = customRates[product.name]
-      const rate = customRate !== undefined ? customRate : product.price_per_packet
-      
-      return sum + (rate * quantity)
-    }, 0)
-  }
-
   const handleSaveShop = async () => {
     try {
-      const { error } = await supabase
+      const { data, error } = await supabase
         .from('shops')
         .update({
           name: editForm.name,
@@ -861,11 +771,17 @@ export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenPro
           route_number: editForm.route_number
         })
         .eq('id', shopId)
+        .select('id, name, address, phone, owner_name, route_number')
+        .single()
 
       if (error) throw error
 
-      // Reload shop data
-      await loadShopData()
+      // Patch the shared store, so the shop lists show the edit too
+      if (shops.byId.has(shopId)) {
+        upsertEntities('shops', [data])
+      } else {
+        setFetchedShop(data)
+      }
       setShowEditModal(false)
     } catch (error) {
       console.error('Error updating shop:', error)
@@ -941,18 +857,21 @@ export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenPro
                 ? 'bg-blue-100 text-blue-900' 
                 : message.type === 'pending'
                 ? 'bg-amber-100 text-amber-900'
+                : message.type === 'summary'
+                ? 'bg-gray-100 text-gray-700'
                 : 'bg-green-100 text-green-900'
             }`}>
               <div className="flex items-center space-x-2 mb-1">
                 {message.type === 'delivery' ? (
                   <ArrowUp className="w-4 h-4" />
-                ) : message.type === 'pending' ? (
+                ) : message.type === 'pending' || message.type === 'summary' ? (
                   <Clock className="w-4 h-4" />
                 ) : (
                   <ArrowDown className="w-4 h-4" />
                 )}
                 <span className="text-xs font-medium">{message.timestamp}</span>
-                {message.type === 'delivery' && (
+                {/* No delete until add_delivery returns the real id */}
+                {message.type === 'delivery' && !message.id.startsWith('delivery-optimistic-') && (
                   <button
                     onClick={() => deleteDelivery(message.id.replace('delivery-', ''))}
                     className="ml-auto text-xs text-red-600 hover:text-red-800"
@@ -1083,7 +1002,7 @@ export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenPro
               <div className="bg-blue-50 rounded-xl p-4 mb-4">
                 <div className="flex justify-between items-center">
                   <span className="font-semibold text-gray-900 text-lg">Total:</span>
-                  <span className="text-2xl font-bold text-blue-600">{formatCurrency(getTotalAmount())}</span>
+                  <span className="text-2xl font-bold text-blue-600">{formatCurrency(totalAmount)}</span>
                 </div>
               </div>
 
@@ -1096,7 +1015,7 @@ export default function ShopDetailScreen({ shopId, onBack }: ShopDetailScreenPro
                 </button>
                 <button
                   onClick={handleSaveMilk}
-                  disabled={getTotalAmount() === 0}
+                  disabled={totalAmount === 0}
                   className="flex-1 px-6 py-4 bg-blue-600 text-white rounded-xl hover:bg-blue-700 disabled:bg-gray-300 disabled:cursor-not-allowed font-semibold text-base transition-colors touch-manipulation"
                 >
                   Save Delivery
@@ -1,26 +1,26 @@
-import { useState, useEffect } from 'react'
+import { useState, useMemo } from 'react'
 import { supabase } from '../lib/supabase'
+import { useEntities, useAppActions, ShopEntity } from '../context/AppContext'
+import { selectList } from '../lib/entityStore'
 import { Plus, Edit, Trash2, Save, X, ArrowLeft } from 'lucide-react'
 
-interface Shop {
-  id: string
-  name: string
-  address: string
-  phone: string
-  owner_name: string
-  route_number: string
-  is_active: boolean
-}
+const SHOP_COLUMNS = 'id, name, address, phone, owner_name, route_number'
 
 interface ShopManagementScreenProps {
   onBack?: () => void
 }
 
 export default function ShopManagementScreen({ onBack }: ShopManagementScreenProps) {
-  const [shops, setShops] = useState<Shop[]>([])
-  const [loading, setLoading] = useState(true)
+  // Active shops from the shared entity store, by route
+  const { shops: shopTable, isLoading } = useEntities()
+  const { upsertEntities, removeEntities } = useAppActions()
+  const shops = useMemo(
+    () => [...selectList(shopTable)].sort((a, b) => (Number(a.route_number) || 0) - (Number(b.route_number) || 0)),
+    [shopTable]
+  )
+  const loading = isLoading && shops.length === 0
   const [showAddForm, setShowAddForm] = useState(false)
-  const [editingShop, setEditingShop] = useState<Shop | null>(null)
+  const [editingShop, setEditingShop] = useState<ShopEntity | null>(null)
   const [formData, setFormData] = useState({
     name: '',
     address: '',
@@ -29,58 +29,41 @@ export default function ShopManagementScreen({ onBack }: ShopManagementScreenPro
     route_number: ''
   })
 
-  const fetchShops = async () => {
-    try {
-      setLoading(true)
-      const { data, error } = await supabase
-        .from('shops')
-        .select('*')
-        .eq('is_active', true)
-        .order('route_number', { ascending: true })
-
-      if (error) throw error
-      setShops(data || [])
-    } catch (error) {
-      console.error('Error fetching shops:', error)
-    } finally {
-      setLoading(false)
-    }
-  }
-
-  useEffect(() => {
-    fetchShops()
-  }, [])
-
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault()
     try {
       if (editingShop) {
         // Update existing shop
-        const { error } = await supabase
+        const { data, error } = await supabase
           .from('shops')
           .update(formData)
           .eq('id', editingShop.id)
+          .select(SHOP_COLUMNS)
+          .single()
 
         if (error) throw error
+        upsertEntities('shops', [data])
       } else {
         // Add new shop
-        const { error } = await supabase
+        const { data, error } = await supabase
           .from('shops')
           .insert([formData])
+          .select(SHOP_COLUMNS)
+          .single()
 
         if (error) throw error
+        upsertEntities('shops', [data])
       }
 
       setShowAddForm(false)
       setEditingShop(null)
       setFormData({ name: '', address: '', phone: '', owner_name: '', route_number: '' })
-      fetchShops()
     } catch (error) {
       console.error('Error saving shop:', error)
     }
   }
 
-  const handleEdit = (shop: Shop) => {
+  const handleEdit = (shop: ShopEntity) => {
     setEditingShop(shop)
     setFormData({
       name: shop.name,
@@ -102,7 +85,7 @@ export default function ShopManagementScreen({ onBack }: ShopManagementScreenPro
         .eq('id', shopId)
 
       if (error) throw error
-      fetchShops()
+      removeEntities('shops', [shopId])
     } catch (error) {
       console.error('Error deleting shop:', error)
     }
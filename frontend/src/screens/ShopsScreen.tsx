@@ -1,5 +1,10 @@
-import React, { useState, useEffect } from 'react';
-import { supabase } from '../lib/supabase';
+import React, { useState, useEffect, useRef, useMemo } from 'react';
+import { api } from '../services/api-simple';
+import { useEntities } from '../context/AppContext';
+import { EntityTable, emptyTable, indexEntities, upsertEntities, selectList } from '../lib/entityStore';
+import { loadSnapshot, saveSnapshot, isFromEarlierDay } from '../lib/snapshot';
+import { onMidnight } from '../lib/scheduler';
+import { onShopRowPatch, ShopRowPatch } from '../lib/optimistic';
 import { Search, Filter, Plus, Calendar, ArrowUp, ArrowDown } from 'lucide-react';
 
 interface Shop {
@@ -29,40 +34,78 @@ interface ShopsScreenProps {
 }
 
 const ShopsScreen: React.FC<ShopsScreenProps> = ({ onSelectShop, refreshTrigger }) => {
-  const [shops, setShops] = useState<Shop[]>([]);
+  // Overview rows (balance, today's status) by shop id, in list order.
+  // Name, owner, phone and route come from the shared entity store, so an
+  // edit made elsewhere shows here without a reload.
+  const { shops: shopTable } = useEntities();
+  const [rows, setRows] = useState<EntityTable<Shop>>(emptyTable);
   const [filteredShops, setFilteredShops] = useState<Shop[]>([]);
   const [searchTerm, setSearchTerm] = useState('');
   const [showDatePicker, setShowDatePicker] = useState(false);
   const [loading, setLoading] = useState(true);
   const [navigating, setNavigating] = useState(false);
+  // Showing the last snapshot until the first fetch lands
+  const [stale, setStale] = useState(false);
+  const hasList = useRef(false);
+  // Latest rows, for patches that need the values they replace
+  const rowsRef = useRef(rows);
+  rowsRef.current = rows;
+
+  const shops = useMemo(() => selectList(rows).map(row => {
+    const entity = shopTable.byId.get(row.id);
+    if (!entity) return row;
+    return {
+      ...row,
+      name: entity.name,
+      owner_name: entity.owner_name ?? row.owner_name,
+      phone: entity.phone ?? row.phone,
+      route_number: entity.route_number?.toString() ?? row.route_number
+    };
+  }), [rows, shopTable]);
+
+  // Cold start: render the last known list while the first fetch runs
+  useEffect(() => {
+    loadSnapshot<Shop[]>('shops_overview').then(snapshot => {
+      if (!snapshot || hasList.current) return;
+      // Delivered/paid-today flags from an earlier day no longer apply
+      const restored = isFromEarlierDay(snapshot)
+        ? snapshot.data.map(shop => ({ ...shop, daily_status: 'not_delivered' as const, last_transaction: undefined }))
+        : snapshot.data;
+      hasList.current = true;
+      setRows(indexEntities(restored));
+      setStale(true);
+      setLoading(false);
+    });
+  }, []);
 
   // Load shops data
   useEffect(() => {
     loadShopsData();
   }, [refreshTrigger]);
 
-  // Daily status reset at 12 AM
-  useEffect(() => {
-    const checkDailyReset = () => {
-      const now = new Date();
-      const currentHour = now.getHours();
-      const currentMinute = now.getMinutes();
-      
-      // Check if it's 12:00 AM (midnight)
-      if (currentHour === 0 && currentMinute === 0) {
-        // Reset daily status for all shops
-        resetDailyStatus();
-      }
-    };
-
-    // Check immediately
-    checkDailyReset();
-
-    // Set up interval to check every minute
-    const interval = setInterval(checkDailyReset, 60000); // Check every minute
-
-    return () => clearInterval(interval);
-  }, []);
+  // Writes made elsewhere (shop detail, payment modal) patch their row in
+  // place instead of reloading the list. The snapshot gets the patched list
+  // too (rollbacks come through here as well), so a reload before the next
+  // fetch doesn't bring back the old balances.
+  useEffect(() => onShopRowPatch((shopId, patch) => {
+    const row = rowsRef.current.byId.get(shopId);
+    if (!row) return null;
+    const previous: ShopRowPatch = {};
+    (Object.keys(patch) as Array<keyof ShopRowPatch>).forEach(field => {
+      (previous as any)[field] = row[field];
+    });
+    const next = upsertEntities(rowsRef.current, [{ id: shopId, ...patch }]);
+    rowsRef.current = next;
+    setRows(next);
+    saveSnapshot('shops_overview', selectList(next));
+    return previous;
+  }), []);
+
+  // Daily status reset at 12 AM (run on return to the app if it was
+  // in the background at midnight)
+  useEffect(() => onMidnight(() => {
+    resetDailyStatus();
+  }), []);
 
   const resetDailyStatus = async () => {
     try {
@@ -76,74 +119,28 @@ const ShopsScreen: React.FC<ShopsScreenProps> = ({ onSelectShop, refreshTrigger
 
   const loadShopsData = async () => {
     try {
-      setLoading(true);
+      // Keep a list on screen (snapshot or previous load) while refreshing
+      if (!hasList.current) setLoading(true);
       
-      // Get shops data
-      const { data: shops, error: shopsError } = await supabase
-        .from('shops')
-        .select('id, name, owner_name, phone, route_number')
-        .eq('is_active', true);
-
-      if (shopsError) throw shopsError;
-
-      // Get today's deliveries to check status
-      const { data: todayDeliveries, error: todayDeliveriesError } = await supabase
-        .from('deliveries')
-        .select('shop_id, total_amount, delivery_status')
-        .eq('delivery_date', new Date().toISOString().split('T')[0])
-        .eq('is_archived', false);
-
-      if (todayDeliveriesError) {
-        console.warn('Today deliveries query failed:', todayDeliveriesError);
-      }
-
-      // Get latest payments for each shop
-      const { data: todayPayments, error: todayPaymentsError } = await supabase
-        .from('payments')
-        .select('shop_id, amount, created_at')
-        .eq('payment_date', new Date().toISOString().split('T')[0])
-        .order('created_at', { ascending: false });
-
-      if (todayPaymentsError) {
-        console.warn('Today payments query failed:', todayPaymentsError);
-      }
-
-      // Process and combine data - use database function for accurate balance calculation
-      const processedShops = await Promise.all(shops?.map(async shop => {
-        // Use the database function for accurate balance calculation
-        const { data: balanceData, error: balanceError } = await supabase.rpc('get_shop_balance', {
-          p_shop_id: shop.id
-        });
-
-        if (balanceError) {
-          console.error(`Error getting balance for shop ${shop.name}:`, balanceError);
-        }
-
-        const currentBalance = balanceData?.total_pending || 0;
-        
-        // Get today's deliveries and payments
-        const shopDeliveries = todayDeliveries?.filter(d => d.shop_id === shop.id) || [];
-        const shopPayments = todayPayments?.filter(p => p.shop_id === shop.id) || [];
-        
-        const hasDeliveries = shopDeliveries.length > 0;
-        const lastPayment = shopPayments[0];
-
-        return {
-          id: shop.id,
-          name: shop.name,
-          owner_name: shop.owner_name,
-          phone: shop.phone,
-          route_number: shop.route_number?.toString() || '0',
-          current_balance: currentBalance,
-          daily_status: (hasDeliveries ? 'delivered' : 'not_delivered') as 'delivered' | 'not_delivered',
-          last_transaction: lastPayment ? {
-            type: 'payment' as 'delivery' | 'payment',
-            amount: lastPayment.amount,
-            description: `Payment of ₹${lastPayment.amount}`,
-            created_at: lastPayment.created_at
-          } : undefined
-        };
-      }) || []);
+      // One call for every active shop's balance, today's delivery flag and
+      // last payment (sent as a compact columnar response)
+      const overview = await api.getShopsOverview(new Date().toISOString().split('T')[0]);
+
+      const processedShops = (overview || []).map((shop: any) => ({
+        id: shop.shop_id,
+        name: shop.shop_name,
+        owner_name: shop.owner_name,
+        phone: shop.phone,
+        route_number: shop.route_number?.toString() || '0',
+        current_balance: shop.total_pending || 0,
+        daily_status: (shop.delivered_today ? 'delivered' : 'not_delivered') as 'delivered' | 'not_delivered',
+        last_transaction: shop.last_payment_at ? {
+          type: 'payment' as 'delivery' | 'payment',
+          amount: shop.last_payment_amount,
+          description: `Payment of ₹${shop.last_payment_amount}`,
+          created_at: shop.last_payment_at
+        } : undefined
+      }));
 
       // Sort shops: not delivered first, then delivered
       const sortedShops = processedShops.sort((a, b) => {
@@ -152,8 +149,10 @@ const ShopsScreen: React.FC<ShopsScreenProps> = ({ onSelectShop, refreshTrigger
         return 0;
       });
 
-      setShops(sortedShops);
-      setFilteredShops(sortedShops);
+      hasList.current = true;
+      setRows(indexEntities(sortedShops));
+      setStale(false);
+      saveSnapshot('shops_overview', sortedShops);
 
 
     } catch (error) {
@@ -215,7 +214,10 @@ const ShopsScreen: React.FC<ShopsScreenProps> = ({ onSelectShop, refreshTrigger
       <div className="bg-white shadow-sm border-b">
         <div className="px-4 py-3">
           <div className="flex items-center justify-between mb-4">
-            <h1 className="text-xl font-semibold text-gray-900">Shops</h1>
+            <div className="flex items-center space-x-2">
+              <h1 className="text-xl font-semibold text-gray-900">Shops</h1>
+              {stale && <span className="text-xs text-gray-500">Updating…</span>}
+            </div>
             <div className="flex items-center space-x-2">
               <button className="p-2 text-gray-600 hover:text-gray-900">
                 <Filter className="h-5 w-5" />
@@ -296,7 +298,7 @@ const ShopsScreen: React.FC<ShopsScreenProps> = ({ onSelectShop, refreshTrigger
                   </div>
                 </div>
 
-                <div className="text-right">
+                <div className={`text-right ${stale ? 'opacity-50' : ''}`} title={stale ? 'Last known balance, updating' : undefined}>
                   <div className={`text-xl font-bold ${shop.current_balance > 0 ? 'text-red-600' : 'text-green-600'}`}>
                     {formatCurrency(shop.current_balance)}
                   </div>
@@ -1,5 +1,6 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { supabase } from '../lib/supabase'
+import { loadSnapshot, saveSnapshot } from '../lib/snapshot'
 import { ArrowLeft, Plus, Minus, Save, Package, AlertTriangle } from 'lucide-react'
 
 interface StockManagementScreenProps {
@@ -19,15 +20,18 @@ export default function StockManagementScreen({ onBack }: StockManagementScreenP
   const [editingItem, setEditingItem] = useState<string | null>(null)
   const [editQuantity, setEditQuantity] = useState<number>(0)
   const [editThreshold, setEditThreshold] = useState<number>(10)
+  // Showing the last snapshot until the fetch lands
+  const [stale, setStale] = useState(false)
+  const hasList = useRef(false)
 
   const loadStockData = async () => {
     try {
-      setLoading(true)
+      if (!hasList.current) setLoading(true)
       console.log('🔍 STOCK DEBUG - Loading stock data...')
       
       const { data, error } = await supabase
         .from('stock')
-        .select('*')
+        .select('id, product_name, current_quantity, low_stock_threshold')
         .order('product_name')
 
       console.log('🔍 STOCK DEBUG - Supabase response:', { data, error })
@@ -38,10 +42,14 @@ export default function StockManagementScreen({ onBack }: StockManagementScreenP
       }
       
       console.log('✅ STOCK LOADED - Items:', data?.length || 0)
+      hasList.current = true
       setStockItems(data || [])
+      setStale(false)
+      saveSnapshot('stock', data || [])
     } catch (error) {
       console.error('❌ STOCK ERROR - Failed to load:', error)
-      alert('Failed to load stock data. Please check your connection.')
+      // Offline with a snapshot on screen: keep it, marked as stale
+      if (!hasList.current) alert('Failed to load stock data. Please check your connection.')
     } finally {
       setLoading(false)
     }
@@ -118,6 +126,13 @@ export default function StockManagementScreen({ onBack }: StockManagementScreenP
   }
 
   useEffect(() => {
+    loadSnapshot<StockItem[]>('stock').then(snapshot => {
+      if (!snapshot || hasList.current) return
+      hasList.current = true
+      setStockItems(snapshot.data)
+      setStale(true)
+      setLoading(false)
+    })
     loadStockData()
   }, [])
 
@@ -146,11 +161,12 @@ export default function StockManagementScreen({ onBack }: StockManagementScreenP
             </button>
           )}
           <h2 className="text-xl font-bold text-gray-900">Stock Management</h2>
+          {stale && <span className="text-xs text-gray-500">Updating…</span>}
         </div>
       </div>
 
       {/* Stock Items - Mobile Compact */}
-      <div className="space-y-2">
+      <div className={`space-y-2 ${stale ? 'opacity-60' : ''}`}>
         {stockItems.length === 0 ? (
           <div className="text-center py-8">
             <Package className="w-12 h-12 text-gray-400 mx-auto mb-4" />
@@ -57,6 +57,7 @@ export default function TestControls({ onDateChange }: TestControlsProps) {
       await supabase.from('shop_pending_history').delete().neq('id', '00000000-0000-0000-0000-000000000000')
       await supabase.from('payments').delete().neq('id', '00000000-0000-0000-0000-000000000000')
       await supabase.from('activity_log').delete().neq('id', '00000000-0000-0000-0000-000000000000')
+      await supabase.from('activity_log_daily').delete().neq('id', '00000000-0000-0000-0000-000000000000')
 
       setMessage('✅ All test data cleared! Fresh start ready.')
       onDateChange() // Trigger refresh
@@ -1,4 +1,101 @@
 import { supabase } from '../lib/supabase'
+import { READ_ONLY_RPCS } from '../lib/readRouting'
+
+type RpcResponse = { data: any; error: any }
+
+type RpcOptions = {
+  // Ask for list results as column names plus value arrays (decoded here)
+  columnar?: boolean
+}
+
+type QueuedCall = {
+  fn: string
+  args?: Record<string, any>
+  columnar: boolean
+  resolve: (response: RpcResponse) => void
+}
+
+// batch_rpc accepts at most 50 calls per request
+const MAX_BATCH_CALLS = 50
+
+let queuedCalls: QueuedCall[] = []
+let batchRpcAvailable = true
+let columnarRpcAvailable = true
+
+// { format: 'columnar', columns, rows } back to an array of row objects
+export const decodeColumnar = (data: any) => {
+  if (!data || data.format !== 'columnar') return data
+  const { columns, rows } = data as { columns: string[]; rows: any[][] }
+  return rows.map(values => {
+    const row: Record<string, any> = {}
+    columns.forEach((column, i) => {
+      row[column] = values[i]
+    })
+    return row
+  })
+}
+
+const settle = (call: QueuedCall, request: PromiseLike<RpcResponse>) => {
+  Promise.resolve(request).then(
+    ({ data, error }) => call.resolve({ data: error ? null : decodeColumnar(data), error }),
+    error => call.resolve({ data: null, error })
+  )
+}
+
+const sendSingle = async (call: QueuedCall) => {
+  if (call.columnar && columnarRpcAvailable) {
+    const response = await supabase.rpc('columnar_rpc', { p_fn: call.fn, p_args: call.args || {} })
+    if (response.error?.code !== 'PGRST202') {
+      settle(call, Promise.resolve(response))
+      return
+    }
+    // Database without columnar_rpc yet: plain calls from now on
+    columnarRpcAvailable = false
+  }
+  settle(call, supabase.rpc(call.fn, call.args))
+}
+
+const sendBatch = async (calls: QueuedCall[]) => {
+  if (calls.length === 1 || !batchRpcAvailable) {
+    calls.forEach(sendSingle)
+    return
+  }
+
+  const { data, error } = await supabase.rpc('batch_rpc', {
+    p_calls: calls.map(({ fn, args, columnar }) => ({ fn, args: args || {}, columnar }))
+  })
+  if (error || !data?.success) {
+    // Database without batch_rpc yet: stop trying and send calls one by one
+    if (error?.code === 'PGRST202') batchRpcAvailable = false
+    calls.forEach(sendSingle)
+    return
+  }
+
+  data.results.forEach((result: any, i: number) => {
+    settle(calls[i], Promise.resolve(result.error ? { data: null, error: result.error } : { data: result.data, error: null }))
+  })
+}
+
+const flushQueuedCalls = () => {
+  const calls = queuedCalls
+  queuedCalls = []
+  for (let i = 0; i < calls.length; i += MAX_BATCH_CALLS) {
+    sendBatch(calls.slice(i, i + MAX_BATCH_CALLS))
+  }
+}
+
+// Drop-in for supabase.rpc() on read-only functions: calls made in the same
+// tick go out together as one batch_rpc request, and each caller still gets
+// its own { data, error }. Other functions are passed straight through.
+export const rpcRead = (fn: string, args?: Record<string, any>, options: RpcOptions = {}): Promise<RpcResponse> => {
+  if (!READ_ONLY_RPCS.has(fn)) {
+    return Promise.resolve(supabase.rpc(fn, args))
+  }
+  return new Promise(resolve => {
+    queuedCalls.push({ fn, args, columnar: !!options.columnar, resolve })
+    if (queuedCalls.length === 1) setTimeout(flushQueuedCalls, 0)
+  })
+}
 
 // Simple API service without complex caching for production build
 export const api = {
@@ -6,13 +103,21 @@ export const api = {
   async getShops() {
     const { data, error } = await supabase
       .from('shops')
-      .select('*')
+      .select('id, name, address, phone, owner_name, route_number')
       .eq('is_active', true)
       .order('name')
     if (error) throw error
     return data
   },
 
+  async getShopsOverview(date?: string) {
+    const { data, error } = await rpcRead('get_shops_overview', {
+      p_date: date || new Date().toISOString().split('T')[0]
+    }, { columnar: true })
+    if (error) throw error
+    return data
+  },
+
   async getShopById(id: string) {
     const { data, error } = await supabase
       .from('shops')
@@ -27,7 +132,7 @@ export const api = {
   async getDeliveryBoys() {
     const { data, error } = await supabase
       .from('delivery_boys')
-      .select('*')
+      .select('id, name, phone')
       .eq('is_active', true)
       .order('name')
     if (error) throw error
@@ -38,7 +143,7 @@ export const api = {
   async getMilkTypes() {
     const { data, error } = await supabase
       .from('milk_types')
-      .select('*')
+      .select('id, name, price_per_packet')
       .eq('is_active', true)
       .order('name')
     if (error) throw error
@@ -60,7 +165,7 @@ export const api = {
   async getDeliveries(date?: string) {
     const { data, error } = await supabase
       .from('deliveries')
-      .select('*')
+      .select('id, shop_id, delivery_boy_id, products, total_amount, payment_amount, payment_status, delivery_date, created_at')
       .eq('delivery_date', date || new Date().toISOString().split('T')[0])
       .eq('is_archived', false)
       .order('created_at', { ascending: false })
@@ -91,23 +196,23 @@ export const api = {
 
   // Collection Views
   async getTodayCollection(date?: string) {
-    const { data, error } = await supabase.rpc('get_today_collection_view', {
+    const { data, error } = await rpcRead('get_today_collection_view', {
       p_date: date || new Date().toISOString().split('T')[0]
-    })
+    }, { columnar: true })
     if (error) throw error
     return data
   },
 
   async getReportsCollection(date: string) {
-    const { data, error } = await supabase.rpc('get_reports_collection_view', {
+    const { data, error } = await rpcRead('get_reports_collection_view', {
       p_date: date
-    })
+    }, { columnar: true })
     if (error) throw error
     return data
   },
 
   async getReportsDailySummary(date: string) {
-    const { data, error } = await supabase.rpc('get_reports_daily_summary', {
+    const { data, error } = await rpcRead('get_reports_daily_summary', {
       p_date: date
     })
     if (error) throw error
@@ -116,7 +221,7 @@ export const api = {
 
   // Shop Details
   async getShopDetail(shopId: string, date: string, functionName: string) {
-    const { data, error } = await supabase.rpc(functionName, {
+    const { data, error } = await rpcRead(functionName, {
       p_shop_id: shopId,
       p_date: date
     })
@@ -135,7 +240,7 @@ export const api = {
 
   // Shop Balance
   async getShopBalance(shopId: string) {
-    const { data, error } = await supabase.rpc('get_shop_balance', {
+    const { data, error } = await rpcRead('get_shop_balance', {
       p_shop_id: shopId
     })
     if (error) throw error
@@ -1,4 +1,5 @@
 import { ENV } from '../config/environment'
+import { scheduler } from '../lib/scheduler'
 
 // Session Management Utility
 export class SessionManager {
@@ -66,19 +67,18 @@ export class SessionManager {
     }
   }
 
-  // Auto-logout when session expires
+  // Auto-logout when session expires: one deadline at the expiry time,
+  // pushed back if the session was extended in the meantime
   static startSessionWatcher(onLogout: () => void): () => void {
-    const checkSession = () => {
-      if (!this.isSessionValid()) {
-        onLogout()
-        return
+    let loggedOut = false
+    return scheduler.every(
+      now => (loggedOut ? Infinity : now + this.getTimeRemaining()),
+      () => {
+        if (!this.isSessionValid()) {
+          loggedOut = true
+          onLogout()
+        }
       }
-    }
-
-    // Check every minute
-    const interval = setInterval(checkSession, 60000)
-
-    // Return cleanup function
-    return () => clearInterval(interval)
+    )
   }
 }
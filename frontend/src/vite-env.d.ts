@@ -3,6 +3,9 @@
 interface ImportMetaEnv {
   readonly VITE_REACT_APP_SUPABASE_URL: string
   readonly VITE_REACT_APP_SUPABASE_ANON_KEY: string
+  readonly VITE_REACT_APP_SUPABASE_REPLICA_URL?: string
+  readonly VITE_REACT_APP_SUPABASE_REPLICA_ANON_KEY?: string
+  readonly VITE_REACT_APP_REPLICA_MAX_LAG_MS?: string
   readonly VITE_REACT_APP_OWNER_USERNAME: string
   readonly VITE_REACT_APP_OWNER_PASSWORD: string
   readonly VITE_REACT_APP_STAFF_USERNAME: string
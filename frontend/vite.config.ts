@@ -1,13 +1,22 @@
 import { defineConfig } from 'vite'
 import react from '@vitejs/plugin-react'
+import { precompressPlugin } from './scripts/precompress.js'
+
+// REACT_PROFILING=1 npm run build: React's profiling build with readable
+// component names, so harness.trace gets render timings from a production
+// bundle
+const profiling = process.env.REACT_PROFILING === '1'
 
 // https://vite.dev/config/
 export default defineConfig({
-  plugins: [react()],
+  // Brotli/gzip variants plus dist/asset-manifest.json (served by npm run serve)
+  plugins: [react(), precompressPlugin()],
+  resolve: profiling
+    ? { alias: [{ find: /^react-dom$/, replacement: 'react-dom/profiling' }] }
+    : undefined,
+  esbuild: profiling ? { keepNames: true } : undefined,
   server: {
     port: 5173,
     host: 'localhost'
   }
 })
-
-
@@ -1,120 +1,75 @@
 import asyncio
-from playwright import async_api
 from playwright.async_api import expect
 
-async def run_test():
-    pw = None
-    browser = None
-    context = None
-    
-    try:
-        # Start a Playwright session in asynchronous mode
-        pw = await async_api.async_playwright().start()
-        
-        # Launch a Chromium browser in headless mode with custom arguments
-        browser = await pw.chromium.launch(
-            headless=True,
-            args=[
-                "--window-size=1280,720",         # Set the browser window size
-                "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
-                "--ipc=host",                     # Use host-level IPC for better stability
-                "--single-process"                # Run the browser in a single process mode
-            ],
-        )
-        
-        # Create a new browser context (like an incognito window)
-        context = await browser.new_context()
-        context.set_default_timeout(5000)
-        
-        # Open a new page in the browser context
-        page = await context.new_page()
-        
-        # Navigate to your target URL and wait until the network request is committed
-        await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
-        
-        # Wait for the main page to reach DOMContentLoaded state (optional for stability)
-        try:
-            await page.wait_for_load_state("domcontentloaded", timeout=3000)
-        except async_api.Error:
-            pass
-        
-        # Iterate through all iframes and wait for them to load as well
-        for frame in page.frames:
-            try:
-                await frame.wait_for_load_state("domcontentloaded", timeout=3000)
-            except async_api.Error:
-                pass
-        
-        # Interact with the page elements to simulate user flow
-        # -> Navigate to login screen
-        frame = context.pages[-1]
-        # Click Home button to check if it leads to login or login access
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/div/div/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+from harness import open_app, run_standalone, settle
 
-        # -> Click Settings button to check for login or logout options
-        frame = context.pages[-1]
-        # Click Settings button to check for login or logout options
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
 
-        # -> Click the Settings button (index 41) to check for login or logout options
-        frame = context.pages[-1]
-        # Click Settings button to check for login or logout options
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+async def run_test(context, page):
+    # Open the app and wait for its first data load to settle
+    await open_app(page)
 
-        # -> Click the Settings button (index 4) to check for login or logout options
-        frame = context.pages[-1]
-        # Click Settings button to check for login or logout options
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+    # Interact with the page elements to simulate user flow
+    # -> Navigate to login screen
+    frame = context.pages[-1]
+    # Click Home button to check if it leads to login or login access
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/div/div/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
 
-        # -> Enter valid PIN and submit to access settings
-        frame = context.pages[-1]
-        # Enter valid PIN 'owner123' to access settings
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('owner123')
-        
+    # -> Click Settings button to check for login or logout options
+    frame = context.pages[-1]
+    # Click Settings button to check for login or logout options
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
 
-        frame = context.pages[-1]
-        # Click Access Settings button to submit PIN
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+    # -> Click the Settings button (index 41) to check for login or logout options
+    frame = context.pages[-1]
+    # Click Settings button to check for login or logout options
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
 
-        # -> Enter a valid numeric PIN and submit to access settings
-        frame = context.pages[-1]
-        # Enter valid numeric PIN '1234' to access settings
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('1234')
-        
+    # -> Click the Settings button (index 4) to check for login or logout options
+    frame = context.pages[-1]
+    # Click Settings button to check for login or logout options
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
 
-        frame = context.pages[-1]
-        # Click Access Settings button to submit valid PIN
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+    # -> Enter valid PIN and submit to access settings
+    frame = context.pages[-1]
+    # Enter valid PIN 'owner123' to access settings
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
+    await settle(page); await elem.fill('owner123')
+    
 
-        # --> Assertions to verify final state
-        frame = context.pages[-1]
-        try:
-            await expect(frame.locator('text=Login Successful - Owner Dashboard').first).to_be_visible(timeout=1000)
-        except AssertionError:
-            raise AssertionError("Test case failed: Login was not successful with valid credentials, or role-based access to the appropriate home dashboard was not granted as per the test plan.")
-        await asyncio.sleep(5)
+    frame = context.pages[-1]
+    # Click Access Settings button to submit PIN
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
     
-    finally:
-        if context:
-            await context.close()
-        if browser:
-            await browser.close()
-        if pw:
-            await pw.stop()
-            
-asyncio.run(run_test())
-    
\ No newline at end of file
+
+    # -> Enter a valid numeric PIN and submit to access settings
+    frame = context.pages[-1]
+    # Enter valid numeric PIN '1234' to access settings
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
+    await settle(page); await elem.fill('1234')
+    
+
+    frame = context.pages[-1]
+    # Click Access Settings button to submit valid PIN
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # --> Assertions to verify final state
+    frame = context.pages[-1]
+    try:
+        await expect(frame.locator('text=Login Successful - Owner Dashboard').first).to_be_visible(timeout=1000)
+    except AssertionError:
+        raise AssertionError("Test case failed: Login was not successful with valid credentials, or role-based access to the appropriate home dashboard was not granted as per the test plan.")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_standalone(run_test))
@@ -1,177 +1,132 @@
 import asyncio
-from playwright import async_api
 from playwright.async_api import expect
 
-async def run_test():
-    pw = None
-    browser = None
-    context = None
+from harness import APP_URL, open_app, run_standalone, settle
+
+
+async def run_test(context, page):
+    # Open the app and wait for its first data load to settle
+    await open_app(page)
+
+    # Interact with the page elements to simulate user flow
+    # -> Find and navigate to the shop management screen
+    await page.mouse.wheel(0, 300)
+    
+
+    # -> Check if login is required or reload page to find navigation
+    await page.goto(f'{APP_URL}/login', timeout=10000)
+    await settle(page)
+    
+
+    # -> Click the '+' button to start creating a new shop
+    frame = context.pages[-1]
+    # Click the '+' button to add a new shop
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click the '+' button (index 40) to open the new shop creation form.
+    frame = context.pages[-1]
+    # Click the '+' button to add a new shop
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click the 'Shops' button (index 3) to navigate to the shop management screen.
+    frame = context.pages[-1]
+    # Click the 'Shops' button to go to shop management screen
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click the '+' button (index 40) to open the new shop creation form.
+    frame = context.pages[-1]
+    # Click the '+' button to add a new shop
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click the '+' button (index 40) to open the new shop creation form.
+    frame = context.pages[-1]
+    # Click the '+' button to add a new shop
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click the '+' button (index 40) to open the new shop creation form.
+    frame = context.pages[-1]
+    # Click the '+' button to add a new shop
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Try clicking the '+' button (index 40) again to open the new shop creation form, or try clicking on an existing shop to see if editing is possible.
+    frame = context.pages[-1]
+    # Click the '+' button to add a new shop
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
     
+
+    frame = context.pages[-1]
+    # Click on an existing shop 'prashant' to try editing
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div[2]/div/div').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click the 'Receive' button (index 4) to test updating shop details or related operations.
+    frame = context.pages[-1]
+    # Click the 'Receive' button to test updating shop details or related operations
+    elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Input a payment amount and save the payment to test updating shop details and activity logging.
+    frame = context.pages[-1]
+    # Enter payment amount 100
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[2]/div[2]/div/input').nth(0)
+    await settle(page); await elem.fill('100')
+    
+
+    frame = context.pages[-1]
+    # Click 'Save Payment' button to save the payment
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Check for a delete option or menu to delete the shop 'prashant'.
+    frame = context.pages[-1]
+    # Click 'Shops' button to go back to shop list to check for delete options
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    frame = context.pages[-1]
+    # Click on shop 'prashant' to check for delete option in detail view
+    elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Close the 'Receive Payment' modal and navigate back to the Shops list to check for any delete options or alternative ways to delete a shop.
+    frame = context.pages[-1]
+    # Click 'Cancel' button to close the 'Receive Payment' modal
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Check for any delete options or menus on the Shops list screen or shop detail view to test shop deletion.
+    frame = context.pages[-1]
+    # Click on shop 'prashant' to check for delete option in detail view
+    elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # --> Assertions to verify final state
+    frame = context.pages[-1]
     try:
-        # Start a Playwright session in asynchronous mode
-        pw = await async_api.async_playwright().start()
-        
-        # Launch a Chromium browser in headless mode with custom arguments
-        browser = await pw.chromium.launch(
-            headless=True,
-            args=[
-                "--window-size=1280,720",         # Set the browser window size
-                "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
-                "--ipc=host",                     # Use host-level IPC for better stability
-                "--single-process"                # Run the browser in a single process mode
-            ],
-        )
-        
-        # Create a new browser context (like an incognito window)
-        context = await browser.new_context()
-        context.set_default_timeout(5000)
-        
-        # Open a new page in the browser context
-        page = await context.new_page()
-        
-        # Navigate to your target URL and wait until the network request is committed
-        await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
-        
-        # Wait for the main page to reach DOMContentLoaded state (optional for stability)
-        try:
-            await page.wait_for_load_state("domcontentloaded", timeout=3000)
-        except async_api.Error:
-            pass
-        
-        # Iterate through all iframes and wait for them to load as well
-        for frame in page.frames:
-            try:
-                await frame.wait_for_load_state("domcontentloaded", timeout=3000)
-            except async_api.Error:
-                pass
-        
-        # Interact with the page elements to simulate user flow
-        # -> Find and navigate to the shop management screen
-        await page.mouse.wheel(0, 300)
-        
-
-        # -> Check if login is required or reload page to find navigation
-        await page.goto('http://localhost:5173/login', timeout=10000)
-        await asyncio.sleep(3)
-        
-
-        # -> Click the '+' button to start creating a new shop
-        frame = context.pages[-1]
-        # Click the '+' button to add a new shop
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the '+' button (index 40) to open the new shop creation form.
-        frame = context.pages[-1]
-        # Click the '+' button to add a new shop
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the 'Shops' button (index 3) to navigate to the shop management screen.
-        frame = context.pages[-1]
-        # Click the 'Shops' button to go to shop management screen
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the '+' button (index 40) to open the new shop creation form.
-        frame = context.pages[-1]
-        # Click the '+' button to add a new shop
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the '+' button (index 40) to open the new shop creation form.
-        frame = context.pages[-1]
-        # Click the '+' button to add a new shop
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the '+' button (index 40) to open the new shop creation form.
-        frame = context.pages[-1]
-        # Click the '+' button to add a new shop
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Try clicking the '+' button (index 40) again to open the new shop creation form, or try clicking on an existing shop to see if editing is possible.
-        frame = context.pages[-1]
-        # Click the '+' button to add a new shop
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        frame = context.pages[-1]
-        # Click on an existing shop 'prashant' to try editing
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div[2]/div/div').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the 'Receive' button (index 4) to test updating shop details or related operations.
-        frame = context.pages[-1]
-        # Click the 'Receive' button to test updating shop details or related operations
-        elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Input a payment amount and save the payment to test updating shop details and activity logging.
-        frame = context.pages[-1]
-        # Enter payment amount 100
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[2]/div[2]/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('100')
-        
-
-        frame = context.pages[-1]
-        # Click 'Save Payment' button to save the payment
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Check for a delete option or menu to delete the shop 'prashant'.
-        frame = context.pages[-1]
-        # Click 'Shops' button to go back to shop list to check for delete options
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        frame = context.pages[-1]
-        # Click on shop 'prashant' to check for delete option in detail view
-        elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Close the 'Receive Payment' modal and navigate back to the Shops list to check for any delete options or alternative ways to delete a shop.
-        frame = context.pages[-1]
-        # Click 'Cancel' button to close the 'Receive Payment' modal
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Check for any delete options or menus on the Shops list screen or shop detail view to test shop deletion.
-        frame = context.pages[-1]
-        # Click on shop 'prashant' to check for delete option in detail view
-        elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # --> Assertions to verify final state
-        frame = context.pages[-1]
-        try:
-            await expect(frame.locator('text=Shop Creation Successful').first).to_be_visible(timeout=1000)
-        except AssertionError:
-            raise AssertionError("Test case failed: The test plan execution for creating, reading, updating, and deleting shops with activity logging and unique shop name validation has failed. The expected success message 'Shop Creation Successful' was not found, indicating the test did not pass as intended.")
-        await asyncio.sleep(5)
-    
-    finally:
-        if context:
-            await context.close()
-        if browser:
-            await browser.close()
-        if pw:
-            await pw.stop()
-            
-asyncio.run(run_test())
-    
\ No newline at end of file
+        await expect(frame.locator('text=Shop Creation Successful').first).to_be_visible(timeout=1000)
+    except AssertionError:
+        raise AssertionError("Test case failed: The test plan execution for creating, reading, updating, and deleting shops with activity logging and unique shop name validation has failed. The expected success message 'Shop Creation Successful' was not found, indicating the test did not pass as intended.")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_standalone(run_test))
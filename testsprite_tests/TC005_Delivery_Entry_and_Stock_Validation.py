@@ -1,155 +1,110 @@
 import asyncio
-from playwright import async_api
 from playwright.async_api import expect
 
-async def run_test():
-    pw = None
-    browser = None
-    context = None
+from harness import open_app, run_standalone, settle
+
+
+async def run_test(context, page):
+    # Open the app and wait for its first data load to settle
+    await open_app(page)
+
+    # Interact with the page elements to simulate user flow
+    # -> Click on Shops button to navigate to delivery screen or shop selection.
+    frame = context.pages[-1]
+    # Click Shops button to navigate to delivery screen or shop selection
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/div/div/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
     
-    try:
-        # Start a Playwright session in asynchronous mode
-        pw = await async_api.async_playwright().start()
-        
-        # Launch a Chromium browser in headless mode with custom arguments
-        browser = await pw.chromium.launch(
-            headless=True,
-            args=[
-                "--window-size=1280,720",         # Set the browser window size
-                "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
-                "--ipc=host",                     # Use host-level IPC for better stability
-                "--single-process"                # Run the browser in a single process mode
-            ],
-        )
-        
-        # Create a new browser context (like an incognito window)
-        context = await browser.new_context()
-        context.set_default_timeout(5000)
-        
-        # Open a new page in the browser context
-        page = await context.new_page()
-        
-        # Navigate to your target URL and wait until the network request is committed
-        await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
-        
-        # Wait for the main page to reach DOMContentLoaded state (optional for stability)
-        try:
-            await page.wait_for_load_state("domcontentloaded", timeout=3000)
-        except async_api.Error:
-            pass
-        
-        # Iterate through all iframes and wait for them to load as well
-        for frame in page.frames:
-            try:
-                await frame.wait_for_load_state("domcontentloaded", timeout=3000)
-            except async_api.Error:
-                pass
-        
-        # Interact with the page elements to simulate user flow
-        # -> Click on Shops button to navigate to delivery screen or shop selection.
-        frame = context.pages[-1]
-        # Click Shops button to navigate to delivery screen or shop selection
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/div/div/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click on a shop (e.g., 'bhagvat kaka') to start delivery creation.
-        frame = context.pages[-1]
-        # Click on shop 'bhagvat kaka' to start delivery creation
-        elem = frame.locator('xpath=html/body/div').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click 'Add Milk' button to select multiple milk products for delivery.
-        frame = context.pages[-1]
-        # Click 'Add Milk' button to select multiple milk products for delivery
-        elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Enter a quantity exceeding stock for the first product (खाऊ) to verify validation error.
-        frame = context.pages[-1]
-        # Enter quantity 101 exceeding stock 100 for product 'खाऊ'
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[2]/div/div/div[2]/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('101')
-        
-
-        # -> Check for any visible validation error message or UI indication preventing exceeding stock. If none, try to reduce quantity to a valid number (e.g., 100) and verify total recalculation.
-        frame = context.pages[-1]
-        # Click Cancel button to close Add Milk Delivery modal and reset input
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div[2]/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click 'Add Milk' button to reopen the modal and enter valid quantities for multiple products.
-        frame = context.pages[-1]
-        # Click 'Add Milk' button to reopen the Add Milk Delivery modal
-        elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Enter valid quantities for multiple products: 100 for 'खाऊ', 10 for 'गाय 1LR', 5 for 'गाय 500ml'.
-        frame = context.pages[-1]
-        # Enter valid quantity 100 for product 'खाऊ'
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[2]/div/div/div[2]/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('100')
-        
-
-        frame = context.pages[-1]
-        # Enter valid quantity 10 for product 'गाय 1LR'
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[2]/div/div[2]/div[2]/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('10')
-        
-
-        frame = context.pages[-1]
-        # Enter valid quantity 5 for product 'गाय 500ml'
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[2]/div/div[3]/div[2]/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('5')
-        
-
-        # -> Click 'Save Delivery' button to save the delivery record.
-        frame = context.pages[-1]
-        # Click 'Save Delivery' button to save the delivery record
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div[2]/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click 'Add Milk' button to open the modal and verify updated stock levels for the products.
-        frame = context.pages[-1]
-        # Click 'Add Milk' button to open modal and verify updated stock levels
-        elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Close the 'Add Milk Delivery' modal by clicking 'Cancel' and finish the test.
-        frame = context.pages[-1]
-        # Click 'Cancel' button to close the Add Milk Delivery modal
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div[2]/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Test deletion of the delivery record to verify if stock levels are restored correctly.
-        frame = context.pages[-1]
-        # Click 'Delete' button to delete the delivery record
-        elem = frame.locator('xpath=html/body/div/div/div/div[2]/div[3]/div/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # --> Assertions to verify final state
-        frame = context.pages[-1]
-        try:
-            await expect(frame.locator('text=Delivery Creation Successful').first).to_be_visible(timeout=1000)
-        except AssertionError:
-            raise AssertionError("Test case failed: Delivery creation flow with multi-product selection, stock checks, and accurate total calculations did not complete successfully as expected.")
-        await asyncio.sleep(5)
+
+    # -> Click on a shop (e.g., 'bhagvat kaka') to start delivery creation.
+    frame = context.pages[-1]
+    # Click on shop 'bhagvat kaka' to start delivery creation
+    elem = frame.locator('xpath=html/body/div').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click 'Add Milk' button to select multiple milk products for delivery.
+    frame = context.pages[-1]
+    # Click 'Add Milk' button to select multiple milk products for delivery
+    elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Enter a quantity exceeding stock for the first product (खाऊ) to verify validation error.
+    frame = context.pages[-1]
+    # Enter quantity 101 exceeding stock 100 for product 'खाऊ'
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[2]/div/div/div[2]/div/input').nth(0)
+    await settle(page); await elem.fill('101')
+    
+
+    # -> Check for any visible validation error message or UI indication preventing exceeding stock. If none, try to reduce quantity to a valid number (e.g., 100) and verify total recalculation.
+    frame = context.pages[-1]
+    # Click Cancel button to close Add Milk Delivery modal and reset input
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div[2]/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click 'Add Milk' button to reopen the modal and enter valid quantities for multiple products.
+    frame = context.pages[-1]
+    # Click 'Add Milk' button to reopen the Add Milk Delivery modal
+    elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Enter valid quantities for multiple products: 100 for 'खाऊ', 10 for 'गाय 1LR', 5 for 'गाय 500ml'.
+    frame = context.pages[-1]
+    # Enter valid quantity 100 for product 'खाऊ'
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[2]/div/div/div[2]/div/input').nth(0)
+    await settle(page); await elem.fill('100')
     
-    finally:
-        if context:
-            await context.close()
-        if browser:
-            await browser.close()
-        if pw:
-            await pw.stop()
-            
-asyncio.run(run_test())
-    
\ No newline at end of file
+
+    frame = context.pages[-1]
+    # Enter valid quantity 10 for product 'गाय 1LR'
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[2]/div/div[2]/div[2]/div/input').nth(0)
+    await settle(page); await elem.fill('10')
+    
+
+    frame = context.pages[-1]
+    # Enter valid quantity 5 for product 'गाय 500ml'
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[2]/div/div[3]/div[2]/div/input').nth(0)
+    await settle(page); await elem.fill('5')
+    
+
+    # -> Click 'Save Delivery' button to save the delivery record.
+    frame = context.pages[-1]
+    # Click 'Save Delivery' button to save the delivery record
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div[2]/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click 'Add Milk' button to open the modal and verify updated stock levels for the products.
+    frame = context.pages[-1]
+    # Click 'Add Milk' button to open modal and verify updated stock levels
+    elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Close the 'Add Milk Delivery' modal by clicking 'Cancel' and finish the test.
+    frame = context.pages[-1]
+    # Click 'Cancel' button to close the Add Milk Delivery modal
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div[2]/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Test deletion of the delivery record to verify if stock levels are restored correctly.
+    frame = context.pages[-1]
+    # Click 'Delete' button to delete the delivery record
+    elem = frame.locator('xpath=html/body/div/div/div/div[2]/div[3]/div/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # --> Assertions to verify final state
+    frame = context.pages[-1]
+    try:
+        await expect(frame.locator('text=Delivery Creation Successful').first).to_be_visible(timeout=1000)
+    except AssertionError:
+        raise AssertionError("Test case failed: Delivery creation flow with multi-product selection, stock checks, and accurate total calculations did not complete successfully as expected.")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_standalone(run_test))
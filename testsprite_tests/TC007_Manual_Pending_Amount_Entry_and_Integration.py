@@ -1,161 +1,116 @@
 import asyncio
-from playwright import async_api
 from playwright.async_api import expect
 
-async def run_test():
-    pw = None
-    browser = None
-    context = None
+from harness import open_app, run_standalone, settle
+
+
+async def run_test(context, page):
+    # Open the app and wait for its first data load to settle
+    await open_app(page)
+
+    # Interact with the page elements to simulate user flow
+    # -> Click on Shops button to navigate to shop details
+    frame = context.pages[-1]
+    # Click Shops button to navigate to shop details
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/div/div/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
     
-    try:
-        # Start a Playwright session in asynchronous mode
-        pw = await async_api.async_playwright().start()
-        
-        # Launch a Chromium browser in headless mode with custom arguments
-        browser = await pw.chromium.launch(
-            headless=True,
-            args=[
-                "--window-size=1280,720",         # Set the browser window size
-                "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
-                "--ipc=host",                     # Use host-level IPC for better stability
-                "--single-process"                # Run the browser in a single process mode
-            ],
-        )
-        
-        # Create a new browser context (like an incognito window)
-        context = await browser.new_context()
-        context.set_default_timeout(5000)
-        
-        # Open a new page in the browser context
-        page = await context.new_page()
-        
-        # Navigate to your target URL and wait until the network request is committed
-        await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
-        
-        # Wait for the main page to reach DOMContentLoaded state (optional for stability)
-        try:
-            await page.wait_for_load_state("domcontentloaded", timeout=3000)
-        except async_api.Error:
-            pass
-        
-        # Iterate through all iframes and wait for them to load as well
-        for frame in page.frames:
-            try:
-                await frame.wait_for_load_state("domcontentloaded", timeout=3000)
-            except async_api.Error:
-                pass
-        
-        # Interact with the page elements to simulate user flow
-        # -> Click on Shops button to navigate to shop details
-        frame = context.pages[-1]
-        # Click Shops button to navigate to shop details
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/div/div/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click on a specific shop from the list to open its details for adding manual pending amount
-        frame = context.pages[-1]
-        # Click on shop 'megha' to open shop details for adding manual pending amount
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div[2]/div/div[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click on 'Receive' button to add manual pending amount for existing customer
-        frame = context.pages[-1]
-        # Click 'Receive' button to add manual pending amount for existing customer
-        elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Close 'Receive Payment' modal by clicking Cancel button to access main shop details page
-        frame = context.pages[-1]
-        # Click Cancel button to close 'Receive Payment' modal
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click 'Add Milk' button to check if manual pending amount can be added or if it leads to relevant section
-        frame = context.pages[-1]
-        # Click 'Add Milk' button to explore adding manual pending amount or related options
-        elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Close 'Add Milk Delivery' modal by clicking Cancel button to explore other options for adding manual pending amount
-        frame = context.pages[-1]
-        # Click Cancel button to close 'Add Milk Delivery' modal
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div[2]/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click on 'Settings' button to check if manual pending amount management or related options are available there
-        frame = context.pages[-1]
-        # Click 'Settings' button to explore manual pending amount options
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Enter PIN 'owner123' and click Access Settings button to unlock settings
-        frame = context.pages[-1]
-        # Enter PIN 'owner123' to access settings
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('owner123')
-        
-
-        frame = context.pages[-1]
-        # Click Access Settings button to unlock settings
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Clear the PIN input field and enter a numeric PIN '1234' (example) and click Access Settings button
-        frame = context.pages[-1]
-        # Clear the PIN input field
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('')
-        
-
-        frame = context.pages[-1]
-        # Enter numeric PIN '1234' to access settings
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('1234')
-        
-
-        frame = context.pages[-1]
-        # Click Access Settings button to unlock settings
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Try to go back to Shops page and explore other ways to add manual pending amount for existing customer without accessing settings
-        frame = context.pages[-1]
-        # Click Shops button to go back to Shops page
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click on shop 'megha' to open shop details for adding manual pending amount
-        frame = context.pages[-1]
-        # Click on shop 'megha' to open shop details
-        elem = frame.locator('xpath=html/body/div').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # --> Assertions to verify final state
-        frame = context.pages[-1]
-        try:
-            await expect(frame.locator('text=Manual Pending Amount Successfully Added').first).to_be_visible(timeout=1000)
-        except AssertionError:
-            raise AssertionError("Test case failed: Adding manual pending amounts for old customers did not integrate correctly with payments and reporting as expected.")
-        await asyncio.sleep(5)
+
+    # -> Click on a specific shop from the list to open its details for adding manual pending amount
+    frame = context.pages[-1]
+    # Click on shop 'megha' to open shop details for adding manual pending amount
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div[2]/div/div[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click on 'Receive' button to add manual pending amount for existing customer
+    frame = context.pages[-1]
+    # Click 'Receive' button to add manual pending amount for existing customer
+    elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Close 'Receive Payment' modal by clicking Cancel button to access main shop details page
+    frame = context.pages[-1]
+    # Click Cancel button to close 'Receive Payment' modal
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click 'Add Milk' button to check if manual pending amount can be added or if it leads to relevant section
+    frame = context.pages[-1]
+    # Click 'Add Milk' button to explore adding manual pending amount or related options
+    elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Close 'Add Milk Delivery' modal by clicking Cancel button to explore other options for adding manual pending amount
+    frame = context.pages[-1]
+    # Click Cancel button to close 'Add Milk Delivery' modal
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div[2]/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click on 'Settings' button to check if manual pending amount management or related options are available there
+    frame = context.pages[-1]
+    # Click 'Settings' button to explore manual pending amount options
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Enter PIN 'owner123' and click Access Settings button to unlock settings
+    frame = context.pages[-1]
+    # Enter PIN 'owner123' to access settings
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
+    await settle(page); await elem.fill('owner123')
     
-    finally:
-        if context:
-            await context.close()
-        if browser:
-            await browser.close()
-        if pw:
-            await pw.stop()
-            
-asyncio.run(run_test())
-    
\ No newline at end of file
+
+    frame = context.pages[-1]
+    # Click Access Settings button to unlock settings
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Clear the PIN input field and enter a numeric PIN '1234' (example) and click Access Settings button
+    frame = context.pages[-1]
+    # Clear the PIN input field
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
+    await settle(page); await elem.fill('')
+    
+
+    frame = context.pages[-1]
+    # Enter numeric PIN '1234' to access settings
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
+    await settle(page); await elem.fill('1234')
+    
+
+    frame = context.pages[-1]
+    # Click Access Settings button to unlock settings
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Try to go back to Shops page and explore other ways to add manual pending amount for existing customer without accessing settings
+    frame = context.pages[-1]
+    # Click Shops button to go back to Shops page
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click on shop 'megha' to open shop details for adding manual pending amount
+    frame = context.pages[-1]
+    # Click on shop 'megha' to open shop details
+    elem = frame.locator('xpath=html/body/div').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # --> Assertions to verify final state
+    frame = context.pages[-1]
+    try:
+        await expect(frame.locator('text=Manual Pending Amount Successfully Added').first).to_be_visible(timeout=1000)
+    except AssertionError:
+        raise AssertionError("Test case failed: Adding manual pending amounts for old customers did not integrate correctly with payments and reporting as expected.")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_standalone(run_test))
@@ -1,156 +1,111 @@
 import asyncio
-from playwright import async_api
 from playwright.async_api import expect
 
-async def run_test():
-    pw = None
-    browser = None
-    context = None
+from harness import APP_URL, open_app, run_standalone, settle
+
+
+async def run_test(context, page):
+    # Open the app and wait for its first data load to settle
+    await open_app(page)
+
+    # Interact with the page elements to simulate user flow
+    # -> Scroll down or try to find login or navigation elements to proceed with login as business owner
+    await page.mouse.wheel(0, await page.evaluate('() => window.innerHeight'))
     
-    try:
-        # Start a Playwright session in asynchronous mode
-        pw = await async_api.async_playwright().start()
-        
-        # Launch a Chromium browser in headless mode with custom arguments
-        browser = await pw.chromium.launch(
-            headless=True,
-            args=[
-                "--window-size=1280,720",         # Set the browser window size
-                "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
-                "--ipc=host",                     # Use host-level IPC for better stability
-                "--single-process"                # Run the browser in a single process mode
-            ],
-        )
-        
-        # Create a new browser context (like an incognito window)
-        context = await browser.new_context()
-        context.set_default_timeout(5000)
-        
-        # Open a new page in the browser context
-        page = await context.new_page()
-        
-        # Navigate to your target URL and wait until the network request is committed
-        await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
-        
-        # Wait for the main page to reach DOMContentLoaded state (optional for stability)
-        try:
-            await page.wait_for_load_state("domcontentloaded", timeout=3000)
-        except async_api.Error:
-            pass
-        
-        # Iterate through all iframes and wait for them to load as well
-        for frame in page.frames:
-            try:
-                await frame.wait_for_load_state("domcontentloaded", timeout=3000)
-            except async_api.Error:
-                pass
-        
-        # Interact with the page elements to simulate user flow
-        # -> Scroll down or try to find login or navigation elements to proceed with login as business owner
-        await page.mouse.wheel(0, await page.evaluate('() => window.innerHeight'))
-        
-
-        # -> Try to reload the page or open login page directly to find login form
-        await page.goto('http://localhost:5173/login', timeout=10000)
-        await asyncio.sleep(3)
-        
-
-        # -> Try clicking 'Home' button to see if it reveals login form or login options
-        frame = context.pages[-1]
-        # Click Home button to check for login form or options
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/div/div/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Try clicking the 'Settings' button to check if login or authentication options are available there
-        frame = context.pages[-1]
-        # Click Settings button to check for login or authentication options
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the 'Settings' button to check for login or authentication options
-        frame = context.pages[-1]
-        # Click Settings button to check for login or authentication options
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Enter the PIN 'owner123' to access settings and proceed with login as business owner
-        frame = context.pages[-1]
-        # Enter PIN to access settings
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('owner123')
-        
-
-        frame = context.pages[-1]
-        # Click Access Settings button to submit PIN and access settings
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Enter a numeric PIN to access settings and proceed with testing daily reset and delivery verification
-        frame = context.pages[-1]
-        # Enter numeric PIN to access settings
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('123456')
-        
-
-        frame = context.pages[-1]
-        # Click Access Settings button to submit numeric PIN
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Try to use the 'Home' button to navigate back and check if there is an alternative login or access method
-        frame = context.pages[-1]
-        # Click Home button to check for alternative login or access options
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the 'Shops' button to check for delivery details and payment statuses before reset
-        frame = context.pages[-1]
-        # Click Shops button to view delivery details and payment statuses
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the 'Settings' button to try to initiate the daily reset process
-        frame = context.pages[-1]
-        # Click Settings button to try to initiate daily reset process
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Enter a numeric PIN to access settings and initiate the daily reset process
-        frame = context.pages[-1]
-        # Enter numeric PIN to access settings
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('0000')
-        
-
-        frame = context.pages[-1]
-        # Click Access Settings button to submit PIN
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # --> Assertions to verify final state
-        frame = context.pages[-1]
-        try:
-            await expect(frame.locator('text=Daily Reset Completed Successfully').first).to_be_visible(timeout=1000)
-        except AssertionError:
-            raise AssertionError("Test case failed: The daily reset process did not complete as expected. Paid deliveries may not have been archived, pending data might have been lost, or summary reports could be inaccurate.")
-        await asyncio.sleep(5)
+
+    # -> Try to reload the page or open login page directly to find login form
+    await page.goto(f'{APP_URL}/login', timeout=10000)
+    await settle(page)
+    
+
+    # -> Try clicking 'Home' button to see if it reveals login form or login options
+    frame = context.pages[-1]
+    # Click Home button to check for login form or options
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/div/div/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Try clicking the 'Settings' button to check if login or authentication options are available there
+    frame = context.pages[-1]
+    # Click Settings button to check for login or authentication options
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click the 'Settings' button to check for login or authentication options
+    frame = context.pages[-1]
+    # Click Settings button to check for login or authentication options
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Enter the PIN 'owner123' to access settings and proceed with login as business owner
+    frame = context.pages[-1]
+    # Enter PIN to access settings
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
+    await settle(page); await elem.fill('owner123')
+    
+
+    frame = context.pages[-1]
+    # Click Access Settings button to submit PIN and access settings
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Enter a numeric PIN to access settings and proceed with testing daily reset and delivery verification
+    frame = context.pages[-1]
+    # Enter numeric PIN to access settings
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
+    await settle(page); await elem.fill('123456')
     
-    finally:
-        if context:
-            await context.close()
-        if browser:
-            await browser.close()
-        if pw:
-            await pw.stop()
-            
-asyncio.run(run_test())
-    
\ No newline at end of file
+
+    frame = context.pages[-1]
+    # Click Access Settings button to submit numeric PIN
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Try to use the 'Home' button to navigate back and check if there is an alternative login or access method
+    frame = context.pages[-1]
+    # Click Home button to check for alternative login or access options
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click the 'Shops' button to check for delivery details and payment statuses before reset
+    frame = context.pages[-1]
+    # Click Shops button to view delivery details and payment statuses
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click the 'Settings' button to try to initiate the daily reset process
+    frame = context.pages[-1]
+    # Click Settings button to try to initiate daily reset process
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Enter a numeric PIN to access settings and initiate the daily reset process
+    frame = context.pages[-1]
+    # Enter numeric PIN to access settings
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
+    await settle(page); await elem.fill('0000')
+    
+
+    frame = context.pages[-1]
+    # Click Access Settings button to submit PIN
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # --> Assertions to verify final state
+    frame = context.pages[-1]
+    try:
+        await expect(frame.locator('text=Daily Reset Completed Successfully').first).to_be_visible(timeout=1000)
+    except AssertionError:
+        raise AssertionError("Test case failed: The daily reset process did not complete as expected. Paid deliveries may not have been archived, pending data might have been lost, or summary reports could be inaccurate.")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_standalone(run_test))
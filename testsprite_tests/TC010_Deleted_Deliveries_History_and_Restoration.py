@@ -1,143 +1,98 @@
 import asyncio
-from playwright import async_api
 from playwright.async_api import expect
 
-async def run_test():
-    pw = None
-    browser = None
-    context = None
+from harness import open_app, run_standalone, settle
+
+
+async def run_test(context, page):
+    # Open the app and wait for its first data load to settle
+    await open_app(page)
+
+    # Interact with the page elements to simulate user flow
+    # -> Click on the Shops button to view shops and their deliveries.
+    frame = context.pages[-1]
+    # Click the Shops button to view shops and their deliveries
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/div/div/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
     
-    try:
-        # Start a Playwright session in asynchronous mode
-        pw = await async_api.async_playwright().start()
-        
-        # Launch a Chromium browser in headless mode with custom arguments
-        browser = await pw.chromium.launch(
-            headless=True,
-            args=[
-                "--window-size=1280,720",         # Set the browser window size
-                "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
-                "--ipc=host",                     # Use host-level IPC for better stability
-                "--single-process"                # Run the browser in a single process mode
-            ],
-        )
-        
-        # Create a new browser context (like an incognito window)
-        context = await browser.new_context()
-        context.set_default_timeout(5000)
-        
-        # Open a new page in the browser context
-        page = await context.new_page()
-        
-        # Navigate to your target URL and wait until the network request is committed
-        await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
-        
-        # Wait for the main page to reach DOMContentLoaded state (optional for stability)
-        try:
-            await page.wait_for_load_state("domcontentloaded", timeout=3000)
-        except async_api.Error:
-            pass
-        
-        # Iterate through all iframes and wait for them to load as well
-        for frame in page.frames:
-            try:
-                await frame.wait_for_load_state("domcontentloaded", timeout=3000)
-            except async_api.Error:
-                pass
-        
-        # Interact with the page elements to simulate user flow
-        # -> Click on the Shops button to view shops and their deliveries.
-        frame = context.pages[-1]
-        # Click the Shops button to view shops and their deliveries
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/div/div/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click on a shop from the list to open its delivery details.
-        frame = context.pages[-1]
-        # Click on the first shop 'bhagvat kaka' to open its delivery details
-        elem = frame.locator('xpath=html/body/div').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the 'Receive' button to view deliveries and delete one.
-        frame = context.pages[-1]
-        # Click the 'Receive' button to view deliveries for deletion
-        elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the 'Cancel' button to close the 'Receive Payment' popup and return to the delivery details page.
-        frame = context.pages[-1]
-        # Click the 'Cancel' button to close the 'Receive Payment' popup
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click on the delivery item or a button to delete a delivery from the shop detail page.
-        frame = context.pages[-1]
-        # Click on the first delivery item or delete button to delete a delivery
-        elem = frame.locator('xpath=html/body/div/div/div/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click on the 'mama' shop entry to open its delivery details.
-        frame = context.pages[-1]
-        # Click on the 'mama' shop entry to open delivery details
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div[2]/div/div[4]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the 'Add Milk' button to check if it leads to delivery management options including delete.
-        frame = context.pages[-1]
-        # Click the 'Add Milk' button to explore delivery management options
-        elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the 'Cancel' button (index 29) to close the 'Add Milk Delivery' form and return to the delivery details page.
-        frame = context.pages[-1]
-        # Click the 'Cancel' button to close the 'Add Milk Delivery' form
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div[2]/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the 'Receive' button (index 4) to check if it leads to delivery management options including delete.
-        frame = context.pages[-1]
-        # Click the 'Receive' button to view deliveries for deletion
-        elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the 'Cancel' button (index 4) to close the 'Receive Payment' modal and return to the delivery details page.
-        frame = context.pages[-1]
-        # Click the 'Cancel' button to close the 'Receive Payment' modal
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the 'Shops' button (index 7) to navigate to the Shops page and check for deleted deliveries history or related options.
-        frame = context.pages[-1]
-        # Click the 'Shops' button to navigate to Shops page for deleted deliveries history
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # --> Assertions to verify final state
-        frame = context.pages[-1]
-        try:
-            await expect(frame.locator('text=Delivery Restoration Successful').first).to_be_visible(timeout=1000)
-        except AssertionError:
-            raise AssertionError("Test failed: Deleted deliveries are not properly tracked, restored, or stock levels updated as per the test plan.")
-        await asyncio.sleep(5)
+
+    # -> Click on a shop from the list to open its delivery details.
+    frame = context.pages[-1]
+    # Click on the first shop 'bhagvat kaka' to open its delivery details
+    elem = frame.locator('xpath=html/body/div').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click the 'Receive' button to view deliveries and delete one.
+    frame = context.pages[-1]
+    # Click the 'Receive' button to view deliveries for deletion
+    elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
     
-    finally:
-        if context:
-            await context.close()
-        if browser:
-            await browser.close()
-        if pw:
-            await pw.stop()
-            
-asyncio.run(run_test())
-    
\ No newline at end of file
+
+    # -> Click the 'Cancel' button to close the 'Receive Payment' popup and return to the delivery details page.
+    frame = context.pages[-1]
+    # Click the 'Cancel' button to close the 'Receive Payment' popup
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click on the delivery item or a button to delete a delivery from the shop detail page.
+    frame = context.pages[-1]
+    # Click on the first delivery item or delete button to delete a delivery
+    elem = frame.locator('xpath=html/body/div/div/div/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click on the 'mama' shop entry to open its delivery details.
+    frame = context.pages[-1]
+    # Click on the 'mama' shop entry to open delivery details
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div[2]/div/div[4]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click the 'Add Milk' button to check if it leads to delivery management options including delete.
+    frame = context.pages[-1]
+    # Click the 'Add Milk' button to explore delivery management options
+    elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click the 'Cancel' button (index 29) to close the 'Add Milk Delivery' form and return to the delivery details page.
+    frame = context.pages[-1]
+    # Click the 'Cancel' button to close the 'Add Milk Delivery' form
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div[2]/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click the 'Receive' button (index 4) to check if it leads to delivery management options including delete.
+    frame = context.pages[-1]
+    # Click the 'Receive' button to view deliveries for deletion
+    elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click the 'Cancel' button (index 4) to close the 'Receive Payment' modal and return to the delivery details page.
+    frame = context.pages[-1]
+    # Click the 'Cancel' button to close the 'Receive Payment' modal
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click the 'Shops' button (index 7) to navigate to the Shops page and check for deleted deliveries history or related options.
+    frame = context.pages[-1]
+    # Click the 'Shops' button to navigate to Shops page for deleted deliveries history
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # --> Assertions to verify final state
+    frame = context.pages[-1]
+    try:
+        await expect(frame.locator('text=Delivery Restoration Successful').first).to_be_visible(timeout=1000)
+    except AssertionError:
+        raise AssertionError("Test failed: Deleted deliveries are not properly tracked, restored, or stock levels updated as per the test plan.")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_standalone(run_test))
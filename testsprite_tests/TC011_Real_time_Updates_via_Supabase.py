@@ -1,85 +1,40 @@
 import asyncio
-from playwright import async_api
 from playwright.async_api import expect
 
-async def run_test():
-    pw = None
-    browser = None
-    context = None
-    
-    try:
-        # Start a Playwright session in asynchronous mode
-        pw = await async_api.async_playwright().start()
-        
-        # Launch a Chromium browser in headless mode with custom arguments
-        browser = await pw.chromium.launch(
-            headless=True,
-            args=[
-                "--window-size=1280,720",         # Set the browser window size
-                "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
-                "--ipc=host",                     # Use host-level IPC for better stability
-                "--single-process"                # Run the browser in a single process mode
-            ],
-        )
-        
-        # Create a new browser context (like an incognito window)
-        context = await browser.new_context()
-        context.set_default_timeout(5000)
-        
-        # Open a new page in the browser context
-        page = await context.new_page()
-        
-        # Navigate to your target URL and wait until the network request is committed
-        await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
-        
-        # Wait for the main page to reach DOMContentLoaded state (optional for stability)
-        try:
-            await page.wait_for_load_state("domcontentloaded", timeout=3000)
-        except async_api.Error:
-            pass
-        
-        # Iterate through all iframes and wait for them to load as well
-        for frame in page.frames:
-            try:
-                await frame.wait_for_load_state("domcontentloaded", timeout=3000)
-            except async_api.Error:
-                pass
-        
-        # Interact with the page elements to simulate user flow
-        # -> Try to reload the page to see if login form appears or check for any hidden elements or alternative navigation to login
-        await page.goto('http://localhost:5173/', timeout=10000)
-        await asyncio.sleep(3)
-        
+from harness import APP_URL, open_app, run_standalone, settle
+
 
-        # -> Click on Shops button to navigate to Shops section and perform data change (e.g., delivery creation) to test real-time updates
-        frame = context.pages[-1]
-        # Click Shops button to navigate to Shops section
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/div/div/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+async def run_test(context, page):
+    # Open the app and wait for its first data load to settle
+    await open_app(page)
+
+    # Interact with the page elements to simulate user flow
+    # -> Try to reload the page to see if login form appears or check for any hidden elements or alternative navigation to login
+    await page.goto(f'{APP_URL}/', timeout=10000)
+    await settle(page)
+    
 
-        # -> Click the floating '+' button at index 40 to start delivery creation process
-        frame = context.pages[-1]
-        # Click floating '+' button to initiate delivery creation
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+    # -> Click on Shops button to navigate to Shops section and perform data change (e.g., delivery creation) to test real-time updates
+    frame = context.pages[-1]
+    # Click Shops button to navigate to Shops section
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/div/div/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
 
-        # --> Assertions to verify final state
-        frame = context.pages[-1]
-        try:
-            await expect(frame.locator('text=Real-time update successful').first).to_be_visible(timeout=30000)
-        except AssertionError:
-            raise AssertionError("Test case failed: Real-time updates did not propagate instantly to UI, auto-refresh and toast notifications for all relevant changes are missing or not functioning as expected.")
-        await asyncio.sleep(5)
+    # -> Click the floating '+' button at index 40 to start delivery creation process
+    frame = context.pages[-1]
+    # Click floating '+' button to initiate delivery creation
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
     
-    finally:
-        if context:
-            await context.close()
-        if browser:
-            await browser.close()
-        if pw:
-            await pw.stop()
-            
-asyncio.run(run_test())
-    
\ No newline at end of file
+
+    # --> Assertions to verify final state
+    frame = context.pages[-1]
+    try:
+        await expect(frame.locator('text=Real-time update successful').first).to_be_visible(timeout=30000)
+    except AssertionError:
+        raise AssertionError("Test case failed: Real-time updates did not propagate instantly to UI, auto-refresh and toast notifications for all relevant changes are missing or not functioning as expected.")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_standalone(run_test))
@@ -1,177 +1,132 @@
 import asyncio
-from playwright import async_api
 from playwright.async_api import expect
 
-async def run_test():
-    pw = None
-    browser = None
-    context = None
-    
-    try:
-        # Start a Playwright session in asynchronous mode
-        pw = await async_api.async_playwright().start()
-        
-        # Launch a Chromium browser in headless mode with custom arguments
-        browser = await pw.chromium.launch(
-            headless=True,
-            args=[
-                "--window-size=1280,720",         # Set the browser window size
-                "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
-                "--ipc=host",                     # Use host-level IPC for better stability
-                "--single-process"                # Run the browser in a single process mode
-            ],
-        )
-        
-        # Create a new browser context (like an incognito window)
-        context = await browser.new_context()
-        context.set_default_timeout(5000)
-        
-        # Open a new page in the browser context
-        page = await context.new_page()
-        
-        # Navigate to your target URL and wait until the network request is committed
-        await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
-        
-        # Wait for the main page to reach DOMContentLoaded state (optional for stability)
-        try:
-            await page.wait_for_load_state("domcontentloaded", timeout=3000)
-        except async_api.Error:
-            pass
-        
-        # Iterate through all iframes and wait for them to load as well
-        for frame in page.frames:
-            try:
-                await frame.wait_for_load_state("domcontentloaded", timeout=3000)
-            except async_api.Error:
-                pass
-        
-        # Interact with the page elements to simulate user flow
-        # -> Try to reload the page or check if there is any way to trigger UI elements to appear.
-        await page.goto('http://localhost:5173/', timeout=10000)
-        await asyncio.sleep(3)
-        
-
-        # -> Navigate between bottom navigation tabs multiple times to test state persistence.
-        frame = context.pages[-1]
-        # Click Home tab to navigate to Home screen
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Use deep link to open the app at a specific tab (e.g., Shops) and verify correct tab and content load.
-        await page.goto('http://localhost:5173/?tab=shops', timeout=10000)
-        await asyncio.sleep(3)
-        
-
-        # -> Navigate to Home tab and then back to Shops tab to verify Shops tab state persistence after navigation.
-        frame = context.pages[-1]
-        # Click Home tab to navigate away from Shops tab
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click Settings tab to navigate to Settings screen and verify state persistence after navigation.
-        frame = context.pages[-1]
-        # Click Settings tab to navigate to Settings screen
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        frame = context.pages[-1]
-        # Click Shops tab to navigate back to Shops screen
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Enter PIN 'owner123' to access Settings and verify state persistence after navigation.
-        frame = context.pages[-1]
-        # Enter PIN to access Settings
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('owner123')
-        
-
-        frame = context.pages[-1]
-        # Click Access Settings button to submit PIN
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Clear the current PIN input and enter a numeric-only PIN (e.g., '1234') to access Settings and verify state persistence.
-        frame = context.pages[-1]
-        # Clear the PIN input field
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('')
-        
-
-        frame = context.pages[-1]
-        # Enter numeric PIN to access Settings
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('1234')
-        
-
-        frame = context.pages[-1]
-        # Click Access Settings button to submit PIN
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Clear the PIN input and enter the correct PIN 'owner123' to access Settings tab and verify state persistence.
-        frame = context.pages[-1]
-        # Clear the PIN input field
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('')
-        
-
-        frame = context.pages[-1]
-        # Enter correct PIN 'owner123' to access Settings
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('owner123')
-        
-
-        frame = context.pages[-1]
-        # Click Access Settings button to submit PIN
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Clear the PIN input field and enter a numeric-only PIN such as '1234' or '0000' to access Settings tab.
-        frame = context.pages[-1]
-        # Clear the PIN input field
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('')
-        
-
-        frame = context.pages[-1]
-        # Enter numeric PIN to access Settings
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('1234')
-        
-
-        frame = context.pages[-1]
-        # Click Access Settings button to submit PIN
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # --> Assertions to verify final state
-        frame = context.pages[-1]
-        await expect(frame.locator('text=Home').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=Shops').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=Settings').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=Settings Protected').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=Enter PIN to access settings').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=Enter PIN').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=Invalid PIN. Please try again.').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=Access Settings').first).to_be_visible(timeout=30000)
-        await asyncio.sleep(5)
-    
-    finally:
-        if context:
-            await context.close()
-        if browser:
-            await browser.close()
-        if pw:
-            await pw.stop()
-            
-asyncio.run(run_test())
-    
\ No newline at end of file
+from harness import APP_URL, open_app, run_standalone, settle
+
+
+async def run_test(context, page):
+    # Open the app and wait for its first data load to settle
+    await open_app(page)
+
+    # Interact with the page elements to simulate user flow
+    # -> Try to reload the page or check if there is any way to trigger UI elements to appear.
+    await page.goto(f'{APP_URL}/', timeout=10000)
+    await settle(page)
+    
+
+    # -> Navigate between bottom navigation tabs multiple times to test state persistence.
+    frame = context.pages[-1]
+    # Click Home tab to navigate to Home screen
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Use deep link to open the app at a specific tab (e.g., Shops) and verify correct tab and content load.
+    await page.goto(f'{APP_URL}/?tab=shops', timeout=10000)
+    await settle(page)
+    
+
+    # -> Navigate to Home tab and then back to Shops tab to verify Shops tab state persistence after navigation.
+    frame = context.pages[-1]
+    # Click Home tab to navigate away from Shops tab
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click Settings tab to navigate to Settings screen and verify state persistence after navigation.
+    frame = context.pages[-1]
+    # Click Settings tab to navigate to Settings screen
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    frame = context.pages[-1]
+    # Click Shops tab to navigate back to Shops screen
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Enter PIN 'owner123' to access Settings and verify state persistence after navigation.
+    frame = context.pages[-1]
+    # Enter PIN to access Settings
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
+    await settle(page); await elem.fill('owner123')
+    
+
+    frame = context.pages[-1]
+    # Click Access Settings button to submit PIN
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Clear the current PIN input and enter a numeric-only PIN (e.g., '1234') to access Settings and verify state persistence.
+    frame = context.pages[-1]
+    # Clear the PIN input field
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
+    await settle(page); await elem.fill('')
+    
+
+    frame = context.pages[-1]
+    # Enter numeric PIN to access Settings
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
+    await settle(page); await elem.fill('1234')
+    
+
+    frame = context.pages[-1]
+    # Click Access Settings button to submit PIN
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Clear the PIN input and enter the correct PIN 'owner123' to access Settings tab and verify state persistence.
+    frame = context.pages[-1]
+    # Clear the PIN input field
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
+    await settle(page); await elem.fill('')
+    
+
+    frame = context.pages[-1]
+    # Enter correct PIN 'owner123' to access Settings
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
+    await settle(page); await elem.fill('owner123')
+    
+
+    frame = context.pages[-1]
+    # Click Access Settings button to submit PIN
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Clear the PIN input field and enter a numeric-only PIN such as '1234' or '0000' to access Settings tab.
+    frame = context.pages[-1]
+    # Clear the PIN input field
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
+    await settle(page); await elem.fill('')
+    
+
+    frame = context.pages[-1]
+    # Enter numeric PIN to access Settings
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
+    await settle(page); await elem.fill('1234')
+    
+
+    frame = context.pages[-1]
+    # Click Access Settings button to submit PIN
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # --> Assertions to verify final state
+    frame = context.pages[-1]
+    await expect(frame.locator('text=Home').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=Shops').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=Settings').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=Settings Protected').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=Enter PIN to access settings').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=Enter PIN').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=Invalid PIN. Please try again.').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=Access Settings').first).to_be_visible(timeout=30000)
+
+
+if __name__ == "__main__":
+    asyncio.run(run_standalone(run_test))
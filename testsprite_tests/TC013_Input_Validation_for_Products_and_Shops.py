@@ -1,94 +1,49 @@
 import asyncio
-from playwright import async_api
 from playwright.async_api import expect
 
-async def run_test():
-    pw = None
-    browser = None
-    context = None
-    
-    try:
-        # Start a Playwright session in asynchronous mode
-        pw = await async_api.async_playwright().start()
-        
-        # Launch a Chromium browser in headless mode with custom arguments
-        browser = await pw.chromium.launch(
-            headless=True,
-            args=[
-                "--window-size=1280,720",         # Set the browser window size
-                "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
-                "--ipc=host",                     # Use host-level IPC for better stability
-                "--single-process"                # Run the browser in a single process mode
-            ],
-        )
-        
-        # Create a new browser context (like an incognito window)
-        context = await browser.new_context()
-        context.set_default_timeout(5000)
-        
-        # Open a new page in the browser context
-        page = await context.new_page()
-        
-        # Navigate to your target URL and wait until the network request is committed
-        await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
-        
-        # Wait for the main page to reach DOMContentLoaded state (optional for stability)
-        try:
-            await page.wait_for_load_state("domcontentloaded", timeout=3000)
-        except async_api.Error:
-            pass
-        
-        # Iterate through all iframes and wait for them to load as well
-        for frame in page.frames:
-            try:
-                await frame.wait_for_load_state("domcontentloaded", timeout=3000)
-            except async_api.Error:
-                pass
-        
-        # Interact with the page elements to simulate user flow
-        # -> Click on the Shops button to access shop management and attempt to create shops with identical names.
-        frame = context.pages[-1]
-        # Click on the Shops button to open shop management
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/div/div/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+from harness import open_app, run_standalone, settle
+
 
-        # -> Try clicking the '+' button at index 35 to add a new shop.
-        frame = context.pages[-1]
-        # Click the '+' button at bottom right to add a new shop
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div[2]/div/div[34]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+async def run_test(context, page):
+    # Open the app and wait for its first data load to settle
+    await open_app(page)
 
-        # -> Navigate back to Shops page to find the correct interface for adding a new shop with a name input.
-        frame = context.pages[-1]
-        # Click on Shops button to return to Shops page for proper shop creation interface
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+    # Interact with the page elements to simulate user flow
+    # -> Click on the Shops button to access shop management and attempt to create shops with identical names.
+    frame = context.pages[-1]
+    # Click on the Shops button to open shop management
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/div/div/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
 
-        # -> Click on the Shops button (index 7) to try to access the shop management interface again.
-        frame = context.pages[-1]
-        # Click on Shops button to access shop management interface
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+    # -> Try clicking the '+' button at index 35 to add a new shop.
+    frame = context.pages[-1]
+    # Click the '+' button at bottom right to add a new shop
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div[2]/div/div[34]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
 
-        # --> Assertions to verify final state
-        frame = context.pages[-1]
-        try:
-            await expect(frame.locator('text=Duplicate Shop Name Error').first).to_be_visible(timeout=1000)
-        except AssertionError:
-            raise AssertionError("Test case failed: Validation error for duplicate shop names was not displayed as expected, indicating the test plan to prevent duplicate shop names did not pass.")
-        await asyncio.sleep(5)
+    # -> Navigate back to Shops page to find the correct interface for adding a new shop with a name input.
+    frame = context.pages[-1]
+    # Click on Shops button to return to Shops page for proper shop creation interface
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
     
-    finally:
-        if context:
-            await context.close()
-        if browser:
-            await browser.close()
-        if pw:
-            await pw.stop()
-            
-asyncio.run(run_test())
-    
\ No newline at end of file
+
+    # -> Click on the Shops button (index 7) to try to access the shop management interface again.
+    frame = context.pages[-1]
+    # Click on Shops button to access shop management interface
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # --> Assertions to verify final state
+    frame = context.pages[-1]
+    try:
+        await expect(frame.locator('text=Duplicate Shop Name Error').first).to_be_visible(timeout=1000)
+    except AssertionError:
+        raise AssertionError("Test case failed: Validation error for duplicate shop names was not displayed as expected, indicating the test plan to prevent duplicate shop names did not pass.")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_standalone(run_test))
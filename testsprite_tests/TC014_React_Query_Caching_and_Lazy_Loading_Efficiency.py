@@ -1,169 +1,24 @@
 import asyncio
-from playwright import async_api
-from playwright.async_api import expect
+from pathlib import Path
 
-async def run_test():
-    pw = None
-    browser = None
-    context = None
-    
-    try:
-        # Start a Playwright session in asynchronous mode
-        pw = await async_api.async_playwright().start()
-        
-        # Launch a Chromium browser in headless mode with custom arguments
-        browser = await pw.chromium.launch(
-            headless=True,
-            args=[
-                "--window-size=1280,720",         # Set the browser window size
-                "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
-                "--ipc=host",                     # Use host-level IPC for better stability
-                "--single-process"                # Run the browser in a single process mode
-            ],
-        )
-        
-        # Create a new browser context (like an incognito window)
-        context = await browser.new_context()
-        context.set_default_timeout(5000)
-        
-        # Open a new page in the browser context
-        page = await context.new_page()
-        
-        # Navigate to your target URL and wait until the network request is committed
-        await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
-        
-        # Wait for the main page to reach DOMContentLoaded state (optional for stability)
-        try:
-            await page.wait_for_load_state("domcontentloaded", timeout=3000)
-        except async_api.Error:
-            pass
-        
-        # Iterate through all iframes and wait for them to load as well
-        for frame in page.frames:
-            try:
-                await frame.wait_for_load_state("domcontentloaded", timeout=3000)
-            except async_api.Error:
-                pass
-        
-        # Interact with the page elements to simulate user flow
-        # -> Navigate to Home screen to observe network calls and UI responsiveness
-        frame = context.pages[-1]
-        # Click Home button to navigate to Home screen
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+from harness import run_standalone
+from harness.network import check_budgets, load_budgets, print_report, record_flows, write_report
 
-        # -> Click Shops button to navigate back to Shops screen and observe network calls for caching validation
-        frame = context.pages[-1]
-        # Click Shops button to navigate to Shops screen
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+REPORT_PATH = Path(__file__).resolve().parent / "tmp" / "network_report.json"
 
-        # -> Click Home button to navigate to Home screen and observe network calls for caching validation
-        frame = context.pages[-1]
-        # Click Home button to navigate to Home screen
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
 
-        # -> Click the Home button to navigate back to the Home screen.
-        frame = context.pages[-1]
-        # Click Home button to navigate back to Home screen
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+async def run_test(context, page):
+    # -> Open the app, switch tabs, open a shop, go back and open Settings while recording every Supabase call
+    results = await record_flows(page)
 
-        # -> Click Shops button to navigate to Shops screen and observe network calls for caching validation
-        frame = context.pages[-1]
-        # Click Shops button to navigate to Shops screen
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+    # --> Assertions to verify final state
+    violations = check_budgets(results, load_budgets())
+    write_report(results, REPORT_PATH)
+    print_report(results)
+    if violations:
+        raise AssertionError("Network call budgets exceeded (report: tmp/network_report.json):\n"
+                             + "\n".join(violations))
 
-        # -> Click Home button to navigate to Home screen and observe network calls for caching validation
-        frame = context.pages[-1]
-        # Click Home button to navigate to Home screen
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
 
-        # -> Click Shops button to navigate to Shops screen and monitor network calls for caching validation
-        frame = context.pages[-1]
-        # Click Shops button to navigate to Shops screen
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click Home button to navigate to Home screen and observe network calls for caching validation
-        frame = context.pages[-1]
-        # Click Home button to navigate to Home screen
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click Shops button to navigate to Shops screen and monitor network calls for caching validation
-        frame = context.pages[-1]
-        # Click Shops button to navigate to Shops screen
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click Settings button to navigate to Settings screen and observe lazy loading behavior
-        frame = context.pages[-1]
-        # Click Settings button to navigate to Settings screen
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Enter PIN and click Access Settings to load Settings screen and observe lazy loading behavior
-        frame = context.pages[-1]
-        # Enter PIN 'owner123' to access Settings
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('owner123')
-        
-
-        frame = context.pages[-1]
-        # Click Access Settings button to submit PIN and load Settings screen
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Clear the PIN input and enter a valid numeric PIN '1234' to access Settings and observe lazy loading
-        frame = context.pages[-1]
-        # Clear the PIN input field
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('')
-        
-
-        frame = context.pages[-1]
-        # Enter valid numeric PIN '1234'
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('1234')
-        
-
-        frame = context.pages[-1]
-        # Click Access Settings button to submit valid PIN and load Settings screen
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # --> Assertions to verify final state
-        frame = context.pages[-1]
-        await expect(frame.locator('text=Settings').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=Enter PIN to access settings').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=Access Settings').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=Home').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=Shops').first).to_be_visible(timeout=30000)
-        await asyncio.sleep(5)
-    
-    finally:
-        if context:
-            await context.close()
-        if browser:
-            await browser.close()
-        if pw:
-            await pw.stop()
-            
-asyncio.run(run_test())
-    
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(run_standalone(run_test))
@@ -1,126 +1,25 @@
 import asyncio
-from playwright import async_api
-from playwright.async_api import expect
+import os
 
-async def run_test():
-    pw = None
-    browser = None
-    context = None
-    
-    try:
-        # Start a Playwright session in asynchronous mode
-        pw = await async_api.async_playwright().start()
-        
-        # Launch a Chromium browser in headless mode with custom arguments
-        browser = await pw.chromium.launch(
-            headless=True,
-            args=[
-                "--window-size=1280,720",         # Set the browser window size
-                "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
-                "--ipc=host",                     # Use host-level IPC for better stability
-                "--single-process"                # Run the browser in a single process mode
-            ],
-        )
-        
-        # Create a new browser context (like an incognito window)
-        context = await browser.new_context()
-        context.set_default_timeout(5000)
-        
-        # Open a new page in the browser context
-        page = await context.new_page()
-        
-        # Navigate to your target URL and wait until the network request is committed
-        await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
-        
-        # Wait for the main page to reach DOMContentLoaded state (optional for stability)
-        try:
-            await page.wait_for_load_state("domcontentloaded", timeout=3000)
-        except async_api.Error:
-            pass
-        
-        # Iterate through all iframes and wait for them to load as well
-        for frame in page.frames:
-            try:
-                await frame.wait_for_load_state("domcontentloaded", timeout=3000)
-            except async_api.Error:
-                pass
-        
-        # Interact with the page elements to simulate user flow
-        # -> Simulate 3G network speed to test app load time and responsiveness.
-        frame = context.pages[-1]
-        # Click Settings to find network simulation options or relevant settings
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/div/div[2]/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+from harness import run_standalone
+from harness.perf import DEFAULT_PROFILE, check_budgets, load_budgets, measure_flows, print_report
 
-        # -> Try to navigate to Settings page to check for network simulation options or use browser devtools to simulate 3G network externally.
-        frame = context.pages[-1]
-        # Click Settings button to check for network simulation or relevant options
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div[2]/div/div[38]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+# Throttling slows the whole browser process, so run alone with a long timeout
+SERIAL = True
+TIMEOUT = 600
 
-        # -> Simulate 3G network speed using browser devtools or app settings if available.
-        frame = context.pages[-1]
-        # Click Settings to check for network simulation options or app performance settings
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
 
-        # -> Enter PIN 'owner123' to access Settings and look for network simulation or performance throttling options.
-        frame = context.pages[-1]
-        # Enter PIN 'owner123' to access Settings
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('owner123')
-        
+async def run_test(context, page):
+    # -> Throttle network and CPU, then measure login, shops list and shop detail
+    profile = os.environ.get("PERF_PROFILE", DEFAULT_PROFILE)
+    report = await measure_flows(context, page, profile)
 
-        frame = context.pages[-1]
-        # Click Access Settings button to submit PIN and enter Settings
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+    # --> Assertions to verify final state
+    violations = check_budgets(report, load_budgets())
+    print_report(report)
+    if violations:
+        raise AssertionError("Performance budgets exceeded under " + profile + ":\n" + "\n".join(violations))
 
-        # -> Enter a numeric PIN to access Settings. Try '1234' or '0000' as common numeric PINs.
-        frame = context.pages[-1]
-        # Enter numeric PIN '1234' to access Settings
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('1234')
-        
 
-        frame = context.pages[-1]
-        # Click Access Settings button to submit numeric PIN
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Try another numeric PIN such as '0000' or '1111' to access Settings or consider using browser devtools to simulate 3G network externally.
-        frame = context.pages[-1]
-        # Enter numeric PIN '0000' to access Settings
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('0000')
-        
-
-        frame = context.pages[-1]
-        # Click Access Settings button to submit numeric PIN
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # --> Assertions to verify final state
-        frame = context.pages[-1]
-        try:
-            await expect(frame.locator('text=Network Speed Exceeds 5G Limit').first).to_be_visible(timeout=1000)
-        except AssertionError:
-            raise AssertionError("Test plan failed: App load time and responsiveness did not meet targets under simulated 3G network conditions. Immediate failure triggered due to unmet performance thresholds.")
-        await asyncio.sleep(5)
-    
-    finally:
-        if context:
-            await context.close()
-        if browser:
-            await browser.close()
-        if pw:
-            await pw.stop()
-            
-asyncio.run(run_test())
-    
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(run_standalone(run_test))
@@ -1,129 +1,84 @@
 import asyncio
-from playwright import async_api
 from playwright.async_api import expect
 
-async def run_test():
-    pw = None
-    browser = None
-    context = None
-    
-    try:
-        # Start a Playwright session in asynchronous mode
-        pw = await async_api.async_playwright().start()
-        
-        # Launch a Chromium browser in headless mode with custom arguments
-        browser = await pw.chromium.launch(
-            headless=True,
-            args=[
-                "--window-size=1280,720",         # Set the browser window size
-                "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
-                "--ipc=host",                     # Use host-level IPC for better stability
-                "--single-process"                # Run the browser in a single process mode
-            ],
-        )
-        
-        # Create a new browser context (like an incognito window)
-        context = await browser.new_context()
-        context.set_default_timeout(5000)
-        
-        # Open a new page in the browser context
-        page = await context.new_page()
-        
-        # Navigate to your target URL and wait until the network request is committed
-        await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
-        
-        # Wait for the main page to reach DOMContentLoaded state (optional for stability)
-        try:
-            await page.wait_for_load_state("domcontentloaded", timeout=3000)
-        except async_api.Error:
-            pass
-        
-        # Iterate through all iframes and wait for them to load as well
-        for frame in page.frames:
-            try:
-                await frame.wait_for_load_state("domcontentloaded", timeout=3000)
-            except async_api.Error:
-                pass
-        
-        # Interact with the page elements to simulate user flow
-        # -> Navigate to login page or login form to log in as staff user.
-        frame = context.pages[-1]
-        # Click Settings to find login or user management options
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/div/div[2]/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+from harness import open_app, run_standalone, settle
+
+
+async def run_test(context, page):
+    # Open the app and wait for its first data load to settle
+    await open_app(page)
 
-        # -> Try clicking the Settings button to find logout or user management options to reach login page.
-        frame = context.pages[-1]
-        # Click Settings button to find logout or user management options
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+    # Interact with the page elements to simulate user flow
+    # -> Navigate to login page or login form to log in as staff user.
+    frame = context.pages[-1]
+    # Click Settings to find login or user management options
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/div/div[2]/input').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
 
-        # -> Go back to the Home or Shops page to find login or logout options to proceed with login as staff user.
-        frame = context.pages[-1]
-        # Click Home button to navigate away from Settings and look for login/logout options
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+    # -> Try clicking the Settings button to find logout or user management options to reach login page.
+    frame = context.pages[-1]
+    # Click Settings button to find logout or user management options
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
 
-        # -> Click on Settings button to check for logout or user management options to log out current user.
-        frame = context.pages[-1]
-        # Click Settings button to find logout or user management options
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+    # -> Go back to the Home or Shops page to find login or logout options to proceed with login as staff user.
+    frame = context.pages[-1]
+    # Click Home button to navigate away from Settings and look for login/logout options
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
 
-        # -> Navigate to Shops page to check for logout or user management options to log out current user.
-        frame = context.pages[-1]
-        # Click Shops button to navigate to Shops page and look for logout or user management options
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+    # -> Click on Settings button to check for logout or user management options to log out current user.
+    frame = context.pages[-1]
+    # Click Settings button to find logout or user management options
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
 
-        # -> Click Settings button to check for logout or user management options to log out current user.
-        frame = context.pages[-1]
-        # Click Settings button to find logout or user management options
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+    # -> Navigate to Shops page to check for logout or user management options to log out current user.
+    frame = context.pages[-1]
+    # Click Shops button to navigate to Shops page and look for logout or user management options
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
 
-        # -> Click Home button to navigate to Home page and look for logout or user management options to log out current user.
-        frame = context.pages[-1]
-        # Click Home button to navigate to Home page
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+    # -> Click Settings button to check for logout or user management options to log out current user.
+    frame = context.pages[-1]
+    # Click Settings button to find logout or user management options
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[3]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
 
-        # -> Click Shops button to check for any logout or user management options to log out current user.
-        frame = context.pages[-1]
-        # Click Shops button to navigate to Shops page and look for logout or user management options
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+    # -> Click Home button to navigate to Home page and look for logout or user management options to log out current user.
+    frame = context.pages[-1]
+    # Click Home button to navigate to Home page
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
 
-        # -> Click the floating plus button to check if it opens a menu with logout or user management options.
-        frame = context.pages[-1]
-        # Click floating plus button to check for additional options including logout or user management
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+    # -> Click Shops button to check for any logout or user management options to log out current user.
+    frame = context.pages[-1]
+    # Click Shops button to navigate to Shops page and look for logout or user management options
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
 
-        # --> Assertions to verify final state
-        frame = context.pages[-1]
-        try:
-            await expect(frame.locator('text=Session Timeout Successful').first).to_be_visible(timeout=1000)
-        except AssertionError:
-            raise AssertionError("Test failed: Session timeout did not trigger logout and role-based access limits were not enforced as expected.")
-        await asyncio.sleep(5)
+    # -> Click the floating plus button to check if it opens a menu with logout or user management options.
+    frame = context.pages[-1]
+    # Click floating plus button to check for additional options including logout or user management
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
     
-    finally:
-        if context:
-            await context.close()
-        if browser:
-            await browser.close()
-        if pw:
-            await pw.stop()
-            
-asyncio.run(run_test())
-    
\ No newline at end of file
+
+    # --> Assertions to verify final state
+    frame = context.pages[-1]
+    try:
+        await expect(frame.locator('text=Session Timeout Successful').first).to_be_visible(timeout=1000)
+    except AssertionError:
+        raise AssertionError("Test failed: Session timeout did not trigger logout and role-based access limits were not enforced as expected.")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_standalone(run_test))
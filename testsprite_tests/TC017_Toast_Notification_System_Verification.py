@@ -1,147 +1,102 @@
 import asyncio
-from playwright import async_api
 from playwright.async_api import expect
 
-async def run_test():
-    pw = None
-    browser = None
-    context = None
+from harness import open_app, run_standalone, settle
+
+
+async def run_test(context, page):
+    # Open the app and wait for its first data load to settle
+    await open_app(page)
+
+    # Interact with the page elements to simulate user flow
+    # -> Trigger a successful action to display a success toast notification.
+    frame = context.pages[-1]
+    # Click Shops button to navigate to shops page where delivery actions can be triggered
+    elem = frame.locator('xpath=html/body/div/div/div/main/div/div/div/div/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
     
-    try:
-        # Start a Playwright session in asynchronous mode
-        pw = await async_api.async_playwright().start()
-        
-        # Launch a Chromium browser in headless mode with custom arguments
-        browser = await pw.chromium.launch(
-            headless=True,
-            args=[
-                "--window-size=1280,720",         # Set the browser window size
-                "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
-                "--ipc=host",                     # Use host-level IPC for better stability
-                "--single-process"                # Run the browser in a single process mode
-            ],
-        )
-        
-        # Create a new browser context (like an incognito window)
-        context = await browser.new_context()
-        context.set_default_timeout(5000)
-        
-        # Open a new page in the browser context
-        page = await context.new_page()
-        
-        # Navigate to your target URL and wait until the network request is committed
-        await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
-        
-        # Wait for the main page to reach DOMContentLoaded state (optional for stability)
-        try:
-            await page.wait_for_load_state("domcontentloaded", timeout=3000)
-        except async_api.Error:
-            pass
-        
-        # Iterate through all iframes and wait for them to load as well
-        for frame in page.frames:
-            try:
-                await frame.wait_for_load_state("domcontentloaded", timeout=3000)
-            except async_api.Error:
-                pass
-        
-        # Interact with the page elements to simulate user flow
-        # -> Trigger a successful action to display a success toast notification.
-        frame = context.pages[-1]
-        # Click Shops button to navigate to shops page where delivery actions can be triggered
-        elem = frame.locator('xpath=html/body/div/div/div/main/div/div/div/div/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Try to trigger success toast notification by clicking on a shop entry or another interactive element that may cause a success toast.
-        frame = context.pages[-1]
-        # Click on the first shop entry 'prashant' to try triggering a success toast notification
-        elem = frame.locator('xpath=html/body/div').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click the 'Receive' button to trigger a success toast notification.
-        frame = context.pages[-1]
-        # Click the 'Receive' button to trigger a success toast notification
-        elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Input a non-zero amount in the 'Amount Received' field and click 'Save Payment' to trigger success toast notification.
-        frame = context.pages[-1]
-        # Input 100 in the 'Amount Received' field
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[2]/div[2]/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('100')
-        
-
-        frame = context.pages[-1]
-        # Click 'Save Payment' button to save payment and trigger success toast notification
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Try to trigger an error toast notification by simulating a payment failure or invalid action.
-        frame = context.pages[-1]
-        # Click 'Receive' button again to open payment modal for error test
-        elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Input a negative amount in the 'Amount Received' field and click 'Save Payment' to trigger error toast notification.
-        frame = context.pages[-1]
-        # Input -50 in the 'Amount Received' field to trigger error toast
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[2]/div[2]/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('-50')
-        
-
-        frame = context.pages[-1]
-        # Click 'Save Payment' button to attempt to trigger error toast notification
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Trigger warning and info toast notifications by performing actions that cause these notifications or simulate them if possible.
-        frame = context.pages[-1]
-        # Click 'Cancel' button to close the 'Receive Payment' modal before testing warning and info toasts
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click 'Add Milk' button to try triggering a warning toast notification.
-        frame = context.pages[-1]
-        # Click 'Add Milk' button to trigger warning toast notification
-        elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Input a quantity exceeding stock or invalid input to trigger a warning toast notification, then save delivery to check for info toast notification.
-        frame = context.pages[-1]
-        # Input 200 in the first milk quantity field to exceed stock and trigger warning toast
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[2]/div/div/div[2]/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('200')
-        
-
-        frame = context.pages[-1]
-        # Click 'Save Delivery' button to attempt to trigger warning or info toast notifications
-        elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div[2]/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # --> Assertions to verify final state
-        frame = context.pages[-1]
-        try:
-            await expect(frame.locator('text=Toast Notification Success').first).to_be_visible(timeout=1000)
-        except AssertionError:
-            raise AssertionError("Test plan failed: Toast notifications for success, error, warning, and info messages did not display or auto-dismiss as expected.")
-        await asyncio.sleep(5)
+
+    # -> Try to trigger success toast notification by clicking on a shop entry or another interactive element that may cause a success toast.
+    frame = context.pages[-1]
+    # Click on the first shop entry 'prashant' to try triggering a success toast notification
+    elem = frame.locator('xpath=html/body/div').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click the 'Receive' button to trigger a success toast notification.
+    frame = context.pages[-1]
+    # Click the 'Receive' button to trigger a success toast notification
+    elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Input a non-zero amount in the 'Amount Received' field and click 'Save Payment' to trigger success toast notification.
+    frame = context.pages[-1]
+    # Input 100 in the 'Amount Received' field
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[2]/div[2]/div/input').nth(0)
+    await settle(page); await elem.fill('100')
+    
+
+    frame = context.pages[-1]
+    # Click 'Save Payment' button to save payment and trigger success toast notification
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Try to trigger an error toast notification by simulating a payment failure or invalid action.
+    frame = context.pages[-1]
+    # Click 'Receive' button again to open payment modal for error test
+    elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Input a negative amount in the 'Amount Received' field and click 'Save Payment' to trigger error toast notification.
+    frame = context.pages[-1]
+    # Input -50 in the 'Amount Received' field to trigger error toast
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[2]/div[2]/div/input').nth(0)
+    await settle(page); await elem.fill('-50')
     
-    finally:
-        if context:
-            await context.close()
-        if browser:
-            await browser.close()
-        if pw:
-            await pw.stop()
-            
-asyncio.run(run_test())
-    
\ No newline at end of file
+
+    frame = context.pages[-1]
+    # Click 'Save Payment' button to attempt to trigger error toast notification
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Trigger warning and info toast notifications by performing actions that cause these notifications or simulate them if possible.
+    frame = context.pages[-1]
+    # Click 'Cancel' button to close the 'Receive Payment' modal before testing warning and info toasts
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Click 'Add Milk' button to try triggering a warning toast notification.
+    frame = context.pages[-1]
+    # Click 'Add Milk' button to trigger warning toast notification
+    elem = frame.locator('xpath=html/body/div/div/div/div[3]/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # -> Input a quantity exceeding stock or invalid input to trigger a warning toast notification, then save delivery to check for info toast notification.
+    frame = context.pages[-1]
+    # Input 200 in the first milk quantity field to exceed stock and trigger warning toast
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[2]/div/div/div[2]/div/input').nth(0)
+    await settle(page); await elem.fill('200')
+    
+
+    frame = context.pages[-1]
+    # Click 'Save Delivery' button to attempt to trigger warning or info toast notifications
+    elem = frame.locator('xpath=html/body/div/div/div/div[4]/div/div[3]/div[2]/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
+
+    # --> Assertions to verify final state
+    frame = context.pages[-1]
+    try:
+        await expect(frame.locator('text=Toast Notification Success').first).to_be_visible(timeout=1000)
+    except AssertionError:
+        raise AssertionError("Test plan failed: Toast notifications for success, error, warning, and info messages did not display or auto-dismiss as expected.")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_standalone(run_test))
@@ -1,128 +1,83 @@
 import asyncio
-from playwright import async_api
 from playwright.async_api import expect
 
-async def run_test():
-    pw = None
-    browser = None
-    context = None
-    
-    try:
-        # Start a Playwright session in asynchronous mode
-        pw = await async_api.async_playwright().start()
-        
-        # Launch a Chromium browser in headless mode with custom arguments
-        browser = await pw.chromium.launch(
-            headless=True,
-            args=[
-                "--window-size=1280,720",         # Set the browser window size
-                "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
-                "--ipc=host",                     # Use host-level IPC for better stability
-                "--single-process"                # Run the browser in a single process mode
-            ],
-        )
-        
-        # Create a new browser context (like an incognito window)
-        context = await browser.new_context()
-        context.set_default_timeout(5000)
-        
-        # Open a new page in the browser context
-        page = await context.new_page()
-        
-        # Navigate to your target URL and wait until the network request is committed
-        await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
-        
-        # Wait for the main page to reach DOMContentLoaded state (optional for stability)
-        try:
-            await page.wait_for_load_state("domcontentloaded", timeout=3000)
-        except async_api.Error:
-            pass
-        
-        # Iterate through all iframes and wait for them to load as well
-        for frame in page.frames:
-            try:
-                await frame.wait_for_load_state("domcontentloaded", timeout=3000)
-            except async_api.Error:
-                pass
-        
-        # Interact with the page elements to simulate user flow
-        # -> Try to reload the app or navigate to a login or main screen to verify app functionality
-        await page.goto('http://localhost:5173/', timeout=10000)
-        await asyncio.sleep(3)
-        
+from harness import APP_URL, open_app, run_standalone, settle
+
 
-        # -> Simulate offline mode by turning off network connection to verify cached data accessibility and usability offline.
-        frame = context.pages[-1]
-        # Click Home button to check navigation and cached data accessibility
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+async def run_test(context, page):
+    # Open the app and wait for its first data load to settle
+    await open_app(page)
+
+    # Interact with the page elements to simulate user flow
+    # -> Try to reload the app or navigate to a login or main screen to verify app functionality
+    await page.goto(f'{APP_URL}/', timeout=10000)
+    await settle(page)
+    
 
-        # -> Click Shops button to return to Shops page and verify offline data persistence.
-        frame = context.pages[-1]
-        # Click Shops button to return to Shops page
-        elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+    # -> Simulate offline mode by turning off network connection to verify cached data accessibility and usability offline.
+    frame = context.pages[-1]
+    # Click Home button to check navigation and cached data accessibility
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button').nth(0)
+    await settle(page); await elem.click(timeout=5000)
+    
 
-        # --> Assertions to verify final state
-        frame = context.pages[-1]
-        await expect(frame.locator('text=Shops').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=prashant').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=Not Delivered').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=Route 0').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=₹0').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=megha').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=samarthkrupa mavshi').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=mama').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=sonar').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=aaji').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=jyoti').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=bhagvat kaka').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=shiv kirana').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=mahakali').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=ganesh subhash').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=priyanka').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=gurukrupa').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=mayur devre').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=pardesi kaka').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=aarti').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=krushnakunj').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=khandu ram nagar').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=keters').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=KGN').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=market').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=khan baba').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=sub jail').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=sawariya').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=sadguru').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=ramesh chaudhari').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=jay ambe').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=kamlakar vanjari').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=sharma').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=najiya').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=patel').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=sagar chai nagari').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=Ikbal').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=Tambapur').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=चंद्रकांत').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=Hamib shah').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=Khala').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=बिजासनी').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=shri ram kirana').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=Delivered').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=₹4,913').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=Home').first).to_be_visible(timeout=30000)
-        await expect(frame.locator('text=Settings').first).to_be_visible(timeout=30000)
-        await asyncio.sleep(5)
+    # -> Click Shops button to return to Shops page and verify offline data persistence.
+    frame = context.pages[-1]
+    # Click Shops button to return to Shops page
+    elem = frame.locator('xpath=html/body/div/div/nav/div/button[2]').nth(0)
+    await settle(page); await elem.click(timeout=5000)
     
-    finally:
-        if context:
-            await context.close()
-        if browser:
-            await browser.close()
-        if pw:
-            await pw.stop()
-            
-asyncio.run(run_test())
-    
\ No newline at end of file
+
+    # --> Assertions to verify final state
+    frame = context.pages[-1]
+    await expect(frame.locator('text=Shops').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=prashant').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=Not Delivered').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=Route 0').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=₹0').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=megha').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=samarthkrupa mavshi').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=mama').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=sonar').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=aaji').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=jyoti').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=bhagvat kaka').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=shiv kirana').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=mahakali').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=ganesh subhash').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=priyanka').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=gurukrupa').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=mayur devre').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=pardesi kaka').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=aarti').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=krushnakunj').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=khandu ram nagar').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=keters').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=KGN').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=market').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=khan baba').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=sub jail').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=sawariya').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=sadguru').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=ramesh chaudhari').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=jay ambe').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=kamlakar vanjari').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=sharma').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=najiya').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=patel').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=sagar chai nagari').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=Ikbal').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=Tambapur').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=चंद्रकांत').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=Hamib shah').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=Khala').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=बिजासनी').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=shri ram kirana').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=Delivered').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=₹4,913').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=Home').first).to_be_visible(timeout=30000)
+    await expect(frame.locator('text=Settings').first).to_be_visible(timeout=30000)
+
+
+if __name__ == "__main__":
+    asyncio.run(run_standalone(run_test))
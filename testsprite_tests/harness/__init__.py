@@ -0,0 +1,20 @@
+"""Shared Playwright harness for the testsprite_tests suite.
+
+Each ``TCxxx_*.py`` file defines ``async def run_test(context, page)`` and
+can be run on its own (``python TC001_User_Authentication_Success.py``) or
+together with the rest through the shared-browser runner::
+
+    python -m harness.runner --workers 4
+"""
+
+from .browser import APP_URL, launch_browser, new_test_page, open_app, run_standalone
+from .waits import settle
+
+__all__ = [
+    "APP_URL",
+    "launch_browser",
+    "new_test_page",
+    "open_app",
+    "run_standalone",
+    "settle",
+]
@@ -0,0 +1,52 @@
+"""Browser, context and page setup shared by every test."""
+
+import os
+
+from playwright import async_api
+
+from .waits import settle, track_network
+
+APP_URL = os.environ.get("APP_URL", "http://localhost:5173").rstrip("/")
+
+BROWSER_ARGS = [
+    "--window-size=1280,720",         # Set the browser window size
+    "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
+]
+
+
+async def launch_browser(pw, headless: bool = True):
+    """Launch the one Chromium instance a run shares between its tests."""
+    return await pw.chromium.launch(headless=headless, args=BROWSER_ARGS)
+
+
+async def new_test_page(browser, default_timeout: int = 5000):
+    """Create an isolated context (like an incognito window) and its page."""
+    context = await browser.new_context()
+    context.set_default_timeout(default_timeout)
+    page = await context.new_page()
+    track_network(page)
+    return context, page
+
+
+async def open_app(page, path: str = "/"):
+    """Navigate to the app and wait until its first data load has settled."""
+    await page.goto(APP_URL + path, wait_until="commit", timeout=10000)
+    try:
+        await page.wait_for_load_state("domcontentloaded", timeout=10000)
+    except async_api.Error:
+        pass
+    await settle(page)
+
+
+async def run_standalone(run_test, headless: bool = True):
+    """Run a single test module's ``run_test`` with its own browser."""
+    async with async_api.async_playwright() as pw:
+        browser = await launch_browser(pw, headless=headless)
+        try:
+            context, page = await new_test_page(browser)
+            try:
+                await run_test(context, page)
+            finally:
+                await context.close()
+        finally:
+            await browser.close()
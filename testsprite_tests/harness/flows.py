@@ -0,0 +1,82 @@
+"""User flows measured by the performance, network and tracing harnesses.
+
+Each flow has an unmeasured ``prepare`` step that puts the app in its
+starting state, the measured user ``action``, and a ``ready`` selector that
+is visible once the screen the user asked for has rendered.
+"""
+
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from .browser import APP_URL
+from .waits import settle
+
+HOME_TAB = 'nav button:has-text("Home")'
+SHOPS_TAB = 'nav button:has-text("Shops")'
+SETTINGS_TAB = 'nav button:has-text("Settings")'
+SHOP_CARD = 'main .cursor-pointer:has(h3)'
+RECEIVE_BUTTON = 'button:has-text("Receive")'
+BACK_BUTTON = 'button:has(svg.lucide-arrow-left)'
+SETTINGS_PIN = 'text=Enter PIN to access settings'
+
+NAVIGATION_TIMEOUT_MS = 120_000
+
+
+@dataclass(frozen=True)
+class Flow:
+    name: str
+    action: Callable[..., Awaitable[None]]
+    ready: str
+    prepare: Callable[..., Awaitable[None]] | None = None
+    # True when the action is a full page load (LCP is only defined then)
+    navigation: bool = False
+
+
+async def _start_app(page) -> None:
+    # Throttled cold loads take far longer than open_app's defaults allow
+    await page.goto(APP_URL, wait_until="commit", timeout=NAVIGATION_TIMEOUT_MS)
+
+
+async def _on_home_tab(page) -> None:
+    await page.click(HOME_TAB)
+    await settle(page)
+
+
+async def _on_shops_list(page) -> None:
+    await page.click(SHOPS_TAB)
+    await page.locator(SHOP_CARD).first.wait_for(state="visible")
+    await settle(page)
+
+
+async def _on_shop_detail(page) -> None:
+    await _on_shops_list(page)
+    await page.locator(SHOP_CARD).first.click()
+    await page.locator(RECEIVE_BUTTON).wait_for(state="visible")
+    await settle(page)
+
+
+async def _click_shops_tab(page) -> None:
+    await page.click(SHOPS_TAB)
+
+
+async def _click_settings_tab(page) -> None:
+    await page.click(SETTINGS_TAB)
+
+
+async def _click_first_shop(page) -> None:
+    await page.locator(SHOP_CARD).first.click()
+
+
+async def _click_back(page) -> None:
+    await page.click(BACK_BUTTON)
+
+
+# The login screen is currently bypassed (see App.tsx), so "login" measures a
+# cold start through the session check to the first rendered shop list.
+LOGIN = Flow("login", action=_start_app, ready=SHOP_CARD, navigation=True)
+SHOPS_LIST = Flow("shops_list", action=_click_shops_tab, ready=SHOP_CARD, prepare=_on_home_tab)
+SHOP_DETAIL = Flow("shop_detail", action=_click_first_shop, ready=RECEIVE_BUTTON, prepare=_on_shops_list)
+BACK_FROM_SHOP = Flow("back_from_shop", action=_click_back, ready=SHOP_CARD, prepare=_on_shop_detail)
+SETTINGS = Flow("settings", action=_click_settings_tab, ready=SETTINGS_PIN, prepare=_on_home_tab)
+
+FLOWS = {flow.name: flow for flow in (LOGIN, SHOPS_LIST, SHOP_DETAIL, BACK_FROM_SHOP, SETTINGS)}
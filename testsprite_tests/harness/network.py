@@ -0,0 +1,246 @@
+"""Count the Supabase calls each user flow makes and hold them to budgets.
+
+Every request to the Supabase REST API (``/rest/v1/<table>`` and
+``/rest/v1/rpc/<function>``) is recorded with its endpoint, status, response
+bytes and duration while a flow from :mod:`harness.flows` runs. Budgets in
+``budgets/network_budgets.json`` cap the calls per flow, the bytes per flow
+and, optionally, the calls per endpoint, so a per-shop fan-out such as one
+``get_shop_balance`` per card fails loudly instead of slowing the app down.
+
+    cd testsprite_tests
+    python -m harness.network --json tmp/network_report.json --check
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from playwright import async_api
+
+from .browser import launch_browser, new_test_page, open_app
+from .flows import FLOWS, Flow
+from .waits import settle
+
+BUDGETS_FILE = Path(__file__).resolve().parent.parent / "budgets" / "network_budgets.json"
+
+DEFAULT_FLOWS = ("login", "shops_list", "shop_detail", "back_from_shop", "settings")
+
+_REST_PREFIX = "/rest/v1/"
+
+
+@dataclass
+class Call:
+    endpoint: str
+    method: str
+    status: int | None
+    bytes: int
+    duration_ms: float
+
+
+@dataclass
+class EndpointSummary:
+    endpoint: str
+    count: int
+    bytes: int
+    duration_ms: float
+
+
+@dataclass
+class FlowCalls:
+    flow: str
+    calls: list[Call] = field(default_factory=list)
+    violations: list[str] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.calls)
+
+    @property
+    def bytes(self) -> int:
+        return sum(call.bytes for call in self.calls)
+
+    def endpoints(self) -> list[EndpointSummary]:
+        grouped = defaultdict(list)
+        for call in self.calls:
+            grouped[call.endpoint].append(call)
+        return sorted(
+            (EndpointSummary(name, len(calls), sum(c.bytes for c in calls),
+                             round(sum(c.duration_ms for c in calls), 1))
+             for name, calls in grouped.items()),
+            key=lambda summary: (-summary.count, summary.endpoint),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "flow": self.flow,
+            "calls": self.count,
+            "bytes": self.bytes,
+            "duration_ms": round(sum(call.duration_ms for call in self.calls), 1),
+            "endpoints": [asdict(summary) for summary in self.endpoints()],
+            "violations": self.violations,
+        }
+
+
+def endpoint_name(url: str, method: str) -> str | None:
+    """``rpc:get_shop_balance`` / ``GET shops``, or None for non-REST traffic."""
+    path = urlsplit(url).path
+    index = path.find(_REST_PREFIX)
+    if index < 0:
+        return None
+    resource = path[index + len(_REST_PREFIX):].strip("/")
+    if resource.startswith("rpc/"):
+        return "rpc:" + resource[len("rpc/"):]
+    return f"{method} {resource}"
+
+
+class CallRecorder:
+    """Records Supabase REST calls on a page into the currently open flow."""
+
+    def __init__(self, page):
+        self._current: FlowCalls | None = None
+        self._pending: set[asyncio.Task] = set()
+        page.on("requestfinished", self._finished)
+        page.on("requestfailed", self._finished)
+
+    def _finished(self, request) -> None:
+        if self._current is None:
+            return
+        endpoint = endpoint_name(request.url, request.method)
+        if endpoint is None or request.method == "OPTIONS":
+            return
+        task = asyncio.ensure_future(self._record(self._current, request, endpoint))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _record(self, flow: FlowCalls, request, endpoint: str) -> None:
+        response = await request.response()
+        try:
+            sizes = await request.sizes()
+            size = sizes["responseBodySize"] + sizes["responseHeadersSize"]
+        except async_api.Error:
+            size = 0  # failed requests have no sizes
+        timing = request.timing
+        duration = timing["responseEnd"] if timing["responseEnd"] >= 0 else 0.0
+        flow.calls.append(Call(endpoint, request.method, response.status if response else None,
+                               max(size, 0), round(duration, 1)))
+
+    def start(self, name: str) -> FlowCalls:
+        self._current = FlowCalls(name)
+        return self._current
+
+    async def stop(self) -> FlowCalls:
+        flow, self._current = self._current, None
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        return flow
+
+
+async def record_flow(page, recorder: CallRecorder, flow: Flow) -> FlowCalls:
+    if flow.prepare:
+        await flow.prepare(page)
+    recorder.start(flow.name)
+    await flow.action(page)
+    await page.locator(flow.ready).first.wait_for(state="visible")
+    # Calls fired after the screen appears (balances, history) still count
+    await settle(page)
+    return await recorder.stop()
+
+
+async def record_flows(page, flows: tuple[str, ...] = DEFAULT_FLOWS) -> list[FlowCalls]:
+    """Run ``flows`` in order on a fresh page and return the calls of each."""
+    recorder = CallRecorder(page)
+    results = []
+    for index, name in enumerate(flows):
+        flow = FLOWS[name]
+        if index == 0 and not flow.navigation:
+            await open_app(page)
+        results.append(await record_flow(page, recorder, flow))
+    return results
+
+
+def load_budgets(path: Path = BUDGETS_FILE) -> dict:
+    budgets = json.loads(path.read_text())
+    return {name: limits for name, limits in budgets.items() if not name.startswith("_")}
+
+
+def check_budgets(results: list[FlowCalls], budgets: dict) -> list[str]:
+    """Return one message per exceeded limit (and record them per flow)."""
+    violations = []
+    for flow in results:
+        limits = budgets.get(flow.flow, {})
+        found = []
+        if "max_calls" in limits and flow.count > limits["max_calls"]:
+            calls = ", ".join(f"{s.endpoint} x{s.count}" for s in flow.endpoints())
+            found.append(f"{flow.count} calls > budget {limits['max_calls']} ({calls})")
+        if "max_kb" in limits and flow.bytes / 1024 > limits["max_kb"]:
+            found.append(f"{flow.bytes / 1024:.1f} KB > budget {limits['max_kb']} KB")
+        counts = {summary.endpoint: summary.count for summary in flow.endpoints()}
+        for endpoint, limit in limits.get("endpoints", {}).items():
+            if counts.get(endpoint, 0) > limit:
+                found.append(f"{endpoint} called {counts[endpoint]} times > budget {limit}")
+        flow.violations = found
+        violations.extend(f"{flow.flow}: {message}" for message in found)
+    return violations
+
+
+def build_report(results: list[FlowCalls]) -> dict:
+    return {
+        "flows": [flow.to_dict() for flow in results],
+        "total_calls": sum(flow.count for flow in results),
+        "passed": not any(flow.violations for flow in results),
+    }
+
+
+def write_report(results: list[FlowCalls], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(build_report(results), indent=2))
+
+
+def print_report(results: list[FlowCalls], out=sys.stdout) -> None:
+    for flow in results:
+        print(f"{flow.flow}: {flow.count} calls, {flow.bytes / 1024:.1f} KB", file=out)
+        for summary in flow.endpoints():
+            print(f"    {summary.endpoint:<40} x{summary.count:<4} "
+                  f"{summary.bytes / 1024:8.1f} KB {summary.duration_ms:9.0f} ms", file=out)
+        for violation in flow.violations:
+            print(f"    OVER BUDGET  {violation}", file=out)
+
+
+async def _run(flows: tuple[str, ...], headless: bool) -> list[FlowCalls]:
+    async with async_api.async_playwright() as pw:
+        browser = await launch_browser(pw, headless=headless)
+        try:
+            context, page = await new_test_page(browser)
+            try:
+                return await record_flows(page, flows)
+            finally:
+                await context.close()
+        finally:
+            await browser.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Record Supabase calls per user flow.")
+    parser.add_argument("--flow", action="append", dest="flows", choices=sorted(FLOWS),
+                        help=f"flows to run in order (default {' '.join(DEFAULT_FLOWS)})")
+    parser.add_argument("--budgets", type=Path, default=BUDGETS_FILE)
+    parser.add_argument("--check", action="store_true", help="exit non-zero when over budget")
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument("--json", type=Path, help="write the machine-readable report here")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(_run(tuple(args.flows or DEFAULT_FLOWS), not args.headed))
+    violations = check_budgets(results, load_budgets(args.budgets))
+    print_report(results)
+    if args.json:
+        write_report(results, args.json)
+    return 1 if args.check and violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
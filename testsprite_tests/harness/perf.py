@@ -0,0 +1,252 @@
+"""Throttled performance measurements with checked-in budgets.
+
+Network and CPU throttling are applied over the Chrome DevTools Protocol, so
+the numbers reflect what a delivery boy sees on a cheap phone on 3G rather
+than what the developer machine sees. Profiles are named ``network/cpu``
+(``fast-3g/low-end``), or by one half only (``slow-3g``, ``low-end``).
+
+For every flow in :mod:`harness.flows` the harness records:
+
+``ready_ms``     action start until the flow's ``ready`` element is visible
+``lcp_ms``       largest contentful paint (page loads only)
+``tti_ms``       action start until ready and past the last long task
+``js_heap_mb``   used JS heap once the flow has settled
+``transfer_kb``  bytes received over the wire during the flow
+
+Budgets live in ``budgets/perf_budgets.json`` and should be measured
+against a production build served with its precompressed assets and
+cache headers (``npm run build && npm run serve``)::
+
+    cd testsprite_tests
+    APP_URL=http://localhost:4173 python -m harness.perf --profile slow-3g/low-end --check
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from playwright import async_api
+
+from .browser import launch_browser, new_test_page, open_app
+from .flows import FLOWS, NAVIGATION_TIMEOUT_MS, Flow
+from .waits import settle
+
+BUDGETS_FILE = Path(__file__).resolve().parent.parent / "budgets" / "perf_budgets.json"
+
+DEFAULT_PROFILE = "fast-3g/low-end"
+DEFAULT_FLOWS = ("login", "shops_list", "shop_detail")
+
+# Chrome DevTools presets (throughput in bytes per second)
+NETWORK_PROFILES = {
+    "slow-3g": {"latency": 2000, "downloadThroughput": 50_000, "uploadThroughput": 50_000},
+    "fast-3g": {"latency": 562.5, "downloadThroughput": 180_000, "uploadThroughput": 84_375},
+}
+
+# CPU slowdown multipliers relative to the machine running the browser
+CPU_PROFILES = {
+    "low-end": 4,
+    "mid-tier": 2,
+}
+
+# Collects LCP and long task entries from the very first frame of each document
+_OBSERVER_SCRIPT = """
+(() => {
+  const perf = window.__perf = { lcp: null, longTasks: [] };
+  try {
+    new PerformanceObserver((list) => {
+      for (const entry of list.getEntries()) perf.lcp = entry.startTime;
+    }).observe({ type: 'largest-contentful-paint', buffered: true });
+    new PerformanceObserver((list) => {
+      for (const entry of list.getEntries()) {
+        perf.longTasks.push([entry.startTime, entry.startTime + entry.duration]);
+      }
+    }).observe({ type: 'longtask', buffered: true });
+  } catch (e) { /* observers unsupported: metrics stay empty */ }
+})();
+"""
+
+
+@dataclass
+class FlowMetrics:
+    flow: str
+    ready_ms: float
+    tti_ms: float
+    js_heap_mb: float
+    transfer_kb: float
+    lcp_ms: float | None = None
+
+
+@dataclass
+class PerfReport:
+    profile: str
+    flows: list[FlowMetrics] = field(default_factory=list)
+    violations: list[str] = field(default_factory=list)
+
+
+def parse_profile(profile: str) -> tuple[dict | None, float]:
+    """Resolve ``network/cpu`` into CDP network conditions and a CPU rate."""
+    network, rate = None, 1
+    for part in filter(None, profile.split("/")):
+        if part in NETWORK_PROFILES:
+            network = NETWORK_PROFILES[part]
+        elif part in CPU_PROFILES:
+            rate = CPU_PROFILES[part]
+        else:
+            known = ", ".join([*NETWORK_PROFILES, *CPU_PROFILES])
+            raise ValueError(f"unknown profile part {part!r} (known: {known})")
+    return network, rate
+
+
+class _TransferCounter:
+    """Sums encoded bytes of every response finished on a CDP session."""
+
+    def __init__(self, cdp):
+        self.bytes = 0
+        cdp.on("Network.loadingFinished", self._finished)
+
+    def _finished(self, params) -> None:
+        self.bytes += params.get("encodedDataLength", 0)
+
+
+async def apply_profile(context, page, profile: str):
+    """Throttle ``page`` and return the CDP session used to measure it."""
+    network, rate = parse_profile(profile)
+    cdp = await context.new_cdp_session(page)
+    await cdp.send("Network.enable")
+    await cdp.send("Performance.enable")
+    if network:
+        await cdp.send("Network.emulateNetworkConditions", {"offline": False, **network})
+    if rate > 1:
+        await cdp.send("Emulation.setCPUThrottlingRate", {"rate": rate})
+    return cdp
+
+
+async def _heap_mb(cdp) -> float:
+    metrics = (await cdp.send("Performance.getMetrics"))["metrics"]
+    used = next((m["value"] for m in metrics if m["name"] == "JSHeapUsedSize"), 0)
+    return used / (1024 * 1024)
+
+
+async def measure_flow(page, cdp, transfer: _TransferCounter, flow: Flow) -> FlowMetrics:
+    if flow.prepare:
+        await flow.prepare(page)
+
+    start = 0.0 if flow.navigation else await page.evaluate("performance.now()")
+    bytes_before = transfer.bytes
+    await flow.action(page)
+    await page.locator(flow.ready).first.wait_for(state="visible", timeout=NAVIGATION_TIMEOUT_MS)
+    ready = await page.evaluate("performance.now()")
+
+    # Let trailing requests and renders finish before reading the rest
+    await settle(page, timeout_ms=NAVIGATION_TIMEOUT_MS)
+    perf = await page.evaluate("window.__perf || { lcp: null, longTasks: [] }")
+    last_long_task = max((end for begin, end in perf["longTasks"] if begin >= start), default=0.0)
+
+    return FlowMetrics(
+        flow=flow.name,
+        ready_ms=round(ready - start, 1),
+        tti_ms=round(max(ready, last_long_task) - start, 1),
+        js_heap_mb=round(await _heap_mb(cdp), 2),
+        transfer_kb=round((transfer.bytes - bytes_before) / 1024, 1),
+        lcp_ms=round(perf["lcp"], 1) if flow.navigation and perf["lcp"] is not None else None,
+    )
+
+
+async def measure_flows(context, page, profile: str = DEFAULT_PROFILE,
+                        flows: tuple[str, ...] = DEFAULT_FLOWS) -> PerfReport:
+    """Run ``flows`` in order on a fresh page under ``profile``."""
+    await context.add_init_script(_OBSERVER_SCRIPT)
+    cdp = await apply_profile(context, page, profile)
+    transfer = _TransferCounter(cdp)
+    context.set_default_timeout(NAVIGATION_TIMEOUT_MS)
+
+    report = PerfReport(profile)
+    for index, name in enumerate(flows):
+        flow = FLOWS[name]
+        if index == 0 and not flow.navigation:
+            await open_app(page)
+        report.flows.append(await measure_flow(page, cdp, transfer, flow))
+    return report
+
+
+def load_budgets(path: Path = BUDGETS_FILE) -> dict:
+    budgets = json.loads(path.read_text())
+    return {name: flows for name, flows in budgets.items() if not name.startswith("_")}
+
+
+def check_budgets(report: PerfReport, budgets: dict) -> list[str]:
+    """Return one message per metric over budget (and record them on ``report``)."""
+    profile_budgets = budgets.get(report.profile)
+    if profile_budgets is None:
+        raise KeyError(f"no budgets defined for profile {report.profile!r}")
+    violations = []
+    for metrics in report.flows:
+        for metric, limit in profile_budgets.get(metrics.flow, {}).items():
+            value = getattr(metrics, metric)
+            if value is not None and value > limit:
+                violations.append(f"{report.profile} {metrics.flow}: {metric} {value} > budget {limit}")
+    report.violations = violations
+    return violations
+
+
+def print_report(report: PerfReport, out=sys.stdout) -> None:
+    print(f"profile {report.profile}", file=out)
+    print(f"{'flow':<16}{'ready':>9}{'lcp':>9}{'tti':>9}{'heap MB':>9}{'KB':>9}", file=out)
+    for m in report.flows:
+        lcp = f"{m.lcp_ms:.0f}" if m.lcp_ms is not None else "-"
+        print(f"{m.flow:<16}{m.ready_ms:>9.0f}{lcp:>9}{m.tti_ms:>9.0f}"
+              f"{m.js_heap_mb:>9.1f}{m.transfer_kb:>9.1f}", file=out)
+    for violation in report.violations:
+        print(f"OVER BUDGET  {violation}", file=out)
+
+
+async def _run(profiles: list[str], flows: tuple[str, ...], headless: bool) -> list[PerfReport]:
+    reports = []
+    async with async_api.async_playwright() as pw:
+        browser = await launch_browser(pw, headless=headless)
+        try:
+            for profile in profiles:
+                # A fresh context per profile keeps the HTTP cache cold
+                context, page = await new_test_page(browser)
+                try:
+                    reports.append(await measure_flows(context, page, profile, flows))
+                finally:
+                    await context.close()
+        finally:
+            await browser.close()
+    return reports
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure app flows under 3G and CPU throttling.")
+    parser.add_argument("--profile", action="append", dest="profiles",
+                        help=f"network/cpu profile, repeatable (default {DEFAULT_PROFILE})")
+    parser.add_argument("--flow", action="append", dest="flows", choices=sorted(FLOWS),
+                        help=f"flows to run in order (default {' '.join(DEFAULT_FLOWS)})")
+    parser.add_argument("--budgets", type=Path, default=BUDGETS_FILE)
+    parser.add_argument("--check", action="store_true", help="exit non-zero when over budget")
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument("--json", type=Path, help="also write metrics to this JSON file")
+    args = parser.parse_args(argv)
+
+    profiles = args.profiles or [DEFAULT_PROFILE]
+    for profile in profiles:
+        parse_profile(profile)
+    reports = asyncio.run(_run(profiles, tuple(args.flows or DEFAULT_FLOWS), not args.headed))
+
+    budgets = load_budgets(args.budgets)
+    for report in reports:
+        if report.profile in budgets:
+            check_budgets(report, budgets)
+        print_report(report)
+        print()
+    if args.json:
+        args.json.write_text(json.dumps([asdict(r) for r in reports], indent=2))
+    return 1 if args.check and any(r.violations for r in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
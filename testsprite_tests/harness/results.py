@@ -0,0 +1,537 @@
+"""Run history: test and benchmark timings across runs, in SQLite.
+
+``tmp/test_results.json`` is replaced on every TestSprite run and carries
+the full source of each test, so nothing tells whether the suite or the app
+got slower. This store keeps one row per run (when, which commit, which
+machine, browser and app URL) and one row per test, flow metric or
+benchmark case with its duration, sample statistics and request counts.
+
+Every ``python -m harness.runner`` run is recorded automatically. The JSON
+reports of the other harnesses and database tools are imported, and the
+kind of report is detected from its shape:
+
+``harness.runner --json``            per test: status, seconds, requests
+``harness.perf --json``              per flow metric: ready, TTI, LCP (ms)
+``harness.network --json``           per flow: Supabase calls, bytes
+``harness.trace record --json``      per flow: long task, scripting, layout ms
+``database.tools.benchmark --out``   per RPC: n, mean, stdev and p50 (ms)
+``database.tools.soak --out``        per RPC: p50 of the last window (ms)
+``tmp/test_results.json``            TestSprite statuses (source dropped)
+
+A duration counts as a significant slowdown when it is at least
+``--min-ratio`` slower and unlikely to be noise: a one-sided Welch test
+(normal approximation) when both runs have samples (benchmarks), otherwise
+a robust z-score (median and MAD) against the same result in the previous
+``--window`` runs. Any increase in request count is reported.
+
+Usage::
+
+    cd testsprite_tests
+    python -m harness.results runs
+    python -m harness.results import tmp/perf.json --label my-branch
+    python -m harness.results trend TC006
+    python -m harness.results compare 12 15
+    python -m harness.results check          # latest run vs its history
+"""
+
+import argparse
+import json
+import math
+import platform
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from importlib import metadata
+from pathlib import Path
+
+from .browser import APP_URL
+
+SUITE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_DB = SUITE_DIR / "tmp" / "results.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+  id INTEGER PRIMARY KEY,
+  kind TEXT NOT NULL,
+  label TEXT,
+  started_at TEXT NOT NULL,
+  wall_seconds REAL,
+  git_sha TEXT,
+  git_branch TEXT,
+  git_dirty INTEGER,
+  host TEXT,
+  platform TEXT,
+  python TEXT,
+  playwright TEXT,
+  app_url TEXT,
+  source TEXT,
+  env TEXT NOT NULL DEFAULT '{}'
+);
+
+CREATE TABLE IF NOT EXISTS results (
+  run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+  name TEXT NOT NULL,
+  status TEXT,
+  duration_ms REAL,
+  n INTEGER,
+  mean_ms REAL,
+  stdev_ms REAL,
+  requests INTEGER,
+  api_requests INTEGER,
+  bytes INTEGER,
+  PRIMARY KEY (run_id, name)
+);
+
+CREATE INDEX IF NOT EXISTS idx_results_name ON results(name, run_id);
+"""
+
+# Welch tests need a few samples on both sides to mean anything
+MIN_SAMPLES = 5
+# History points needed before a single-valued result can be judged
+MIN_HISTORY = 3
+
+
+@dataclass
+class Result:
+    name: str
+    status: str | None = None
+    # The value compared across runs: a test's wall time, a flow metric,
+    # a benchmark's median
+    duration_ms: float | None = None
+    n: int | None = None
+    mean_ms: float | None = None
+    stdev_ms: float | None = None
+    requests: int | None = None
+    api_requests: int | None = None
+    bytes: int | None = None
+
+
+@dataclass
+class Run:
+    id: int
+    kind: str
+    label: str | None
+    started_at: str
+    git_sha: str | None
+    results: dict[str, Result]
+
+
+@dataclass
+class Finding:
+    name: str
+    message: str
+    # None when there is too little data to tell noise from a slowdown
+    significant: bool | None
+
+
+# ==============================================
+# STORE
+# ==============================================
+
+def open_store(path: Path = DEFAULT_DB) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _git(*args: str) -> str | None:
+    try:
+        out = subprocess.run(["git", *args], cwd=SUITE_DIR, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() if out.returncode == 0 else None
+
+
+def environment() -> dict:
+    """Metadata of the machine and checkout a run comes from."""
+    try:
+        playwright_version = metadata.version("playwright")
+    except metadata.PackageNotFoundError:
+        playwright_version = None
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "git_sha": _git("rev-parse", "HEAD"),
+        "git_branch": _git("rev-parse", "--abbrev-ref", "HEAD"),
+        "git_dirty": None if status is None else int(bool(status)),
+        "host": socket.gethostname(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "playwright": playwright_version,
+        "app_url": APP_URL,
+    }
+
+
+def record_run(conn: sqlite3.Connection, kind: str, results: list[Result], *,
+               label: str | None = None, wall_seconds: float | None = None,
+               source: str | None = None, env: dict | None = None,
+               started_at: str | None = None) -> int:
+    """Store one run and its results; returns the run id."""
+    meta = environment()
+    extra = dict(env or {})
+    # Values from the report (e.g. its own timestamp) win over the local ones
+    for key in list(extra):
+        if key in meta:
+            meta[key] = extra.pop(key)
+    with conn:
+        run_id = conn.execute(
+            """INSERT INTO runs (kind, label, started_at, wall_seconds, git_sha, git_branch,
+                                 git_dirty, host, platform, python, playwright, app_url, source, env)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (kind, label, started_at or datetime.now(timezone.utc).isoformat(timespec="seconds"),
+             wall_seconds, meta["git_sha"], meta["git_branch"], meta["git_dirty"], meta["host"],
+             meta["platform"], meta["python"], meta["playwright"], meta["app_url"], source,
+             json.dumps(extra)),
+        ).lastrowid
+        conn.executemany(
+            """INSERT OR REPLACE INTO results (run_id, name, status, duration_ms, n, mean_ms,
+                                               stdev_ms, requests, api_requests, bytes)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            [(run_id, r.name, r.status, r.duration_ms, r.n, r.mean_ms, r.stdev_ms,
+              r.requests, r.api_requests, r.bytes) for r in results],
+        )
+    return run_id
+
+
+def load_run(conn: sqlite3.Connection, run_id: int) -> Run:
+    row = conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+    if row is None:
+        raise KeyError(f"no run {run_id}")
+    results = {
+        r["name"]: Result(**{key: r[key] for key in r.keys() if key != "run_id"})
+        for r in conn.execute("SELECT * FROM results WHERE run_id = ?", (run_id,))
+    }
+    return Run(row["id"], row["kind"], row["label"], row["started_at"], row["git_sha"], results)
+
+
+def previous_run_ids(conn: sqlite3.Connection, run: Run, limit: int) -> list[int]:
+    """Earlier runs of the same kind, newest first."""
+    rows = conn.execute("SELECT id FROM runs WHERE kind = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                        (run.kind, run.id, limit))
+    return [row["id"] for row in rows]
+
+
+def history(conn: sqlite3.Connection, name: str, run_ids: list[int]) -> list[float]:
+    if not run_ids:
+        return []
+    marks = ",".join("?" * len(run_ids))
+    rows = conn.execute(
+        f"SELECT duration_ms FROM results WHERE name = ? AND run_id IN ({marks}) "
+        "AND duration_ms IS NOT NULL AND (status IS NULL OR status = 'passed')",
+        (name, *run_ids),
+    )
+    return [row["duration_ms"] for row in rows]
+
+
+# ==============================================
+# IMPORTERS
+# ==============================================
+
+def _from_runner(data: dict) -> tuple[str, list[Result], dict]:
+    results = [Result(r["test_id"], r["status"], round(r["seconds"] * 1000, 1),
+                      requests=r.get("requests"), api_requests=r.get("api_requests"))
+               for r in data["results"]]
+    return "suite", results, {"workers": data.get("workers"), "wall_seconds": data.get("wall_seconds")}
+
+
+def _from_testsprite(data: list) -> tuple[str, list[Result], dict]:
+    # Only the outcome: the records also carry each test's full source
+    results = [Result(record["title"].split("-", 1)[0], (record.get("testStatus") or "").lower() or None)
+               for record in data]
+    created = max((record.get("modified") or record.get("created") or "" for record in data), default="")
+    return "testsprite", results, {"started_at": created or None}
+
+
+def _from_perf(data: list) -> tuple[str, list[Result], dict]:
+    results = []
+    for report in data:
+        for flow in report["flows"]:
+            prefix = f"perf:{report['profile']}:{flow['flow']}"
+            for metric in ("ready_ms", "tti_ms", "lcp_ms"):
+                if flow.get(metric) is not None:
+                    results.append(Result(f"{prefix}:{metric}", duration_ms=flow[metric]))
+            results.append(Result(f"{prefix}:transfer", bytes=round(flow["transfer_kb"] * 1024)))
+    return "perf", results, {"profiles": [report["profile"] for report in data]}
+
+
+def _from_network(data: dict) -> tuple[str, list[Result], dict]:
+    results = [Result(f"network:{flow['flow']}", "failed" if flow["violations"] else "passed",
+                      flow["duration_ms"], api_requests=flow["calls"], bytes=flow["bytes"])
+               for flow in data["flows"]]
+    return "network", results, {}
+
+
+def _from_trace(data: dict) -> tuple[str, list[Result], dict]:
+    results = []
+    for flow in data["flows"]:
+        prefix = f"trace:{flow['flow']}"
+        long_ms = round(sum(task["duration_ms"] for task in flow["long_tasks"]), 1)
+        metrics = {"long_task_ms": long_ms, "scripting_ms": flow["scripting_ms"],
+                   "layout_ms": flow["layout_ms"], "commit_ms": flow["commit_ms"]}
+        results.extend(Result(f"{prefix}:{metric}", duration_ms=value, n=data["runs"])
+                       for metric, value in metrics.items() if value is not None)
+    return "trace", results, {"label": data["label"], "profile": data["profile"]}
+
+
+def _from_benchmark(data: dict) -> tuple[str, list[Result], dict]:
+    results = []
+    for scale, scale_results in data["scales"].items():
+        for case, result in scale_results["cases"].items():
+            timings = result["timings_ms"]
+            results.append(Result(f"benchmark:{scale}:{case}", duration_ms=timings["p50"],
+                                  n=timings["n"], mean_ms=timings["mean"], stdev_ms=timings["stdev"]))
+    return "benchmark", results, {"started_at": data.get("created_at"), "python": data.get("python"),
+                                  "repeat": data.get("repeat")}
+
+
+def _from_soak(data: dict) -> tuple[str, list[Result], dict]:
+    last = data["windows"][-1]
+    results = [Result(f"soak:{name}", duration_ms=ms, n=last["calls"].get(name))
+               for name, ms in last["p50_ms"].items()]
+    return "soak", results, {"config": data["config"], "exponents": data["exponents"]}
+
+
+def parse_report(data) -> tuple[str, list[Result], dict]:
+    """Recognize one of the supported reports; returns (kind, results, env)."""
+    if isinstance(data, list) and data and "testStatus" in data[0]:
+        return _from_testsprite(data)
+    if isinstance(data, list) and data and "profile" in data[0] and "flows" in data[0]:
+        return _from_perf(data)
+    if isinstance(data, dict):
+        if "results" in data and "wall_seconds" in data:
+            return _from_runner(data)
+        if "total_calls" in data:
+            return _from_network(data)
+        if "label" in data and "flows" in data:
+            return _from_trace(data)
+        if "scales" in data:
+            return _from_benchmark(data)
+        if "windows" in data and "exponents" in data:
+            return _from_soak(data)
+    raise ValueError("not a runner, TestSprite, perf, network, trace, benchmark or soak report")
+
+
+def import_report(conn: sqlite3.Connection, path: Path, label: str | None = None) -> int:
+    kind, results, env = parse_report(json.loads(path.read_text()))
+    started_at = env.pop("started_at", None)
+    wall_seconds = env.pop("wall_seconds", None)
+    label = label or env.pop("label", None)
+    return record_run(conn, kind, results, label=label, wall_seconds=wall_seconds,
+                      source=str(path), env=env, started_at=started_at)
+
+
+# ==============================================
+# ANALYSIS
+# ==============================================
+
+def welch_p_value(base: Result, head: Result) -> float | None:
+    """One-sided p-value that ``head``'s mean is above ``base``'s, or None."""
+    if not all((base.n, head.n, base.mean_ms is not None, head.mean_ms is not None,
+                base.stdev_ms is not None, head.stdev_ms is not None)):
+        return None
+    if min(base.n, head.n) < MIN_SAMPLES:
+        return None
+    error = math.sqrt(base.stdev_ms ** 2 / base.n + head.stdev_ms ** 2 / head.n)
+    if error == 0:
+        return 0.0 if head.mean_ms > base.mean_ms else 1.0
+    return 1 - statistics.NormalDist().cdf((head.mean_ms - base.mean_ms) / error)
+
+
+def robust_z(value: float, past: list[float]) -> float | None:
+    """How many (MAD-scaled) deviations ``value`` lies above the median of ``past``."""
+    if len(past) < MIN_HISTORY:
+        return None
+    median = statistics.median(past)
+    mad = statistics.median(abs(x - median) for x in past) * 1.4826
+    # Perfectly stable history: fall back to a 1% spread
+    spread = mad or abs(median) * 0.01 or 1.0
+    return (value - median) / spread
+
+
+def assess(name: str, base: Result | None, head: Result, past: list[float], min_ratio: float = 0.1,
+           alpha: float = 0.01, z_limit: float = 3.0) -> list[Finding]:
+    """Slowdowns and request increases of ``head`` against ``base`` and ``past``."""
+    findings = []
+    if base is not None:
+        for field_name in ("requests", "api_requests"):
+            before, after = getattr(base, field_name), getattr(head, field_name)
+            if before is not None and after is not None and after > before:
+                findings.append(Finding(name, f"{field_name} {before} -> {after}", True))
+
+    if head.duration_ms is None or head.status not in (None, "passed"):
+        return findings
+    reference = base.duration_ms if base is not None and base.duration_ms is not None else None
+    if reference is None and past:
+        reference = statistics.median(past)
+    if not reference or head.duration_ms < reference * (1 + min_ratio):
+        return findings
+
+    change = f"{reference:.1f} -> {head.duration_ms:.1f} ms (+{(head.duration_ms / reference - 1) * 100:.0f}%)"
+    p_value = welch_p_value(base, head) if base is not None else None
+    if p_value is not None:
+        findings.append(Finding(name, f"{change}, p={p_value:.3g}", p_value < alpha))
+        return findings
+    z = robust_z(head.duration_ms, past)
+    if z is None:
+        findings.append(Finding(name, f"{change}, {len(past)} earlier run(s): too few to judge", None))
+    else:
+        findings.append(Finding(name, f"{change}, z={z:.1f} over {len(past)} runs", z > z_limit))
+    return findings
+
+
+def compare_runs(conn: sqlite3.Connection, base_id: int, head_id: int, window: int = 10,
+                 min_ratio: float = 0.1, alpha: float = 0.01) -> list[Finding]:
+    """Findings for ``head`` against ``base``, with ``base`` and its predecessors as history."""
+    base, head = load_run(conn, base_id), load_run(conn, head_id)
+    past_ids = [base.id, *previous_run_ids(conn, base, window - 1)]
+    findings = []
+    for name, result in sorted(head.results.items()):
+        findings.extend(assess(name, base.results.get(name), result, history(conn, name, past_ids),
+                               min_ratio, alpha))
+    return findings
+
+
+def check_run(conn: sqlite3.Connection, run_id: int | None = None, window: int = 10,
+              min_ratio: float = 0.1, alpha: float = 0.01) -> tuple[Run, list[Finding]]:
+    """Compare a run (default the latest) with the previous run of its kind."""
+    if run_id is None:
+        row = conn.execute("SELECT MAX(id) AS id FROM runs").fetchone()
+        if row["id"] is None:
+            raise KeyError("the results store is empty")
+        run_id = row["id"]
+    run = load_run(conn, run_id)
+    earlier = previous_run_ids(conn, run, 1)
+    if not earlier:
+        return run, []
+    return run, compare_runs(conn, earlier[0], run.id, window, min_ratio, alpha)
+
+
+# ==============================================
+# OUTPUT
+# ==============================================
+
+_SPARKS = "▁▂▃▄▅▆▇█"
+
+
+def sparkline(values: list[float]) -> str:
+    low, high = min(values), max(values)
+    if high == low:
+        return _SPARKS[0] * len(values)
+    return "".join(_SPARKS[round((v - low) / (high - low) * (len(_SPARKS) - 1))] for v in values)
+
+
+def print_runs(conn: sqlite3.Connection, kind: str | None, limit: int, out=sys.stdout) -> None:
+    rows = conn.execute(
+        """SELECT r.*, COUNT(x.name) AS results,
+                  SUM(CASE WHEN x.status IS NOT NULL AND x.status <> 'passed' THEN 1 ELSE 0 END) AS failing
+           FROM runs r LEFT JOIN results x ON x.run_id = r.id
+           WHERE ? IS NULL OR r.kind = ?
+           GROUP BY r.id ORDER BY r.id DESC LIMIT ?""",
+        (kind, kind, limit),
+    ).fetchall()
+    for row in rows:
+        sha = (row["git_sha"] or "")[:8] + ("+" if row["git_dirty"] else "")
+        wall = f"{row['wall_seconds']:.0f}s" if row["wall_seconds"] is not None else "-"
+        print(f"{row['id']:>5}  {row['started_at']:<25} {row['kind']:<10} {sha:<10} "
+              f"{row['results']:>4} results {row['failing'] or 0:>3} failing  {wall:>6}  "
+              f"{row['label'] or ''}", file=out)
+
+
+def print_trend(conn: sqlite3.Connection, pattern: str, limit: int, out=sys.stdout) -> None:
+    # Per kind: TC006 of the runner and of a TestSprite import are different series
+    series = conn.execute(
+        """SELECT DISTINCT r.kind, x.name FROM results x JOIN runs r ON r.id = x.run_id
+           WHERE x.name LIKE ? ORDER BY x.name, r.kind""",
+        (f"%{pattern}%",),
+    ).fetchall()
+    for kind, name in series:
+        rows = conn.execute(
+            """SELECT x.* FROM results x JOIN runs r ON r.id = x.run_id
+               WHERE x.name = ? AND r.kind = ? ORDER BY x.run_id DESC LIMIT ?""",
+            (name, kind, limit),
+        ).fetchall()[::-1]
+        values = [row["duration_ms"] for row in rows if row["duration_ms"] is not None]
+        requests = [row["api_requests"] for row in rows if row["api_requests"] is not None]
+        line = f"{kind:<10} {name:<48}"
+        if values:
+            line += (f" {sparkline(values)}  last {values[-1]:.1f} ms, median {statistics.median(values):.1f} ms"
+                     f" over {len(values)} runs")
+        if requests:
+            line += f"  api requests {requests[0]} -> {requests[-1]}"
+        failing = sum(row["status"] not in (None, "passed") for row in rows)
+        if failing:
+            line += f"  {failing} of {len(rows)} failing"
+        print(line, file=out)
+
+
+def print_findings(findings: list[Finding], out=sys.stdout) -> None:
+    for finding in findings:
+        tag = {True: "SLOWER", False: "noise?", None: "slower?"}[finding.significant]
+        print(f"{tag:<8} {finding.name:<48} {finding.message}", file=out)
+    significant = sum(f.significant is True for f in findings)
+    print(f"{significant} significant slowdown(s)", file=out)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect the history of test and benchmark runs.")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB, help=f"results store (default {DEFAULT_DB})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    runs = commands.add_parser("runs", help="list recorded runs, newest first")
+    runs.add_argument("--kind")
+    runs.add_argument("--limit", type=int, default=20)
+
+    imported = commands.add_parser("import", help="record a JSON report as a run")
+    imported.add_argument("paths", type=Path, nargs="+")
+    imported.add_argument("--label")
+
+    trend = commands.add_parser("trend", help="durations of matching results across runs")
+    trend.add_argument("pattern", help="substring of the result name, e.g. TC006 or get_shop_balance")
+    trend.add_argument("--limit", type=int, default=20)
+
+    for name, help_text in (("compare", "slowdowns of one run against another"),
+                            ("check", "slowdowns of a run (default the latest) against its history")):
+        command = commands.add_parser(name, help=help_text)
+        if name == "compare":
+            command.add_argument("base", type=int)
+            command.add_argument("head", type=int)
+        else:
+            command.add_argument("--run", type=int)
+        command.add_argument("--window", type=int, default=10, help="earlier runs used as history")
+        command.add_argument("--min-ratio", type=float, default=0.1, help="ignore slowdowns below this fraction")
+        command.add_argument("--alpha", type=float, default=0.01, help="significance level of the Welch test")
+    args = parser.parse_args(argv)
+
+    conn = open_store(args.db)
+    try:
+        if args.command == "runs":
+            print_runs(conn, args.kind, args.limit)
+        elif args.command == "import":
+            for path in args.paths:
+                run_id = import_report(conn, path, args.label)
+                print(f"{path}: run {run_id} ({load_run(conn, run_id).kind})")
+        elif args.command == "trend":
+            print_trend(conn, args.pattern, args.limit)
+        elif args.command == "compare":
+            findings = compare_runs(conn, args.base, args.head, args.window, args.min_ratio, args.alpha)
+            print(f"run {args.base} -> run {args.head}")
+            print_findings(findings)
+            return 1 if any(f.significant for f in findings) else 0
+        else:
+            run, findings = check_run(conn, args.run, args.window, args.min_ratio, args.alpha)
+            print(f"run {run.id} ({run.kind}, {run.started_at})")
+            print_findings(findings)
+            return 1 if any(f.significant for f in findings) else 0
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""Run the TCxxx suite concurrently against one shared browser.
+
+One Chromium instance is launched per run; every test gets its own
+isolated context, and up to ``--workers`` tests run at the same time.
+Modules that set ``SERIAL = True`` (throttled performance runs) run one at
+a time after the rest, and ``TIMEOUT`` overrides the per-test timeout.
+Per-test wall time and request counts are reported at the end and
+recorded in the results store (see :mod:`harness.results`).
+
+    cd testsprite_tests
+    python -m harness.runner --workers 4
+    python -m harness.runner -k TC006 -k TC007 --json tmp/run.json
+"""
+
+import argparse
+import asyncio
+import functools
+import importlib.util
+import json
+import sys
+import time
+import traceback
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from playwright import async_api
+
+from . import results as store
+from .browser import launch_browser, new_test_page
+from .waits import track_network
+
+SUITE_DIR = Path(__file__).resolve().parent.parent
+
+
+@dataclass
+class TestResult:
+    test_id: str
+    title: str
+    status: str
+    seconds: float
+    error: str | None = None
+    # Requests the test's page made, and how many of them hit Supabase REST
+    requests: int = 0
+    api_requests: int = 0
+
+
+def discover(patterns: list[str] | None = None) -> list[Path]:
+    paths = sorted(SUITE_DIR.glob("TC[0-9][0-9][0-9]_*.py"))
+    if patterns:
+        paths = [p for p in paths if any(pattern in p.stem for pattern in patterns)]
+    return paths
+
+
+@functools.lru_cache(maxsize=None)
+def load_test(path: Path):
+    spec = importlib.util.spec_from_file_location(f"testsprite_{path.stem}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def is_serial(path: Path) -> bool:
+    try:
+        return bool(getattr(load_test(path), "SERIAL", False))
+    except Exception:
+        return False  # the import error is reported by run_one
+
+
+def _describe(path: Path) -> tuple[str, str]:
+    test_id, _, title = path.stem.partition("_")
+    return test_id, title.replace("_", " ")
+
+
+async def run_one(browser, path: Path, semaphore: asyncio.Semaphore, timeout: float) -> TestResult:
+    test_id, title = _describe(path)
+    async with semaphore:
+        started = time.perf_counter()
+        context = tracker = None
+        try:
+            module = load_test(path)
+            timeout = getattr(module, "TIMEOUT", timeout)
+            context, page = await new_test_page(browser)
+            tracker = track_network(page)
+            await asyncio.wait_for(module.run_test(context, page), timeout)
+            status, error = "passed", None
+        except AssertionError as exc:
+            status, error = "failed", str(exc)
+        except asyncio.TimeoutError:
+            status, error = "failed", f"timed out after {timeout:.0f}s"
+        except Exception:
+            status, error = "error", traceback.format_exc(limit=3)
+        finally:
+            if context is not None:
+                await context.close()
+        result = TestResult(test_id, title, status, time.perf_counter() - started, error)
+        if tracker is not None:
+            result.requests, result.api_requests = tracker.requests, tracker.api_requests
+        return result
+
+
+async def run_suite(paths: list[Path], workers: int = 4, headless: bool = True,
+                    timeout: float = 180.0) -> list[TestResult]:
+    semaphore = asyncio.Semaphore(max(1, workers))
+    async with async_api.async_playwright() as pw:
+        browser = await launch_browser(pw, headless=headless)
+        try:
+            concurrent = [p for p in paths if not is_serial(p)]
+            results = await asyncio.gather(*(run_one(browser, path, semaphore, timeout) for path in concurrent))
+            alone = asyncio.Semaphore(1)
+            for path in paths:
+                if is_serial(path):
+                    results.append(await run_one(browser, path, alone, timeout))
+            return sorted(results, key=lambda r: r.test_id)
+        finally:
+            await browser.close()
+
+
+def print_report(results: list[TestResult], wall: float, out=sys.stdout) -> None:
+    width = max((len(r.title) for r in results), default=10)
+    for r in results:
+        print(f"{r.test_id}  {r.title:<{width}}  {r.status:<6}  {r.seconds:7.2f}s"
+              f"  {r.requests:>4} requests ({r.api_requests} api)", file=out)
+    passed = sum(r.status == "passed" for r in results)
+    serial = sum(r.seconds for r in results)
+    print(f"\n{passed}/{len(results)} passed; wall {wall:.1f}s, "
+          f"sum of test times {serial:.1f}s", file=out)
+    for r in results:
+        if r.error:
+            print(f"\n--- {r.test_id} {r.status}: {r.error.strip()}", file=out)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the testsprite suite with a shared browser.")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="tests run concurrently (default 4)")
+    parser.add_argument("-k", dest="patterns", action="append", help="only tests whose file name contains this")
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument("--timeout", type=float, default=180.0, help="per-test timeout in seconds")
+    parser.add_argument("--json", type=Path, help="also write results to this JSON file")
+    parser.add_argument("--label", help="name of this run in the results store (e.g. a branch)")
+    parser.add_argument("--store", type=Path, default=store.DEFAULT_DB, help="results store to record the run in")
+    parser.add_argument("--no-store", action="store_true", help="do not record the run")
+    args = parser.parse_args(argv)
+
+    paths = discover(args.patterns)
+    if not paths:
+        print("no tests matched", file=sys.stderr)
+        return 2
+    started = time.perf_counter()
+    results = asyncio.run(run_suite(paths, args.workers, not args.headed, args.timeout))
+    wall = time.perf_counter() - started
+    print_report(results, wall)
+    if args.json:
+        args.json.write_text(json.dumps({
+            "wall_seconds": wall,
+            "workers": args.workers,
+            "results": [asdict(r) for r in results],
+        }, indent=2))
+    if not args.no_store:
+        conn = store.open_store(args.store)
+        try:
+            run_id = store.record_run(
+                conn, "suite",
+                [store.Result(r.test_id, r.status, round(r.seconds * 1000, 1),
+                              requests=r.requests, api_requests=r.api_requests) for r in results],
+                label=args.label, wall_seconds=round(wall, 2), env={"workers": args.workers},
+            )
+        finally:
+            conn.close()
+        print(f"recorded as run {run_id} in {args.store} (python -m harness.results check)")
+    return 0 if all(r.status == "passed" for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
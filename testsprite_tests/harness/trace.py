@@ -0,0 +1,550 @@
+"""Main-thread traces and React commit profiles per user flow.
+
+For every flow in :mod:`harness.flows` the harness records a Chrome
+performance trace (the same data as the DevTools Performance panel) and
+every React commit, then reduces them to a report per screen:
+
+``long tasks``   main-thread tasks over 50 ms, with their start and length
+``main thread``  self time split into scripting, style/layout, paint and other
+``handlers``     event dispatches (``event:click``) and JS functions
+                 (``fn:name file:line``) by total time on the main thread
+``components``   React components by commits they rendered in and by
+                 render time
+
+React commits are collected through a minimal ``__REACT_DEVTOOLS_GLOBAL_HOOK__``
+installed before the app loads. Render times need React's profiling timers:
+the dev server has them, a production bundle only when built with
+``REACT_PROFILING=1 npm run build`` (see ``frontend/vite.config.ts``);
+otherwise commit counts are reported without timings.
+
+Record a report per build and compare them; ``--check`` exits non-zero when
+a flow, component or handler got slower than the thresholds::
+
+    cd testsprite_tests
+    python -m harness.trace record --label main --runs 3 --json tmp/trace_main.json
+    python -m harness.trace record --label branch --runs 3 --json tmp/trace_branch.json
+    python -m harness.trace compare tmp/trace_main.json tmp/trace_branch.json --check
+
+``--save-traces DIR`` keeps the raw Chrome traces (load them in the DevTools
+Performance panel) and a Playwright trace per flow (``playwright show-trace``).
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import sys
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from playwright import async_api
+
+from .browser import launch_browser, new_test_page, open_app
+from .flows import FLOWS, NAVIGATION_TIMEOUT_MS, Flow
+from .perf import apply_profile, parse_profile
+from .waits import settle
+
+DEFAULT_FLOWS = ("login", "shops_list", "shop_detail", "back_from_shop", "settings")
+
+LONG_TASK_MS = 50.0
+TOP = 10
+
+TRACE_CATEGORIES = [
+    "toplevel",
+    "devtools.timeline",
+    "disabled-by-default-devtools.timeline",
+    "v8.execute",
+    "blink.user_timing",
+    "loading",
+]
+
+# Trace event names per DevTools category; the self time of anything else
+# (including the task runner itself) counts as "other"
+SCRIPTING_EVENTS = {
+    "EvaluateScript", "v8.compile", "v8.compileModule", "v8.evaluateModule",
+    "FunctionCall", "TimerFire", "EventDispatch", "RunMicrotasks",
+    "FireAnimationFrame", "FireIdleCallback", "XHRReadyStateChange", "XHRLoad",
+    "V8.Execute", "v8.run", "MajorGC", "MinorGC", "V8.GCScavenger", "V8.GCFinalizeMC",
+}
+LAYOUT_EVENTS = {
+    "Layout", "UpdateLayoutTree", "RecalculateStyles", "UpdateLayerTree",
+    "HitTest", "PrePaint", "Layerize", "ScheduleStyleRecalculation", "InvalidateLayout",
+}
+PAINT_EVENTS = {
+    "Paint", "PaintImage", "Decode Image", "CompositeLayers", "Commit", "RasterTask",
+}
+TASK_EVENTS = {"RunTask", "ThreadControllerImpl::RunTask"}
+
+_CHUNK_HASH = re.compile(r"-[\w-]{8}(\.js)$")
+
+# Records which components rendered in each commit. A subtree whose child
+# list is shared with the previous tree bailed out and is skipped; a
+# component rendered if it is new or has React's PerformedWork flag.
+# selfBaseDuration/actualDuration exist only with React's profiling timers.
+_REACT_HOOK_SCRIPT = """
+(() => {
+  if (window.__REACT_DEVTOOLS_GLOBAL_HOOK__) return;  // the real DevTools win
+  const commits = window.__reactCommits = [];
+  // Function, class, forwardRef, memo and simple memo components
+  const COMPONENT_TAGS = new Set([0, 1, 11, 14, 15]);
+  const PERFORMED_WORK = 1;
+  const typeName = (type) => !type ? null : typeof type === 'function'
+    ? (type.displayName || type.name || null)
+    : (type.displayName || typeName(type.render) || typeName(type.type));
+  const walk = (fiber, rendered) => {
+    for (; fiber; fiber = fiber.sibling) {
+      const prev = fiber.alternate;
+      if (COMPONENT_TAGS.has(fiber.tag) && (prev === null || (fiber.flags & PERFORMED_WORK))) {
+        const ms = typeof fiber.selfBaseDuration === 'number' ? fiber.selfBaseDuration : null;
+        rendered.push([typeName(fiber.type) || 'Anonymous', ms]);
+      }
+      if (fiber.child && !(prev && prev.child === fiber.child)) walk(fiber.child, rendered);
+    }
+  };
+  let renderers = 0;
+  window.__REACT_DEVTOOLS_GLOBAL_HOOK__ = {
+    supportsFiber: true,
+    renderers: new Map(),
+    inject(renderer) { this.renderers.set(++renderers, renderer); return renderers; },
+    checkDCE() {},
+    onScheduleFiberRoot() {},
+    onCommitFiberUnmount() {},
+    onPostCommitFiberRoot() {},
+    onCommitFiberRoot(id, root) {
+      try {
+        const rendered = [];
+        walk(root.current, rendered);
+        const ms = root.current.actualDuration;
+        commits.push({ at: performance.now(), ms: typeof ms === 'number' ? ms : null, components: rendered });
+      } catch (e) { /* never break the app for a profile */ }
+    },
+  };
+})();
+"""
+
+
+@dataclass
+class LongTask:
+    start_ms: float
+    duration_ms: float
+
+
+@dataclass
+class HandlerStats:
+    name: str
+    calls: int
+    total_ms: float
+    max_ms: float
+
+
+@dataclass
+class ComponentStats:
+    name: str
+    commits: int
+    renders: int
+    # None when the build has no profiling timers
+    total_ms: float | None = None
+    max_ms: float | None = None
+
+
+@dataclass
+class FlowTrace:
+    flow: str
+    wall_ms: float
+    long_tasks: list[LongTask] = field(default_factory=list)
+    scripting_ms: float = 0.0
+    layout_ms: float = 0.0
+    paint_ms: float = 0.0
+    other_ms: float = 0.0
+    commits: int = 0
+    commit_ms: float | None = None
+    handlers: list[HandlerStats] = field(default_factory=list)
+    components: list[ComponentStats] = field(default_factory=list)
+
+    @property
+    def long_task_ms(self) -> float:
+        return round(sum(task.duration_ms for task in self.long_tasks), 1)
+
+
+@dataclass
+class TraceReport:
+    label: str
+    profile: str
+    runs: int
+    flows: list[FlowTrace] = field(default_factory=list)
+
+
+# ==============================================
+# CHROME TRACE
+# ==============================================
+
+def _main_thread(events: list[dict]) -> tuple[int, int] | None:
+    """The renderer main thread that ran the most top-level task time."""
+    renderer_threads = {
+        (e["pid"], e["tid"]) for e in events
+        if e.get("ph") == "M" and e.get("name") == "thread_name"
+        and e.get("args", {}).get("name") == "CrRendererMain"
+    }
+    busy = defaultdict(float)
+    for e in events:
+        key = (e.get("pid"), e.get("tid"))
+        if e.get("ph") == "X" and e.get("name") in TASK_EVENTS and key in renderer_threads:
+            busy[key] += e.get("dur", 0)
+    return max(busy, key=busy.get) if busy else None
+
+
+def _handler_name(event: dict) -> str | None:
+    data = event.get("args", {}).get("data") or {}
+    if event["name"] == "EventDispatch" and data.get("type"):
+        return f"event:{data['type']}"
+    if event["name"] == "FunctionCall":
+        url = (data.get("url") or "").rsplit("/", 1)[-1].split("?")[0]
+        # Chunk names without Vite's content hash, so two builds line up
+        url = _CHUNK_HASH.sub(r"\1", url)
+        function = data.get("functionName") or "(anonymous)"
+        return f"fn:{function} {url}:{data.get('lineNumber', 0)}" if url else f"fn:{function}"
+    return None
+
+
+def analyze_trace(events: list[dict], flow: str, wall_ms: float) -> FlowTrace:
+    """Reduce the main-thread events of one flow's trace to a ``FlowTrace``."""
+    result = FlowTrace(flow, round(wall_ms, 1))
+    thread = _main_thread(events)
+    if thread is None:
+        return result
+
+    spans = sorted(
+        (e for e in events
+         if e.get("ph") == "X" and (e.get("pid"), e.get("tid")) == thread and "dur" in e),
+        key=lambda e: (e["ts"], -e["dur"]),
+    )
+    origin = spans[0]["ts"] if spans else 0
+    self_us = defaultdict(float)
+    handlers = defaultdict(list)
+    # Open spans as [end, event, time covered by children]
+    stack: list[list] = []
+
+    def close(entry: list) -> None:
+        _, event, children = entry
+        name = event["name"]
+        own = max(event["dur"] - children, 0)
+        if name in SCRIPTING_EVENTS:
+            self_us["scripting"] += own
+        elif name in LAYOUT_EVENTS:
+            self_us["layout"] += own
+        elif name in PAINT_EVENTS:
+            self_us["paint"] += own
+        else:
+            self_us["other"] += own
+
+    for event in spans:
+        while stack and stack[-1][0] <= event["ts"]:
+            close(stack.pop())
+        if stack:
+            stack[-1][2] += event["dur"]
+        elif event["name"] in TASK_EVENTS and event["dur"] / 1000 > LONG_TASK_MS:
+            result.long_tasks.append(
+                LongTask(round((event["ts"] - origin) / 1000, 1), round(event["dur"] / 1000, 1)))
+        handler = _handler_name(event)
+        if handler:
+            handlers[handler].append(event["dur"] / 1000)
+        stack.append([event["ts"] + event["dur"], event, 0.0])
+    while stack:
+        close(stack.pop())
+
+    result.scripting_ms = round(self_us["scripting"] / 1000, 1)
+    result.layout_ms = round(self_us["layout"] / 1000, 1)
+    result.paint_ms = round(self_us["paint"] / 1000, 1)
+    result.other_ms = round(self_us["other"] / 1000, 1)
+    result.handlers = sorted(
+        (HandlerStats(name, len(times), round(sum(times), 1), round(max(times), 1))
+         for name, times in handlers.items()),
+        key=lambda h: h.total_ms, reverse=True,
+    )[:TOP]
+    return result
+
+
+# ==============================================
+# REACT COMMITS
+# ==============================================
+
+def add_commits(result: FlowTrace, commits: list[dict]) -> FlowTrace:
+    """Aggregate the hook's commits into per-component stats on ``result``."""
+    stats: dict[str, dict] = {}
+    timed = [c["ms"] for c in commits if c["ms"] is not None]
+    for commit in commits:
+        seen = set()
+        for name, ms in commit["components"]:
+            entry = stats.setdefault(name, {"commits": 0, "renders": 0, "times": []})
+            entry["renders"] += 1
+            if ms is not None:
+                entry["times"].append(ms)
+            if name not in seen:
+                seen.add(name)
+                entry["commits"] += 1
+    result.commits = len(commits)
+    result.commit_ms = round(sum(timed), 1) if timed else None
+    result.components = [
+        ComponentStats(
+            name, entry["commits"], entry["renders"],
+            round(sum(entry["times"]), 1) if entry["times"] else None,
+            round(max(entry["times"]), 1) if entry["times"] else None,
+        )
+        for name, entry in stats.items()
+    ]
+    result.components.sort(key=lambda c: (c.total_ms or 0, c.commits), reverse=True)
+    return result
+
+
+def slowest_components(result: FlowTrace, limit: int = TOP) -> list[ComponentStats]:
+    return [c for c in result.components if c.total_ms is not None][:limit]
+
+
+def busiest_components(result: FlowTrace, limit: int = TOP) -> list[ComponentStats]:
+    return sorted(result.components, key=lambda c: (c.commits, c.renders), reverse=True)[:limit]
+
+
+# ==============================================
+# RECORDING
+# ==============================================
+
+async def trace_flow(browser, page, flow: Flow, save_dir: Path | None = None) -> FlowTrace:
+    if flow.prepare:
+        await flow.prepare(page)
+    offset = 0 if flow.navigation else await page.evaluate("(window.__reactCommits || []).length")
+
+    if save_dir:
+        await page.context.tracing.start_chunk(title=flow.name)
+    await browser.start_tracing(page=page, categories=TRACE_CATEGORIES)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await flow.action(page)
+    await page.locator(flow.ready).first.wait_for(state="visible", timeout=NAVIGATION_TIMEOUT_MS)
+    # Trailing requests and the renders they cause belong to the flow
+    await settle(page, timeout_ms=NAVIGATION_TIMEOUT_MS)
+    wall_ms = (loop.time() - started) * 1000
+    raw = await browser.stop_tracing()
+    if save_dir:
+        await page.context.tracing.stop_chunk(path=save_dir / f"{flow.name}.zip")
+        (save_dir / f"{flow.name}.json").write_bytes(raw)
+
+    trace = json.loads(raw)
+    events = trace["traceEvents"] if isinstance(trace, dict) else trace
+    commits = await page.evaluate("(window.__reactCommits || [])")
+    return add_commits(analyze_trace(events, flow.name, wall_ms), commits[offset:])
+
+
+async def trace_flows(browser, context, page, flows: tuple[str, ...] = DEFAULT_FLOWS,
+                      profile: str | None = None, save_dir: Path | None = None) -> list[FlowTrace]:
+    """Run ``flows`` in order on a fresh page, tracing each one."""
+    await context.add_init_script(_REACT_HOOK_SCRIPT)
+    if profile:
+        await apply_profile(context, page, profile)
+    context.set_default_timeout(NAVIGATION_TIMEOUT_MS)
+    if save_dir:
+        save_dir.mkdir(parents=True, exist_ok=True)
+        await context.tracing.start(screenshots=True, snapshots=True)
+
+    results = []
+    for index, name in enumerate(flows):
+        flow = FLOWS[name]
+        if index == 0 and not flow.navigation:
+            await open_app(page)
+        results.append(await trace_flow(browser, page, flow, save_dir))
+    if save_dir:
+        await context.tracing.stop()
+    return results
+
+
+def _median(values: list) -> float | None:
+    values = [v for v in values if v is not None]
+    return round(statistics.median(values), 1) if values else None
+
+
+def merge_runs(runs: list[FlowTrace]) -> FlowTrace:
+    """Median of each metric over repeated runs of one flow."""
+    if len(runs) == 1:
+        return runs[0]
+    merged = FlowTrace(runs[0].flow, _median([r.wall_ms for r in runs]))
+    for metric in ("scripting_ms", "layout_ms", "paint_ms", "other_ms", "commits", "commit_ms"):
+        setattr(merged, metric, _median([getattr(r, metric) for r in runs]))
+    # The run with the median long task time stands for the others
+    by_long_tasks = sorted(runs, key=lambda r: r.long_task_ms)
+    merged.long_tasks = by_long_tasks[len(runs) // 2].long_tasks
+
+    # Missing from a run counts as zero calls and commits in that run
+    handlers = [{h.name: h for h in run.handlers} for run in runs]
+    components = [{c.name: c for c in run.components} for run in runs]
+    merged.handlers = sorted(
+        (HandlerStats(name,
+                      int(_median([h[name].calls if name in h else 0 for h in handlers])),
+                      _median([h[name].total_ms if name in h else 0 for h in handlers]),
+                      _median([h[name].max_ms if name in h else 0 for h in handlers]))
+         for name in set().union(*handlers)),
+        key=lambda h: h.total_ms, reverse=True,
+    )[:TOP]
+    merged.components = sorted(
+        (ComponentStats(name,
+                        int(_median([c[name].commits if name in c else 0 for c in components])),
+                        int(_median([c[name].renders if name in c else 0 for c in components])),
+                        _median([c[name].total_ms for c in components if name in c]),
+                        _median([c[name].max_ms for c in components if name in c]))
+         for name in set().union(*components)),
+        key=lambda c: (c.total_ms or 0, c.commits), reverse=True,
+    )
+    return merged
+
+
+async def _record(flows: tuple[str, ...], runs: int, profile: str | None, headless: bool,
+                  save_dir: Path | None) -> list[FlowTrace]:
+    per_flow = defaultdict(list)
+    async with async_api.async_playwright() as pw:
+        browser = await launch_browser(pw, headless=headless)
+        try:
+            for run in range(runs):
+                # A fresh context per run keeps the HTTP cache and React state cold
+                context, page = await new_test_page(browser)
+                run_dir = save_dir / f"run{run + 1}" if save_dir and runs > 1 else save_dir
+                try:
+                    for result in await trace_flows(browser, context, page, flows, profile, run_dir):
+                        per_flow[result.flow].append(result)
+                finally:
+                    await context.close()
+        finally:
+            await browser.close()
+    return [merge_runs(per_flow[name]) for name in flows]
+
+
+# ==============================================
+# REPORTS
+# ==============================================
+
+def write_report(report: TraceReport, path: Path) -> None:
+    path.write_text(json.dumps(asdict(report), indent=2))
+
+
+def load_report(path: Path) -> TraceReport:
+    data = json.loads(path.read_text())
+    flows = []
+    for flow in data["flows"]:
+        flows.append(FlowTrace(
+            **{k: v for k, v in flow.items() if k not in ("long_tasks", "handlers", "components")},
+            long_tasks=[LongTask(**t) for t in flow["long_tasks"]],
+            handlers=[HandlerStats(**h) for h in flow["handlers"]],
+            components=[ComponentStats(**c) for c in flow["components"]],
+        ))
+    return TraceReport(data["label"], data["profile"], data["runs"], flows)
+
+
+def print_report(report: TraceReport, out=sys.stdout) -> None:
+    print(f"{report.label}: profile {report.profile}, median of {report.runs} run(s)", file=out)
+    print(f"{'flow':<16}{'wall':>8}{'long':>6}{'long ms':>9}{'script':>8}{'layout':>8}"
+          f"{'paint':>7}{'other':>7}{'commits':>9}{'render':>8}", file=out)
+    for f in report.flows:
+        render = f"{f.commit_ms:.0f}" if f.commit_ms is not None else "-"
+        print(f"{f.flow:<16}{f.wall_ms:>8.0f}{len(f.long_tasks):>6}{f.long_task_ms:>9.0f}"
+              f"{f.scripting_ms:>8.0f}{f.layout_ms:>8.0f}{f.paint_ms:>7.0f}{f.other_ms:>7.0f}"
+              f"{f.commits:>9}{render:>8}", file=out)
+    for f in report.flows:
+        print(f"\n{f.flow}", file=out)
+        for task in f.long_tasks:
+            print(f"  long task     {task.duration_ms:>7.1f} ms at {task.start_ms:.0f} ms", file=out)
+        for c in busiest_components(f, 5):
+            print(f"  most commits  {c.commits:>4} commits {c.renders:>5} renders  {c.name}", file=out)
+        for c in slowest_components(f, 5):
+            print(f"  slowest       {c.total_ms:>7.1f} ms (max {c.max_ms:.1f})  {c.name}", file=out)
+        for h in f.handlers[:5]:
+            print(f"  handler       {h.total_ms:>7.1f} ms x{h.calls:<4} {h.name}", file=out)
+
+
+def _regressed(before: float | None, after: float | None, min_ms: float, min_ratio: float) -> bool:
+    if after is None:
+        return False
+    before = before or 0.0
+    return after - before >= min_ms and after > before * (1 + min_ratio)
+
+
+def compare_reports(base: TraceReport, head: TraceReport, min_ms: float = 5.0,
+                    min_ratio: float = 0.2) -> list[str]:
+    """One line per flow metric, component or handler that got slower in ``head``.
+
+    A value regresses when it grew by at least ``min_ms`` and by more than
+    ``min_ratio``; commit counts regress when they grew at all.
+    """
+    regressions = []
+    base_flows = {f.flow: f for f in base.flows}
+    for flow in head.flows:
+        old = base_flows.get(flow.flow)
+        if old is None:
+            continue
+        for metric in ("long_task_ms", "scripting_ms", "layout_ms", "paint_ms", "commit_ms"):
+            before, after = getattr(old, metric), getattr(flow, metric)
+            if _regressed(before, after, min_ms, min_ratio):
+                regressions.append(f"{flow.flow}: {metric} {before} -> {after}")
+
+        old_components = {c.name: c for c in old.components}
+        for component in flow.components:
+            was = old_components.get(component.name)
+            if was is None:
+                was = ComponentStats(component.name, 0, 0)
+            if component.commits > was.commits:
+                regressions.append(f"{flow.flow}: component {component.name} commits "
+                                   f"{was.commits} -> {component.commits}")
+            if _regressed(was.total_ms, component.total_ms, min_ms, min_ratio):
+                regressions.append(f"{flow.flow}: component {component.name} render ms "
+                                   f"{was.total_ms} -> {component.total_ms}")
+
+        old_handlers = {h.name: h for h in old.handlers}
+        for handler in flow.handlers:
+            was = old_handlers.get(handler.name)
+            before = was.total_ms if was else None
+            if _regressed(before, handler.total_ms, min_ms, min_ratio):
+                regressions.append(f"{flow.flow}: handler {handler.name} ms {before} -> {handler.total_ms}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Trace the main thread and React commits per user flow.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="trace flows and write a report")
+    record.add_argument("--label", default="current", help="name of the build being traced")
+    record.add_argument("--flow", action="append", dest="flows", choices=sorted(FLOWS),
+                        help=f"flows to run in order (default {' '.join(DEFAULT_FLOWS)})")
+    record.add_argument("--profile", help="network/cpu throttling profile (see harness.perf)")
+    record.add_argument("--runs", type=int, default=1, help="repeat the flows, report medians")
+    record.add_argument("--save-traces", type=Path, help="keep raw Chrome and Playwright traces here")
+    record.add_argument("--headed", action="store_true")
+    record.add_argument("--json", type=Path, help="write the report here (input to compare)")
+
+    compare = commands.add_parser("compare", help="show what got slower between two reports")
+    compare.add_argument("base", type=Path)
+    compare.add_argument("head", type=Path)
+    compare.add_argument("--min-ms", type=float, default=5.0, help="ignore growth below this")
+    compare.add_argument("--min-ratio", type=float, default=0.2, help="ignore growth below this fraction")
+    compare.add_argument("--check", action="store_true", help="exit non-zero on any regression")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        base, head = load_report(args.base), load_report(args.head)
+        regressions = compare_reports(base, head, args.min_ms, args.min_ratio)
+        print(f"{base.label} -> {head.label}: {len(regressions)} regression(s)")
+        for line in regressions:
+            print(f"SLOWER  {line}")
+        return 1 if args.check and regressions else 0
+
+    if args.profile:
+        parse_profile(args.profile)
+    flows = tuple(args.flows or DEFAULT_FLOWS)
+    results = asyncio.run(_record(flows, args.runs, args.profile, not args.headed, args.save_traces))
+    report = TraceReport(args.label, args.profile or "unthrottled", args.runs, results)
+    print_report(report)
+    if args.json:
+        write_report(report, args.json)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
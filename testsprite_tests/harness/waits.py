@@ -0,0 +1,100 @@
+"""Event-driven waits replacing the fixed ``wait_for_timeout`` sleeps.
+
+Playwright's ``networkidle`` load state only covers the initial navigation;
+the app fetches from Supabase after every tab switch and click. The tracker
+here counts in-flight requests per page so :func:`settle` can return as soon
+as the network has been quiet briefly and no loading spinner is visible.
+"""
+
+import asyncio
+import weakref
+
+from playwright import async_api
+
+# Long-lived streams (Supabase realtime) never finish and must not block idling.
+_IGNORED_RESOURCE_TYPES = {"websocket", "eventsource"}
+
+# Supabase REST calls (tables and RPCs), counted separately from assets
+_API_PATH = "/rest/v1/"
+
+# Loading indicators used across the screens (Tailwind ``animate-spin``).
+SPINNER_SELECTOR = ".animate-spin"
+
+_trackers: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+class NetworkTracker:
+    def __init__(self, page):
+        self._loop = asyncio.get_running_loop()
+        self.in_flight = 0
+        # Requests started on the page so far (all, and Supabase REST only)
+        self.requests = 0
+        self.api_requests = 0
+        self.last_change = self._loop.time()
+        self.idle = asyncio.Event()
+        self.idle.set()
+        page.on("request", self._started)
+        page.on("requestfinished", self._finished)
+        page.on("requestfailed", self._finished)
+
+    def _started(self, request) -> None:
+        if request.resource_type in _IGNORED_RESOURCE_TYPES:
+            return
+        self.in_flight += 1
+        self.requests += 1
+        if _API_PATH in request.url and request.method != "OPTIONS":
+            self.api_requests += 1
+        self.last_change = self._loop.time()
+        self.idle.clear()
+
+    def _finished(self, request) -> None:
+        if request.resource_type in _IGNORED_RESOURCE_TYPES:
+            return
+        self.in_flight = max(0, self.in_flight - 1)
+        self.last_change = self._loop.time()
+        if self.in_flight == 0:
+            self.idle.set()
+
+    async def wait_idle(self, quiet: float, timeout: float) -> bool:
+        """Wait until no request has been in flight for ``quiet`` seconds."""
+        deadline = self._loop.time() + timeout
+        while True:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self.idle.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+            quiet_left = self.last_change + quiet - self._loop.time()
+            if quiet_left <= 0:
+                return True
+            await asyncio.sleep(min(quiet_left, max(0.0, deadline - self._loop.time())))
+            if self.idle.is_set() and self._loop.time() - self.last_change >= quiet:
+                return True
+
+
+def track_network(page) -> NetworkTracker:
+    tracker = _trackers.get(page)
+    if tracker is None:
+        tracker = _trackers[page] = NetworkTracker(page)
+    return tracker
+
+
+async def settle(page, quiet_ms: int = 250, timeout_ms: int = 5000) -> None:
+    """Wait for the page to finish reacting to the last action.
+
+    Returns once the network has been idle for ``quiet_ms`` and no spinner
+    is visible, or after ``timeout_ms`` at the latest; the following
+    action's own auto-waiting takes over from there.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout_ms / 1000
+    await track_network(page).wait_idle(quiet_ms / 1000, timeout_ms / 1000)
+    remaining = deadline - loop.time()
+    if remaining <= 0:
+        return
+    try:
+        await page.locator(SPINNER_SELECTOR).first.wait_for(state="hidden", timeout=remaining * 1000)
+    except async_api.Error:
+        pass